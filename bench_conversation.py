@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de Message y Conversation.
+
+Mide:
+- Bytes por mensaje en memoria (tracemalloc), frente a la representación
+  anterior (dataclass frozen con datetime) como referencia
+- Coste medio por append con historial ilimitado y con max_messages
+  (recorte activo en cada append): debe ser constante, no crecer con N
+- Bytes por sesión inactiva (solo system prompt), con el prompt compartido
+  del registro frente a una copia propia por sesión
+- Bytes por sesión con historial: residente frente a hibernada (blob
+  comprimido de HibernatedConversationStore)
+
+Uso:
+    python bench_conversation.py                  # 10k mensajes
+    python bench_conversation.py --messages 50000
+    python bench_conversation.py --max-messages 20
+"""
+
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.application.conversation_service import DEFAULT_SYSTEM_PROMPT  # noqa: E402
+from src.domain.conversation import Conversation  # noqa: E402
+from src.domain.message import Message  # noqa: E402
+from src.domain.system_prompt import SystemPromptRegistry  # noqa: E402
+from src.infrastructure.persistence.hibernated_conversation_store import HibernatedConversationStore  # noqa: E402
+
+
+@dataclass(frozen=True)
+class DataclassMessage:
+    """Representación anterior de Message (solo como referencia)."""
+    
+    role: str
+    content: str
+    timestamp: datetime
+
+
+def _text(i: int) -> str:
+    return f"Mensaje de prueba número {i}"
+
+
+def measure_bytes(count: int, build) -> float:
+    """Bytes por objeto creados por build(texto), sin contar el texto."""
+    texts = [_text(i) for i in range(count)]
+    
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [build(text) for text in texts]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    # Lista contenedora incluida (8 bytes por puntero): igual en ambos casos
+    del objects
+    return (after - before) / count
+
+
+def measure_idle_sessions(count: int, shared: bool) -> float:
+    """
+    Bytes por conversación recién creada con el prompt por defecto.
+    
+    Args:
+        count: Número de sesiones
+        shared: True = registro común; False = un registro (una copia) por sesión
+    """
+    registry = SystemPromptRegistry()
+    
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    # Sin registro común cada sesión tiene su propia copia del texto
+    prompts = [DEFAULT_SYSTEM_PROMPT] * count if shared else [
+        "".join(list(DEFAULT_SYSTEM_PROMPT)) for _ in range(count)
+    ]
+    sessions = [
+        Conversation(system_prompt=prompt, prompts=registry if shared else SystemPromptRegistry())
+        for prompt in prompts
+    ]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    del sessions
+    return (after - before) / count
+
+
+def measure_hibernation(count: int, turns: int) -> tuple[float, float]:
+    """
+    Bytes por sesión con `turns` turnos: residente y hibernada en memoria.
+    
+    Returns:
+        (bytes residentes por sesión, bytes hibernados por sesión)
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = []
+    for _ in range(count):
+        conversation = Conversation(system_prompt=DEFAULT_SYSTEM_PROMPT)
+        for i in range(turns):
+            conversation.add_user_message(f"Pregunta {i}: ¿qué tiempo hará mañana en Madrid?")
+            conversation.add_assistant_message(f"Respuesta {i}: mañana habrá sol y unos 24 grados.")
+        sessions.append(conversation)
+    resident = tracemalloc.get_traced_memory()[0] - before
+    
+    hibernation = HibernatedConversationStore()
+    for conversation in sessions:
+        hibernation.save(conversation)
+    del sessions, conversation
+    hibernated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    
+    return resident / count, hibernated / count
+
+
+def measure_append(count: int, max_messages=None) -> tuple[float, float]:
+    """
+    Coste por append en la primera y la última décima parte de N mensajes.
+    
+    Returns:
+        (µs por append al principio, µs por append al final)
+    """
+    conversation = Conversation(max_messages=max_messages)
+    texts = [_text(i) for i in range(count)]
+    tenth = max(1, count // 10)
+    timings = []
+    
+    for start in (0, count - tenth):
+        if start > 0:
+            for text in texts[tenth:start]:
+                conversation.add_user_message(text)
+        
+        begin = perf_counter()
+        for text in texts[start:start + tenth]:
+            conversation.add_user_message(text)
+        timings.append((perf_counter() - begin) / tenth * 1e6)
+    
+    return timings[0], timings[1]
+
+
+def main():
+    """Punto de entrada."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Message/Conversation micro-benchmark")
+    parser.add_argument("--messages", type=int, default=10000, help="Messages per run")
+    parser.add_argument("--max-messages", type=int, default=50, help="History bound for the trimmed run")
+    
+    args = parser.parse_args()
+    n = args.messages
+    
+    slotted = measure_bytes(n, Message.create_user_message)
+    legacy = measure_bytes(
+        n,
+        lambda text: DataclassMessage("user", text, datetime.now(timezone.utc))
+    )
+    
+    print(f"\n📦 Bytes por mensaje ({n} mensajes, sin el texto):")
+    print(f"  Message (slots, int ns)     {slotted:8.1f}")
+    print(f"  dataclass + datetime        {legacy:8.1f}")
+    
+    print(f"\n⏱️  Append (µs/mensaje, primera vs última décima de {n}):")
+    for label, bound in (("sin límite", None), (f"max_messages={args.max_messages}", args.max_messages)):
+        first, last = measure_append(n, bound)
+        print(f"  {label:22s} {first:7.2f} → {last:7.2f}")
+    
+    print(f"\n💤 Bytes por sesión inactiva ({n} sesiones, prompt por defecto):")
+    print(f"  prompt compartido (registro) {measure_idle_sessions(n, shared=True):8.1f}")
+    print(f"  copia por sesión             {measure_idle_sessions(n, shared=False):8.1f}")
+    
+    sessions = max(1, n // 10)
+    resident, hibernated = measure_hibernation(sessions, turns=20)
+    print(f"\n🧊 Bytes por sesión con 20 turnos ({sessions} sesiones):")
+    print(f"  residente                    {resident:8.1f}")
+    print(f"  hibernada (zlib)             {hibernated:8.1f}  ({resident / hibernated:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de los formatos de respuesta de /api/voice/process.
+
+Mide, para cada formato (headers base64, multipart/mixed, frame binario):
+- Bytes en el cable: cuerpo + cabeceras propias del formato
+- Coste de serializar en el servidor (µs)
+- Coste de decodificar en el cliente (µs, equivalente en Python)
+
+con una respuesta corta y una larga, y audio de pocos segundos.
+
+Uso:
+    python bench_voice_envelope.py
+    python bench_voice_envelope.py --seconds 10 --rounds 5000
+"""
+
+import base64
+import json
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.api import voice_envelope  # noqa: E402
+
+
+# WAV 16-bit mono a 22.05 kHz (lo que genera pyttsx3/espeak)
+BYTES_PER_SECOND = 22050 * 2
+
+TEXTS = {
+    "corta": "Son las diez y cuarto.",
+    "larga": "Mañana habrá sol por la mañana y chubascos débiles por la tarde, con 24 °C. " * 40,
+}
+
+
+def _decode_headers(body: bytes, headers: dict[str, str]):
+    return (
+        base64.b64decode(headers["X-Transcribed-Text"]).decode("utf-8"),
+        base64.b64decode(headers["X-Response-Text"]).decode("utf-8"),
+        body
+    )
+
+
+def _decode_multipart(body: bytes, media_type: str):
+    boundary = media_type.split("boundary=")[1].encode("ascii")
+    json_part, audio_part = body.split(b"--" + boundary)[1:3]
+    meta = json.loads(json_part.split(b"\r\n\r\n", 1)[1])
+    return meta, audio_part.split(b"\r\n\r\n", 1)[1][:-2]
+
+
+def measure(fmt: str, meta: dict, audio: bytes, rounds: int) -> tuple[int, float, float]:
+    """
+    Returns:
+        (bytes en el cable, µs por serialización, µs por decodificación)
+    """
+    body, media_type, headers = voice_envelope.encode(fmt, meta, audio)
+    wire = len(body) + sum(len(name) + len(value) + 4 for name, value in headers.items())
+    
+    start = perf_counter()
+    for _ in range(rounds):
+        voice_envelope.encode(fmt, meta, audio)
+    encode_us = (perf_counter() - start) / rounds * 1e6
+    
+    if fmt == voice_envelope.FORMAT_FRAME:
+        decode = lambda: voice_envelope.decode_frame(body)  # noqa: E731
+    elif fmt == voice_envelope.FORMAT_MULTIPART:
+        decode = lambda: _decode_multipart(body, media_type)  # noqa: E731
+    else:
+        decode = lambda: _decode_headers(body, headers)  # noqa: E731
+    
+    start = perf_counter()
+    for _ in range(rounds):
+        decode()
+    decode_us = (perf_counter() - start) / rounds * 1e6
+    
+    return wire, encode_us, decode_us
+
+
+def main():
+    """Punto de entrada."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Voice response envelope micro-benchmark")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Seconds of response audio")
+    parser.add_argument("--rounds", type=int, default=2000, help="Iterations per measurement")
+    
+    args = parser.parse_args()
+    audio = b"RIFF" + bytes(int(args.seconds * BYTES_PER_SECOND))
+    
+    for label, text in TEXTS.items():
+        meta = {
+            "session_id": "550e8400-e29b-41d4-a716-446655440000",
+            "transcribed_text": "¿Qué tiempo hará mañana?",
+            "response_text": text,
+            "latency": {"total": 1.52, "stt": 0.31, "llm": 0.9, "tts": 0.31}
+        }
+        
+        print(f"\n📦 Respuesta {label} ({len(text)} caracteres, {args.seconds:g}s de audio):")
+        print(f"  {'formato':10s} {'bytes texto':>12s} {'serializar µs':>14s} {'decodificar µs':>15s}")
+        for fmt in voice_envelope.ENCODERS:
+            wire, encode_us, decode_us = measure(fmt, meta, audio, args.rounds)
+            print(f"  {fmt:10s} {wire - len(audio):12d} {encode_us:14.1f} {decode_us:15.1f}")
+
+
+if __name__ == "__main__":
+    main()
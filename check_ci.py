@@ -101,6 +101,13 @@ class CIChecker:
             print("\n⏭️  Ruff not installed, skipping lint")
             return True
     
+    def check_import_time(self) -> bool:
+        """Validar presupuesto de tiempo de importación."""
+        return self.run_command(
+            [sys.executable, "check_import_time.py"],
+            "Import Time Budget"
+        )
+    
     def run_all_checks(self) -> bool:
         """Ejecutar todas las validaciones."""
         print("\n" + "="*60)
@@ -113,6 +120,7 @@ class CIChecker:
         checks = [
             ("Tests", self.check_tests),
             ("Coverage", self.check_coverage),
+            ("Import time", self.check_import_time),
             ("Linting", self.check_lint),
         ]
         
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark del tiempo de importación de la aplicación.
+
+Ejecuta `python -X importtime -c "import src.api.main"` en un proceso
+limpio y falla si:
+- El tiempo acumulado supera el presupuesto (--budget-ms)
+- Se importa algún backend pesado (faster-whisper, pyttsx3, openai...),
+  que deben cargarse al crear/usar su cliente, no al importar la app
+
+Uso:
+    python check_import_time.py                  # Presupuesto por defecto
+    python check_import_time.py --budget-ms 800  # Presupuesto propio
+    python check_import_time.py --top 20         # Más módulos en el ranking
+"""
+
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+
+TARGET_MODULE = "src.api.main"
+DEFAULT_BUDGET_MS = 1000.0
+
+# Backends que NO deben importarse al importar la aplicación
+HEAVY_MODULES = ("faster_whisper", "ctranslate2", "av", "pyttsx3", "openai")
+
+# Línea de -X importtime: "import time:  self [us] | cumulative | module"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure_imports(module: str = TARGET_MODULE) -> dict[str, int]:
+    """
+    Importar un módulo en un proceso limpio con -X importtime.
+    
+    Args:
+        module: Módulo a importar
+    
+    Returns:
+        Dict módulo → tiempo acumulado en microsegundos
+    
+    Raises:
+        RuntimeError: Si la importación falla
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).parent,
+        capture_output=True,
+        text=True
+    )
+    
+    if result.returncode != 0:
+        raise RuntimeError(f"Import of {module} failed:\n{result.stderr}")
+    
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            timings[match.group(4)] = int(match.group(2))
+    
+    return timings
+
+
+def find_heavy_imports(timings: dict[str, int]) -> list[str]:
+    """Backends pesados (o sus submódulos) presentes en la importación."""
+    return sorted(
+        name for name in timings
+        if name.split(".")[0] in HEAVY_MODULES
+    )
+
+
+def main():
+    """Punto de entrada."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Guard application import time")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Import time budget (ms)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to report")
+    
+    args = parser.parse_args()
+    
+    timings = measure_imports()
+    total_ms = timings.get(TARGET_MODULE, 0) / 1000
+    
+    print(f"\n⏱️  import {TARGET_MODULE}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"\nTop {args.top} imports (cumulative):")
+    for name, micros in sorted(timings.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+    
+    failed = False
+    
+    heavy = find_heavy_imports(timings)
+    if heavy:
+        print(f"\n❌ Heavy backends imported eagerly: {', '.join(heavy[:10])}")
+        failed = True
+    
+    if total_ms > args.budget_ms:
+        print(f"\n❌ Import time over budget: {total_ms:.1f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    
+    if not failed:
+        print("\n✅ Import time within budget")
+    
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -45,6 +45,17 @@ def check_venv():
 
 def main():
     """Main function."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Launch A.R.C.A LLM")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Workers (>1 arranca el modo prefork de producción, sin --reload)"
+    )
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("🤖 A.R.C.A LLM - Voice Conversational Assistant")
     print("=" * 60)
@@ -68,15 +79,26 @@ def main():
     print("Presiona Ctrl+C para detener el servidor")
     print()
     
-    # Launch uvicorn
-    try:
-        subprocess.run([
+    if args.workers > 1:
+        # Producción: modelos precargados en el padre y fork de N workers
+        command = [
+            sys.executable, "-m", "src.api.prefork",
+            "--workers", str(args.workers),
+            "--host", "0.0.0.0",
+            "--port", "8000"
+        ]
+    else:
+        command = [
             sys.executable, "-m", "uvicorn",
             "src.api.main:app",
             "--host", "0.0.0.0",
             "--port", "8000",
             "--reload"
-        ])
+        ]
+    
+    # Launch uvicorn
+    try:
+        subprocess.run(command)
     except KeyboardInterrupt:
         print()
         print("=" * 60)
@@ -4,26 +4,89 @@ FastAPI Application - A.R.C.A LLM Voice Assistant.
 Aplicación principal que expone endpoints para conversación por voz.
 """
 
+import json
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Optional
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from pathlib import Path
 from loguru import logger
 
 from ..config import settings
-from ..infrastructure.stt.whisper_client import WhisperSTTClient
-from ..infrastructure.llm.lm_studio_client import LMStudioClient
+from ..infrastructure.stt.whisper_client import WhisperSTTClient, configure_model_cache
+from ..infrastructure.llm.llm_pool_client import LLMPoolClient
 from ..infrastructure.tts.pyttsx3_client import Pyttsx3TTSClient
-from ..application.conversation_service import ConversationService
+from ..application.conversation_service import DEFAULT_SYSTEM_PROMPT, ConversationService
+from ..application.conversation_store import ConversationStore, InMemoryConversationStore
+from ..domain.conversation_template import ConversationTemplate
+from ..domain.system_prompt import SYSTEM_PROMPTS
+from ..infrastructure.persistence.hibernated_conversation_store import HibernatedConversationStore
+from ..infrastructure.persistence.redis_conversation_store import RedisConversationStore
+from ..infrastructure.persistence.sqlite_conversation_store import SqliteConversationStore
 from ..application.voice_assistant_service import VoiceAssistantService
+from .static_assets import StaticAssetCache
 
 
 # === Global State ===
 voice_service: VoiceAssistantService = None
 
 
+def build_conversation_store() -> ConversationStore:
+    """Crear el store de conversaciones configurado."""
+    if settings.conversation_store == "redis":
+        return RedisConversationStore.from_url(
+            settings.redis_url,
+            max_cached_sessions=settings.session_max_count,
+            idle_ttl=settings.session_idle_ttl
+        )
+    
+    if settings.conversation_store == "sqlite":
+        return SqliteConversationStore(
+            Path(settings.sqlite_path),
+            commit_delay=settings.sqlite_commit_delay,
+            **settings.get_session_cache_config()
+        )
+    
+    spill_store = None
+    cache_config = settings.get_session_cache_config()
+    
+    if settings.session_hibernate != "off":
+        # Tier frío: las sesiones inactivas se comprimen y salen del heap
+        spill_store = HibernatedConversationStore(
+            directory=Path(settings.session_hibernate_dir) if settings.session_hibernate == "disk" else None,
+            compression_level=settings.session_hibernate_level,
+            max_age=settings.session_hibernate_max_age,
+            max_bytes=settings.session_hibernate_max_bytes
+        )
+        cache_config["idle_ttl"] = settings.session_hibernate_after
+    elif settings.session_spill:
+        # Solo de paso: la memoria la gestiona el store principal
+        spill_store = SqliteConversationStore(
+            Path(settings.sqlite_path),
+            commit_delay=settings.sqlite_commit_delay,
+            max_sessions=1
+        )
+    
+    return InMemoryConversationStore(spill_store=spill_store, **cache_config)
+
+
+def load_conversation_template() -> Optional[ConversationTemplate]:
+    """Cargar la plantilla por defecto (system prompt + preámbulo few-shot)."""
+    if not settings.conversation_template_path:
+        return None
+    
+    path = Path(settings.conversation_template_path)
+    data = json.loads(path.read_text(encoding="utf-8"))
+    
+    return ConversationTemplate.create(
+        name=data.get("name", path.stem),
+        system_prompt=data.get("system_prompt", DEFAULT_SYSTEM_PROMPT),
+        examples=[(example["role"], example["content"]) for example in data.get("examples", [])],
+        prompts=SYSTEM_PROMPTS
+    )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -37,6 +100,13 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Starting A.R.C.A LLM...")
     settings.print_startup_info()
     
+    # Cache de modelos HuggingFace: antes de que el warm-up importe
+    # faster-whisper (no se hace al importar el módulo)
+    configure_model_cache()
+    
+    # Frontend en memoria y precomprimido (no en la primera visita)
+    static_assets.load()
+    
     # Inicializar clientes
     logger.info("📦 Initializing clients...")
     
@@ -44,8 +114,10 @@ async def lifespan(app: FastAPI):
         **settings.get_whisper_config()
     )
     
-    llm_client = LMStudioClient(
-        **settings.get_lm_studio_config()
+    # Siempre vía pool (aunque haya un solo backend) para tener
+    # circuit breaker, timeouts y, con varios backends, hedging
+    llm_client = LLMPoolClient.from_urls(
+        **settings.get_llm_pool_config()
     )
     
     tts_client = Pyttsx3TTSClient(
@@ -53,29 +125,40 @@ async def lifespan(app: FastAPI):
     )
     
     # Inicializar servicios
-    conversation_service = ConversationService(max_messages_per_conversation=None)
+    # Store de conversaciones con caché acotada (sesiones, bytes, TTL):
+    # en memoria, persistente (sqlite) o compartido entre workers (redis)
+    conversation_store = build_conversation_store()
+    
+    conversation_service = ConversationService(
+        max_messages_per_conversation=None,
+        store=conversation_store,
+        turn_policy=settings.session_turn_policy,
+        default_template=load_conversation_template()
+    )
     
     voice_service = VoiceAssistantService(
         stt_client=stt_client,
         llm_client=llm_client,
         tts_client=tts_client,
-        conversation_service=conversation_service
+        conversation_service=conversation_service,
+        **settings.get_voice_service_config()
     )
     
-    # Health check
-    logger.info("🏥 Running startup health check...")
-    health = await voice_service.health_check()
+    # Warm-up (STT, LLM, TTS) y sondeo de salud en background: el puerto
+    # se abre ya y /health/ready indica cuándo se puede enviar tráfico
+    await voice_service.start()
     
-    if not health["overall"]:
-        logger.warning("⚠️ Some components are unhealthy, but starting anyway")
+    # Janitor: saca de memoria las sesiones inactivas (TTL)
+    await conversation_service.start_janitor(settings.session_janitor_interval)
     
-    logger.info("✅ A.R.C.A LLM is ready!")
+    logger.info("✅ A.R.C.A LLM is accepting connections (warming up in background)")
     
     yield
     
     # === SHUTDOWN ===
     logger.info("🛑 Shutting down A.R.C.A LLM...")
-    voice_service.cleanup()
+    await conversation_service.stop_janitor()
+    await voice_service.cleanup()
     logger.info("👋 Goodbye!")
 
 
@@ -102,16 +185,29 @@ app.add_middleware(
         "X-Latency-Total",
         "X-Latency-STT",
         "X-Latency-LLM",
-        "X-Latency-TTS"
+        "X-Latency-TTS",
+        "X-Latency-Lock-Wait",
+        "X-Latency-Queue-Wait",
+        "X-LLM-Backend",
+        "Retry-After"
     ],
 )
 
 
 # === Static Files ===
-# Montar directorio static para CSS/JS
-static_path = Path(__file__).parent.parent / "frontend" / "static"
-if static_path.exists():
-    app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
+# index.html y CSS/JS en memoria, precomprimidos y con hash de contenido
+frontend_path = Path(__file__).parent.parent / "frontend"
+static_assets = StaticAssetCache(
+    static_dir=frontend_path / "static",
+    template_path=frontend_path / "templates" / "index.html"
+)
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static_files(path: str, request: Request):
+    """Servir CSS/JS desde memoria (Accept-Encoding, ETag, URLs con hash)."""
+    response = static_assets.static(path, request)
+    return response if response is not None else Response(status_code=404)
 
 
 # === Routes ===
@@ -122,14 +218,14 @@ app.include_router(voice_routes.router, prefix="/api", tags=["voice"])
 
 # === Root Endpoint ===
 @app.get("/", response_class=HTMLResponse)
-async def root():
+async def root(request: Request):
     """
-    Servir interfaz web principal.
+    Servir interfaz web principal (desde memoria, con las URLs de static con hash).
     """
-    template_path = Path(__file__).parent.parent / "frontend" / "templates" / "index.html"
+    response = static_assets.index(request)
     
-    if template_path.exists():
-        return HTMLResponse(content=template_path.read_text(encoding='utf-8'), status_code=200)
+    if response is not None:
+        return response
     else:
         return HTMLResponse(
             content="<h1>A.R.C.A LLM API</h1><p>Frontend not found. API is running at /api/</p>",
@@ -138,11 +234,17 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
+async def health_check(deep: bool = False):
     """
     Health check endpoint.
+    
+    Devuelve la última instantánea del monitor de salud (instantáneo).
+    Con ?deep=true ejecuta el chequeo profundo (genera texto y audio).
     """
-    health = await voice_service.health_check()
+    if deep:
+        health = await voice_service.health_check()
+    else:
+        health = voice_service.get_health_snapshot()
     
     return {
         "status": "healthy" if health["overall"] else "unhealthy",
@@ -150,6 +252,31 @@ async def health_check():
     }
 
 
+@app.get("/health/live")
+async def liveness():
+    """
+    Liveness probe: el proceso y el event loop responden.
+    
+    No depende de LM Studio ni de los modelos (no debe provocar reinicios
+    por fallos externos).
+    """
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: 200 cuando el servicio puede recibir tráfico, 503 si no.
+    
+    Incluye estado y duración del warm-up de cada componente.
+    """
+    if voice_service is None:
+        return JSONResponse(content={"ready": False, "components": {}}, status_code=503)
+    
+    state = voice_service.get_readiness()
+    return JSONResponse(content=state, status_code=200 if state["ready"] else 503)
+
+
 # === Para ejecutar con uvicorn ===
 if __name__ == "__main__":
     import uvicorn
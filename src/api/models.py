@@ -62,6 +62,11 @@ class ConversationHistoryResponse(BaseModel):
     session_id: UUID
     messages: list[dict[str, str]]
     message_count: int
+    version: int = Field(default=0, description="Versión del historial (la misma que el ETag)")
+    next_cursor: int = Field(default=0, description="Valor de 'since' para pedir lo siguiente")
+    total: int = Field(default=0, description="Índice tras el último mensaje de la conversación")
+    has_more: bool = Field(default=False, description="Quedan mensajes tras esta página")
+    reset: bool = Field(default=False, description="El historial cambió por detrás del cursor: página desde el principio")
     
     class Config:
         json_schema_extra = {
@@ -84,7 +89,12 @@ class ConversationHistoryResponse(BaseModel):
                         "timestamp": "2025-01-01T12:01:05Z"
                     }
                 ],
-                "message_count": 3
+                "message_count": 3,
+                "version": 7,
+                "next_cursor": 3,
+                "total": 3,
+                "has_more": False,
+                "reset": False
             }
         }
 
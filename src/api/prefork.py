@@ -0,0 +1,264 @@
+"""
+Prefork - Modo de producción multi-worker.
+
+Un proceso padre precarga el código (FastAPI, faster-whisper, OpenAI SDK),
+descarga el modelo Whisper, congela el heap con gc.freeze() y abre el
+socket; después hace fork() de N workers uvicorn (uvloop + httptools si
+están instalados) que aceptan del mismo socket. Las páginas del código
+precargado se comparten copy-on-write entre workers.
+
+Estado POR WORKER (no compartido):
+- Conversaciones con CONVERSATION_STORE=memory: usar el store Redis o
+  routing sticky por session_id en el balanceador
+- Turnos en curso y barge-in: el POST /voice/barge-in debe llegar al
+  worker que ejecuta el turno (mismo requisito de routing sticky)
+- Modelo Whisper, engine TTS y executors: cada worker instancia el suyo
+  (CTranslate2 arranca threads al crear el modelo y no sobreviven a fork)
+- Circuit breakers, pool HTTP hacia LM Studio, métricas y health monitor
+
+Uso:
+    python -m src.api.prefork --workers 4
+    python run_arca.py --workers 4
+"""
+
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from importlib.util import find_spec
+from typing import Optional
+
+from loguru import logger
+
+from ..config import settings
+
+
+# Segundos mínimos entre el arranque de un worker y su reemplazo
+RESPAWN_BACKOFF = 1.0
+
+
+def select_event_loop() -> str:
+    """Event loop de uvicorn: uvloop si está instalado."""
+    return "uvloop" if find_spec("uvloop") else "asyncio"
+
+
+def select_http_protocol() -> str:
+    """Parser HTTP de uvicorn: httptools si está instalado."""
+    return "httptools" if find_spec("httptools") else "h11"
+
+
+def preload() -> None:
+    """
+    Precargar en el padre todo lo que los workers comparten copy-on-write.
+    
+    No crea clientes ni servicios: el lifespan de cada worker lo hace
+    después del fork.
+    """
+    from ..infrastructure.stt.whisper_client import configure_model_cache, prefetch_model
+    
+    configure_model_cache()
+    
+    # La app y los backends pesados se importan una vez aquí, no en cada worker
+    from . import main  # noqa: F401
+    import faster_whisper  # noqa: F401
+    import openai  # noqa: F401
+    
+    try:
+        prefetch_model(settings.whisper_model)
+    except Exception as e:
+        # Los workers lo reintentarán en su warm-up
+        logger.warning(f"⚠️ Whisper model prefetch failed: {e}")
+    
+    # Sacar los objetos precargados del GC: recorrerlos tocaría sus
+    # cabeceras y rompería el copy-on-write en cada worker
+    gc.collect()
+    gc.freeze()
+    
+    logger.info(f"🧊 Preloaded and froze {gc.get_freeze_count()} objects")
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """
+    Abrir el socket de escucha compartido por todos los workers.
+    
+    Args:
+        host: Interfaz de escucha
+        port: Puerto
+        backlog: Cola de conexiones pendientes
+    
+    Returns:
+        Socket heredable en estado listen
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, worker_id: int) -> None:
+    """
+    Servir la app en este proceso (worker) sobre el socket heredado.
+    
+    Args:
+        sock: Socket de escucha abierto por el padre
+        worker_id: Índice del worker (para logs)
+    """
+    import uvicorn
+    from .main import app
+    
+    config = uvicorn.Config(
+        app,
+        loop=select_event_loop(),
+        http=select_http_protocol(),
+        lifespan="on",
+        log_level=settings.log_level.lower()
+    )
+    
+    logger.info(f"👷 Worker {worker_id} (pid {os.getpid()}) serving")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class PreforkSupervisor:
+    """
+    Proceso padre: precarga, fork de workers y reemplazo de los que mueren.
+    
+    Responsibilities:
+    - Abrir el socket y precargar antes del primer fork
+    - Mantener N workers vivos (respawn con backoff)
+    - Propagar SIGTERM/SIGINT a los workers y esperar a que terminen
+    """
+    
+    def __init__(self, workers: int, host: str, port: int):
+        """
+        Inicializar supervisor.
+        
+        Args:
+            workers: Número de workers a mantener
+            host: Interfaz de escucha
+            port: Puerto
+        """
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        
+        self.workers = workers
+        self.host = host
+        self.port = port
+        
+        self._sock: Optional[socket.socket] = None
+        self._children: dict[int, tuple[int, float]] = {}  # pid → (worker_id, started_at)
+        self._stopping = False
+    
+    def _spawn(self, worker_id: int) -> int:
+        """Hacer fork de un worker y devolver su pid."""
+        pid = os.fork()
+        
+        if pid == 0:
+            # Hijo: uvicorn instala sus propios handlers de señales
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            
+            exit_code = 0
+            try:
+                run_worker(self._sock, worker_id)
+            except BaseException as e:
+                logger.error(f"❌ Worker {worker_id} crashed: {e}")
+                exit_code = 1
+            finally:
+                # Nunca volver al bucle del supervisor desde un hijo
+                os._exit(exit_code)
+        
+        self._children[pid] = (worker_id, time.monotonic())
+        return pid
+    
+    def _handle_stop(self, signum, frame) -> None:
+        """Handler de SIGTERM/SIGINT: parar workers de forma ordenada."""
+        if self._stopping:
+            return
+        
+        self._stopping = True
+        logger.info(f"🛑 Signal {signum}: stopping {len(self._children)} workers")
+        
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    def run(self) -> int:
+        """
+        Arrancar y supervisar los workers hasta recibir señal de parada.
+        
+        Returns:
+            Código de salida del proceso padre
+        """
+        self._sock = bind_socket(self.host, self.port)
+        preload()
+        
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        
+        for worker_id in range(self.workers):
+            self._spawn(worker_id)
+        
+        logger.info(
+            f"🚀 Prefork: {self.workers} workers on http://{self.host}:{self.port} "
+            f"(loop={select_event_loop()}, http={select_http_protocol()})"
+        )
+        
+        while self._children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            
+            worker_id, started_at = self._children.pop(pid, (None, 0.0))
+            if worker_id is None or self._stopping:
+                continue
+            
+            logger.warning(
+                f"⚠️ Worker {worker_id} (pid {pid}) exited with status "
+                f"{os.waitstatus_to_exitcode(status)}, respawning"
+            )
+            
+            # Evitar un bucle de forks si el worker muere al arrancar
+            uptime = time.monotonic() - started_at
+            if uptime < RESPAWN_BACKOFF:
+                time.sleep(RESPAWN_BACKOFF - uptime)
+            
+            if not self._stopping:
+                self._spawn(worker_id)
+        
+        self._sock.close()
+        logger.info("👋 All workers stopped")
+        return 0
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Punto de entrada: python -m src.api.prefork."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="A.R.C.A LLM pre-fork multi-worker server")
+    parser.add_argument("--workers", type=int, default=settings.api_workers, help="Number of worker processes")
+    parser.add_argument("--host", default=settings.api_host, help="Bind host")
+    parser.add_argument("--port", type=int, default=settings.api_port, help="Bind port")
+    
+    args = parser.parse_args(argv)
+    
+    if not hasattr(os, "fork"):
+        logger.error("❌ Prefork mode requires os.fork() (Linux/macOS)")
+        sys.exit(1)
+    
+    settings.print_startup_info()
+    supervisor = PreforkSupervisor(workers=args.workers, host=args.host, port=args.port)
+    sys.exit(supervisor.run())
+
+
+if __name__ == "__main__":
+    main()
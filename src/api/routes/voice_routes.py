@@ -3,18 +3,26 @@ Voice Routes - Endpoints para procesamiento de voz.
 
 Endpoints:
 - POST /voice/process - Procesar audio y retornar respuesta
+- POST /voice/stream - Igual, con el audio como cuerpo crudo decodificado mientras llega
 - POST /text/process - Procesar texto (para testing)
-- GET /conversation/{session_id} - Obtener historial
+- GET /conversation/{session_id} - Obtener historial (paginado, delta, ETag, NDJSON)
 - DELETE /conversation/{session_id} - Limpiar conversación
+- POST /voice/barge-in/{session_id} - Cancelar el turno en curso
+- GET /voice/metrics - Métricas de routing LLM y conexiones HTTP
 - WebSocket /ws/voice - Streaming (futuro)
 """
 
-import base64
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends
-from fastapi.responses import Response, JSONResponse
-from uuid import UUID, uuid4
+import asyncio
+import json
+from math import ceil
+from typing import Awaitable, Iterator, Optional, TypeVar
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends, Request, Query
+from fastapi.responses import Response, JSONResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
+from uuid import NAMESPACE_URL, UUID, uuid4, uuid5
 from loguru import logger
 
+from .. import voice_envelope
 from ..models import (
     VoiceProcessResponse,
     TextProcessRequest,
@@ -22,11 +30,130 @@ from ..models import (
     ConversationHistoryResponse,
     ErrorResponse
 )
-from ...application.voice_assistant_service import VoiceAssistantService
+from ...application.voice_assistant_service import VoiceAssistantService, TurnCancelledError
+from ...application.conversation_service import SessionBusyError
+from ...application.idempotency import IdempotencyKeyReusedError
+from ...application.rate_limiter import RateLimitedError
+from ...infrastructure.stt.audio_stream import AudioLimitError
+from ...infrastructure.llm.lm_studio_client import LLMUnavailableError
 
 
 router = APIRouter()
 
+T = TypeVar("T")
+
+# Cada cuánto se comprueba si el cliente cerró la conexión (segundos)
+DISCONNECT_POLL_INTERVAL = 0.2
+
+# Status no estándar (nginx) para "el cliente cerró la petición"
+CLIENT_CLOSED_REQUEST = 499
+
+# Máximo de mensajes por página del historial
+HISTORY_MAX_PAGE = 1000
+
+# Historial en streaming: un mensaje por línea, enviados en lotes
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_BATCH_SIZE = 64
+
+# Idempotency-Key: longitud máxima y namespace de la sesión derivada
+# cuando el cliente no envía session_id (los reintentos caen en la misma)
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_NAMESPACE = uuid5(NAMESPACE_URL, "urn:arca:idempotency-key")
+
+# Media types aceptados como cuerpo de /voice/stream (además de audio/*)
+STREAM_MEDIA_TYPES = ("application/octet-stream", "video/webm")
+
+# Tipos de respuesta de un turno de voz (según Accept y audio_format)
+VOICE_RESPONSES = {
+    200: {"content": {
+        "audio/wav": {},
+        "audio/ogg": {},
+        "audio/webm": {},
+        "audio/mpeg": {},
+        "multipart/mixed": {},
+        voice_envelope.FRAME_MEDIA_TYPE: {}
+    }},
+    400: {"model": ErrorResponse},
+    409: {"model": ErrorResponse},
+    422: {"model": ErrorResponse},
+    429: {"model": ErrorResponse},
+    500: {"model": ErrorResponse},
+    503: {"model": ErrorResponse}
+}
+
+
+class ClientDisconnectedError(Exception):
+    """El cliente cerró la conexión antes de recibir la respuesta."""
+
+
+async def _cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """
+    Ejecutar el pipeline cancelándolo si el cliente se desconecta.
+    
+    Así una petición abortada desde el navegador no sigue ocupando
+    LM Studio ni los threads de TTS hasta terminar.
+    
+    Raises:
+        ClientDisconnectedError: Si el cliente cerró la conexión
+    """
+    task = asyncio.ensure_future(work)
+    
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                await asyncio.wait({task})
+                raise ClientDisconnectedError()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def _find_llm_unavailable(error: BaseException) -> Optional[LLMUnavailableError]:
+    """Buscar un LLMUnavailableError en la cadena de causas del error."""
+    while error is not None:
+        if isinstance(error, LLMUnavailableError):
+            return error
+        error = error.__cause__
+    return None
+
+
+def _service_error(error: Exception) -> HTTPException:
+    """
+    Traducir un error del pipeline a HTTPException.
+    
+    Turno cancelado por barge-in o sesión ocupada (política reject) → 409;
+    Idempotency-Key reutilizada con otra petición → 422; cuota de turnos
+    superada → 429 con Retry-After; LLM no disponible (timeout, conexión,
+    circuito abierto) → 503 con Retry-After; cualquier otro error → 500.
+    """
+    if isinstance(error, (TurnCancelledError, SessionBusyError)):
+        return HTTPException(status_code=409, detail=str(error))
+    
+    if isinstance(error, IdempotencyKeyReusedError):
+        return HTTPException(status_code=422, detail=str(error))
+    
+    if isinstance(error, RateLimitedError):
+        return HTTPException(
+            status_code=429,
+            detail=str(error),
+            headers={"Retry-After": str(max(1, ceil(error.retry_after)))}
+        )
+    
+    unavailable = _find_llm_unavailable(error)
+    
+    if unavailable is not None:
+        return HTTPException(
+            status_code=503,
+            detail=str(unavailable),
+            headers={"Retry-After": str(max(1, ceil(unavailable.retry_after)))}
+        )
+    
+    return HTTPException(status_code=500, detail=str(error))
+
 
 def get_voice_service() -> VoiceAssistantService:
     """Obtener instancia del servicio de voz (inyectada en main.py)."""
@@ -34,18 +161,136 @@ def get_voice_service() -> VoiceAssistantService:
     return voice_service
 
 
+def _idempotency_key(request: Request) -> Optional[str]:
+    """Cabecera Idempotency-Key (None si no viene)."""
+    key = request.headers.get("idempotency-key")
+    if key is not None and not 0 < len(key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idempotency-Key must have 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+        )
+    return key
+
+
+def _client(request: Request) -> Optional[str]:
+    """IP del cliente (cuota de turnos, cola justa y alcance de Idempotency-Key)."""
+    return request.client.host if request.client else None
+
+
+def _parse_session_id(
+    session_id: Optional[str],
+    idempotency_key: Optional[str] = None,
+    client: Optional[str] = None
+) -> UUID:
+    """
+    session_id del cliente, o uno nuevo si no se indica.
+    
+    Con Idempotency-Key y sin session_id, la sesión se deriva de la clave y
+    de la IP del cliente: el reintento llega a la misma sesión que la
+    petición original, y otro cliente con la misma clave (un contador, el
+    valor por defecto de una librería) no cae en esa conversación.
+    """
+    if not session_id:
+        if not idempotency_key:
+            return uuid4()
+        return uuid5(IDEMPOTENCY_NAMESPACE, idempotency_key if client is None else f"{client} {idempotency_key}")
+    try:
+        return UUID(session_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid session_id format")
+
+
+def _admit(
+    service: VoiceAssistantService,
+    sid: UUID,
+    request: Request,
+    idempotency_key: Optional[str] = None
+) -> None:
+    """
+    Cuota de turnos por sesión y por IP del cliente (RateLimitedError → 429).
+    
+    Se comprueba después de mirar la Idempotency-Key: un reintento que se
+    une a un turno conocido no gasta cuota.
+    """
+    service.admit(sid, _client(request), idempotency_key)
+
+
+def _select_audio_format(
+    service: VoiceAssistantService,
+    accept: str,
+    audio_format: Optional[str]
+) -> tuple[str, str]:
+    """
+    Códec del audio de respuesta: audio_format explícito o tipos audio/* de Accept.
+    
+    Se elige antes del pipeline: un formato inválido no debe gastar STT ni LLM.
+    
+    Returns:
+        (nombre del formato, media type)
+    """
+    audio_formats = service.get_audio_formats()
+    if audio_format is None:
+        audio_format = voice_envelope.negotiate_audio(accept, audio_formats) or "wav"
+    elif audio_format not in audio_formats:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported audio_format: {audio_format} (available: {', '.join(audio_formats)})"
+        )
+    return audio_format, audio_formats[audio_format]
+
+
+def _voice_response(accept: str, sid: UUID, audio_type: str, result: tuple) -> Response:
+    """
+    Respuesta de un turno de voz en el formato negociado con Accept: audio
+    + textos en cabeceras base64 (por defecto), multipart/mixed o frame binario.
+    """
+    transcribed, response_text, response_audio, latency = result
+    
+    body, media_type, headers = voice_envelope.encode(
+        voice_envelope.negotiate(accept),
+        {
+            "session_id": str(sid),
+            "transcribed_text": transcribed,
+            "response_text": response_text,
+            "latency": latency,
+            "audio_type": audio_type
+        },
+        response_audio
+    )
+    
+    headers.update({
+        "Vary": "Accept",
+        "X-Session-ID": str(sid),
+        "X-Latency-Total": str(latency["total"]),
+        "X-Latency-STT": str(latency["stt"]),
+        "X-Latency-LLM": str(latency["llm"]),
+        "X-Latency-TTS": str(latency["tts"]),
+        "X-Latency-Lock-Wait": str(latency.get("lock_wait", 0.0)),
+        "X-Latency-Queue-Wait": str(latency.get("queue_wait", 0.0))
+    })
+    
+    # Decisión de routing del pool LLM (si hay varios backends)
+    if "llm_backend" in latency:
+        headers["X-LLM-Backend"] = str(int(latency["llm_backend"]))
+    
+    return Response(
+        content=body,
+        media_type=media_type,
+        headers=headers
+    )
+
+
 @router.post(
     "/voice/process",
     response_model=VoiceProcessResponse,
-    responses={
-        400: {"model": ErrorResponse},
-        500: {"model": ErrorResponse}
-    }
+    responses=VOICE_RESPONSES
 )
 async def process_voice(
+    http_request: Request,
     audio: UploadFile = File(..., description="Audio file (WAV, MP3, WEBM, etc.)"),
     session_id: str = Form(None, description="Session ID (optional, auto-generated if not provided)"),
-    language: str = Form("es", description="Language code (es, en, etc.)")
+    language: str = Form("es", description="Language code (es, en, etc.)"),
+    audio_format: str = Form(None, description="Response audio format (wav, ogg, webm, mp3, wav16k, wav8k); overrides Accept")
 ):
     """
     Procesar audio de voz y retornar respuesta.
@@ -56,17 +301,19 @@ async def process_voice(
     3. Sintetizar respuesta a audio (TTS)
     4. Retornar texto + audio
     
-    El audio de respuesta se retorna como base64 en JSON junto con el texto.
+    Formato según Accept (ver voice_envelope): audio/wav con los textos en
+    base64 en cabeceras (por defecto), multipart/mixed (JSON + audio) o
+    application/vnd.arca.voice-frame (frame binario con prefijos de longitud).
+    El audio se codifica según audio_format o, si no se indica, según los
+    tipos audio/* de Accept (audio/ogg, audio/webm, audio/mpeg); por
+    defecto WAV.
+    
+    Con la cabecera Idempotency-Key, un reintento se une al turno en curso
+    o recibe su resultado en lugar de repetir el pipeline.
     """
     try:
-        # Parsear session_id
-        if session_id:
-            try:
-                sid = UUID(session_id)
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid session_id format")
-        else:
-            sid = uuid4()
+        idempotency_key = _idempotency_key(http_request)
+        sid = _parse_session_id(session_id, idempotency_key, _client(http_request))
         
         # Leer audio bytes
         audio_bytes = await audio.read()
@@ -76,38 +323,125 @@ async def process_voice(
         
         logger.info(f"📨 Received voice request: session={sid}, audio_size={len(audio_bytes)} bytes")
         
-        # Procesar con servicio
         service = get_voice_service()
-        transcribed, response_text, response_audio, latency = await service.process_voice_input(
-            audio_bytes=audio_bytes,
-            session_id=sid,
-            language=language
+        accept = http_request.headers.get("accept", "")
+        audio_format, audio_type = _select_audio_format(service, accept, audio_format)
+        _admit(service, sid, http_request, idempotency_key)
+        
+        # Procesar con servicio
+        result = await _cancel_on_disconnect(
+            http_request,
+            service.process_voice_input(
+                audio_bytes=audio_bytes,
+                session_id=sid,
+                language=language,
+                audio_format=audio_format,
+                idempotency_key=idempotency_key,
+                client=_client(http_request)
+            )
         )
         
-        # Retornar respuesta con audio como bytes
-        # Texto en base64 para evitar problemas con caracteres Unicode en headers
-        transcribed_b64 = base64.b64encode(transcribed.encode('utf-8')).decode('ascii')
-        response_text_b64 = base64.b64encode(response_text.encode('utf-8')).decode('ascii')
+        return _voice_response(accept, sid, audio_type, result)
+    
+    except HTTPException:
+        raise
+    except ClientDisconnectedError:
+        logger.info(f"🔌 Client disconnected, voice turn cancelled: session={sid}")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except Exception as e:
+        logger.error(f"❌ Voice processing error: {e}")
+        raise _service_error(e)
+
+
+@router.post(
+    "/voice/stream",
+    response_model=VoiceProcessResponse,
+    responses={
+        **VOICE_RESPONSES,
+        413: {"model": ErrorResponse},
+        415: {"model": ErrorResponse}
+    },
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+        "audio/*": {"schema": {"type": "string", "format": "binary"}}
+    }}}
+)
+async def process_voice_stream(
+    http_request: Request,
+    session_id: Optional[str] = Query(None, description="Session ID (optional, auto-generated if not provided)"),
+    language: str = Query("es", description="Language code (es, en, etc.)"),
+    audio_format: Optional[str] = Query(None, description="Response audio format; overrides Accept")
+):
+    """
+    Procesar audio de voz enviado como cuerpo crudo (sin multipart).
+    
+    Mismo pipeline y mismos formatos de respuesta que /voice/process, pero
+    el audio (Content-Type audio/* o application/octet-stream, admite
+    Transfer-Encoding: chunked) se decodifica a PCM de 16 kHz mientras se
+    sube: al terminar la subida solo queda el último chunk por decodificar.
+    Los límites de tamaño y duración se aplican durante la subida (413).
+    Admite Idempotency-Key como /voice/process.
+    """
+    try:
+        idempotency_key = _idempotency_key(http_request)
+        sid = _parse_session_id(session_id, idempotency_key, _client(http_request))
+        
+        content_type = http_request.headers.get("content-type", "").partition(";")[0].strip().lower()
+        if not (content_type.startswith("audio/") or content_type in STREAM_MEDIA_TYPES):
+            raise HTTPException(
+                status_code=415,
+                detail="Body must be audio/* or application/octet-stream"
+            )
+        
+        service = get_voice_service()
+        accept = http_request.headers.get("accept", "")
+        audio_format, audio_type = _select_audio_format(service, accept, audio_format)
+        
+        # Con Content-Length conocido se rechaza sin leer el cuerpo
+        content_length = http_request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > service.stream_max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Audio exceeds {service.stream_max_bytes} bytes"
+            )
+        
+        # Antes de leer el cuerpo: un cliente sin cuota no ocupa el decodificador
+        _admit(service, sid, http_request, idempotency_key)
+        
+        # La subida no se envuelve en _cancel_on_disconnect: is_disconnected()
+        # consume mensajes del cuerpo. Una desconexión aquí llega como
+        # ClientDisconnect desde request.stream().
+        try:
+            samples = await service.decode_voice_stream(http_request.stream())
+        except AudioLimitError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        return Response(
-            content=response_audio,
-            media_type="audio/wav",
-            headers={
-                "X-Session-ID": str(sid),
-                "X-Transcribed-Text": transcribed_b64,  # Base64 encoded
-                "X-Response-Text": response_text_b64,    # Base64 encoded
-                "X-Latency-Total": str(latency["total"]),
-                "X-Latency-STT": str(latency["stt"]),
-                "X-Latency-LLM": str(latency["llm"]),
-                "X-Latency-TTS": str(latency["tts"])
-            }
+        logger.info(f"📨 Received voice stream: session={sid}, samples={len(samples)}")
+        
+        result = await _cancel_on_disconnect(
+            http_request,
+            service.process_voice_input(
+                audio_bytes=samples,
+                session_id=sid,
+                language=language,
+                audio_format=audio_format,
+                idempotency_key=idempotency_key,
+                client=_client(http_request)
+            )
         )
         
+        return _voice_response(accept, sid, audio_type, result)
+    
     except HTTPException:
         raise
+    except (ClientDisconnect, ClientDisconnectedError):
+        logger.info(f"🔌 Client disconnected, voice turn cancelled: session={sid}")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
         logger.error(f"❌ Voice processing error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _service_error(e)
 
 
 @router.post(
@@ -115,26 +449,39 @@ async def process_voice(
     response_model=TextProcessResponse,
     responses={
         400: {"model": ErrorResponse},
-        500: {"model": ErrorResponse}
+        409: {"model": ErrorResponse},
+        422: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
     }
 )
-async def process_text(request: TextProcessRequest):
+async def process_text(request: TextProcessRequest, http_request: Request):
     """
     Procesar texto sin voz (para testing/debugging).
     
-    Útil para probar el LLM sin necesidad de audio.
+    Útil para probar el LLM sin necesidad de audio. Admite Idempotency-Key
+    como /voice/process.
     """
     try:
+        idempotency_key = _idempotency_key(http_request)
+        
         # Usar o generar session_id
-        sid = request.session_id or uuid4()
+        sid = request.session_id or _parse_session_id(None, idempotency_key, _client(http_request))
         
         logger.info(f"📨 Received text request: session={sid}")
         
         # Procesar con servicio
         service = get_voice_service()
-        response_text, response_audio, latency = await service.process_text_input(
-            text=request.text,
-            session_id=sid
+        _admit(service, sid, http_request, idempotency_key)
+        response_text, response_audio, latency = await _cancel_on_disconnect(
+            http_request,
+            service.process_text_input(
+                text=request.text,
+                session_id=sid,
+                idempotency_key=idempotency_key,
+                client=_client(http_request)
+            )
         )
         
         return TextProcessResponse(
@@ -142,36 +489,121 @@ async def process_text(request: TextProcessRequest):
             response_text=response_text,
             latency=latency
         )
-        
+    
+    except HTTPException:
+        raise
+    except ClientDisconnectedError:
+        logger.info(f"🔌 Client disconnected, text turn cancelled: session={sid}")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
         logger.error(f"❌ Text processing error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _service_error(e)
+
+
+def _history_etag(version: int, since: int, limit: Optional[int], ndjson: bool) -> str:
+    """
+    ETag fuerte del historial: versión de la conversación + representación.
+    
+    La página (since, limit) forma parte de la representación: con otra
+    página y la misma versión el cuerpo es distinto y no vale un 304.
+    """
+    tag = f"{version:x}"
+    if since or limit is not None:
+        tag += f"-s{since}-l{limit or ''}"
+    if ndjson:
+        tag += "-ndjson"
+    return f'"{tag}"'
+
+
+def _if_none_match(request: Request) -> list[str]:
+    """ETags de If-None-Match (la comparación es débil: se ignora W/)."""
+    header = request.headers.get("if-none-match", "")
+    return [tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()]
+
+
+def _known_version(etags: list[str]) -> Optional[int]:
+    """Versión del historial que ya tiene el cliente, según su ETag."""
+    for tag in etags:
+        try:
+            return int(tag.strip('"').partition("-")[0], 16)
+        except ValueError:
+            continue
+    return None
+
+
+def _ndjson_lines(meta: dict, messages: tuple[dict[str, str], ...]) -> Iterator[bytes]:
+    """Cabecera con metadatos y un mensaje por línea, en lotes."""
+    yield (json.dumps(meta) + "\n").encode()
+    for i in range(0, len(messages), NDJSON_BATCH_SIZE):
+        batch = messages[i:i + NDJSON_BATCH_SIZE]
+        yield "".join(json.dumps(message, ensure_ascii=False) + "\n" for message in batch).encode()
 
 
 @router.get(
     "/conversation/{session_id}",
     response_model=ConversationHistoryResponse,
-    responses={404: {"model": ErrorResponse}}
+    responses={
+        200: {"content": {NDJSON_MEDIA_TYPE: {}}},
+        304: {"description": "History not modified"},
+        404: {"model": ErrorResponse}
+    }
 )
-async def get_conversation_history(session_id: UUID):
+async def get_conversation_history(
+    session_id: UUID,
+    request: Request,
+    since: int = Query(default=0, ge=0, description="Índice absoluto desde el que devolver mensajes (cursor)"),
+    limit: Optional[int] = Query(default=None, ge=1, le=HISTORY_MAX_PAGE, description="Máximo de mensajes por página")
+):
     """
-    Obtener historial completo de una conversación.
+    Obtener historial de una conversación (completo, paginado o delta).
     
-    Útil para sincronizar frontend o debugging.
+    Útil para sincronizar frontend o debugging. Con `since` (el
+    `next_cursor` de la respuesta anterior) solo se devuelven los mensajes
+    nuevos; `limit` pagina. El ETag deriva de la versión de la
+    conversación y de la página pedida: con If-None-Match, la misma página
+    y sin cambios responde 304 sin serializar nada. Con `Accept: application/x-ndjson` el historial se
+    envía en streaming: una línea de metadatos y un mensaje por línea.
     """
     try:
         service = get_voice_service()
-        messages = await service.get_conversation_history(session_id)
+        etags = _if_none_match(request)
+        page = await service.get_conversation_page(
+            session_id,
+            since=since,
+            limit=limit,
+            known_version=_known_version(etags)
+        )
         
-        if messages is None:
+        if page is None:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        return ConversationHistoryResponse(
-            session_id=session_id,
-            messages=messages,
-            message_count=len(messages)
-        )
+        ndjson = NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+        etag = _history_etag(page["version"], since, limit, ndjson)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        
+        if etag in etags or "*" in etags:
+            return Response(status_code=304, headers=headers)
+        
+        messages = page["messages"]
+        meta = {
+            "session_id": str(session_id),
+            "message_count": len(messages),
+            "version": page["version"],
+            "next_cursor": page["next_cursor"],
+            "total": page["total"],
+            "has_more": page["next_cursor"] < page["total"],
+            "reset": page["reset"]
+        }
         
+        if ndjson:
+            return StreamingResponse(
+                _ndjson_lines(meta, messages),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers=headers
+            )
+        
+        return JSONResponse(content={**meta, "messages": list(messages)}, headers=headers)
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -205,7 +637,7 @@ async def clear_conversation(
             raise HTTPException(status_code=404, detail="Conversation not found")
         
         return {"message": "Conversation cleared", "session_id": str(session_id)}
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -213,29 +645,62 @@ async def clear_conversation(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/voice/barge-in/{session_id}")
+async def barge_in(
+    session_id: UUID,
+    service: VoiceAssistantService = Depends(get_voice_service)
+):
+    """
+    Cancelar el turno en curso de una sesión (el usuario vuelve a hablar).
+    
+    La petición /voice/process interrumpida responde 409 y el historial
+    queda sin la pregunta que no llegó a tener respuesta.
+    """
+    cancelled = await service.barge_in(session_id)
+    
+    return {"session_id": str(session_id), "cancelled": cancelled}
+
+
 @router.get("/voice/health")
 async def health_check(
+    deep: bool = False,
     service: VoiceAssistantService = Depends(get_voice_service)
 ):
     """
     Health check endpoint para Docker y monitoreo.
     
+    Por defecto devuelve la instantánea cacheada del monitor de salud
+    (sondas baratas en background), sin cargar LM Studio ni el TTS.
+    
+    Args:
+        deep: Ejecutar el chequeo profundo (generación real de texto y audio)
+    
     Returns:
         JSON con estado de salud de todos los componentes
     """
     try:
-        health_status = await service.health_check()
+        if deep:
+            health_status = await service.health_check()
+        else:
+            health_status = service.get_health_snapshot()
         
-        return JSONResponse(
-            content={
-                "status": "healthy" if health_status["overall"] else "degraded",
-                "components": {
-                    "stt": "up" if health_status["stt"] else "down",
-                    "llm": "up" if health_status["llm"] else "down",
-                    "tts": "up" if health_status["tts"] else "down"
-                },
-                "overall": health_status["overall"]
+        content = {
+            "status": "healthy" if health_status["overall"] else "degraded",
+            "components": {
+                "stt": "up" if health_status["stt"] else "down",
+                "llm": "up" if health_status["llm"] else "down",
+                "tts": "up" if health_status["tts"] else "down"
             },
+            "overall": health_status["overall"],
+            "deep": deep
+        }
+        
+        if not deep:
+            content["checked_at"] = health_status["checked_at"]
+            content["age"] = health_status["age"]
+        
+        return JSONResponse(
+            content=content,
             status_code=200 if health_status["overall"] else 503
         )
     except Exception as e:
@@ -249,6 +714,17 @@ async def health_check(
         )
 
 
+@router.get("/voice/metrics")
+async def get_metrics(
+    service: VoiceAssistantService = Depends(get_voice_service)
+):
+    """
+    Métricas operativas: routing del pool LLM, circuit breakers y
+    reutilización de conexiones / espera en el pool HTTP.
+    """
+    return service.get_metrics()
+
+
 # === WebSocket para streaming (futuro) ===
 # TODO: Implementar WebSocket para streaming bidireccional
 # @router.websocket("/ws/voice")
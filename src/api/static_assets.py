@@ -0,0 +1,210 @@
+"""
+Static Assets - Frontend servido desde memoria, precomprimido y con hash.
+
+Al arrancar (o en la primera petición) se leen index.html y los ficheros
+de static/ una sola vez, se comprimen con gzip (y brotli, si está
+instalado) y se guardan en memoria:
+
+- Cada fichero estático se publica también con el hash de su contenido en
+  el nombre (/static/js/voice-interface.<hash>.js) y Cache-Control
+  immutable de un año; index.html referencia esas URLs.
+- index.html y las URLs sin hash se sirven con no-cache: el navegador
+  revalida con If-None-Match y recibe 304 sin cuerpo.
+- La codificación se elige según Accept-Encoding (br > gzip > identity).
+
+Los cambios en los ficheros requieren reiniciar el servidor.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+from dataclasses import dataclass, field
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from loguru import logger
+
+
+# Cache-Control de las URLs con hash (el contenido no cambia nunca)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Cache-Control de index.html y URLs sin hash (revalidar siempre)
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Por debajo de este tamaño no compensa comprimir
+MIN_COMPRESS_SIZE = 256
+
+# Preferencia del servidor entre las codificaciones que acepta el cliente
+ENCODINGS = ("br", "gzip")
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+@dataclass(slots=True)
+class StaticAsset:
+    """Fichero en memoria con sus variantes comprimidas."""
+    
+    media_type: str
+    digest: str
+    cache_control: str
+    bodies: dict[str, bytes] = field(default_factory=dict)  # codificación → cuerpo ("identity" siempre)
+    
+    def etag(self, encoding: str) -> str:
+        """ETag fuerte por representación (cada codificación es un cuerpo distinto)."""
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+
+def _accepted_encodings(accept_encoding: str) -> set[str]:
+    """Codificaciones de Accept-Encoding con q > 0."""
+    accepted = set()
+    
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    
+    return accepted
+
+
+def _hashed_name(relative: str, digest: str) -> str:
+    """css/style.css → css/style.<hash>.css"""
+    path = Path(relative)
+    return str(path.with_name(f"{path.stem}.{digest}{path.suffix}").as_posix())
+
+
+class StaticAssetCache:
+    """
+    Frontend (index.html + static/) en memoria.
+    
+    Responsibilities:
+    - Leer y comprimir los ficheros una sola vez
+    - Publicar URLs con hash de contenido y reescribirlas en index.html
+    - Negociar Accept-Encoding y responder 304 a If-None-Match
+    """
+    
+    def __init__(self, static_dir: Path, template_path: Path, url_prefix: str = "/static"):
+        """
+        Inicializar cache (los ficheros se leen en load()).
+        
+        Args:
+            static_dir: Directorio de ficheros estáticos
+            template_path: index.html
+            url_prefix: Prefijo de las URLs de static_dir
+        """
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.url_prefix = url_prefix
+        
+        self._assets: Optional[dict[str, StaticAsset]] = None
+        self._index: Optional[StaticAsset] = None
+        self._urls: dict[str, str] = {}
+        self._brotli = find_spec("brotli") is not None
+    
+    def load(self) -> None:
+        """Leer, comprimir y publicar todos los ficheros (idempotente)."""
+        if self._assets is not None:
+            return
+        
+        assets: dict[str, StaticAsset] = {}
+        urls: dict[str, str] = {}
+        total = 0
+        
+        if self.static_dir.is_dir():
+            for path in sorted(self.static_dir.rglob("*")):
+                if not path.is_file():
+                    continue
+                
+                relative = path.relative_to(self.static_dir).as_posix()
+                asset = self._build(path.read_bytes(), self._media_type(path), IMMUTABLE_CACHE_CONTROL)
+                hashed = _hashed_name(relative, asset.digest)
+                
+                assets[hashed] = asset
+                # URL sin hash: mismo contenido, pero hay que revalidarla
+                assets[relative] = StaticAsset(asset.media_type, asset.digest, REVALIDATE_CACHE_CONTROL, asset.bodies)
+                urls[f"{self.url_prefix}/{relative}"] = f"{self.url_prefix}/{hashed}"
+                total += len(asset.bodies["identity"])
+        
+        self._assets = assets
+        self._urls = urls
+        
+        if self.template_path.is_file():
+            html = self.template_path.read_text(encoding="utf-8")
+            for url, hashed_url in urls.items():
+                html = html.replace(f'"{url}"', f'"{hashed_url}"')
+            self._index = self._build(html.encode("utf-8"), "text/html; charset=utf-8", REVALIDATE_CACHE_CONTROL)
+        
+        logger.info(
+            f"📦 Static assets loaded: {len(urls)} files, {total} bytes, "
+            f"encodings={', '.join(e for e in ENCODINGS if e != 'br' or self._brotli)}"
+        )
+    
+    @staticmethod
+    def _media_type(path: Path) -> str:
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type == "application/javascript":
+            media_type += "; charset=utf-8"
+        return media_type
+    
+    def _build(self, data: bytes, media_type: str, cache_control: str) -> StaticAsset:
+        """Crear el asset con hash de contenido y variantes comprimidas (si ocupan menos)."""
+        asset = StaticAsset(
+            media_type=media_type,
+            digest=hashlib.blake2b(data, digest_size=6).hexdigest(),
+            cache_control=cache_control,
+            bodies={"identity": data}
+        )
+        
+        if len(data) < MIN_COMPRESS_SIZE or not media_type.startswith(COMPRESSIBLE_TYPES):
+            return asset
+        
+        variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+        if self._brotli:
+            import brotli
+            variants["br"] = brotli.compress(data, quality=11)
+        
+        asset.bodies.update(
+            (encoding, body) for encoding, body in variants.items() if len(body) < len(data)
+        )
+        return asset
+    
+    def index(self, request: Request) -> Optional[Response]:
+        """Respuesta de index.html (None si no hay frontend)."""
+        self.load()
+        return None if self._index is None else self._respond(self._index, request)
+    
+    def static(self, path: str, request: Request) -> Optional[Response]:
+        """Respuesta de un fichero estático (None si no existe)."""
+        self.load()
+        asset = self._assets.get(path)
+        return None if asset is None else self._respond(asset, request)
+    
+    @staticmethod
+    def _respond(asset: StaticAsset, request: Request) -> Response:
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = next((e for e in ENCODINGS if e in accepted and e in asset.bodies), "identity")
+        
+        headers = {
+            "ETag": asset.etag(encoding),
+            "Cache-Control": asset.cache_control,
+            "Vary": "Accept-Encoding"
+        }
+        
+        # Cualquier representación del mismo contenido vale para revalidar
+        if_none_match = request.headers.get("if-none-match", "")
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or tags & {asset.etag(e) for e in asset.bodies}:
+            return Response(status_code=304, headers=headers)
+        
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        
+        return Response(content=asset.bodies[encoding], media_type=asset.media_type, headers=headers)
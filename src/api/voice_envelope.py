@@ -0,0 +1,188 @@
+"""
+Voice Envelope - Formatos de respuesta de POST /api/voice/process.
+
+El formato se negocia con la cabecera Accept:
+- headers (por defecto, compatibilidad): cuerpo audio/wav y textos en
+  base64 en X-Transcribed-Text / X-Response-Text
+- multipart: multipart/mixed con una parte JSON (textos y latencias) y
+  una parte audio/wav
+- frame: application/vnd.arca.voice-frame, un frame binario compacto:
+
+    magic "ARCA" | versión (u8) | longitud JSON (u32) | longitud audio (u32) | JSON | audio
+  
+  (enteros big-endian). Sin base64 ni límites de tamaño de cabeceras:
+  el cliente lee el JSON y el audio con dos slices.
+
+El códec del audio (wav, Opus, MP3...) se negocia aparte, con los tipos
+audio/* de la misma cabecera Accept (ver negotiate_audio()).
+"""
+
+import base64
+import json
+import secrets
+import struct
+from typing import Any, Optional
+
+
+FORMAT_HEADERS = "headers"
+FORMAT_MULTIPART = "multipart"
+FORMAT_FRAME = "frame"
+
+FRAME_MEDIA_TYPE = "application/vnd.arca.voice-frame"
+FRAME_MAGIC = b"ARCA"
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct("!4sBII")
+
+# Media type (de Accept) → formato; un tipo de audio pide el cuerpo de audio
+MEDIA_TYPES = {
+    FRAME_MEDIA_TYPE: FORMAT_FRAME,
+    "multipart/mixed": FORMAT_MULTIPART,
+    "audio/wav": FORMAT_HEADERS,
+    "audio/ogg": FORMAT_HEADERS,
+    "audio/webm": FORMAT_HEADERS,
+    "audio/mpeg": FORMAT_HEADERS,
+}
+
+
+def _accepted(accept: str) -> list[tuple[float, int, str]]:
+    """Entradas de Accept como (-q, posición, media type), sin las de q=0."""
+    entries = []
+    
+    for position, item in enumerate(accept.split(",")):
+        media_type, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        
+        if quality > 0:
+            entries.append((-quality, position, media_type.strip().lower()))
+    
+    return entries
+
+
+def negotiate(accept: str) -> str:
+    """
+    Elegir formato de respuesta según la cabecera Accept.
+    
+    Se respeta la calidad (q) y, a igual calidad, el orden del cliente.
+    Sin Accept, con comodines o sin ningún tipo conocido: formato headers.
+    """
+    candidates = [
+        (quality, position, MEDIA_TYPES[media_type])
+        for quality, position, media_type in _accepted(accept)
+        if media_type in MEDIA_TYPES
+    ]
+    return min(candidates)[2] if candidates else FORMAT_HEADERS
+
+
+def negotiate_audio(accept: str, formats: dict[str, str]) -> Optional[str]:
+    """
+    Elegir el formato de audio según los tipos audio/* de Accept.
+    
+    Args:
+        accept: Cabecera Accept
+        formats: Formatos disponibles → media type (en orden de preferencia
+                 del servidor para un mismo media type)
+    
+    Returns:
+        Nombre del formato, o None si el cliente no pide ningún tipo disponible
+    """
+    by_type: dict[str, str] = {}
+    for name, media_type in formats.items():
+        by_type.setdefault(media_type.partition(";")[0], name)
+    
+    candidates = [
+        (quality, position, by_type[media_type])
+        for quality, position, media_type in _accepted(accept)
+        if media_type in by_type
+    ]
+    return min(candidates)[2] if candidates else None
+
+
+def _json(meta: dict[str, Any]) -> bytes:
+    return json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_headers(meta: dict[str, Any], audio: bytes) -> tuple[bytes, str, dict[str, str]]:
+    """Formato original: audio como cuerpo y textos en base64 en cabeceras."""
+    headers = {
+        "X-Transcribed-Text": base64.b64encode(meta["transcribed_text"].encode("utf-8")).decode("ascii"),
+        "X-Response-Text": base64.b64encode(meta["response_text"].encode("utf-8")).decode("ascii"),
+    }
+    return audio, meta.get("audio_type", "audio/wav"), headers
+
+
+def encode_multipart(meta: dict[str, Any], audio: bytes) -> tuple[bytes, str, dict[str, str]]:
+    """multipart/mixed: parte JSON + parte de audio."""
+    boundary = secrets.token_hex(16)
+    delimiter = f"--{boundary}\r\n".encode("ascii")
+    
+    body = b"".join((
+        delimiter,
+        b"Content-Type: application/json; charset=utf-8\r\n\r\n",
+        _json(meta),
+        b"\r\n",
+        delimiter,
+        f"Content-Type: {meta.get('audio_type', 'audio/wav')}\r\nContent-Length: {len(audio)}\r\n\r\n".encode("ascii"),
+        audio,
+        f"\r\n--{boundary}--\r\n".encode("ascii"),
+    ))
+    return body, f"multipart/mixed; boundary={boundary}", {}
+
+
+def encode_frame(meta: dict[str, Any], audio: bytes) -> tuple[bytes, str, dict[str, str]]:
+    """Frame binario con prefijos de longitud."""
+    payload = _json(meta)
+    header = FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, len(payload), len(audio))
+    return b"".join((header, payload, audio)), FRAME_MEDIA_TYPE, {}
+
+
+def decode_frame(body: bytes) -> tuple[dict[str, Any], bytes]:
+    """
+    Leer un frame binario (clientes Python, tests y benchmark).
+    
+    Raises:
+        ValueError: Si el frame está truncado o no es un frame A.R.C.A
+    """
+    if len(body) < FRAME_HEADER.size:
+        raise ValueError("Truncated voice frame")
+    
+    magic, version, json_len, audio_len = FRAME_HEADER.unpack_from(body)
+    
+    if magic != FRAME_MAGIC or version != FRAME_VERSION:
+        raise ValueError(f"Unsupported voice frame: {magic!r} v{version}")
+    
+    start = FRAME_HEADER.size
+    if len(body) != start + json_len + audio_len:
+        raise ValueError("Truncated voice frame")
+    
+    meta = json.loads(body[start:start + json_len])
+    return meta, body[start + json_len:]
+
+
+ENCODERS = {
+    FORMAT_HEADERS: encode_headers,
+    FORMAT_MULTIPART: encode_multipart,
+    FORMAT_FRAME: encode_frame,
+}
+
+
+def encode(fmt: str, meta: dict[str, Any], audio: bytes) -> tuple[bytes, str, dict[str, str]]:
+    """
+    Serializar la respuesta de un turno de voz.
+    
+    Args:
+        fmt: Formato negociado (ver negotiate())
+        meta: session_id, transcribed_text, response_text, latency y
+              audio_type (media type del audio, por defecto audio/wav)
+        audio: Audio de la respuesta
+    
+    Returns:
+        (cuerpo, media type, cabeceras propias del formato)
+    """
+    return ENCODERS[fmt](meta, audio)
@@ -2,13 +2,53 @@
 ConversationService - Servicio para gestionar conversaciones.
 
 Application layer service que orquesta Conversation aggregates.
+
+Los métodos con prefijo `a` (aget_conversation, aadd_user_message...) son
+los del event loop: con un store que hace I/O (SQLite, Redis, disco) las
+llamadas al store van a un thread propio y un backend lento no congela el
+resto de peticiones. Los cambios del dominio se hacen siempre en el loop.
 """
 
-from typing import Optional
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from time import monotonic
+from typing import AsyncIterator, Callable, Literal, Optional, TypeVar
 from uuid import UUID, uuid4
 
 from loguru import logger
-from ..domain.conversation import Conversation
+from ..domain.conversation import Conversation, check_template_fits
+from ..domain.conversation_template import ConversationTemplate
+from ..domain.system_prompt import SYSTEM_PROMPTS, SystemPromptRegistry
+from .conversation_store import ConversationStore, InMemoryConversationStore
+
+
+T = TypeVar("T")
+
+
+# Prompt del sistema por defecto.
+# IMPORTANTE: debe ser estático (sin timestamps, fechas ni texto variable) para
+# que el prefijo enviado a LM Studio sea idéntico byte a byte entre turnos y
+# el servidor pueda reutilizar su prompt cache (KV cache).
+DEFAULT_SYSTEM_PROMPT = (
+    "Eres A.R.C.A, un asistente conversacional inteligente y amigable. "
+    "Respondes de manera natural y concisa. "
+    "Recuerdas todo el contexto de la conversación."
+)
+
+
+# Qué hacer con un turno que llega mientras otro de la misma sesión está en curso:
+# - queue: esperar a que termine (orden garantizado)
+# - coalesce: si es la misma petición repetida (doble clic, reintento), unirse
+#   al turno en curso y devolver su resultado; si no, esperar como queue
+# - reject: fallar enseguida con SessionBusyError (409)
+TurnPolicy = Literal["queue", "coalesce", "reject"]
+
+
+class SessionBusyError(RuntimeError):
+    """La sesión ya tiene un turno en curso (política reject)."""
 
 
 class ConversationService:
@@ -19,29 +59,106 @@ class ConversationService:
     - Crear y gestionar múltiples conversaciones (por session_id)
     - Proveer acceso a conversaciones activas
     - Limpiar conversaciones antiguas
+    - Persistir cada cambio en el ConversationStore configurado
+    - Serializar los turnos de una misma sesión (lock por sesión)
+    - Crear sesiones desde plantillas (preámbulo compartido) y hacer fork
     """
     
-    def __init__(self, max_messages_per_conversation: Optional[int] = None):
+    def __init__(
+        self,
+        max_messages_per_conversation: Optional[int] = None,
+        store: Optional[ConversationStore] = None,
+        turn_policy: TurnPolicy = "queue",
+        prompts: Optional[SystemPromptRegistry] = None,
+        default_template: Optional[ConversationTemplate] = None
+    ):
         """
         Inicializar servicio de conversaciones.
         
         Args:
             max_messages_per_conversation: Límite de mensajes por conversación
                                           (None = ilimitado)
+            store: Almacenamiento de conversaciones (None = en memoria del proceso)
+            turn_policy: Turnos concurrentes en la misma sesión (queue, coalesce, reject)
+            prompts: Registro de system prompts compartidos (None = el del proceso)
+            default_template: Plantilla para las conversaciones nuevas sin
+                              system prompt propio (None = DEFAULT_SYSTEM_PROMPT)
         """
-        # Almacenamiento en memoria: session_id -> Conversation
-        self._conversations: dict[UUID, Conversation] = {}
+        if turn_policy not in ("queue", "coalesce", "reject"):
+            raise ValueError(f"Invalid turn policy: {turn_policy}")
+        
+        self._store = store or InMemoryConversationStore()
         self._max_messages = max_messages_per_conversation
+        self._prompts = prompts if prompts is not None else SYSTEM_PROMPTS
+        self._templates: dict[str, ConversationTemplate] = {}
+        self._default_template = default_template
+        if default_template is not None:
+            check_template_fits(default_template, max_messages_per_conversation)
+            self._templates[default_template.name] = default_template
+        self._janitor_task: Optional[asyncio.Task] = None
+        
+        # Un solo thread: las llamadas al store se serializan (no es thread-safe)
+        self._io_executor: Optional[ThreadPoolExecutor] = None
+        
+        # Lock por sesión. Weak-valued: la entrada desaparece en cuanto ningún
+        # turno lo usa ni lo espera, así la tabla no crece con cada session_id
+        self.turn_policy = turn_policy
+        self._turn_locks: weakref.WeakValueDictionary[UUID, asyncio.Lock] = weakref.WeakValueDictionary()
+        self._turn_stats = {"turns": 0, "waited": 0, "wait_total": 0.0, "wait_max": 0.0, "rejected": 0}
         
         logger.info(
             f"💬 ConversationService initialized: "
-            f"max_messages={max_messages_per_conversation or 'unlimited'}"
+            f"max_messages={max_messages_per_conversation or 'unlimited'}, "
+            f"store={type(self._store).__name__}"
         )
     
+    @property
+    def store(self) -> ConversationStore:
+        """Almacenamiento de conversaciones en uso."""
+        return self._store
+    
+    @property
+    def prompts(self) -> SystemPromptRegistry:
+        """Registro de system prompts compartidos entre conversaciones."""
+        return self._prompts
+    
+    def register_template(
+        self,
+        name: str,
+        examples: list[tuple[str, str]],
+        system_prompt: Optional[str] = None
+    ) -> ConversationTemplate:
+        """
+        Registrar una plantilla: system prompt + preámbulo few-shot.
+        
+        Args:
+            name: Nombre de la plantilla
+            examples: Turnos de ejemplo como (rol, contenido)
+            system_prompt: Prompt del sistema (None = DEFAULT_SYSTEM_PROMPT)
+        
+        Returns:
+            Plantilla registrada (reemplaza a otra con el mismo nombre)
+        
+        Raises:
+            ValueError: Si los ejemplos no dejan sitio para turnos propios
+        """
+        template = ConversationTemplate.create(
+            name=name,
+            system_prompt=DEFAULT_SYSTEM_PROMPT if system_prompt is None else system_prompt,
+            examples=examples,
+            prompts=self._prompts
+        )
+        check_template_fits(template, self._max_messages)
+        self._templates[name] = template
+        
+        logger.info(f"📋 Template registered: {name} ({len(template.prefix)} example messages)")
+        return template
+    
     def create_conversation(
         self,
         session_id: Optional[UUID] = None,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        template: Optional[str] = None
     ) -> Conversation:
         """
         Crear nueva conversación.
@@ -49,33 +166,85 @@ class ConversationService:
         Args:
             session_id: ID de sesión (auto-generado si None)
             system_prompt: Prompt personalizado del sistema
-            
+            template: Nombre de una plantilla registrada (ignora system_prompt)
+        
         Returns:
             Conversación creada
+        
+        Raises:
+            ValueError: Si la plantilla no está registrada
         """
+        conversation = self._new_conversation(session_id, system_prompt, template)
+        self._store.save(conversation)
+        
+        logger.info(f"✨ New conversation created: {conversation.session_id}")
+        return conversation
+    
+    def _new_conversation(
+        self,
+        session_id: Optional[UUID],
+        system_prompt: Optional[str],
+        template: Optional[str]
+    ) -> Conversation:
+        """Construir la conversación de create_conversation() (sin guardarla)."""
         # Generar session_id si no se proporciona
         if session_id is None:
             session_id = uuid4()
         
-        # Usar prompt default si no se proporciona
-        if system_prompt is None:
-            system_prompt = (
-                "Eres A.R.C.A, un asistente conversacional inteligente y amigable. "
-                "Respondes de manera natural y concisa. "
-                "Recuerdas todo el contexto de la conversación."
+        if template is not None:
+            if template not in self._templates:
+                raise ValueError(f"Unknown conversation template: {template}")
+            selected = self._templates[template]
+        elif system_prompt is None:
+            selected = self._default_template
+        else:
+            selected = None
+        
+        if selected is not None:
+            # Prompt y preámbulo compartidos con el resto de sesiones de la plantilla
+            conversation = Conversation.from_template(
+                selected,
+                session_id=session_id,
+                max_messages=self._max_messages
+            )
+        else:
+            # Crear conversación (el prompt se comparte vía registro, no se copia)
+            conversation = Conversation(
+                session_id=session_id,
+                max_messages=self._max_messages,
+                system_prompt=DEFAULT_SYSTEM_PROMPT if system_prompt is None else system_prompt,
+                prompts=self._prompts
             )
         
-        # Crear conversación
-        conversation = Conversation(
-            session_id=session_id,
-            max_messages=self._max_messages,
-            system_prompt=system_prompt
-        )
+        return conversation
+    
+    def fork_conversation(
+        self,
+        session_id: UUID,
+        new_session_id: Optional[UUID] = None
+    ) -> Conversation:
+        """
+        Crear una sesión nueva que continúa desde el historial de otra.
+        
+        Args:
+            session_id: ID de la sesión origen
+            new_session_id: ID de la nueva sesión (auto-generado si None)
         
-        # Almacenar
-        self._conversations[session_id] = conversation
+        Returns:
+            Conversación nueva (comparte el historial origen como prefijo)
+        
+        Raises:
+            ValueError: Si la conversación origen no existe
+        """
+        source = self.get_conversation(session_id)
+        
+        if source is None:
+            raise ValueError(f"Conversation not found: {session_id}")
+        
+        conversation = source.fork(new_session_id)
+        self._store.save(conversation)
         
-        logger.info(f"✨ New conversation created: {session_id}")
+        logger.info(f"🍴 Conversation forked: {session_id} → {conversation.session_id}")
         return conversation
     
     def get_conversation(self, session_id: UUID) -> Optional[Conversation]:
@@ -84,11 +253,11 @@ class ConversationService:
         
         Args:
             session_id: ID de la sesión
-            
+        
         Returns:
             Conversation si existe, None si no
         """
-        return self._conversations.get(session_id)
+        return self._store.get(session_id)
     
     def get_or_create_conversation(
         self,
@@ -101,7 +270,7 @@ class ConversationService:
         Args:
             session_id: ID de la sesión
             system_prompt: Prompt del sistema (solo para nuevas conversaciones)
-            
+        
         Returns:
             Conversación existente o recién creada
         """
@@ -122,21 +291,16 @@ class ConversationService:
         Args:
             session_id: ID de la sesión
             content: Contenido del mensaje
-            
+        
         Returns:
             Conversación actualizada
-            
+        
         Raises:
             ValueError: Si conversación no existe
         """
         conversation = self.get_conversation(session_id)
-        
-        if conversation is None:
-            raise ValueError(f"Conversation not found: {session_id}")
-        
-        conversation.add_user_message(content)
-        logger.debug(f"👤 User message added to {session_id}")
-        
+        write, args = self._add_message(session_id, conversation, content, assistant=False)
+        write(*args)
         return conversation
     
     def add_assistant_message(self, session_id: UUID, content: str) -> Conversation:
@@ -146,22 +310,71 @@ class ConversationService:
         Args:
             session_id: ID de la sesión
             content: Contenido del mensaje
-            
+        
         Returns:
             Conversación actualizada
-            
+        
         Raises:
             ValueError: Si conversación no existe
         """
         conversation = self.get_conversation(session_id)
+        write, args = self._add_message(session_id, conversation, content, assistant=True)
+        write(*args)
+        return conversation
+    
+    def _add_message(
+        self,
+        session_id: UUID,
+        conversation: Optional[Conversation],
+        content: str,
+        assistant: bool
+    ) -> tuple[Callable[..., None], tuple]:
+        """
+        Añadir un mensaje al dominio y devolver la escritura que lo persiste.
+        
+        Si el límite de mensajes recortó el historial, el mensaje no es un
+        simple append y se reescribe la conversación completa.
         
+        Returns:
+            (método del store, argumentos)
+        
+        Raises:
+            ValueError: Si conversación no existe
+        """
         if conversation is None:
             raise ValueError(f"Conversation not found: {session_id}")
         
-        conversation.add_assistant_message(content)
-        logger.debug(f"🤖 Assistant message added to {session_id}")
+        previous_count = conversation.message_count
+        if assistant:
+            conversation.add_assistant_message(content)
+            message = conversation.get_last_assistant_message()
+            logger.debug(f"🤖 Assistant message added to {session_id}")
+        else:
+            conversation.add_user_message(content)
+            message = conversation.get_last_user_message()
+            logger.debug(f"👤 User message added to {session_id}")
         
-        return conversation
+        if conversation.message_count == previous_count + 1:
+            return self._store.append, (conversation, message)
+        return self._store.save, (conversation,)
+    
+    def discard_unanswered_user_message(self, session_id: UUID) -> bool:
+        """
+        Eliminar la pregunta sin respuesta de un turno cancelado.
+        
+        Args:
+            session_id: ID de la sesión
+        
+        Returns:
+            True si se eliminó un mensaje, False si no había nada que quitar
+        """
+        conversation = self.get_conversation(session_id)
+        
+        if conversation is None or not conversation.discard_unanswered_user_message():
+            return False
+        
+        self._store.save(conversation)
+        return True
     
     def clear_conversation(self, session_id: UUID, keep_system: bool = True) -> None:
         """
@@ -175,6 +388,7 @@ class ConversationService:
         
         if conversation:
             conversation.clear_history(keep_system)
+            self._store.save(conversation)
             logger.info(f"🧹 Conversation cleared: {session_id}")
     
     def delete_conversation(self, session_id: UUID) -> bool:
@@ -183,19 +397,147 @@ class ConversationService:
         
         Args:
             session_id: ID de la sesión
-            
+        
         Returns:
             True si se eliminó, False si no existía
         """
-        if session_id in self._conversations:
-            del self._conversations[session_id]
+        if self._store.delete(session_id):
             logger.info(f"🗑️ Conversation deleted: {session_id}")
             return True
         return False
     
+    # === Desde el event loop ===
+    
+    async def _io(self, method: Callable[..., T], *args) -> T:
+        """Llamar al store: directamente si es en memoria, en su thread si hace I/O."""
+        if not self._store.blocking:
+            return method(*args)
+        
+        if self._io_executor is None:
+            self._io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversation-store")
+        return await asyncio.get_running_loop().run_in_executor(self._io_executor, partial(method, *args))
+    
+    async def aget_conversation(self, session_id: UUID) -> Optional[Conversation]:
+        """get_conversation() desde el event loop."""
+        return await self._io(self._store.get, session_id)
+    
+    async def aget_or_create_conversation(
+        self,
+        session_id: UUID,
+        system_prompt: Optional[str] = None
+    ) -> Conversation:
+        """get_or_create_conversation() desde el event loop."""
+        conversation = await self.aget_conversation(session_id)
+        
+        if conversation is None:
+            logger.info(f"🆕 Creating new conversation for session: {session_id}")
+            conversation = self._new_conversation(session_id, system_prompt, None)
+            await self._io(self._store.save, conversation)
+            logger.info(f"✨ New conversation created: {session_id}")
+        
+        return conversation
+    
+    async def aadd_user_message(self, session_id: UUID, content: str) -> Conversation:
+        """add_user_message() desde el event loop."""
+        conversation = await self.aget_conversation(session_id)
+        write, args = self._add_message(session_id, conversation, content, assistant=False)
+        await self._io(write, *args)
+        return conversation
+    
+    async def aadd_assistant_message(self, session_id: UUID, content: str) -> Conversation:
+        """add_assistant_message() desde el event loop."""
+        conversation = await self.aget_conversation(session_id)
+        write, args = self._add_message(session_id, conversation, content, assistant=True)
+        await self._io(write, *args)
+        return conversation
+    
+    async def adiscard_unanswered_user_message(self, session_id: UUID) -> bool:
+        """discard_unanswered_user_message() desde el event loop."""
+        conversation = await self.aget_conversation(session_id)
+        
+        if conversation is None or not conversation.discard_unanswered_user_message():
+            return False
+        
+        await self._io(self._store.save, conversation)
+        return True
+    
+    async def aclear_conversation(self, session_id: UUID, keep_system: bool = True) -> None:
+        """clear_conversation() desde el event loop."""
+        conversation = await self.aget_conversation(session_id)
+        
+        if conversation:
+            conversation.clear_history(keep_system)
+            await self._io(self._store.save, conversation)
+            logger.info(f"🧹 Conversation cleared: {session_id}")
+    
+    @asynccontextmanager
+    async def turn_lock(self, session_id: UUID) -> AsyncIterator[float]:
+        """
+        Ejecutar un turno en exclusiva dentro de su sesión.
+        
+        Sesiones distintas nunca se esperan entre sí. Mientras dura el turno
+        la sesión está fijada en el store: los límites de memoria no la
+        expulsan entre la pregunta y la respuesta.
+        
+        Args:
+            session_id: ID de la sesión
+        
+        Yields:
+            Segundos esperados hasta obtener el lock
+        
+        Raises:
+            SessionBusyError: Si la política es reject y hay un turno en curso
+        """
+        lock = self._turn_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._turn_locks[session_id] = lock
+        
+        if self.turn_policy == "reject" and lock.locked():
+            self._turn_stats["rejected"] += 1
+            raise SessionBusyError(f"Session {session_id} already has a turn in progress")
+        
+        start = monotonic()
+        async with lock:
+            wait = monotonic() - start
+            
+            stats = self._turn_stats
+            stats["turns"] += 1
+            if wait > 0.001:
+                stats["waited"] += 1
+            stats["wait_total"] += wait
+            stats["wait_max"] = max(stats["wait_max"], wait)
+            
+            self._store.pin(session_id)
+            try:
+                yield wait
+            finally:
+                self._store.unpin(session_id)
+    
+    def get_turn_metrics(self) -> dict:
+        """Turnos serializados, esperas por lock y rechazos."""
+        stats = self._turn_stats
+        
+        return {
+            "policy": self.turn_policy,
+            "turns": stats["turns"],
+            "waited": stats["waited"],
+            "rejected": stats["rejected"],
+            "lock_wait_avg": round(stats["wait_total"] / stats["turns"], 4) if stats["turns"] else 0.0,
+            "lock_wait_max": round(stats["wait_max"], 4),
+            "locked_sessions": len(self._turn_locks)
+        }
+    
+    def close(self) -> None:
+        """Cerrar el store (confirma las escrituras pendientes)."""
+        if self._io_executor is not None:
+            self._io_executor.shutdown(wait=True)
+            self._io_executor = None
+        self._store.close()
+    
     def get_active_conversations_count(self) -> int:
         """Obtener número de conversaciones activas."""
-        return len(self._conversations)
+        return self._store.count()
     
     def cleanup_inactive_conversations(self) -> int:
         """
@@ -204,16 +546,64 @@ class ConversationService:
         Returns:
             Número de conversaciones eliminadas
         """
-        inactive_ids = [
-            sid for sid, conv in self._conversations.items()
-            if not conv.is_active
-        ]
+        inactive_ids = []
+        for sid in self._store.session_ids():
+            conversation = self._store.get(sid)
+            if conversation is not None and not conversation.is_active:
+                inactive_ids.append(sid)
         
         for sid in inactive_ids:
-            del self._conversations[sid]
+            self._store.delete(sid)
         
         if inactive_ids:
             logger.info(f"🧹 Cleaned up {len(inactive_ids)} inactive conversations")
         
         return len(inactive_ids)
-
+    
+    def evict_idle_conversations(self) -> int:
+        """
+        Sacar de memoria las conversaciones inactivas más allá del TTL del store.
+        
+        Returns:
+            Número de conversaciones expulsadas
+        """
+        evicted = self._store.evict_expired()
+        
+        if evicted:
+            logger.info(f"🧹 Evicted {evicted} idle conversations")
+        
+        return evicted
+    
+    async def _run_janitor(self, interval: float) -> None:
+        """Bucle del janitor: expulsar sesiones inactivas periódicamente."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._io(self.evict_idle_conversations)
+            except Exception as e:
+                logger.warning(f"⚠️ Conversation janitor failed: {e}")
+    
+    async def start_janitor(self, interval: float = 30.0) -> None:
+        """
+        Arrancar el janitor de sesiones en background.
+        
+        Args:
+            interval: Segundos entre pasadas
+        """
+        if self._janitor_task is not None:
+            return
+        
+        self._janitor_task = asyncio.create_task(self._run_janitor(interval))
+        logger.info(f"🧹 Conversation janitor started: interval={interval}s")
+    
+    async def stop_janitor(self) -> None:
+        """Detener el janitor de sesiones."""
+        if self._janitor_task is None:
+            return
+        
+        self._janitor_task.cancel()
+        try:
+            await self._janitor_task
+        except asyncio.CancelledError:
+            pass
+        self._janitor_task = None
@@ -0,0 +1,199 @@
+"""
+ConversationStore - Persistencia de conversaciones detrás de ConversationService.
+
+El servicio no sabe dónde viven las conversaciones: en memoria del proceso
+(comportamiento histórico, un solo worker) o en un backend externo
+compartido entre workers y nodos (ver infrastructure/persistence).
+"""
+
+from abc import ABC, abstractmethod
+from typing import Optional
+from uuid import UUID
+
+from ..domain.conversation import Conversation
+from ..domain.message import Message
+from .session_cache import SessionCache
+
+
+class ConversationStore(ABC):
+    """
+    Interfaz de almacenamiento de conversaciones (repositorio).
+    
+    Contrato:
+    - get() devuelve la conversación o None
+    - save() escribe la conversación completa (creación, limpieza, recortes)
+    - append() persiste un mensaje que ya se añadió al final de la conversación
+    - blocking indica si esas llamadas hacen I/O (disco, red): entonces
+      ConversationService las saca del event loop
+    """
+    
+    blocking: bool = False
+    
+    @abstractmethod
+    def get(self, session_id: UUID) -> Optional[Conversation]:
+        """Obtener conversación por session_id (None si no existe)."""
+    
+    @abstractmethod
+    def save(self, conversation: Conversation) -> None:
+        """Escribir la conversación completa (reemplaza la anterior)."""
+    
+    @abstractmethod
+    def append(self, conversation: Conversation, message: Message) -> None:
+        """Persistir un mensaje añadido al final de la conversación."""
+    
+    @abstractmethod
+    def delete(self, session_id: UUID) -> bool:
+        """Eliminar conversación. True si existía."""
+    
+    @abstractmethod
+    def session_ids(self) -> list[UUID]:
+        """IDs de todas las conversaciones almacenadas."""
+    
+    def count(self) -> int:
+        """Número de conversaciones almacenadas."""
+        return len(self.session_ids())
+    
+    def pin(self, session_id: UUID) -> None:
+        """Mantener la sesión en memoria mientras dura un turno (solo stores con caché)."""
+    
+    def unpin(self, session_id: UUID) -> None:
+        """Liberar un pin() al terminar el turno."""
+    
+    def evict_expired(self) -> int:
+        """
+        Expulsar de memoria las sesiones inactivas (llamado por el janitor).
+        
+        Returns:
+            Número de sesiones expulsadas
+        """
+        return 0
+    
+    def get_metrics(self) -> dict:
+        """Métricas propias del backend (vacío si no tiene)."""
+        return {}
+    
+    def close(self) -> None:
+        """Liberar recursos (confirmar escrituras pendientes, conexiones...)."""
+
+
+class InMemoryConversationStore(ConversationStore):
+    """
+    Store en memoria del proceso: session_id -> Conversation.
+    
+    Las conversaciones son los propios objetos del dominio, así que save()
+    y append() no tienen que copiar nada. Se pierden al reiniciar y no se
+    comparten entre workers.
+    
+    Con límites (sesiones, bytes, TTL de inactividad) las sesiones expulsadas
+    se descartan, o se vuelcan a spill_store si se configura uno y se
+    recuperan de él en el siguiente acceso.
+    """
+    
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        spill_store: Optional[ConversationStore] = None
+    ):
+        """
+        Inicializar store vacío.
+        
+        Args:
+            max_sessions: Máximo de sesiones en memoria (None = sin límite)
+            max_bytes: Máximo de bytes aproximados (None = sin límite)
+            idle_ttl: Segundos sin acceso antes de expulsar (None = nunca)
+            spill_store: Store donde volcar las sesiones expulsadas (None = descartar)
+        """
+        self._spill_store = spill_store
+        self.spilled = 0
+        self._conversations = SessionCache(
+            max_sessions=max_sessions,
+            max_bytes=max_bytes,
+            idle_ttl=idle_ttl,
+            on_evict=self._on_evict
+        )
+    
+    @property
+    def blocking(self) -> bool:
+        """Bloquea si el spill store bloquea (volcar y recuperar sesiones)."""
+        return self._spill_store is not None and self._spill_store.blocking
+    
+    def _on_evict(self, conversation: Conversation, reason: str) -> None:
+        """Volcar la sesión expulsada al spill store (si hay)."""
+        if self._spill_store is not None:
+            self._spill_store.save(conversation)
+            self.spilled += 1
+    
+    def get(self, session_id: UUID) -> Optional[Conversation]:
+        """Obtener conversación por session_id (None si no existe)."""
+        conversation = self._conversations.get(session_id)
+        
+        if conversation is None and self._spill_store is not None:
+            conversation = self._spill_store.get(session_id)
+            if conversation is not None:
+                self._conversations.put(conversation)
+        
+        return conversation
+    
+    def save(self, conversation: Conversation) -> None:
+        """Guardar (o reemplazar) la conversación."""
+        self._conversations.put(conversation)
+    
+    def append(self, conversation: Conversation, message: Message) -> None:
+        """El mensaje ya está en el objeto almacenado: solo contabilizar su tamaño."""
+        self._conversations.grow(conversation, message)
+    
+    def delete(self, session_id: UUID) -> bool:
+        """Eliminar conversación. True si existía."""
+        existed = self._conversations.pop(session_id) is not None
+        
+        if self._spill_store is not None:
+            existed = self._spill_store.delete(session_id) or existed
+        
+        return existed
+    
+    def session_ids(self) -> list[UUID]:
+        """IDs de todas las conversaciones almacenadas."""
+        session_ids = list(self._conversations)
+        
+        if self._spill_store is not None:
+            session_ids = list(set(session_ids) | set(self._spill_store.session_ids()))
+        
+        return session_ids
+    
+    def count(self) -> int:
+        """Número de conversaciones almacenadas."""
+        if self._spill_store is not None:
+            return len(self.session_ids())
+        return len(self._conversations)
+    
+    def pin(self, session_id: UUID) -> None:
+        """Las sesiones con turno en curso no se expulsan (ni a spill ni descartadas)."""
+        self._conversations.pin(session_id)
+    
+    def unpin(self, session_id: UUID) -> None:
+        """Liberar un pin() al terminar el turno."""
+        self._conversations.unpin(session_id)
+    
+    def evict_expired(self) -> int:
+        """Expulsar las sesiones inactivas más allá del TTL (y caducar el spill store)."""
+        evicted = self._conversations.evict_expired()
+        if self._spill_store is not None:
+            self._spill_store.evict_expired()
+        return evicted
+    
+    def get_metrics(self) -> dict:
+        """Ocupación y expulsiones de la caché de sesiones (y del spill store)."""
+        metrics = self._conversations.stats()
+        if self._spill_store is not None:
+            metrics["spilled"] = self.spilled
+            spill_metrics = self._spill_store.get_metrics()
+            if spill_metrics:
+                metrics["spill"] = spill_metrics
+        return metrics
+    
+    def close(self) -> None:
+        """Cerrar el spill store (si hay)."""
+        if self._spill_store is not None:
+            self._spill_store.close()
@@ -0,0 +1,177 @@
+"""
+FairScheduler - Cola justa entre sesiones para una etapa cara del pipeline.
+
+STT y TTS tienen dos threads cada uno y LM Studio atiende pocas peticiones
+a la vez. Sin cola, el orden de llegada decide: un cliente que encadena
+turnos acapara la etapa y el resto espera detrás de todos ellos.
+
+Cada etapa tiene un número de plazas. Cuando están ocupadas, las
+peticiones esperan en una cola por sesión y, al liberarse una plaza, se
+reparte en round-robin entre las sesiones con peticiones pendientes.
+
+Las sesiones se agrupan por cliente (IP) y el round-robin tiene dos
+niveles: entre clientes y, dentro de cada cliente, entre sus sesiones.
+Abrir más sesiones no da más turnos a un cliente, y los usuarios detrás
+de un mismo proxy o NAT siguen repartiéndose su parte por sesión.
+
+Las métricas identifican las sesiones por un hash truncado de su ID.
+"""
+
+import asyncio
+import hashlib
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import AsyncIterator, Hashable, Optional
+
+
+# Esperas de una sesión: (future, instante en que se encoló)
+_Queue = deque[tuple[asyncio.Future, float]]
+
+
+def _metric_key(key: Hashable) -> str:
+    """Hash truncado de una sesión para las métricas (no expone el ID)."""
+    return hashlib.blake2b(str(key).encode("utf-8"), digest_size=6).hexdigest()
+
+
+class FairScheduler:
+    """
+    Plazas de una etapa repartidas en round-robin entre clientes y sesiones.
+    
+    Responsibilities:
+    - Limitar las peticiones simultáneas de la etapa
+    - Encolar por sesión (agrupada por cliente) y despachar en round-robin
+    - Medir esperas y profundidad de cola por sesión
+    """
+    
+    def __init__(self, name: str, slots: int):
+        """
+        Inicializar scheduler.
+        
+        Args:
+            name: Nombre de la etapa (para métricas)
+            slots: Peticiones simultáneas permitidas
+        """
+        self.name = name
+        self.slots = slots
+        
+        self._active = 0
+        # Cliente → sesión → esperas pendientes; el orden de cada dict es el
+        # turno del round-robin en su nivel
+        self._queues: OrderedDict[Hashable, OrderedDict[Hashable, _Queue]] = OrderedDict()
+        self._served = 0
+        self._queued = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+    
+    @asynccontextmanager
+    async def slot(self, key: Hashable, client: Optional[Hashable] = None) -> AsyncIterator[float]:
+        """
+        Ocupar una plaza de la etapa durante el bloque.
+        
+        Args:
+            key: Sesión que pide la plaza
+            client: Cliente de la sesión (None = la sesión va sola)
+        
+        Yields:
+            Segundos esperados en cola
+        """
+        wait = await self._acquire(key, key if client is None else client)
+        try:
+            yield wait
+        finally:
+            self._release()
+    
+    async def _acquire(self, key: Hashable, client: Hashable) -> float:
+        self._served += 1
+        
+        if self._active < self.slots and not self._queues:
+            self._active += 1
+            return 0.0
+        
+        self._queued += 1
+        start = monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        sessions = self._queues.setdefault(client, OrderedDict())
+        sessions.setdefault(key, deque()).append((waiter, start))
+        
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # La plaza ya era nuestra: cederla a la siguiente sesión
+                self._release()
+            else:
+                self._discard(client, key, waiter)
+            raise
+        
+        wait = monotonic() - start
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
+        return wait
+    
+    def _discard(self, client: Hashable, key: Hashable, waiter: asyncio.Future) -> None:
+        """Quitar de la cola una espera cancelada."""
+        sessions = self._queues.get(client)
+        queue = sessions.get(key) if sessions is not None else None
+        if queue is None:
+            return
+        for entry in queue:
+            if entry[0] is waiter:
+                queue.remove(entry)
+                break
+        else:
+            return
+        if not queue:
+            del sessions[key]
+            if not sessions:
+                del self._queues[client]
+    
+    def _release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+    
+    def _dispatch(self) -> None:
+        """Dar las plazas libres a la siguiente sesión del siguiente cliente de la ronda."""
+        while self._active < self.slots and self._queues:
+            client, sessions = next(iter(self._queues.items()))
+            key, queue = next(iter(sessions.items()))
+            waiter, _ = queue.popleft()
+            
+            # La sesión pasa al final de la ronda de su cliente, y el
+            # cliente al final de la ronda general (o salen si se vacían)
+            if queue:
+                sessions.move_to_end(key)
+            else:
+                del sessions[key]
+            if sessions:
+                self._queues.move_to_end(client)
+            else:
+                del self._queues[client]
+            
+            # Cancelada pero su tarea aún no la ha retirado de la cola
+            if waiter.done():
+                continue
+            
+            self._active += 1
+            waiter.set_result(None)
+    
+    def get_metrics(self) -> dict:
+        """Plazas, ocupación, cola y espera más antigua por sesión (hash) y esperas."""
+        now = monotonic()
+        sessions = {
+            _metric_key(key): {"queued": len(queue), "wait": round(now - queue[0][1], 4)}
+            for client_sessions in self._queues.values()
+            for key, queue in client_sessions.items()
+        }
+        return {
+            "slots": self.slots,
+            "active": self._active,
+            "queued": sum(session["queued"] for session in sessions.values()),
+            "clients": len(self._queues),
+            "sessions": sessions,
+            "served": self._served,
+            "queued_total": self._queued,
+            "wait_avg": round(self._wait_total / self._queued, 4) if self._queued else 0.0,
+            "wait_max": round(self._wait_max, 4)
+        }
@@ -0,0 +1,148 @@
+"""
+HealthMonitor - Sondeo periódico y barato de la salud de los componentes.
+
+En lugar de generar texto y sintetizar audio en cada petición a /health,
+un task en background ejecuta sondas ligeras (p.ej. GET /v1/models,
+espeak --version) en paralelo cada cierto intervalo y cachea el resultado.
+Los endpoints devuelven la última instantánea al instante.
+"""
+
+import asyncio
+from time import time
+from typing import Awaitable, Callable, Optional
+
+from loguru import logger
+
+
+# Sonda de salud: corrutina sin argumentos que devuelve True si está sano
+HealthProbe = Callable[[], Awaitable[bool]]
+
+
+class HealthMonitor:
+    """
+    Monitor de salud con sondas en paralelo y resultados cacheados.
+    
+    Responsibilities:
+    - Ejecutar las sondas de todos los componentes en paralelo
+    - Cachear el resultado con timestamp, latencia y error
+    - Refrescar periódicamente en background
+    """
+    
+    def __init__(
+        self,
+        probes: dict[str, HealthProbe],
+        critical: tuple[str, ...] = ("stt", "llm"),
+        interval: float = 15.0,
+        probe_timeout: float = 2.0
+    ):
+        """
+        Inicializar monitor.
+        
+        Args:
+            probes: Sonda por componente (nombre → corrutina)
+            critical: Componentes que determinan el estado global
+            interval: Segundos entre rondas de sondeo
+            probe_timeout: Timeout (s) de cada sonda
+        """
+        self.probes = probes
+        self.critical = critical
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        
+        self._results: dict[str, dict] = {
+            name: {"healthy": False, "checked_at": None, "latency": 0.0, "error": "not checked yet"}
+            for name in probes
+        }
+        self._checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _run_probe(self, name: str, probe: HealthProbe) -> dict:
+        """Ejecutar una sonda con timeout y medir su latencia."""
+        start = time()
+        error = None
+        
+        try:
+            healthy = await asyncio.wait_for(probe(), timeout=self.probe_timeout)
+        except asyncio.TimeoutError:
+            healthy, error = False, f"timeout after {self.probe_timeout}s"
+        except Exception as e:
+            healthy, error = False, str(e)
+        
+        if not healthy and error is None:
+            error = "probe failed"
+        
+        return {
+            "healthy": bool(healthy),
+            "checked_at": time(),
+            "latency": round(time() - start, 4),
+            "error": error
+        }
+    
+    async def refresh(self) -> dict:
+        """
+        Ejecutar todas las sondas en paralelo y actualizar la caché.
+        
+        Returns:
+            Instantánea actualizada (ver snapshot)
+        """
+        names = list(self.probes)
+        results = await asyncio.gather(
+            *(self._run_probe(name, self.probes[name]) for name in names)
+        )
+        
+        for name, result in zip(names, results):
+            if result["healthy"] != self._results[name]["healthy"]:
+                logger.info(
+                    f"🏥 {name} is now {'up' if result['healthy'] else 'down'}"
+                    + (f": {result['error']}" if result["error"] else "")
+                )
+            self._results[name] = result
+        
+        self._checked_at = time()
+        return self.snapshot()
+    
+    def snapshot(self) -> dict:
+        """
+        Última instantánea cacheada (sin ejecutar sondas).
+        
+        Returns:
+            Dict con estado por componente, "overall", "checked_at" (epoch),
+            "age" (segundos desde la última ronda) y "details" por componente
+        """
+        snapshot = {name: result["healthy"] for name, result in self._results.items()}
+        snapshot["overall"] = all(
+            self._results[name]["healthy"] for name in self.critical if name in self._results
+        )
+        snapshot["checked_at"] = self._checked_at
+        snapshot["age"] = round(time() - self._checked_at, 3) if self._checked_at else None
+        snapshot["details"] = {name: dict(result) for name, result in self._results.items()}
+        return snapshot
+    
+    async def _run(self) -> None:
+        """Bucle de sondeo en background (la primera ronda es inmediata)."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"⚠️ Health probe round failed: {e}")
+            await asyncio.sleep(self.interval)
+    
+    async def start(self) -> None:
+        """Arrancar el sondeo periódico en background (no bloquea)."""
+        if self._task is not None:
+            return
+        
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"🏥 Health monitor started: interval={self.interval}s")
+    
+    async def stop(self) -> None:
+        """Detener el sondeo periódico."""
+        if self._task is None:
+            return
+        
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,188 @@
+"""
+IdempotencyCache - Deduplicar reintentos de turnos (cabecera Idempotency-Key).
+
+Los clientes móviles reintentan /voice/process al vencer su timeout. Sin
+deduplicar, cada reintento repite STT, añade otra vez la pregunta al
+historial, genera otra respuesta y la sintetiza de nuevo.
+
+Por cada clave se guarda la tarea del primer turno:
+- mientras está en curso, los reintentos se unen a ella
+- al terminar con éxito, su resultado se sirve durante ttl segundos
+- si falla o se cancela, la clave se olvida y un reintento lo ejecuta de nuevo
+
+El mapa está acotado en claves (max_keys) y en bytes de resultados
+guardados (max_bytes, p.ej. el audio TTS): se descartan los resultados más
+antiguos, y uno que por sí solo supera el presupuesto no se guarda.
+"""
+
+import asyncio
+import heapq
+from collections import OrderedDict
+from dataclasses import dataclass
+from math import inf
+from time import monotonic
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from loguru import logger
+
+
+class IdempotencyKeyReusedError(ValueError):
+    """La Idempotency-Key ya se usó con una petición distinta."""
+
+
+@dataclass(slots=True)
+class _Entry:
+    """Turno asociado a una clave y la huella de su petición."""
+    
+    fingerprint: Hashable
+    task: asyncio.Task
+    expires_at: float = inf  # inf mientras el turno está en curso
+    size: int = 0  # Bytes del resultado guardado (0 mientras está en curso)
+
+
+class IdempotencyCache:
+    """
+    Mapa acotado con TTL de Idempotency-Key → turno (en curso o terminado).
+    
+    Responsibilities:
+    - Unir los reintentos al turno en curso o servir su resultado
+    - Rechazar una clave reutilizada con otra petición
+    - No cachear errores: un reintento tras un fallo se ejecuta de nuevo
+    """
+    
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        max_keys: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        sizeof: Optional[Callable[[Any], int]] = None
+    ):
+        """
+        Inicializar cache.
+        
+        Args:
+            ttl: Segundos que se conserva el resultado de un turno terminado
+            max_keys: Máximo de claves guardadas
+            max_bytes: Máximo de bytes de resultados guardados
+            sizeof: Tamaño en bytes de un resultado (None = no cuentan)
+        """
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda result: 0)
+        
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        # (caducidad, desempate, clave, entrada) de los resultados guardados:
+        # un turno largo en curso no retiene los caducados que tenga detrás
+        self._expiry: list[tuple[float, int, str, _Entry]] = []
+        self._bytes = 0
+        self._joined = 0
+        self._replayed = 0
+        self._conflicts = 0
+        self._oversized = 0
+    
+    def __contains__(self, key: str) -> bool:
+        """La clave tiene un turno en curso o un resultado sin caducar."""
+        self._evict_expired()
+        return key in self._entries
+    
+    async def run(self, key: str, fingerprint: Hashable, turn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecutar el turno una sola vez por clave.
+        
+        El turno no se cancela si quien espera se desconecta: el reintento
+        del cliente se une a él (barge_in() sí lo cancela).
+        
+        Args:
+            key: Idempotency-Key del cliente
+            fingerprint: Huella de la petición (sesión y entrada del turno)
+            turn: Crea la corrutina del turno (solo se llama si hay que ejecutarlo)
+        
+        Returns:
+            Resultado del turno (el mismo objeto para todos los reintentos)
+        
+        Raises:
+            IdempotencyKeyReusedError: Si la clave llegó antes con otra petición
+        """
+        self._evict_expired()
+        
+        entry = self._entries.get(key)
+        
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                self._conflicts += 1
+                raise IdempotencyKeyReusedError(
+                    f"Idempotency-Key '{key}' was already used with a different request"
+                )
+            
+            if entry.task.done():
+                self._replayed += 1
+                logger.info(f"♻️ Replayed idempotent turn: key={key}")
+            else:
+                self._joined += 1
+                logger.info(f"🔗 Retry joined in-flight turn: key={key}")
+            return await asyncio.shield(entry.task)
+        
+        entry = _Entry(fingerprint, asyncio.ensure_future(turn()))
+        self._entries[key] = entry
+        entry.task.add_done_callback(lambda task: self._settle(key, entry))
+        
+        while len(self._entries) > self.max_keys:
+            self._bytes -= self._entries.popitem(last=False)[1].size
+        
+        return await asyncio.shield(entry.task)
+    
+    def _settle(self, key: str, entry: _Entry) -> None:
+        """Al terminar el turno: conservar el éxito durante ttl, olvidar el fallo."""
+        if self._entries.get(key) is not entry:
+            return  # Descartada por tamaño mientras estaba en curso
+        
+        if entry.task.cancelled() or entry.task.exception() is not None:
+            del self._entries[key]
+            return
+        
+        size = self.sizeof(entry.task.result())
+        if size > self.max_bytes:
+            # Los que esperan ya tienen el resultado; un reintento posterior repite el turno
+            self._oversized += 1
+            del self._entries[key]
+            logger.info(f"📦 Idempotent result not kept ({size} bytes > {self.max_bytes}): key={key}")
+            return
+        
+        entry.size = size
+        entry.expires_at = monotonic() + self.ttl
+        self._entries.move_to_end(key)
+        heapq.heappush(self._expiry, (entry.expires_at, id(entry), key, entry))
+        self._bytes += size
+        self._enforce_budget()
+    
+    def _enforce_budget(self) -> None:
+        """Descartar los resultados terminados más antiguos hasta caber en max_bytes."""
+        for key, entry in list(self._entries.items()):
+            if self._bytes <= self.max_bytes:
+                break
+            if entry.task.done():
+                del self._entries[key]
+                self._bytes -= entry.size
+    
+    def _evict_expired(self) -> None:
+        """Descartar resultados caducados (el heap los da en orden de caducidad)."""
+        now = monotonic()
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            _, _, key, entry = heapq.heappop(expiry)
+            # Ya descartada por tamaño o sustituida por otra con la misma clave
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+                self._bytes -= entry.size
+    
+    def get_metrics(self) -> dict:
+        """Claves y bytes guardados, reintentos unidos/servidos, conflictos y resultados no guardados por tamaño."""
+        return {
+            "keys": len(self._entries),
+            "bytes": self._bytes,
+            "joined": self._joined,
+            "replayed": self._replayed,
+            "conflicts": self._conflicts,
+            "oversized": self._oversized
+        }
@@ -0,0 +1,157 @@
+"""
+RateLimiter - Token buckets por sesión y por IP de cliente.
+
+Cada clave tiene un cubo de `burst` fichas que se rellena a `rate` fichas
+por segundo; cada turno consume una. Un turno sin fichas se rechaza con
+el tiempo que falta para la siguiente (Retry-After), antes de gastar
+STT, LLM o TTS.
+
+Los cubos se guardan en un mapa acotado (se descartan los menos usados:
+un cubo olvidado equivale a uno lleno).
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic
+from typing import Hashable, Optional
+
+
+class RateLimitedError(Exception):
+    """El cliente o la sesión superó su cuota de turnos."""
+    
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass(slots=True)
+class _Bucket:
+    tokens: float
+    updated: float
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets con el mismo ritmo y ráfaga para todas las claves.
+    
+    Responsibilities:
+    - Rellenar y consumir fichas por clave
+    - Calcular la espera hasta la siguiente ficha
+    - Acotar el número de cubos en memoria
+    """
+    
+    def __init__(self, rate: float, burst: int, max_keys: int = 10000):
+        """
+        Inicializar limitador.
+        
+        Args:
+            rate: Fichas por segundo (0 = sin límite)
+            burst: Capacidad del cubo (turnos seguidos permitidos)
+            max_keys: Máximo de cubos en memoria
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        
+        self._buckets: OrderedDict[Hashable, _Bucket] = OrderedDict()
+    
+    @property
+    def enabled(self) -> bool:
+        """False si rate es 0 (sin límite)."""
+        return self.rate > 0
+    
+    def _refill(self, key: Hashable, now: float) -> _Bucket:
+        bucket = self._buckets.get(key)
+        
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(float(self.burst), now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+            self._buckets.move_to_end(key)
+        
+        return bucket
+    
+    def wait_time(self, key: Hashable, now: float) -> float:
+        """Segundos hasta que la clave tenga una ficha (0 si ya la tiene)."""
+        bucket = self._refill(key, now)
+        return 0.0 if bucket.tokens >= 1 else (1 - bucket.tokens) / self.rate
+    
+    def consume(self, key: Hashable) -> None:
+        """Gastar una ficha (llamar tras wait_time() == 0)."""
+        self._buckets[key].tokens -= 1
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimiter:
+    """
+    Cuota de turnos por sesión y por IP de cliente.
+    
+    Un turno solo consume fichas si ambos cubos tienen: un rechazo por IP
+    no gasta la cuota de la sesión ni al revés.
+    """
+    
+    def __init__(
+        self,
+        session_rate: float = 1.0,
+        session_burst: int = 5,
+        client_rate: float = 3.0,
+        client_burst: int = 15,
+        max_keys: int = 10000
+    ):
+        """
+        Inicializar limitador.
+        
+        Args:
+            session_rate: Turnos por segundo sostenidos por sesión (0 = sin límite)
+            session_burst: Ráfaga de turnos por sesión
+            client_rate: Turnos por segundo sostenidos por IP (0 = sin límite)
+            client_burst: Ráfaga de turnos por IP
+            max_keys: Máximo de cubos en memoria por tipo de clave
+        """
+        self.sessions = TokenBucketLimiter(session_rate, session_burst, max_keys)
+        self.clients = TokenBucketLimiter(client_rate, client_burst, max_keys)
+        
+        self._allowed = 0
+        self._rejected = {"session": 0, "client": 0}
+    
+    def acquire(self, session_id: Hashable, client: Optional[str] = None) -> None:
+        """
+        Admitir un turno o rechazarlo.
+        
+        Args:
+            session_id: Sesión del turno
+            client: IP del cliente (None = sin límite por IP)
+        
+        Raises:
+            RateLimitedError: Si la sesión o la IP no tienen fichas
+        """
+        now = monotonic()
+        limits = [("session", self.sessions, session_id)]
+        if client is not None:
+            limits.append(("client", self.clients, client))
+        limits = [(scope, limiter, key) for scope, limiter, key in limits if limiter.enabled]
+        
+        waits = [(limiter.wait_time(key, now), scope) for scope, limiter, key in limits]
+        retry_after, scope = max(waits, default=(0.0, None))
+        
+        if retry_after > 0:
+            self._rejected[scope] += 1
+            raise RateLimitedError(f"Too many turns for this {scope}", retry_after)
+        
+        for _, limiter, key in limits:
+            limiter.consume(key)
+        self._allowed += 1
+    
+    def get_metrics(self) -> dict:
+        """Turnos admitidos y rechazados (por sesión o por IP) y cubos en memoria."""
+        return {
+            "allowed": self._allowed,
+            "rejected": dict(self._rejected),
+            "sessions": len(self.sessions),
+            "clients": len(self.clients)
+        }
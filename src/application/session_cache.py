@@ -0,0 +1,237 @@
+"""
+SessionCache - Caché acotada de conversaciones en memoria.
+
+Límites (cualquiera es opcional):
+- Número máximo de sesiones (expulsa la menos usada recientemente, LRU)
+- Tamaño total aproximado en bytes (expulsa LRU hasta caber)
+- TTL de inactividad desde el último acceso (expulsado por el janitor)
+
+Las sesiones fijadas (pin, con un turno en curso) no se expulsan: el turno
+sigue escribiendo en ellas y, sin spill store, la perdería a mitad.
+
+Cada expulsión se notifica a on_evict, que puede volcar la conversación a
+un backend persistente en lugar de perderla.
+"""
+
+from collections import OrderedDict
+from time import monotonic
+from typing import Callable, Iterator, Optional
+from uuid import UUID
+
+from ..domain.conversation import Conversation
+from ..domain.message import Message
+
+
+# Coste aproximado de un mensaje aparte de su texto (objeto con slots, dict
+# del payload LLM cacheado y punteros en los deques)
+MESSAGE_OVERHEAD_BYTES = 280
+
+# Coste aproximado de una conversación vacía (objeto, deques, snapshots)
+CONVERSATION_OVERHEAD_BYTES = 1700
+
+# Callback de expulsión: (conversación, motivo) con motivo "lru", "bytes" o "ttl"
+EvictionCallback = Callable[[Conversation, str], None]
+
+
+def estimate_message_size(message: Message) -> int:
+    """Tamaño aproximado en memoria de un mensaje."""
+    return MESSAGE_OVERHEAD_BYTES + len(message.content)
+
+
+def estimate_size(conversation: Conversation) -> int:
+    """Tamaño aproximado en memoria de una conversación (sin system prompt ni prefijo, compartidos)."""
+    shared = (conversation.system_prompt is not None) + len(conversation.shared_prefix)
+    return CONVERSATION_OVERHEAD_BYTES + sum(
+        estimate_message_size(m) for m in conversation.messages[shared:]
+    )
+
+
+class SessionCache:
+    """
+    Caché LRU de conversaciones con límite de sesiones, bytes y TTL.
+    
+    Responsibilities:
+    - Mantener orden LRU y último acceso por sesión
+    - Expulsar por número de sesiones o bytes al insertar
+    - Expulsar sesiones inactivas (evict_expired, llamado por el janitor)
+    - Contar aciertos, fallos y expulsiones por motivo
+    """
+    
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        on_evict: Optional[EvictionCallback] = None,
+        clock: Callable[[], float] = monotonic
+    ):
+        """
+        Inicializar caché.
+        
+        Args:
+            max_sessions: Máximo de sesiones en memoria (None = sin límite)
+            max_bytes: Máximo de bytes aproximados (None = sin límite)
+            idle_ttl: Segundos sin acceso antes de expulsar (None = nunca)
+            on_evict: Callback por cada conversación expulsada
+            clock: Reloj monotónico (inyectable en tests)
+        """
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self._clock = clock
+        
+        # session_id -> [conversación, bytes, último acceso] (orden = LRU)
+        self._entries: OrderedDict[UUID, list] = OrderedDict()
+        self._total_bytes = 0
+        # session_id -> turnos en curso que la fijan
+        self._pinned: dict[UUID, int] = {}
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {"lru": 0, "bytes": 0, "ttl": 0}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, session_id: UUID) -> bool:
+        return session_id in self._entries
+    
+    def __iter__(self) -> Iterator[UUID]:
+        return iter(list(self._entries))
+    
+    @property
+    def total_bytes(self) -> int:
+        """Bytes aproximados ocupados por las conversaciones cacheadas."""
+        return self._total_bytes
+    
+    def get(self, session_id: UUID) -> Optional[Conversation]:
+        """Obtener conversación y marcarla como usada recientemente."""
+        entry = self._entries.get(session_id)
+        
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        entry[2] = self._clock()
+        self._entries.move_to_end(session_id)
+        return entry[0]
+    
+    def put(self, conversation: Conversation) -> None:
+        """Insertar o reemplazar una conversación (recalcula su tamaño)."""
+        session_id = conversation.session_id
+        size = estimate_size(conversation)
+        
+        previous = self._entries.pop(session_id, None)
+        if previous is not None:
+            self._total_bytes -= previous[1]
+        
+        self._entries[session_id] = [conversation, size, self._clock()]
+        self._total_bytes += size
+        self._enforce_limits(keep=session_id)
+    
+    def grow(self, conversation: Conversation, message: Message) -> None:
+        """Registrar un mensaje añadido (sin recorrer todo el historial)."""
+        entry = self._entries.get(conversation.session_id)
+        
+        if entry is None or entry[0] is not conversation:
+            self.put(conversation)
+            return
+        
+        size = estimate_message_size(message)
+        entry[1] += size
+        entry[2] = self._clock()
+        self._total_bytes += size
+        self._entries.move_to_end(conversation.session_id)
+        self._enforce_limits(keep=conversation.session_id)
+    
+    def pop(self, session_id: UUID) -> Optional[Conversation]:
+        """Quitar una conversación sin notificar expulsión."""
+        entry = self._entries.pop(session_id, None)
+        
+        if entry is None:
+            return None
+        
+        self._total_bytes -= entry[1]
+        return entry[0]
+    
+    def pin(self, session_id: UUID) -> None:
+        """Fijar una sesión en memoria mientras dura un turno (no se expulsa)."""
+        self._pinned[session_id] = self._pinned.get(session_id, 0) + 1
+    
+    def unpin(self, session_id: UUID) -> None:
+        """Liberar un pin de pin()."""
+        count = self._pinned.get(session_id, 0) - 1
+        if count > 0:
+            self._pinned[session_id] = count
+        else:
+            self._pinned.pop(session_id, None)
+    
+    def _evict(self, session_id: UUID, reason: str) -> None:
+        """Expulsar una sesión y notificarlo."""
+        conversation = self.pop(session_id)
+        self.evictions[reason] += 1
+        
+        if self.on_evict is not None and conversation is not None:
+            self.on_evict(conversation, reason)
+    
+    def _victim(self, keep: UUID) -> Optional[UUID]:
+        """Sesión menos usada que se puede expulsar (None si todas están fijadas)."""
+        for session_id in self._entries:
+            if session_id != keep and session_id not in self._pinned:
+                return session_id
+        return None
+    
+    def _enforce_limits(self, keep: UUID) -> None:
+        """Expulsar LRU hasta cumplir los límites (nunca la sesión recién usada ni las fijadas)."""
+        while self.max_sessions is not None and len(self._entries) > self.max_sessions:
+            victim = self._victim(keep)
+            if victim is None:
+                break
+            self._evict(victim, "lru")
+        
+        while self.max_bytes is not None and self._total_bytes > self.max_bytes:
+            victim = self._victim(keep)
+            if victim is None:
+                break
+            self._evict(victim, "bytes")
+    
+    def evict_expired(self) -> int:
+        """
+        Expulsar las sesiones sin acceso durante más de idle_ttl.
+        
+        Returns:
+            Número de sesiones expulsadas
+        """
+        if self.idle_ttl is None:
+            return 0
+        
+        deadline = self._clock() - self.idle_ttl
+        expired = []
+        
+        # Orden LRU: las inactivas están al principio
+        for session_id, entry in self._entries.items():
+            if entry[2] > deadline:
+                break
+            if session_id not in self._pinned:
+                expired.append(session_id)
+        
+        for session_id in expired:
+            self._evict(session_id, "ttl")
+        
+        return len(expired)
+    
+    def stats(self) -> dict:
+        """Ocupación, aciertos y expulsiones."""
+        lookups = self.hits + self.misses
+        
+        return {
+            "sessions": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "idle_ttl": self.idle_ttl,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": dict(self.evictions)
+        }
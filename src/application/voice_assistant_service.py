@@ -4,16 +4,32 @@ VoiceAssistantService - Orquestador del pipeline completo STT→LLM→TTS.
 Application layer service que coordina toda la conversación por voz.
 """
 
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
 from uuid import UUID
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, AsyncIterator, Optional, Tuple, Union
 from time import time
 
 from loguru import logger
 
 from ..infrastructure.stt.whisper_client import WhisperSTTClient
 from ..infrastructure.llm.lm_studio_client import LMStudioClient
+from ..infrastructure.llm.llm_pool_client import LLMPoolClient
+from ..infrastructure.tts.audio_encoder import AUDIO_FORMATS
 from ..infrastructure.tts.pyttsx3_client import Pyttsx3TTSClient
-from .conversation_service import ConversationService
+from .conversation_service import ConversationService, DEFAULT_SYSTEM_PROMPT, SessionBusyError
+from .fair_scheduler import FairScheduler
+from .health_monitor import HealthMonitor
+from .idempotency import IdempotencyCache
+from .rate_limiter import RateLimiter
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class TurnCancelledError(RuntimeError):
+    """El turno en curso de la sesión se canceló (barge-in) antes de terminar."""
 
 
 class VoiceAssistantService:
@@ -30,95 +46,281 @@ class VoiceAssistantService:
     - Gestionar memoria conversacional
     - Medir latencia end-to-end
     - Error handling robusto
+    - Cancelar el turno en curso de una sesión (barge-in)
+    - Warm-up de componentes en background y readiness
     """
     
     def __init__(
         self,
         stt_client: WhisperSTTClient,
-        llm_client: LMStudioClient,
+        llm_client: LMStudioClient | LLMPoolClient,
         tts_client: Pyttsx3TTSClient,
-        conversation_service: ConversationService
+        conversation_service: ConversationService,
+        enable_prefill: bool = False,
+        prefill_max_wait: float = 2.0,
+        health_interval: float = 15.0,
+        health_probe_timeout: float = 2.0,
+        stream_max_bytes: int = 10 * 1024 * 1024,
+        stream_max_seconds: float = 60.0,
+        idempotency_ttl: float = 300.0,
+        idempotency_max_keys: int = 10000,
+        idempotency_max_bytes: int = 64 * 1024 * 1024,
+        rate_limit_session_rate: float = 1.0,
+        rate_limit_session_burst: int = 5,
+        rate_limit_client_rate: float = 3.0,
+        rate_limit_client_burst: int = 15,
+        stt_slots: int = 2,
+        llm_slots: int = 4,
+        tts_slots: int = 2
     ):
         """
         Inicializar servicio de asistente de voz.
         
         Args:
             stt_client: Cliente para Speech-to-Text (Whisper)
-            llm_client: Cliente para LLM (LM Studio)
+            llm_client: Cliente para LLM (LM Studio o pool de backends)
             tts_client: Cliente para Text-to-Speech (pyttsx3)
             conversation_service: Servicio de conversaciones
+            enable_prefill: Pre-calentar el KV cache del LLM mientras corre STT
+            prefill_max_wait: Segundos máximos que el turno espera al prefill
+            health_interval: Segundos entre sondeos de salud en background
+            health_probe_timeout: Timeout (s) de cada sonda de salud
+            stream_max_bytes: Tamaño máximo de una subida de audio en streaming
+            stream_max_seconds: Duración máxima de una subida de audio en streaming
+            idempotency_ttl: Segundos que se sirve el resultado de un turno con Idempotency-Key
+            idempotency_max_keys: Máximo de Idempotency-Keys recordadas
+            idempotency_max_bytes: Máximo de bytes (textos y audio) de resultados recordados
+            rate_limit_session_rate: Turnos/s sostenidos por sesión (0 = sin límite)
+            rate_limit_session_burst: Ráfaga de turnos por sesión
+            rate_limit_client_rate: Turnos/s sostenidos por IP de cliente (0 = sin límite)
+            rate_limit_client_burst: Ráfaga de turnos por IP de cliente
+            stt_slots: Transcripciones simultáneas (threads de Whisper)
+            llm_slots: Peticiones simultáneas al LLM
+            tts_slots: Síntesis simultáneas (threads de TTS)
         """
         self.stt = stt_client
         self.llm = llm_client
         self.tts = tts_client
         self.conversations = conversation_service
+        self.enable_prefill = enable_prefill
+        self.prefill_max_wait = prefill_max_wait
+        self.stream_max_bytes = stream_max_bytes
+        self.stream_max_seconds = stream_max_seconds
         
-        logger.info("🎙️ VoiceAssistantService initialized")
+        # Turno en curso por sesión (para barge-in) y su huella (para coalesce)
+        self._inflight: dict[UUID, asyncio.Task] = {}
+        self._inflight_keys: dict[UUID, tuple] = {}
+        self._coalesced = 0
+        
+        # Reintentos del cliente con Idempotency-Key
+        self.idempotency = IdempotencyCache(
+            ttl=idempotency_ttl,
+            max_keys=idempotency_max_keys,
+            max_bytes=idempotency_max_bytes,
+            sizeof=self._result_bytes
+        )
+        
+        # Cuota de turnos por sesión/IP y cola justa (round-robin entre
+        # sesiones, agrupadas por IP de cliente) delante de cada etapa cara
+        self.rate_limiter = RateLimiter(
+            session_rate=rate_limit_session_rate,
+            session_burst=rate_limit_session_burst,
+            client_rate=rate_limit_client_rate,
+            client_burst=rate_limit_client_burst
+        )
+        self.stages = {
+            name: FairScheduler(name, slots)
+            for name, slots in (("stt", stt_slots), ("llm", llm_slots), ("tts", tts_slots))
+        }
+        
+        # Sondas baratas en background; health_check() queda como chequeo profundo
+        self.health_monitor = HealthMonitor(
+            probes={
+                "stt": self.stt.probe,
+                "llm": self.llm.probe,
+                "tts": self.tts.probe
+            },
+            interval=health_interval,
+            probe_timeout=health_probe_timeout
+        )
+        
+        # Estado del warm-up de arranque por componente
+        self._startup: dict[str, dict] = {
+            name: {"status": "pending", "duration": None, "error": None}
+            for name in ("stt", "llm", "tts")
+        }
+        self._warmup_task: Optional[asyncio.Task] = None
+        
+        logger.info(f"🎙️ VoiceAssistantService initialized: prefill={enable_prefill}")
+    
+    def admit(
+        self,
+        session_id: UUID,
+        client: Optional[str] = None,
+        idempotency_key: Optional[str] = None
+    ) -> None:
+        """
+        Comprobar la cuota de turnos antes de aceptar la petición.
+        
+        Un reintento cuya Idempotency-Key ya tiene turno (en curso o con
+        resultado guardado) no consume cuota: no ejecuta el pipeline.
+        
+        Args:
+            session_id: Sesión del turno
+            client: IP del cliente (None = solo límite por sesión)
+            idempotency_key: Idempotency-Key de la petición (si la trae)
+        
+        Raises:
+            RateLimitedError: Si la sesión o la IP superaron su cuota (con retry_after)
+        """
+        if idempotency_key is not None and self._idempotency_scope(idempotency_key, client) in self.idempotency:
+            return
+        self.rate_limiter.acquire(session_id, client)
+    
+    @asynccontextmanager
+    async def _stage(self, name: str, session_id: UUID, client: Optional[str], latencies: dict[str, float]):
+        """Ocupar una plaza de la etapa (cola justa) sumando la espera a latencies['queue_wait']."""
+        async with self.stages[name].slot(session_id, client) as wait:
+            latencies['queue_wait'] = round(latencies.get('queue_wait', 0.0) + wait, 4)
+            yield
+    
+    async def decode_voice_stream(self, chunks: AsyncIterator[bytes]) -> "np.ndarray":
+        """
+        Decodificar el audio de una subida en streaming mientras llega.
+        
+        Args:
+            chunks: Cuerpo de la petición en chunks
+        
+        Returns:
+            Muestras para process_voice_input()
+        
+        Raises:
+            AudioLimitError: Si supera stream_max_bytes o stream_max_seconds
+            ValueError: Si el audio está vacío o no se puede decodificar
+        """
+        return await self.stt.decode_stream(chunks, self.stream_max_bytes, self.stream_max_seconds)
     
     async def process_voice_input(
         self,
-        audio_bytes: bytes,
+        audio_bytes: Union[bytes, "np.ndarray"],
         session_id: UUID,
-        language: str = "es"
+        language: str = "es",
+        audio_format: str = "wav",
+        idempotency_key: Optional[str] = None,
+        client: Optional[str] = None
     ) -> Tuple[str, str, bytes, dict[str, float]]:
         """
         Procesar input de voz completo: Audio → Texto → Respuesta → Audio.
         
         Args:
-            audio_bytes: Audio del usuario en bytes
+            audio_bytes: Audio del usuario en bytes, o muestras ya
+                         decodificadas por decode_voice_stream()
             session_id: ID de la sesión conversacional
             language: Idioma del audio (default: español)
-            
+            audio_format: Formato del audio de respuesta (ver get_audio_formats())
+            idempotency_key: Clave del cliente para deduplicar reintentos
+            client: IP del cliente; agrupa sus sesiones en la cola justa de
+                    cada etapa (None = la sesión va sola)
+        
         Returns:
             Tupla con:
             - transcribed_text: Texto transcrito del usuario
             - response_text: Respuesta del asistente (texto)
             - response_audio: Respuesta del asistente (audio bytes)
             - latency: Dict con tiempos de cada etapa
-            
+        
         Raises:
             ValueError: Si audio_bytes está vacío o session_id inválido
             RuntimeError: Si STT (Whisper) falla durante transcripción
             RuntimeError: Si LLM (LM Studio) falla o no está disponible
             RuntimeError: Si TTS (pyttsx3) falla durante síntesis
+            TurnCancelledError: Si el turno se cancela con barge_in()
+            SessionBusyError: Si la sesión tiene un turno en curso (política reject)
+            IdempotencyKeyReusedError: Si idempotency_key llegó antes con otra petición
             Exception: Cualquier error inesperado en el pipeline
         """
+        key = ("voice", language, audio_format, audio_bytes if isinstance(audio_bytes, bytes) else memoryview(audio_bytes))
+        return await self._run_idempotent(
+            idempotency_key,
+            client,
+            session_id,
+            key,
+            lambda: self._run_turn(
+                session_id,
+                self._voice_turn(audio_bytes, session_id, language, audio_format, client),
+                key=key
+            )
+        )
+    
+    async def _voice_turn(
+        self,
+        audio_bytes: Union[bytes, "np.ndarray"],
+        session_id: UUID,
+        language: str,
+        audio_format: str,
+        client: Optional[str]
+    ) -> Tuple[str, str, bytes, dict[str, float]]:
+        """Pipeline de voz de un turno (ver process_voice_input)."""
         total_start = time()
         latencies = {}
         
         logger.info(f"🎤 Processing voice input for session: {session_id}")
         
+        prefill_task: Optional[asyncio.Task] = None
+        conversation = None
+        
         try:
-            # === STEP 1: Speech-to-Text ===
-            stt_start = time()
-            transcribed_text = await self.stt.transcribe_audio(audio_bytes, language)
-            latencies['stt'] = time() - stt_start
+            # === STEP 1: Obtener/Crear Conversación ===
+            conversation = await self.conversations.aget_or_create_conversation(session_id)
+            
+            # === STEP 2: Prefill del KV cache en paralelo con STT ===
+            # El historial actual es prefijo exacto del prompt del turno,
+            # así LM Studio procesa el prompt mientras Whisper transcribe.
+            if self.enable_prefill:
+                prefill_task = asyncio.create_task(
+                    self.llm.prefill_prompt(
+                        conversation.get_messages_for_llm(),
+                        session_id=session_id
+                    )
+                )
+            
+            # === STEP 3: Speech-to-Text ===
+            async with self._stage("stt", session_id, client, latencies):
+                stt_start = time()
+                transcribed_text = await self.stt.transcribe_audio(audio_bytes, language)
+                latencies['stt'] = time() - stt_start
             
             logger.info(f"📝 Transcribed: '{transcribed_text}'")
             
-            # === STEP 2: Obtener/Crear Conversación ===
-            conversation = self.conversations.get_or_create_conversation(session_id)
+            if prefill_task is not None:
+                latencies['prefill'] = await self._await_prefill(prefill_task)
             
-            # === STEP 3: Agregar mensaje del usuario ===
-            conversation.add_user_message(transcribed_text)
+            # === STEP 4: Agregar mensaje del usuario ===
+            conversation = await self.conversations.aadd_user_message(session_id, transcribed_text)
             
-            # === STEP 4: Generar respuesta con LLM ===
-            llm_start = time()
-            messages = conversation.get_messages_for_llm()
-            response_text = await self.llm.generate_response(messages)
-            latencies['llm'] = time() - llm_start
+            # === STEP 5: Generar respuesta con LLM ===
+            async with self._stage("llm", session_id, client, latencies):
+                llm_start = time()
+                messages = conversation.get_messages_for_llm()
+                response_text = await self.llm.generate_response(
+                    messages,
+                    session_id=session_id,
+                    metrics=latencies
+                )
+                latencies['llm'] = time() - llm_start
             
             logger.info(f"🤖 LLM Response: '{response_text}'")
             
-            # === STEP 5: Agregar respuesta a conversación ===
-            conversation.add_assistant_message(response_text)
+            # === STEP 6: Agregar respuesta a conversación ===
+            await self.conversations.aadd_assistant_message(session_id, response_text)
             
-            # === STEP 6: Text-to-Speech ===
-            tts_start = time()
-            response_audio = await self.tts.synthesize_speech(response_text)
-            latencies['tts'] = time() - tts_start
+            # === STEP 7: Text-to-Speech (+ codificación al formato pedido) ===
+            async with self._stage("tts", session_id, client, latencies):
+                tts_start = time()
+                response_audio = await self.tts.synthesize_speech(response_text, audio_format)
+                latencies['tts'] = time() - tts_start
             
-            # === STEP 7: Métricas ===
+            # === STEP 8: Métricas ===
             latencies['total'] = time() - total_start
             
             logger.info(
@@ -129,15 +331,165 @@ class VoiceAssistantService:
             )
             
             return transcribed_text, response_text, response_audio, latencies
-            
+        
+        except asyncio.CancelledError:
+            await self._rollback_turn(conversation, session_id)
+            raise
         except Exception as e:
             logger.error(f"❌ Voice pipeline failed: {e}")
             raise RuntimeError(f"Voice processing error: {e}") from e
+        
+        finally:
+            if prefill_task is not None and not prefill_task.done():
+                prefill_task.cancel()
+    
+    async def _await_prefill(self, prefill_task: asyncio.Task) -> float:
+        """
+        Esperar (acotado) a que termine el prefill del KV cache.
+        
+        El prefill es una optimización: si falla o tarda más de
+        prefill_max_wait, el turno continúa sin él.
+        
+        Returns:
+            Segundos de prefill (0.0 si no terminó o falló)
+        """
+        done, _ = await asyncio.wait({prefill_task}, timeout=self.prefill_max_wait)
+        
+        if not done:
+            logger.debug("⏱️ Prefill still running, continuing without waiting")
+            return 0.0
+        
+        if prefill_task.exception() is not None:
+            logger.warning(f"⚠️ KV cache prefill failed: {prefill_task.exception()}")
+            return 0.0
+        
+        return prefill_task.result()
+    
+    async def _run_idempotent(
+        self,
+        idempotency_key: Optional[str],
+        client: Optional[str],
+        session_id: UUID,
+        key: tuple,
+        run
+    ):
+        """Ejecutar el turno, deduplicando reintentos si el cliente envió Idempotency-Key."""
+        if idempotency_key is None:
+            return await run()
+        return await self.idempotency.run(
+            self._idempotency_scope(idempotency_key, client),
+            (session_id, *self._turn_fingerprint(key)),
+            run
+        )
+    
+    @staticmethod
+    def _idempotency_scope(idempotency_key: str, client: Optional[str]) -> str:
+        """Clave en la cache: una Idempotency-Key solo vale dentro de su cliente (IP)."""
+        return idempotency_key if client is None else f"{client} {idempotency_key}"
+    
+    @staticmethod
+    def _result_bytes(result: tuple) -> int:
+        """Bytes de textos y audio de un resultado de turno (para el presupuesto de idempotencia)."""
+        return sum(len(part) for part in result if isinstance(part, (str, bytes)))
+    
+    @staticmethod
+    def _turn_fingerprint(key: tuple) -> tuple:
+        """Huella compacta de la entrada de un turno (el audio se resume con un hash)."""
+        return tuple(
+            hashlib.blake2b(part, digest_size=16).digest() if isinstance(part, (bytes, memoryview)) else part
+            for part in key
+        )
+    
+    async def _run_turn(self, session_id: UUID, turn, key: tuple = ()):
+        """
+        Ejecutar un turno como tarea cancelable registrada por sesión.
+        
+        Los turnos de una misma sesión se serializan con el lock de
+        ConversationService (según su turn_policy); sesiones distintas
+        no se esperan entre sí. Con coalesce, una petición idéntica a la
+        que está en curso se une a ella en lugar de repetir el pipeline.
+        
+        La cancelación (barge-in o desconexión del cliente) se propaga al
+        LLM y al TTS: la petición HTTP al LLM se cierra y el trabajo TTS que
+        aún esté en cola del executor se descarta.
+        
+        Raises:
+            TurnCancelledError: Si barge_in() canceló el turno
+            SessionBusyError: Si la política es reject y hay un turno en curso
+        """
+        fingerprint = None
+        if self.conversations.turn_policy == "coalesce" and key:
+            fingerprint = self._turn_fingerprint(key)
+            running = self._inflight.get(session_id)
+            if running is not None and not running.done() and self._inflight_keys.get(session_id) == fingerprint:
+                turn.close()
+                self._coalesced += 1
+                logger.info(f"🔗 Coalesced duplicate turn for session {session_id}")
+                return await self._await_turn(session_id, running, shield=True)
+        
+        try:
+            async with self.conversations.turn_lock(session_id) as lock_wait:
+                task = asyncio.ensure_future(turn)
+                self._inflight[session_id] = task
+                self._inflight_keys[session_id] = fingerprint
+                
+                try:
+                    result = await self._await_turn(session_id, task)
+                finally:
+                    if self._inflight.get(session_id) is task:
+                        del self._inflight[session_id]
+                        del self._inflight_keys[session_id]
+        except SessionBusyError:
+            turn.close()
+            raise
+        
+        # El dict de latencias es siempre el último elemento del resultado
+        result[-1]["lock_wait"] = round(lock_wait, 3)
+        return result
+    
+    async def _await_turn(self, session_id: UUID, task: asyncio.Task, shield: bool = False):
+        """Esperar la tarea del turno traduciendo un barge-in a TurnCancelledError."""
+        try:
+            return await (asyncio.shield(task) if shield else task)
+        except asyncio.CancelledError:
+            # Si quien espera no fue cancelado, la cancelación vino de barge_in()
+            if task.cancelled() and not asyncio.current_task().cancelling():
+                raise TurnCancelledError(
+                    f"Turn cancelled by barge-in for session {session_id}"
+                ) from None
+            raise
+    
+    async def _rollback_turn(self, conversation, session_id: UUID) -> None:
+        """Quitar la pregunta sin respuesta de un turno cancelado."""
+        if conversation is not None and await self.conversations.adiscard_unanswered_user_message(session_id):
+            logger.info(f"↩️ Discarded unanswered user message: {session_id}")
+        logger.info(f"🛑 Turn cancelled for session: {session_id}")
+    
+    async def barge_in(self, session_id: UUID) -> bool:
+        """
+        Cancelar el turno en curso de una sesión (el usuario vuelve a hablar).
+        
+        Args:
+            session_id: ID de la sesión
+        
+        Returns:
+            True si había un turno en curso y se canceló, False si no
+        """
+        task = self._inflight.get(session_id)
+        
+        if task is None or task.done():
+            return False
+        
+        task.cancel()
+        logger.info(f"✋ Barge-in: cancelling turn for session {session_id}")
+        return True
     
     async def process_text_input(
         self,
         text: str,
-        session_id: UUID
+        session_id: UUID,
+        idempotency_key: Optional[str] = None,
+        client: Optional[str] = None
     ) -> Tuple[str, bytes, dict[str, float]]:
         """
         Procesar input de texto (sin STT, para testing/debugging).
@@ -145,75 +497,154 @@ class VoiceAssistantService:
         Args:
             text: Texto del usuario
             session_id: ID de la sesión
-            
+            idempotency_key: Clave del cliente para deduplicar reintentos
+            client: IP del cliente para la cola justa (ver process_voice_input)
+        
         Returns:
             Tupla con:
             - response_text: Respuesta del asistente (texto)
             - response_audio: Respuesta del asistente (audio bytes)
             - latency: Dict con tiempos
-            
+        
         Raises:
             ValueError: Si text está vacío
             RuntimeError: Si LLM (LM Studio) falla o no está disponible
             RuntimeError: Si TTS (pyttsx3) falla durante síntesis
+            TurnCancelledError: Si el turno se cancela con barge_in()
+            SessionBusyError: Si la sesión tiene un turno en curso (política reject)
+            IdempotencyKeyReusedError: Si idempotency_key llegó antes con otra petición
             Exception: Cualquier error inesperado en el pipeline
         """
+        key = ("text", text)
+        return await self._run_idempotent(
+            idempotency_key,
+            client,
+            session_id,
+            key,
+            lambda: self._run_turn(session_id, self._text_turn(text, session_id, client), key=key)
+        )
+    
+    async def _text_turn(
+        self,
+        text: str,
+        session_id: UUID,
+        client: Optional[str]
+    ) -> Tuple[str, bytes, dict[str, float]]:
+        """Pipeline de texto de un turno (ver process_text_input)."""
         total_start = time()
         latencies = {}
         
         logger.info(f"💬 Processing text input for session: {session_id}")
         
+        conversation = None
+        
         try:
             # Obtener/Crear conversación
-            conversation = self.conversations.get_or_create_conversation(session_id)
+            conversation = await self.conversations.aget_or_create_conversation(session_id)
             
             # Agregar mensaje del usuario
-            conversation.add_user_message(text)
+            conversation = await self.conversations.aadd_user_message(session_id, text)
             
             # Generar respuesta con LLM
-            llm_start = time()
-            messages = conversation.get_messages_for_llm()
-            response_text = await self.llm.generate_response(messages)
-            latencies['llm'] = time() - llm_start
+            async with self._stage("llm", session_id, client, latencies):
+                llm_start = time()
+                messages = conversation.get_messages_for_llm()
+                response_text = await self.llm.generate_response(
+                    messages,
+                    session_id=session_id,
+                    metrics=latencies
+                )
+                latencies['llm'] = time() - llm_start
             
             # Agregar respuesta a conversación
-            conversation.add_assistant_message(response_text)
+            await self.conversations.aadd_assistant_message(session_id, response_text)
             
             # Text-to-Speech
-            tts_start = time()
-            response_audio = await self.tts.synthesize_speech(response_text)
-            latencies['tts'] = time() - tts_start
+            async with self._stage("tts", session_id, client, latencies):
+                tts_start = time()
+                response_audio = await self.tts.synthesize_speech(response_text)
+                latencies['tts'] = time() - tts_start
             
             latencies['total'] = time() - total_start
             
             logger.info(f"✅ Text pipeline completed in {latencies['total']:.2f}s")
             
             return response_text, response_audio, latencies
-            
+        
+        except asyncio.CancelledError:
+            await self._rollback_turn(conversation, session_id)
+            raise
         except Exception as e:
             logger.error(f"❌ Text pipeline failed: {e}")
             raise RuntimeError(f"Text processing error: {e}") from e
     
+    def get_audio_formats(self) -> dict[str, str]:
+        """Formatos de audio de respuesta disponibles → media type."""
+        return {name: AUDIO_FORMATS[name].media_type for name in self.tts.encoder.formats()}
+    
     async def get_conversation_history(
         self,
         session_id: UUID
-    ) -> Optional[list[dict[str, str]]]:
+    ) -> Optional[tuple[dict[str, str], ...]]:
         """
         Obtener historial de conversación para display.
         
         Args:
             session_id: ID de la sesión
-            
+        
         Returns:
-            Lista de mensajes o None si conversación no existe
+            Instantánea inmutable de los mensajes o None si conversación no existe
         """
-        conversation = self.conversations.get_conversation(session_id)
+        conversation = await self.conversations.aget_conversation(session_id)
         
         if conversation is None:
             return None
         
         return conversation.get_messages_for_display()
     
+    async def get_conversation_page(
+        self,
+        session_id: UUID,
+        since: int = 0,
+        limit: Optional[int] = None,
+        known_version: Optional[int] = None
+    ) -> Optional[dict]:
+        """
+        Obtener una página (o el delta) del historial para display.
+        
+        Args:
+            session_id: ID de la sesión
+            since: Índice absoluto desde el que devolver mensajes (cursor)
+            limit: Máximo de mensajes (None = hasta el final)
+            known_version: Versión del historial que ya tiene el cliente
+        
+        Returns:
+            Dict con version, messages, next_cursor, total y reset (el
+            historial se limpió o se descartaron mensajes desde known_version:
+            se devuelve desde el principio), o None si la conversación no existe
+        """
+        conversation = await self.conversations.aget_conversation(session_id)
+        
+        if conversation is None:
+            return None
+        
+        next_cursor, total, messages = conversation.get_display_page(since, limit)
+        
+        reset = since > 0 and (
+            since > total
+            or (known_version is not None and not conversation.is_append_only_since(known_version))
+        )
+        if reset:
+            next_cursor, total, messages = conversation.get_display_page(0, limit)
+        
+        return {
+            "version": conversation.version,
+            "messages": messages,
+            "next_cursor": next_cursor,
+            "total": total,
+            "reset": reset
+        }
+    
     async def clear_conversation(
         self,
         session_id: UUID,
@@ -225,33 +656,119 @@ class VoiceAssistantService:
         Args:
             session_id: ID de la sesión
             keep_system: Si mantener mensaje del sistema
-            
+        
         Returns:
             True si se limpió, False si conversación no existe
         """
-        conversation = self.conversations.get_conversation(session_id)
+        conversation = await self.conversations.aget_conversation(session_id)
         
         if conversation is None:
             return False
         
-        self.conversations.clear_conversation(session_id, keep_system)
+        await self.conversations.aclear_conversation(session_id, keep_system)
         logger.info(f"🧹 Conversation cleared: {session_id}")
         return True
     
+    async def start(self) -> None:
+        """
+        Lanzar warm-up y monitor de salud en background sin bloquear.
+        
+        El servidor empieza a aceptar conexiones enseguida; get_readiness()
+        indica cuándo puede recibir tráfico.
+        """
+        self._warmup_task = asyncio.create_task(self.warm_up())
+        await self.health_monitor.start()
+    
+    async def warm_up(self) -> dict:
+        """
+        Calentar STT, LLM y TTS en paralelo.
+        
+        - STT: cargar el modelo Whisper
+        - LLM: prefill del system prompt (carga del modelo en LM Studio y
+          prefijo común en su KV cache)
+        - TTS: síntesis de una frase corta
+        
+        Los fallos se registran pero no se propagan: el servicio arranca igual.
+        
+        Returns:
+            Estado de readiness tras el warm-up (ver get_readiness)
+        """
+        logger.info("🔥 Warming up components in background...")
+        primer = [{"role": "system", "content": DEFAULT_SYSTEM_PROMPT}]
+        
+        await asyncio.gather(
+            self._warm_component("stt", self.stt.warm_up),
+            self._warm_component("llm", lambda: self.llm.prefill_prompt(primer)),
+            self._warm_component("tts", self.tts.warm_up)
+        )
+        
+        return self.get_readiness()
+    
+    async def _warm_component(self, name: str, warm) -> None:
+        """Ejecutar el warm-up de un componente registrando su duración."""
+        state = self._startup[name]
+        state["status"] = "warming"
+        start = time()
+        
+        try:
+            await warm()
+            state["status"] = "ready"
+        except Exception as e:
+            state["status"] = "failed"
+            state["error"] = str(e)
+            logger.warning(f"⚠️ {name} warm-up failed: {e}")
+        
+        state["duration"] = round(time() - start, 3)
+        logger.info(f"🔥 {name} warm-up {state['status']} in {state['duration']:.2f}s")
+    
+    def get_readiness(self) -> dict:
+        """
+        Estado de readiness para orquestadores.
+        
+        Listo cuando el modelo STT está cargado y el LLM responde a las
+        sondas de salud (se recupera solo si LM Studio arranca más tarde).
+        
+        Returns:
+            Dict con "ready" y, por componente, estado/duración del warm-up
+            y último resultado de las sondas
+        """
+        health = self.get_health_snapshot()
+        ready = self._startup["stt"]["status"] == "ready" and health["llm"]
+        
+        return {
+            "ready": ready,
+            "components": {
+                name: {**state, "healthy": health.get(name, False)}
+                for name, state in self._startup.items()
+            }
+        }
+    
+    def get_health_snapshot(self) -> dict:
+        """
+        Última instantánea del monitor de salud (instantáneo, sin sondear).
+        
+        Returns:
+            Dict con estado de cada componente, "overall" y antigüedad
+        """
+        return self.health_monitor.snapshot()
+    
     async def health_check(self) -> dict[str, bool]:
         """
-        Verificar salud de todos los componentes.
+        Verificación profunda de todos los componentes (bajo demanda).
+        
+        Genera una respuesta real con el LLM y sintetiza audio: usar
+        get_health_snapshot() para sondeos frecuentes.
         
         Returns:
             Dict con estado de cada componente
         """
         logger.info("🏥 Running health check...")
         
-        # Verificar LLM (crítico)
-        llm_healthy = await self.llm.health_check()
-        
-        # Verificar TTS (puede fallar sin romper todo)
-        tts_healthy = await self.tts.health_check()
+        # LLM (crítico) y TTS (puede fallar sin romper todo) en paralelo
+        llm_healthy, tts_healthy = await asyncio.gather(
+            self.llm.health_check(),
+            self.tts.health_check()
+        )
         
         # STT no tiene health check async simple, asumimos OK
         stt_healthy = True
@@ -270,10 +787,47 @@ class VoiceAssistantService:
         
         return health
     
-    def cleanup(self) -> None:
+    def get_metrics(self) -> dict:
+        """
+        Métricas operativas de los clientes.
+        
+        Returns:
+            Dict con routing del LLM, estado del transporte HTTP, formatos
+            de audio y bytes por segundo de voz del TTS, system
+            prompts compartidos, turnos por sesión (esperas por lock,
+            rechazos, coalescidos), reintentos con Idempotency-Key, cuotas
+            de turnos, colas por etapa y sesión y
+            persistencia de conversaciones (si el store la mide)
+        """
+        metrics = {}
+        if isinstance(self.llm, LLMPoolClient):
+            metrics["llm"] = self.llm.get_metrics()
+        
+        if isinstance(self.tts, Pyttsx3TTSClient):
+            metrics["tts"] = self.tts.get_metrics()
+        
+        metrics["prompts"] = self.conversations.prompts.stats()
+        metrics["turns"] = {
+            **self.conversations.get_turn_metrics(),
+            "coalesced": self._coalesced
+        }
+        metrics["idempotency"] = self.idempotency.get_metrics()
+        metrics["rate_limit"] = self.rate_limiter.get_metrics()
+        metrics["stages"] = {name: stage.get_metrics() for name, stage in self.stages.items()}
+        
+        store_metrics = self.conversations.store.get_metrics()
+        if store_metrics:
+            metrics["conversations"] = store_metrics
+        return metrics
+    
+    async def cleanup(self) -> None:
         """Limpiar recursos de todos los clientes."""
         logger.info("🧹 Cleaning up VoiceAssistantService")
+        if self._warmup_task is not None and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        await self.health_monitor.stop()
         self.stt.cleanup()
-        self.llm.cleanup()
+        await self.llm.cleanup()
         self.tts.cleanup()
+        self.conversations.close()
 
@@ -6,7 +6,7 @@ Usa pydantic-settings para validación automática y gestión segura de environm
 
 from pydantic_settings import BaseSettings
 from pydantic import Field, field_validator
-from typing import Literal
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -17,6 +17,67 @@ class Settings(BaseSettings):
         default="http://127.0.0.1:1234/v1",
         description="URL del servidor LM Studio local"
     )
+    lm_studio_urls: list[str] = Field(
+        default=[],
+        description="Varios endpoints OpenAI-compatibles para balancear (vacío = solo lm_studio_url)"
+    )
+    llm_sticky_sessions: bool = Field(
+        default=True,
+        description="Mantener cada sesión en el mismo backend para reutilizar su KV cache"
+    )
+    llm_hedging_enabled: bool = Field(
+        default=True,
+        description="Duplicar en otro backend las peticiones que superan el p95 reciente"
+    )
+    llm_hedge_min_delay: float = Field(
+        default=0.5,
+        ge=0.0,
+        description="Espera mínima (s) antes de duplicar una petición lenta"
+    )
+    llm_request_timeout: float = Field(
+        default=30.0,
+        gt=0.0,
+        description="Timeout (s) por petición al LLM; cuenta como fallo del backend"
+    )
+    llm_breaker_failure_threshold: int = Field(
+        default=3,
+        ge=1,
+        description="Fallos consecutivos que abren el circuit breaker de un backend"
+    )
+    llm_breaker_reset_timeout: float = Field(
+        default=10.0,
+        gt=0.0,
+        description="Segundos con el circuito abierto antes del probe half-open"
+    )
+    llm_http_max_connections: int = Field(
+        default=100,
+        ge=1,
+        description="Conexiones HTTP simultáneas máximas hacia los backends LLM"
+    )
+    llm_http_max_keepalive: int = Field(
+        default=50,
+        ge=0,
+        description="Conexiones keep-alive inactivas conservadas en el pool"
+    )
+    llm_http_keepalive_expiry: float = Field(
+        default=30.0,
+        ge=0.0,
+        description="Segundos antes de cerrar una conexión keep-alive inactiva"
+    )
+    llm_http_connect_timeout: float = Field(
+        default=2.0,
+        gt=0.0,
+        description="Timeout (s) para conectar con un backend LLM"
+    )
+    llm_http_read_timeout: float = Field(
+        default=60.0,
+        gt=0.0,
+        description="Timeout (s) de lectura HTTP (sustituye los 10 min del SDK)"
+    )
+    llm_http2: bool = Field(
+        default=False,
+        description="Usar HTTP/2 hacia los backends (requiere el paquete h2)"
+    )
     lm_studio_model: str = Field(
         default="qwen/qwen3-8b",
         description="Nombre del modelo en LM Studio"
@@ -33,6 +94,16 @@ class Settings(BaseSettings):
         le=2.0,
         description="Temperatura del LLM (0=determinista, 1+=creativo)"
     )
+    llm_prefill_enabled: bool = Field(
+        default=True,
+        description="Pre-calentar el KV cache de LM Studio mientras corre STT"
+    )
+    llm_prefill_max_wait: float = Field(
+        default=2.0,
+        ge=0.0,
+        le=30.0,
+        description="Segundos máximos que el turno espera al prefill antes de generar"
+    )
     
     # === Whisper STT Configuration ===
     whisper_model: Literal["tiny", "base", "small", "medium", "large"] = Field(
@@ -78,11 +149,98 @@ class Settings(BaseSettings):
         le=65535,
         description="Puerto para FastAPI"
     )
+    api_workers: int = Field(
+        default=1,
+        ge=1,
+        le=64,
+        description="Workers del modo prefork (run_arca.py --workers / python -m src.api.prefork)"
+    )
     cors_origins: list[str] = Field(
         default=["http://localhost:8000"],
         description="Orígenes permitidos para CORS"
     )
     
+    # === Conversation Store ===
+    conversation_store: Literal["memory", "sqlite", "redis"] = Field(
+        default="memory",
+        description="Dónde viven las conversaciones (sqlite = sobreviven a reinicios, redis = compartidas entre workers/nodos)"
+    )
+    sqlite_path: str = Field(
+        default="./data/conversations.db",
+        description="Fichero SQLite (WAL) para conversation_store=sqlite"
+    )
+    sqlite_commit_delay: float = Field(
+        default=0.01,
+        ge=0.0,
+        le=1.0,
+        description="Segundos que el escritor agrupa cambios antes de cada commit"
+    )
+    session_max_count: Optional[int] = Field(
+        default=10000,
+        ge=1,
+        description="Máximo de sesiones en memoria (LRU, None = sin límite)"
+    )
+    session_max_bytes: Optional[int] = Field(
+        default=256 * 1024 * 1024,
+        ge=1,
+        description="Máximo de bytes aproximados de conversaciones en memoria"
+    )
+    session_idle_ttl: Optional[float] = Field(
+        default=3600.0,
+        gt=0.0,
+        description="Segundos sin acceso antes de sacar una sesión de memoria"
+    )
+    session_janitor_interval: float = Field(
+        default=30.0,
+        gt=0.0,
+        description="Segundos entre pasadas del janitor de sesiones inactivas"
+    )
+    session_spill: bool = Field(
+        default=False,
+        description="Con conversation_store=memory, volcar a SQLite las sesiones expulsadas en vez de perderlas"
+    )
+    session_hibernate: Literal["off", "memory", "disk"] = Field(
+        default="off",
+        description="Con conversation_store=memory, comprimir (msgpack+zlib) las sesiones inactivas en memoria o en disco local"
+    )
+    session_hibernate_after: float = Field(
+        default=600.0,
+        gt=0.0,
+        description="Segundos sin acceso antes de hibernar una sesión (sustituye a session_idle_ttl)"
+    )
+    session_hibernate_dir: str = Field(
+        default="./data/hibernated",
+        description="Directorio de las sesiones hibernadas con session_hibernate=disk"
+    )
+    session_hibernate_max_age: Optional[float] = Field(
+        default=86400.0,
+        gt=0.0,
+        description="Segundos que se conserva una sesión hibernada antes de borrarla (None = siempre)"
+    )
+    session_hibernate_max_bytes: Optional[int] = Field(
+        default=512 * 1024 * 1024,
+        ge=1,
+        description="Bytes comprimidos máximos de sesiones hibernadas: por encima se borran las más antiguas"
+    )
+    session_hibernate_level: int = Field(
+        default=6,
+        ge=1,
+        le=9,
+        description="Nivel de compresión zlib de las sesiones hibernadas"
+    )
+    session_turn_policy: Literal["queue", "coalesce", "reject"] = Field(
+        default="queue",
+        description="Turno concurrente en la misma sesión: esperar (queue), unir peticiones idénticas (coalesce) o 409 (reject)"
+    )
+    conversation_template_path: str = Field(
+        default="",
+        description="JSON con system_prompt y examples [{role, content}] compartidos por todas las sesiones nuevas (vacío = sin plantilla)"
+    )
+    redis_url: str = Field(
+        default="redis://localhost:6379/0",
+        description="URL del servidor con protocolo Redis para conversation_store=redis"
+    )
+    
     # === Audio Configuration ===
     audio_sample_rate: int = Field(
         default=16000,
@@ -97,6 +255,81 @@ class Settings(BaseSettings):
         description="Formato de audio"
     )
     
+    voice_stream_max_bytes: int = Field(
+        default=10 * 1024 * 1024,
+        gt=0,
+        description="Tamaño máximo (bytes) de una subida de audio en /api/voice/stream"
+    )
+    voice_stream_max_seconds: float = Field(
+        default=60.0,
+        gt=0.0,
+        description="Duración máxima (s) del audio subido a /api/voice/stream"
+    )
+    idempotency_ttl: float = Field(
+        default=300.0,
+        gt=0.0,
+        description="Segundos que se sirve el resultado de un turno a los reintentos con la misma Idempotency-Key"
+    )
+    idempotency_max_keys: int = Field(
+        default=10000,
+        gt=0,
+        description="Máximo de Idempotency-Keys recordadas (se descartan las más antiguas)"
+    )
+    idempotency_max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        gt=0,
+        description="Máximo de bytes (textos y audio) de resultados recordados; uno mayor no se guarda"
+    )
+    
+    # === Rate Limiting / Fair Queuing ===
+    rate_limit_session_rate: float = Field(
+        default=1.0,
+        ge=0.0,
+        description="Turnos por segundo sostenidos por sesión (0 = sin límite)"
+    )
+    rate_limit_session_burst: int = Field(
+        default=5,
+        ge=1,
+        description="Ráfaga de turnos seguidos permitida por sesión"
+    )
+    rate_limit_client_rate: float = Field(
+        default=3.0,
+        ge=0.0,
+        description="Turnos por segundo sostenidos por IP de cliente (0 = sin límite)"
+    )
+    rate_limit_client_burst: int = Field(
+        default=15,
+        ge=1,
+        description="Ráfaga de turnos seguidos permitida por IP de cliente"
+    )
+    stt_slots: int = Field(
+        default=2,
+        ge=1,
+        description="Transcripciones simultáneas; el resto espera en cola round-robin por sesión"
+    )
+    llm_slots: int = Field(
+        default=4,
+        ge=1,
+        description="Peticiones simultáneas al LLM; el resto espera en cola round-robin por sesión"
+    )
+    tts_slots: int = Field(
+        default=2,
+        ge=1,
+        description="Síntesis simultáneas; el resto espera en cola round-robin por sesión"
+    )
+    
+    # === Health Monitoring ===
+    health_probe_interval: float = Field(
+        default=15.0,
+        gt=0.0,
+        description="Segundos entre sondeos de salud baratos en background"
+    )
+    health_probe_timeout: float = Field(
+        default=2.0,
+        gt=0.0,
+        description="Timeout (s) de cada sonda de salud"
+    )
+    
     # === Logging ===
     log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = Field(
         default="INFO",
@@ -117,6 +350,12 @@ class Settings(BaseSettings):
             raise ValueError("URL debe comenzar con http:// o https://")
         return v.rstrip("/")
     
+    @field_validator("lm_studio_urls")
+    @classmethod
+    def validate_urls(cls, v: list[str]) -> list[str]:
+        """Validar cada URL del pool de backends."""
+        return [cls.validate_url(url) for url in v]
+    
     def get_whisper_config(self) -> dict:
         """Obtener configuración para Whisper."""
         return {
@@ -134,6 +373,62 @@ class Settings(BaseSettings):
             "temperature": self.llm_temperature
         }
     
+    def get_llm_pool_config(self) -> dict:
+        """Obtener configuración para el pool de backends LLM."""
+        return {
+            "base_urls": self.lm_studio_urls or [self.lm_studio_url],
+            "model": self.lm_studio_model,
+            "max_tokens": self.llm_max_tokens,
+            "temperature": self.llm_temperature,
+            "sticky_sessions": self.llm_sticky_sessions,
+            "hedging": self.llm_hedging_enabled,
+            "hedge_min_delay": self.llm_hedge_min_delay,
+            "request_timeout": self.llm_request_timeout,
+            "failure_threshold": self.llm_breaker_failure_threshold,
+            "reset_timeout": self.llm_breaker_reset_timeout,
+            "http_options": self.get_llm_http_config()
+        }
+    
+    def get_llm_http_config(self) -> dict:
+        """Obtener configuración del cliente HTTP compartido por los backends."""
+        return {
+            "max_connections": self.llm_http_max_connections,
+            "max_keepalive_connections": self.llm_http_max_keepalive,
+            "keepalive_expiry": self.llm_http_keepalive_expiry,
+            "connect_timeout": self.llm_http_connect_timeout,
+            "read_timeout": self.llm_http_read_timeout,
+            "http2": self.llm_http2
+        }
+    
+    def get_session_cache_config(self) -> dict:
+        """Obtener límites de la caché de sesiones en memoria."""
+        return {
+            "max_sessions": self.session_max_count,
+            "max_bytes": self.session_max_bytes,
+            "idle_ttl": self.session_idle_ttl
+        }
+    
+    def get_voice_service_config(self) -> dict:
+        """Obtener configuración para VoiceAssistantService."""
+        return {
+            "enable_prefill": self.llm_prefill_enabled,
+            "prefill_max_wait": self.llm_prefill_max_wait,
+            "health_interval": self.health_probe_interval,
+            "health_probe_timeout": self.health_probe_timeout,
+            "stream_max_bytes": self.voice_stream_max_bytes,
+            "stream_max_seconds": self.voice_stream_max_seconds,
+            "idempotency_ttl": self.idempotency_ttl,
+            "idempotency_max_keys": self.idempotency_max_keys,
+            "idempotency_max_bytes": self.idempotency_max_bytes,
+            "rate_limit_session_rate": self.rate_limit_session_rate,
+            "rate_limit_session_burst": self.rate_limit_session_burst,
+            "rate_limit_client_rate": self.rate_limit_client_rate,
+            "rate_limit_client_burst": self.rate_limit_client_burst,
+            "stt_slots": self.stt_slots,
+            "llm_slots": self.llm_slots,
+            "tts_slots": self.tts_slots
+        }
+    
     def get_tts_config(self) -> dict:
         """Obtener configuración para pyttsx3 TTS."""
         return {
@@ -149,7 +444,13 @@ class Settings(BaseSettings):
         print("=" * 60)
         print(f"🔊 STT: Whisper {self.whisper_model} ({self.whisper_device})")
         print(f"🧠 LLM: {self.lm_studio_model}")
+        if self.lm_studio_urls:
+            print(f"⚖️  LLM pool: {len(self.lm_studio_urls)} backends")
         print(f"🔈 TTS: pyttsx3 (rate={self.tts_rate}, volume={self.tts_volume})")
+        if self.conversation_store == "redis":
+            print(f"🗄️  Conversations: {self.redis_url}")
+        elif self.conversation_store == "sqlite":
+            print(f"🗄️  Conversations: {self.sqlite_path}")
         print(f"🌐 API: http://{self.api_host}:{self.api_port}")
         print(f"📊 Log Level: {self.log_level}")
         print("=" * 60)
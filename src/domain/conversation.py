@@ -6,11 +6,64 @@ Siguiendo principios DDD:
 - Encapsula lógica de negocio
 - Mantiene invariantes del dominio
 - Único punto de acceso a los mensajes
+
+El system prompt se guarda aparte de los turnos (user/assistant), que
+viven en un deque acotado por max_messages: recortar el historial al
+añadir un mensaje es O(1). El prompt es una referencia a un SystemPrompt
+internado, compartido por todas las conversaciones con el mismo texto.
+Entre ambos puede ir un preámbulo compartido (SharedPrefix, de una
+plantilla o de un fork) que tampoco se recorta ni se copia.
+
+Los payloads para el LLM (y para display, desde la primera vez que se
+piden) se mantienen en paralelo a los turnos: cada mensaje se convierte a
+dict de solo lectura (FrozenPayload) una sola vez. Las lecturas devuelven
+tuplas inmutables cacheadas que se regeneran solo cuando el historial
+cambia (copy-on-write); como los dicts no admiten cambios, compartirlos
+entre lectores y sesiones es seguro.
+
+Cada cambio del historial incrementa un contador de versión (arranca en un
+valor aleatorio: no se repite tras un reinicio ni entre workers) y cada
+mensaje tiene un índice absoluto que no se desplaza al recortar turnos
+antiguos, de modo que los clientes pueden pedir solo lo nuevo. Los stores
+persisten versión y época (la versión desde la que el historial solo ha
+crecido): una conversación rehidratada conserva sus ETags.
 """
 
-from typing import Optional
+from collections import deque
+from itertools import chain, islice
+from random import getrandbits
+from typing import Iterable, Iterator, Mapping, Optional
 from uuid import UUID, uuid4
-from .message import Message
+from .message import FrozenPayload, Message, ROLE_ASSISTANT, ROLE_SYSTEM, ROLE_USER
+from .conversation_template import EMPTY_PREFIX, ConversationTemplate, SharedPrefix
+from .system_prompt import SYSTEM_PROMPTS, SystemPrompt, SystemPromptRegistry
+
+
+# Turnos propios mínimos con max_messages (una pregunta y su respuesta):
+# un prefijo que no los deja no cabe en el límite
+MIN_TURN_WINDOW = 2
+
+
+def check_template_fits(template: ConversationTemplate, max_messages: Optional[int]) -> None:
+    """
+    Comprobar que una plantilla deja sitio para turnos propios.
+    
+    Args:
+        template: Plantilla (system prompt + ejemplos)
+        max_messages: Límite de mensajes por conversación (None=ilimitado)
+    
+    Raises:
+        ValueError: Si system prompt + ejemplos dejan menos de MIN_TURN_WINDOW mensajes
+    """
+    if not max_messages:
+        return
+    
+    fixed = (template.prompt is not None) + len(template.prefix)
+    if max_messages - fixed < MIN_TURN_WINDOW:
+        raise ValueError(
+            f"Template '{template.name}' has {fixed} fixed messages; "
+            f"max_messages={max_messages} must be at least {fixed + MIN_TURN_WINDOW}"
+        )
 
 
 class Conversation:
@@ -24,11 +77,18 @@ class Conversation:
     - Gestionar límites de memoria (opcional)
     """
     
+    # Sin __dict__: miles de sesiones inactivas ocupan lo mínimo
+    __slots__ = (
+        "_session_id", "_max_messages", "_is_active", "_prompt", "_prefix", "_preamble", "_turns",
+        "_llm_turns", "_display_turns", "_llm_snapshot", "_display_snapshot", "_version", "_epoch", "_offset"
+    )
+    
     def __init__(
         self, 
         session_id: Optional[UUID] = None,
         max_messages: Optional[int] = None,
-        system_prompt: str = "Eres A.R.C.A, un asistente conversacional inteligente y amigable."
+        system_prompt: str = "Eres A.R.C.A, un asistente conversacional inteligente y amigable.",
+        prompts: Optional[SystemPromptRegistry] = None
     ):
         """
         Inicializar conversación.
@@ -37,18 +97,159 @@ class Conversation:
             session_id: Identificador único de sesión (auto-generado si None)
             max_messages: Límite de mensajes en memoria (None=ilimitado)
             system_prompt: Prompt del sistema
+            prompts: Registro donde internar el prompt (None = el del proceso)
         """
+        if prompts is None:
+            prompts = SYSTEM_PROMPTS
+        
         # Identidad inmutable
         self._session_id = session_id or uuid4()
         
-        # Estado interno encapsulado
-        self._messages: list[Message] = []
+        # Estado interno encapsulado: system prompt compartido + turnos acotados
         self._max_messages = max_messages
         self._is_active = True
+        self._version = getrandbits(48)
+        # Preámbulo de la plantilla: sobrevive a clear_history(keep_system=True)
+        self._preamble = EMPTY_PREFIX
+        self._set_history(prompts.intern(system_prompt) if system_prompt else None, ())
+    
+    @classmethod
+    def restore(
+        cls,
+        session_id: UUID,
+        messages: list[Message],
+        max_messages: Optional[int] = None,
+        is_active: bool = True,
+        prompts: Optional[SystemPromptRegistry] = None,
+        version: Optional[int] = None,
+        epoch: Optional[int] = None
+    ) -> "Conversation":
+        """
+        Reconstruir una conversación persistida (sin añadir system prompt).
+        
+        El mensaje del sistema persistido se sustituye por el prompt
+        internado con el mismo texto.
+        
+        Args:
+            session_id: Identificador de la sesión
+            messages: Mensajes en orden, incluido el del sistema
+            max_messages: Límite de mensajes en memoria (None=ilimitado)
+            is_active: Estado de la conversación
+            prompts: Registro donde internar el prompt (None = el del proceso)
+            version: Versión persistida (None = nueva versión aleatoria)
+            epoch: Época persistida (None = la propia versión)
+        """
+        if prompts is None:
+            prompts = SYSTEM_PROMPTS
+        
+        conversation = cls(session_id=session_id, max_messages=max_messages, system_prompt="")
+        
+        prompt = None
+        if messages and messages[0].role_code == ROLE_SYSTEM:
+            prompt = prompts.intern(messages[0].content)
+            messages = messages[1:]
+        
+        conversation._set_history(prompt, messages)
+        conversation._is_active = is_active
+        
+        if version is not None:
+            conversation._version = version
+            conversation._epoch = version if epoch is None else min(epoch, version)
+        return conversation
+    
+    @classmethod
+    def from_template(
+        cls,
+        template: ConversationTemplate,
+        session_id: Optional[UUID] = None,
+        max_messages: Optional[int] = None
+    ) -> "Conversation":
+        """
+        Crear conversación que empieza con el preámbulo de una plantilla.
+        
+        El system prompt y los turnos de ejemplo se referencian, no se copian.
+        
+        Args:
+            template: Plantilla (system prompt + ejemplos)
+            session_id: Identificador de sesión (auto-generado si None)
+            max_messages: Límite de mensajes en memoria (None=ilimitado)
+        
+        Raises:
+            ValueError: Si la plantilla no deja sitio para turnos propios
+        """
+        check_template_fits(template, max_messages)
+        
+        conversation = cls(session_id=session_id, max_messages=max_messages, system_prompt="")
+        conversation._preamble = template.prefix
+        conversation._set_history(template.prompt, (), template.prefix)
+        return conversation
+    
+    def fork(self, session_id: Optional[UUID] = None) -> "Conversation":
+        """
+        Crear una conversación nueva que continúa desde el historial actual.
+        
+        El historial actual pasa a ser el prefijo compartido de la nueva
+        conversación: mismos mensajes y mismos dicts de payload. Con
+        max_messages, del historial heredado se conservan el preámbulo de la
+        plantilla y los mensajes más recientes que dejan sitio a
+        MIN_TURN_WINDOW turnos propios (message_count nunca supera el límite).
+        
+        Args:
+            session_id: Identificador de la nueva sesión (auto-generado si None)
+        
+        Returns:
+            Conversación nueva, independiente de esta a partir de aquí
+        """
+        prefix = self._prefix.extend(self._turns, self._llm_turns) if self._turns else self._prefix
+        if self._max_messages:
+            room = self._max_messages - (self._prompt is not None) - MIN_TURN_WINDOW
+            prefix = prefix.trimmed(max(room, len(self._preamble)), keep=len(self._preamble))
+        
+        child = Conversation(session_id=session_id, max_messages=self._max_messages, system_prompt="")
+        child._preamble = self._preamble
+        child._set_history(self._prompt, (), prefix)
+        return child
+    
+    def _set_history(
+        self,
+        prompt: Optional[SystemPrompt],
+        turns: Iterable[Message],
+        prefix: SharedPrefix = EMPTY_PREFIX
+    ) -> None:
+        """Reemplazar system prompt, prefijo y turnos, reconstruyendo el payload del LLM."""
+        self._prompt = prompt
+        self._prefix = prefix
+        self._turns: deque[Message] = deque(turns, maxlen=self._turns_limit())
+        # Turnos recortados por el límite: índice absoluto del primer turno retenido
+        self._offset = 0
         
-        # Agregar mensaje del sistema si se proporciona
-        if system_prompt:
-            self._messages.append(Message.create_system_message(system_prompt))
+        # Payloads paralelos a _turns (mismo maxlen: se recortan a la vez)
+        self._llm_turns: deque[Mapping[str, str]] = deque(
+            (FrozenPayload(message.to_dict()) for message in self._turns),
+            maxlen=self._turns.maxlen
+        )
+        # Display: se materializa al pedirlo por primera vez
+        self._display_turns: Optional[deque[Mapping[str, str]]] = None
+        self._invalidate_snapshots()
+        self._epoch = self._version
+    
+    def _invalidate_snapshots(self) -> None:
+        self._version += 1
+        self._llm_snapshot: Optional[tuple[Mapping[str, str], ...]] = None
+        self._display_snapshot: Optional[tuple[Mapping[str, str], ...]] = None
+    
+    def _turns_limit(self) -> Optional[int]:
+        """Capacidad del deque de turnos: max_messages menos system prompt y prefijo."""
+        if not self._max_messages:
+            return None
+        return max(0, self._max_messages - (self._prompt is not None) - len(self._prefix))
+    
+    def _iter_messages(self) -> Iterator[Message]:
+        """Recorrer system prompt (si hay), prefijo compartido y turnos en orden."""
+        if self._prompt is not None:
+            yield self._prompt.message
+        yield from self._prefix.messages
+        yield from self._turns
     
     @property
     def session_id(self) -> UUID:
@@ -58,13 +259,57 @@ class Conversation:
     @property
     def message_count(self) -> int:
         """Número total de mensajes en la conversación."""
-        return len(self._messages)
+        return len(self._turns) + len(self._prefix) + (self._prompt is not None)
     
     @property
     def is_active(self) -> bool:
         """Estado de la conversación."""
         return self._is_active
     
+    @property
+    def max_messages(self) -> Optional[int]:
+        """Límite de mensajes en memoria (None=ilimitado)."""
+        return self._max_messages
+    
+    @property
+    def system_prompt(self) -> Optional[SystemPrompt]:
+        """System prompt compartido (None si la conversación no tiene)."""
+        return self._prompt
+    
+    @property
+    def system_prompt_id(self) -> Optional[str]:
+        """ID del system prompt en el registro (None si no tiene)."""
+        return self._prompt.prompt_id if self._prompt is not None else None
+    
+    @property
+    def shared_prefix(self) -> SharedPrefix:
+        """Preámbulo compartido (vacío si no viene de plantilla ni de fork)."""
+        return self._prefix
+    
+    @property
+    def version(self) -> int:
+        """Versión del historial: cambia con cada mensaje añadido, descartado o limpiado."""
+        return self._version
+    
+    @property
+    def epoch(self) -> int:
+        """Versión desde la que el historial solo ha crecido (último clear o descarte)."""
+        return self._epoch
+    
+    def is_append_only_since(self, version: int) -> bool:
+        """
+        Comprobar si desde una versión anterior solo se han añadido mensajes.
+        
+        False si desde entonces se limpió el historial o se descartó algún
+        mensaje, o si la versión no es de esta conversación (otro proceso).
+        """
+        return self._epoch <= version <= self._version
+    
+    @property
+    def messages(self) -> tuple[Message, ...]:
+        """Mensajes en orden (copia inmutable)."""
+        return tuple(self._iter_messages())
+    
     def add_user_message(self, content: str) -> None:
         """
         Agregar mensaje del usuario a la conversación.
@@ -94,56 +339,140 @@ class Conversation:
         message = Message.create_assistant_message(content)
         self._add_message(message)
     
+    def discard_unanswered_user_message(self) -> bool:
+        """
+        Eliminar el último mensaje del usuario si aún no tiene respuesta.
+        
+        Se usa cuando un turno se cancela (barge-in o cliente desconectado)
+        para no dejar en el historial una pregunta sin contestar.
+        
+        Returns:
+            True si se eliminó un mensaje, False si el historial ya era coherente
+        """
+        if self._turns and self._turns[-1].role_code == ROLE_USER:
+            self._turns.pop()
+            self._llm_turns.pop()
+            if self._display_turns is not None:
+                self._display_turns.pop()
+            self._invalidate_snapshots()
+            self._epoch = self._version
+            return True
+        return False
+    
     def _add_message(self, message: Message) -> None:
         """
         Método privado para agregar mensaje y enforcer límite de memoria.
         
-        Si max_messages está configurado, elimina mensajes antiguos (excepto system).
+        Si max_messages está configurado, el deque descarta el turno más
+        antiguo en O(1); el system prompt nunca se descarta.
         """
-        self._messages.append(message)
-        
-        # Enforcer límite de memoria (mantener siempre el system message)
-        if self._max_messages and len(self._messages) > self._max_messages:
-            # Obtener mensajes del sistema
-            system_messages = [m for m in self._messages if m.role == "system"]
-            # Obtener mensajes user/assistant más recientes
-            other_messages = [m for m in self._messages if m.role != "system"]
-            
-            # Mantener solo los últimos N-1 (dejar espacio para system)
-            keep_count = self._max_messages - len(system_messages)
-            recent_messages = other_messages[-keep_count:] if keep_count > 0 else []
-            
-            # Reconstruir lista
-            self._messages = system_messages + recent_messages
+        if len(self._turns) == self._turns.maxlen:
+            self._offset += 1
+        self._turns.append(message)
+        self._llm_turns.append(FrozenPayload(message.to_dict()))
+        if self._display_turns is not None:
+            self._display_turns.append(FrozenPayload(message.to_display_dict()))
+        self._invalidate_snapshots()
     
-    def get_messages_for_llm(self) -> list[dict[str, str]]:
+    def get_messages_for_llm(self) -> tuple[Mapping[str, str], ...]:
         """
         Obtener mensajes en formato compatible con LLM (OpenAI format).
         
+        La tupla es una instantánea: no cambia aunque se añadan mensajes
+        después, así que puede compartirse entre lectores sin copiarla.
+        Los dicts son compartidos y de solo lectura (FrozenPayload): para
+        modificarlos hay que copiarlos con dict().
+        
         Returns:
-            Lista de dicts con formato {"role": "...", "content": "..."}
+            Tupla de dicts con formato {"role": "...", "content": "..."}
         """
-        return [message.to_dict() for message in self._messages]
+        if self._llm_snapshot is None:
+            head = (self._prompt.llm_payload,) if self._prompt is not None else ()
+            self._llm_snapshot = head + self._prefix.llm_payload + tuple(self._llm_turns)
+        return self._llm_snapshot
     
-    def get_messages_for_display(self) -> list[dict[str, str]]:
+    def get_messages_for_display(self) -> tuple[Mapping[str, str], ...]:
         """
         Obtener mensajes para display en frontend.
         
-        Incluye timestamps y metadata adicional.
+        Incluye timestamps y metadata adicional. Misma semántica de
+        instantánea compartida que get_messages_for_llm().
+        """
+        if self._display_snapshot is None:
+            self._display_snapshot = self._display_head() + tuple(self._display_deque())
+        return self._display_snapshot
+    
+    def get_display_page(
+        self,
+        since: int = 0,
+        limit: Optional[int] = None
+    ) -> tuple[int, int, tuple[Mapping[str, str], ...]]:
         """
-        return [message.to_display_dict() for message in self._messages]
+        Obtener los mensajes de display a partir de un índice absoluto.
+        
+        El índice de un mensaje no cambia al recortarse turnos antiguos: un
+        cliente que ya tiene los mensajes [0, since) pide solo los nuevos.
+        Los índices recortados se saltan. El coste es proporcional a la
+        página, no al historial.
+        
+        Args:
+            since: Índice absoluto del primer mensaje a devolver
+            limit: Máximo de mensajes (None = hasta el final)
+        
+        Returns:
+            (cursor siguiente, índice tras el último mensaje de la conversación, mensajes)
+        """
+        head = self._display_head()
+        first_turn = len(head) + self._offset
+        end = first_turn + len(self._turns)
+        
+        page = head[since:] if limit is None else head[since:since + limit]
+        if limit is not None and len(page) == limit:
+            return since + limit, end, page
+        
+        # Lo recortado ya no existe: se sigue por el primer turno retenido
+        skip = max(since, first_turn) - first_turn
+        count = len(self._turns) - skip
+        if limit is not None:
+            count = min(count, limit - len(page))
+        if count <= 0:
+            return max(since, min(end, first_turn + skip)), end, page
+        
+        turns = self._display_deque()
+        if skip > len(turns) // 2:
+            # Página cerca del final (caso típico del polling): recorrer desde la cola
+            tail = list(islice(reversed(turns), len(turns) - skip))
+            page += tuple(reversed(tail[len(tail) - count:]))
+        else:
+            page += tuple(islice(turns, skip, skip + count))
+        
+        return first_turn + skip + count, end, page
+    
+    def _display_head(self) -> tuple[Mapping[str, str], ...]:
+        """Payloads de display del system prompt y del prefijo compartido."""
+        head = (self._prompt.display_payload,) if self._prompt is not None else ()
+        return head + self._prefix.display_payload
+    
+    def _display_deque(self) -> deque[Mapping[str, str]]:
+        """Payloads de display de los turnos (se materializan la primera vez)."""
+        if self._display_turns is None:
+            self._display_turns = deque(
+                (FrozenPayload(message.to_display_dict()) for message in self._turns),
+                maxlen=self._turns.maxlen
+            )
+        return self._display_turns
     
     def get_last_user_message(self) -> Optional[Message]:
         """Obtener el último mensaje del usuario."""
-        for message in reversed(self._messages):
-            if message.role == "user":
+        for message in chain(reversed(self._turns), reversed(self._prefix.messages)):
+            if message.role_code == ROLE_USER:
                 return message
         return None
     
     def get_last_assistant_message(self) -> Optional[Message]:
         """Obtener el último mensaje del asistente."""
-        for message in reversed(self._messages):
-            if message.role == "assistant":
+        for message in chain(reversed(self._turns), reversed(self._prefix.messages)):
+            if message.role_code == ROLE_ASSISTANT:
                 return message
         return None
     
@@ -152,13 +481,14 @@ class Conversation:
         Limpiar historial de conversación.
         
         Args:
-            keep_system: Si True, mantiene el mensaje del sistema
+            keep_system: Si True, mantiene el mensaje del sistema (y el
+                         preámbulo de la plantilla, si la hay)
         """
         if keep_system:
-            system_messages = [m for m in self._messages if m.role == "system"]
-            self._messages = system_messages
+            self._set_history(self._prompt, (), self._preamble)
         else:
-            self._messages = []
+            self._preamble = EMPTY_PREFIX
+            self._set_history(None, ())
     
     def deactivate(self) -> None:
         """Desactivar conversación (no se pueden agregar más mensajes)."""
@@ -182,7 +512,7 @@ class Conversation:
         """Representación para debugging."""
         return (
             f"Conversation(session_id={self._session_id}, "
-            f"messages={len(self._messages)}, "
+            f"messages={self.message_count}, "
             f"active={self._is_active})"
         )
 
@@ -0,0 +1,138 @@
+"""
+ConversationTemplate - Preámbulos compartidos entre conversaciones.
+
+Un despliegue (persona) puede empezar cada sesión con el mismo preámbulo
+few-shot: varios turnos de ejemplo tras el system prompt. En lugar de
+copiarlo en cada conversación, el preámbulo es un SharedPrefix inmutable
+que todas las sesiones de la plantilla referencian. Sus payloads (LLM y
+display) son los mismos objetos para todas: el prefijo del prompt es
+idéntico byte a byte y el servidor LLM puede reutilizar su prompt cache.
+
+Hacer fork de una conversación congela su historial en un SharedPrefix
+nuevo que reutiliza los mismos mensajes y dicts (solo se copian punteros).
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, Mapping, Optional
+
+from .message import FrozenPayload, Message, ROLE_SYSTEM
+from .system_prompt import SYSTEM_PROMPTS, SystemPrompt, SystemPromptRegistry
+
+
+class SharedPrefix:
+    """
+    Secuencia inmutable de mensajes compartida por varias conversaciones.
+    
+    Guarda los mensajes y su payload LLM; el de display se construye la
+    primera vez que se pide.
+    """
+    
+    __slots__ = ("messages", "llm_payload", "_display_payload")
+    
+    def __init__(
+        self,
+        messages: tuple[Message, ...],
+        llm_payload: Optional[tuple[Mapping[str, str], ...]] = None
+    ):
+        """
+        Crear prefijo.
+        
+        Args:
+            messages: Mensajes user/assistant en orden
+            llm_payload: Payload LLM ya construido y congelado (None = generarlo)
+        
+        Raises:
+            ValueError: Si contiene mensajes del sistema
+        """
+        if any(message.role_code == ROLE_SYSTEM for message in messages):
+            raise ValueError("Shared prefix cannot contain system messages")
+        
+        self.messages = messages
+        self.llm_payload = llm_payload if llm_payload is not None else tuple(FrozenPayload(m.to_dict()) for m in messages)
+        self._display_payload: Optional[tuple[Mapping[str, str], ...]] = None
+    
+    def __len__(self) -> int:
+        return len(self.messages)
+    
+    @property
+    def display_payload(self) -> tuple[Mapping[str, str], ...]:
+        """Payload de display (construido bajo demanda y compartido)."""
+        if self._display_payload is None:
+            self._display_payload = tuple(FrozenPayload(m.to_display_dict()) for m in self.messages)
+        return self._display_payload
+    
+    def extend(
+        self,
+        messages: Iterable[Message],
+        llm_payload: Iterable[Mapping[str, str]]
+    ) -> "SharedPrefix":
+        """
+        Nuevo prefijo = este + mensajes (reutilizando sus dicts LLM).
+        
+        Args:
+            messages: Mensajes a añadir al final
+            llm_payload: Sus dicts LLM ya construidos, en el mismo orden
+        """
+        return SharedPrefix(self.messages + tuple(messages), self.llm_payload + tuple(llm_payload))
+    
+    
+    def trimmed(self, size: int, keep: int = 0) -> "SharedPrefix":
+        """
+        Prefijo de como mucho size mensajes: los keep primeros y los más recientes.
+        
+        Args:
+            size: Mensajes máximos del nuevo prefijo (>= keep)
+            keep: Mensajes iniciales que no se recortan (preámbulo de la plantilla)
+        """
+        drop = len(self.messages) - size
+        if drop <= 0:
+            return self
+        return SharedPrefix(
+            self.messages[:keep] + self.messages[keep + drop:],
+            self.llm_payload[:keep] + self.llm_payload[keep + drop:]
+        )
+
+# Prefijo vacío (conversaciones sin plantilla)
+EMPTY_PREFIX = SharedPrefix(())
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class ConversationTemplate:
+    """
+    Value Object: system prompt + preámbulo few-shot de una persona.
+    """
+    
+    name: str
+    prompt: Optional[SystemPrompt]
+    prefix: SharedPrefix
+    
+    @classmethod
+    def create(
+        cls,
+        name: str,
+        system_prompt: Optional[str],
+        examples: Iterable[tuple[str, str]],
+        prompts: Optional[SystemPromptRegistry] = None
+    ) -> "ConversationTemplate":
+        """
+        Crear plantilla.
+        
+        Args:
+            name: Nombre de la plantilla
+            system_prompt: Prompt del sistema (None o "" = sin prompt)
+            examples: Turnos de ejemplo como (rol, contenido), rol user/assistant
+            prompts: Registro donde internar el prompt (None = el del proceso)
+        
+        Raises:
+            ValueError: Si algún ejemplo tiene rol o contenido inválido
+        """
+        if prompts is None:
+            prompts = SYSTEM_PROMPTS
+        
+        messages = tuple(Message(role=role, content=content.strip()) for role, content in examples)
+        
+        return cls(
+            name=name,
+            prompt=prompts.intern(system_prompt) if system_prompt else None,
+            prefix=SharedPrefix(messages)
+        )
@@ -2,17 +2,75 @@
 Message - Value Object para mensajes en conversación.
 
 Siguiendo principios DDD:
-- Inmutable (frozen=True)
+- Inmutable (no admite asignación de atributos)
 - Sin identidad (igualdad por atributos)
 - Representa un concepto del dominio
+
+Representación compacta: __slots__, rol como entero y timestamp como
+entero de nanosegundos (reloj monotónico anclado a la época Unix). El
+datetime y su ISO 8601 solo se construyen al pedirlos (display, stores).
 """
 
-from dataclasses import dataclass
-from datetime import datetime, timezone
-from typing import Literal
+from datetime import datetime, timedelta, timezone
+from time import monotonic_ns, time_ns
+from typing import Literal, Optional
+
+
+Role = Literal["user", "assistant", "system"]
+
+# Códigos de rol (índice en ROLES)
+ROLE_SYSTEM = 0
+ROLE_USER = 1
+ROLE_ASSISTANT = 2
+ROLES: tuple[str, ...] = ("system", "user", "assistant")
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+# Reloj monotónico desplazado a la época Unix: ordena sin retrocesos por
+# ajustes de NTP y sigue siendo convertible a fecha de pared
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MONOTONIC_TO_EPOCH_NS = time_ns() - monotonic_ns()
+
+
+def now_ns() -> int:
+    """
+    Instante actual en nanosegundos desde la época (monotónico en el proceso).
+    
+    Truncado a microsegundos, la resolución de datetime/ISO 8601: un mensaje
+    restaurado desde un store es igual al original.
+    """
+    return (monotonic_ns() + _MONOTONIC_TO_EPOCH_NS) // 1000 * 1000
+
+
+def datetime_to_ns(value: datetime) -> int:
+    """Convertir un datetime (naive = UTC) a nanosegundos desde la época."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // timedelta(microseconds=1) * 1000
+
+
+class FrozenPayload(dict):
+    """
+    Dict de solo lectura para payloads compartidos (LLM y display).
+    
+    Un mismo payload lo comparten todas las lecturas de una conversación y,
+    en el caso del system prompt y de los prefijos, todas las sesiones:
+    mutarlo cambiaría el historial de otras. Sigue siendo un dict (se
+    serializa a JSON sin copiar); dict(payload) da una copia modificable.
+    """
+    
+    __slots__ = ()
+    
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Shared message payload is read-only; copy it with dict(payload)")
+    
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+    
+    def __reduce__(self):
+        """copy/deepcopy/pickle sin pasar por __setitem__."""
+        return (FrozenPayload, (dict(self),))
 
 
-@dataclass(frozen=True)
 class Message:
     """
     Value Object que representa un mensaje en la conversación.
@@ -20,57 +78,136 @@ class Message:
     Inmutable y sin identidad - dos mensajes con mismo contenido son iguales.
     """
     
-    role: Literal["user", "assistant", "system"]
+    __slots__ = ("role_code", "content", "timestamp_ns")
+    
+    role_code: int
     content: str
-    timestamp: datetime
+    timestamp_ns: int
+    
+    def __init__(self, role: Role, content: str, timestamp: Optional[datetime] = None):
+        """
+        Crear mensaje validando invariantes.
+        
+        Args:
+            role: "user", "assistant" o "system"
+            content: Texto del mensaje (no vacío)
+            timestamp: Momento del mensaje (None = ahora)
+        """
+        code = _ROLE_CODES.get(role)
+        if code is None:
+            raise ValueError(f"Invalid role: {role}")
+        
+        self._init(code, content, now_ns() if timestamp is None else datetime_to_ns(timestamp))
     
-    def __post_init__(self):
-        """Validación de invariantes."""
-        if not self.content.strip():
+    def _init(self, role_code: int, content: str, timestamp_ns: int) -> None:
+        """Validar contenido y fijar los slots (única escritura permitida)."""
+        if not content.strip():
             raise ValueError("Message content cannot be empty")
         
-        if self.role not in ("user", "assistant", "system"):
-            raise ValueError(f"Invalid role: {self.role}")
+        object.__setattr__(self, "role_code", role_code)
+        object.__setattr__(self, "content", content)
+        object.__setattr__(self, "timestamp_ns", timestamp_ns)
+    
+    @classmethod
+    def _create(cls, role_code: int, content: str) -> "Message":
+        """Camino rápido de las factories: sin lookup de rol ni datetime."""
+        message = cls.__new__(cls)
+        message._init(role_code, content.strip(), now_ns())
+        return message
+    
+    @classmethod
+    def restore(cls, role_code: int, content: str, timestamp_ns: int) -> "Message":
+        """
+        Reconstruir mensaje desde su representación compacta (p.ej. hibernado).
+        
+        Args:
+            role_code: Código de rol (ROLE_SYSTEM, ROLE_USER, ROLE_ASSISTANT)
+            content: Texto del mensaje
+            timestamp_ns: Nanosegundos desde la época
+        """
+        if not 0 <= role_code < len(ROLES):
+            raise ValueError(f"Invalid role code: {role_code}")
+        
+        message = cls.__new__(cls)
+        message._init(role_code, content, timestamp_ns)
+        return message
+    
+    def __reduce__(self):
+        """copy/deepcopy/pickle vía restore() (el estado no pasa por __setattr__)."""
+        return (Message.restore, (self.role_code, self.content, self.timestamp_ns))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Message is immutable: cannot assign '{name}'")
+    
+    def __delattr__(self, name):
+        raise AttributeError(f"Message is immutable: cannot delete '{name}'")
+    
+    @property
+    def role(self) -> Role:
+        """Rol como texto ("user", "assistant" o "system")."""
+        return ROLES[self.role_code]
+    
+    @property
+    def timestamp(self) -> datetime:
+        """Momento del mensaje (UTC), construido bajo demanda."""
+        return _EPOCH + timedelta(microseconds=self.timestamp_ns // 1000)
     
     @classmethod
     def create_user_message(cls, content: str) -> "Message":
         """Factory method para mensajes de usuario."""
-        return cls(
-            role="user",
-            content=content.strip(),
-            timestamp=datetime.now(timezone.utc)
-        )
+        return cls._create(ROLE_USER, content)
     
     @classmethod
     def create_assistant_message(cls, content: str) -> "Message":
         """Factory method para mensajes del asistente."""
-        return cls(
-            role="assistant",
-            content=content.strip(),
-            timestamp=datetime.now(timezone.utc)
-        )
+        return cls._create(ROLE_ASSISTANT, content)
     
     @classmethod
     def create_system_message(cls, content: str) -> "Message":
         """Factory method para mensajes del sistema."""
+        return cls._create(ROLE_SYSTEM, content)
+    
+    @classmethod
+    def from_dict(cls, data: dict[str, str]) -> "Message":
+        """
+        Reconstruir mensaje desde to_display_dict() (p.ej. desde un store).
+        
+        Args:
+            data: Dict con role, content y timestamp ISO 8601
+        """
         return cls(
-            role="system",
-            content=content.strip(),
-            timestamp=datetime.now(timezone.utc)
+            role=data["role"],
+            content=data["content"],
+            timestamp=datetime.fromisoformat(data["timestamp"])
         )
     
     def to_dict(self) -> dict[str, str]:
         """Convertir a formato para LLM (OpenAI compatible)."""
         return {
-            "role": self.role,
+            "role": ROLES[self.role_code],
             "content": self.content
         }
     
     def to_display_dict(self) -> dict[str, str]:
         """Convertir a formato para display en frontend."""
         return {
-            "role": self.role,
+            "role": ROLES[self.role_code],
             "content": self.content,
             "timestamp": self.timestamp.isoformat()
         }
-
+    
+    def __eq__(self, other) -> bool:
+        """Igualdad por valor (rol, contenido y timestamp)."""
+        if not isinstance(other, Message):
+            return NotImplemented
+        return (
+            self.role_code == other.role_code
+            and self.timestamp_ns == other.timestamp_ns
+            and self.content == other.content
+        )
+    
+    def __hash__(self) -> int:
+        return hash((self.role_code, self.content, self.timestamp_ns))
+    
+    def __repr__(self) -> str:
+        return f"Message(role={self.role!r}, content={self.content!r}, timestamp={self.timestamp.isoformat()!r})"
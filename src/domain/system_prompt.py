@@ -0,0 +1,123 @@
+"""
+SystemPrompt - Prompts del sistema compartidos entre conversaciones.
+
+Todas las sesiones de un despliegue suelen usar el mismo system prompt
+(largo). El registro lo interna: un único Message inmutable, sus payloads
+(LLM y display) y su número de tokens precalculado por prompt distinto.
+Cada conversación solo guarda una referencia al prompt compartido.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, Mapping, Optional
+
+from .message import FrozenPayload, Message
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación barata de tokens (~4 caracteres por token)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+@dataclass(frozen=True, slots=True)
+class SystemPrompt:
+    """
+    Value Object: system prompt internado.
+    
+    prompt_id es estable entre procesos (hash del texto), así que sirve
+    para referenciar el prompt desde un store o entre workers.
+    """
+    
+    prompt_id: str
+    message: Message
+    llm_payload: Mapping[str, str]
+    display_payload: Mapping[str, str]
+    token_count: int
+    
+    @property
+    def text(self) -> str:
+        """Texto del prompt."""
+        return self.message.content
+
+
+class SystemPromptRegistry:
+    """
+    Registro de system prompts internados (uno por texto distinto).
+    
+    Responsibilities:
+    - Devolver la misma instancia para el mismo texto (intern)
+    - Resolver prompts por prompt_id
+    - Precalcular tokens con el tokenizador configurado
+    """
+    
+    def __init__(self, tokenizer: Callable[[str], int] = estimate_tokens):
+        """
+        Inicializar registro vacío.
+        
+        Args:
+            tokenizer: Función texto → número de tokens (default: estimación)
+        """
+        self._tokenizer = tokenizer
+        self._by_text: dict[str, SystemPrompt] = {}
+        self._by_id: dict[str, SystemPrompt] = {}
+        self.hits = 0
+    
+    def __len__(self) -> int:
+        return len(self._by_id)
+    
+    @staticmethod
+    def prompt_id_for(text: str) -> str:
+        """ID estable de un prompt (hash corto de su texto normalizado)."""
+        return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()[:16]
+    
+    def intern(self, text: str) -> SystemPrompt:
+        """
+        Obtener el prompt compartido para un texto (creándolo si es nuevo).
+        
+        Args:
+            text: Texto del system prompt
+        
+        Returns:
+            SystemPrompt compartido
+        
+        Raises:
+            ValueError: Si el texto está vacío
+        """
+        prompt = self._by_text.get(text)
+        if prompt is not None:
+            self.hits += 1
+            return prompt
+        
+        message = Message.create_system_message(text)
+        prompt_id = self.prompt_id_for(text)
+        
+        # Mismo texto tras normalizar (espacios): reutilizar la entrada existente
+        prompt = self._by_id.get(prompt_id)
+        if prompt is None:
+            prompt = SystemPrompt(
+                prompt_id=prompt_id,
+                message=message,
+                llm_payload=FrozenPayload(message.to_dict()),
+                display_payload=FrozenPayload(message.to_display_dict()),
+                token_count=self._tokenizer(message.content)
+            )
+            self._by_id[prompt_id] = prompt
+        
+        self._by_text[text] = prompt
+        return prompt
+    
+    def get(self, prompt_id: str) -> Optional[SystemPrompt]:
+        """Resolver un prompt por su ID (None si no está registrado)."""
+        return self._by_id.get(prompt_id)
+    
+    def stats(self) -> dict:
+        """Prompts registrados, reutilizaciones y tokens de cada uno."""
+        return {
+            "prompts": len(self._by_id),
+            "hits": self.hits,
+            "token_counts": {prompt_id: p.token_count for prompt_id, p in self._by_id.items()}
+        }
+
+
+# Registro del proceso (lo comparten todas las conversaciones por defecto)
+SYSTEM_PROMPTS = SystemPromptRegistry()
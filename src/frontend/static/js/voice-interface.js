@@ -8,6 +8,14 @@
  * - Auto-playing audio responses
  */
 
+// Respuesta de /api/voice/process como frame binario (ver src/api/voice_envelope.py)
+const VOICE_FRAME_TYPE = 'application/vnd.arca.voice-frame';
+
+// Audio comprimido que el navegador sabe reproducir (Opus ~10x menor que WAV)
+const PLAYABLE_AUDIO_TYPES = ['audio/ogg; codecs=opus', 'audio/webm; codecs=opus', 'audio/mpeg']
+    .filter((type) => new Audio().canPlayType(type) !== '')
+    .map((type) => type.split(';')[0]);
+
 class VoiceInterface {
     constructor() {
         // DOM Elements
@@ -166,9 +174,10 @@ class VoiceInterface {
             formData.append('session_id', this.sessionId);
             formData.append('language', 'es');
             
-            // Send request
+            // Send request (frame binario: textos y audio en el cuerpo, sin base64)
             const response = await fetch('/api/voice/process', {
                 method: 'POST',
+                headers: { 'Accept': [VOICE_FRAME_TYPE, ...PLAYABLE_AUDIO_TYPES, 'audio/wav;q=0.5'].join(', ') },
                 body: formData
             });
             
@@ -176,21 +185,7 @@ class VoiceInterface {
                 throw new Error(`HTTP ${response.status}: ${response.statusText}`);
             }
             
-            // Get headers (text is base64 encoded to handle Unicode)
-            const transcribedTextB64 = response.headers.get('X-Transcribed-Text');
-            const responseTextB64 = response.headers.get('X-Response-Text');
-            
-            // Decode base64 to UTF-8
-            const transcribedText = decodeURIComponent(escape(atob(transcribedTextB64)));
-            const responseText = decodeURIComponent(escape(atob(responseTextB64)));
-            
-            const latencyTotal = parseFloat(response.headers.get('X-Latency-Total'));
-            const latencySTT = parseFloat(response.headers.get('X-Latency-STT'));
-            const latencyLLM = parseFloat(response.headers.get('X-Latency-LLM'));
-            const latencyTTS = parseFloat(response.headers.get('X-Latency-TTS'));
-            
-            // Get audio
-            const audioArrayBuffer = await response.arrayBuffer();
+            const { transcribedText, responseText, latency, audioArrayBuffer, audioType } = await this.readVoiceResponse(response);
             
             const totalTime = (performance.now() - startTime) / 1000;
             console.log(`✅ Response received in ${totalTime.toFixed(2)}s`);
@@ -206,15 +201,10 @@ class VoiceInterface {
             this.addMessage('assistant', responseText);
             
             // Update stats
-            this.updateStats({
-                stt: latencySTT,
-                llm: latencyLLM,
-                tts: latencyTTS,
-                total: latencyTotal
-            });
+            this.updateStats(latency);
             
             // Play audio response
-            await this.playAudio(audioArrayBuffer);
+            await this.playAudio(audioArrayBuffer, audioType);
             
             console.log('🎉 Processing complete');
             
@@ -226,12 +216,47 @@ class VoiceInterface {
         }
     }
     
-    async playAudio(audioArrayBuffer) {
+    async readVoiceResponse(response) {
+        const buffer = await response.arrayBuffer();
+        
+        if ((response.headers.get('Content-Type') || '').startsWith(VOICE_FRAME_TYPE)) {
+            // magic "ARCA" | versión (u8) | longitud JSON (u32) | longitud audio (u32) | JSON | audio
+            const view = new DataView(buffer);
+            const jsonLength = view.getUint32(5);
+            const meta = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 13, jsonLength)));
+            
+            return {
+                transcribedText: meta.transcribed_text,
+                responseText: meta.response_text,
+                latency: meta.latency,
+                audioArrayBuffer: buffer.slice(13 + jsonLength),
+                audioType: meta.audio_type || 'audio/wav'
+            };
+        }
+        
+        // Formato original: textos en base64 (UTF-8) en cabeceras
+        const decodeHeader = (name) => decodeURIComponent(escape(atob(response.headers.get(name))));
+        
+        return {
+            transcribedText: decodeHeader('X-Transcribed-Text'),
+            responseText: decodeHeader('X-Response-Text'),
+            latency: {
+                stt: parseFloat(response.headers.get('X-Latency-STT')),
+                llm: parseFloat(response.headers.get('X-Latency-LLM')),
+                tts: parseFloat(response.headers.get('X-Latency-TTS')),
+                total: parseFloat(response.headers.get('X-Latency-Total'))
+            },
+            audioArrayBuffer: buffer,
+            audioType: response.headers.get('Content-Type') || 'audio/wav'
+        };
+    }
+    
+    async playAudio(audioArrayBuffer, audioType = 'audio/wav') {
         console.log('🔊 Playing audio response...');
         
         try {
             // Create blob from array buffer
-            const audioBlob = new Blob([audioArrayBuffer], { type: 'audio/wav' });
+            const audioBlob = new Blob([audioArrayBuffer], { type: audioType });
             const audioUrl = URL.createObjectURL(audioBlob);
             
             // Set audio player source and play
@@ -0,0 +1,125 @@
+"""
+CircuitBreaker - Protección por backend frente a fallos y timeouts.
+
+Estados clásicos:
+- CLOSED: tráfico normal, se cuentan fallos consecutivos
+- OPEN: no se envía tráfico hasta que expira reset_timeout
+- HALF_OPEN: se permite una única petición de prueba (probe)
+"""
+
+from enum import Enum
+from time import monotonic
+
+from loguru import logger
+
+
+class CircuitState(str, Enum):
+    """Estado del circuit breaker."""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker con half-open probing.
+    
+    Tras failure_threshold fallos consecutivos el circuito se abre. Pasado
+    reset_timeout deja pasar una sola petición de prueba: si tiene éxito
+    se cierra, si falla se vuelve a abrir.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        reset_timeout: float = 10.0
+    ):
+        """
+        Inicializar circuit breaker.
+        
+        Args:
+            name: Identificador para logs (p.ej. URL del backend)
+            failure_threshold: Fallos consecutivos para abrir el circuito
+            reset_timeout: Segundos en OPEN antes de permitir un probe
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.times_opened = 0
+    
+    @property
+    def state(self) -> CircuitState:
+        """Estado actual (OPEN pasa a HALF_OPEN al expirar reset_timeout)."""
+        if (
+            self._state == CircuitState.OPEN
+            and monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = CircuitState.HALF_OPEN
+            logger.info(f"🔌 Circuit half-open for {self.name}, allowing probe")
+        return self._state
+    
+    @property
+    def retry_after(self) -> float:
+        """Segundos hasta que el circuito admita un probe (0 si ya lo admite)."""
+        if self.state != CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (monotonic() - self._opened_at))
+    
+    def can_attempt(self) -> bool:
+        """True si se puede enviar una petición ahora (sin reservarla)."""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN:
+            return not self._probe_in_flight
+        return False
+    
+    def on_dispatch(self) -> None:
+        """Registrar envío de una petición (reserva el probe en HALF_OPEN)."""
+        if self.state == CircuitState.HALF_OPEN:
+            self._probe_in_flight = True
+    
+    def on_cancel(self) -> None:
+        """Liberar el probe si la petición se canceló sin resultado."""
+        self._probe_in_flight = False
+    
+    def record_success(self) -> None:
+        """Registrar éxito: cierra el circuito."""
+        if self._state != CircuitState.CLOSED:
+            logger.info(f"✅ Circuit closed for {self.name}")
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+        self._probe_in_flight = False
+    
+    def record_failure(self) -> None:
+        """Registrar fallo o timeout: puede abrir el circuito."""
+        self._consecutive_failures += 1
+        self._probe_in_flight = False
+        
+        if (
+            self._state == CircuitState.HALF_OPEN
+            or self._consecutive_failures >= self.failure_threshold
+        ):
+            if self._state != CircuitState.OPEN:
+                self.times_opened += 1
+                logger.warning(
+                    f"⛔ Circuit opened for {self.name} "
+                    f"after {self._consecutive_failures} consecutive failures"
+                )
+            self._state = CircuitState.OPEN
+            self._opened_at = monotonic()
+    
+    def to_dict(self) -> dict:
+        """Estado del breaker para métricas."""
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self._consecutive_failures,
+            "times_opened": self.times_opened
+        }
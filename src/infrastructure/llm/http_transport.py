@@ -0,0 +1,131 @@
+"""
+HTTP transport - Cliente httpx compartido y afinado para backends LLM.
+
+Un único httpx.AsyncClient (pool de conexiones keep-alive) se comparte
+entre todos los clientes LM Studio para evitar abrir una conexión TCP por
+petición con cientos de sesiones concurrentes.
+
+Métricas vía la extensión "trace" de httpcore:
+- Conexiones nuevas vs reutilizadas
+- Tiempo de espera por una conexión libre del pool
+"""
+
+from importlib.util import find_spec
+from time import monotonic
+from typing import Optional, TYPE_CHECKING
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class HTTPClientMetrics:
+    """
+    Contadores de reutilización de conexiones y espera en el pool.
+    
+    Cada petición registra un callback de trace propio que mide desde que
+    httpx la envía hasta que obtiene conexión (nueva o reutilizada).
+    """
+    
+    def __init__(self):
+        """Inicializar contadores a cero."""
+        self.requests = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.pool_wait_total = 0.0
+        self.pool_wait_max = 0.0
+    
+    async def on_request(self, request: "httpx.Request") -> None:
+        """Event hook de httpx: instala el trace de la petición."""
+        self.requests += 1
+        request.extensions["trace"] = self._make_trace(monotonic())
+    
+    def _make_trace(self, started: float):
+        """Crear callback de trace de httpcore para una petición."""
+        state = {"connected": False, "done": False}
+        
+        async def trace(event_name: str, info: dict) -> None:
+            if state["done"]:
+                return
+            
+            if event_name == "connection.connect_tcp.started":
+                # La espera termina al empezar a abrir una conexión nueva
+                state["connected"] = True
+                self.new_connections += 1
+                self._record_wait(monotonic() - started)
+            elif event_name.endswith("send_request_headers.started"):
+                if not state["connected"]:
+                    self.reused_connections += 1
+                    self._record_wait(monotonic() - started)
+                state["done"] = True
+        
+        return trace
+    
+    def _record_wait(self, wait: float) -> None:
+        """Acumular tiempo de espera por conexión."""
+        self.pool_wait_total += wait
+        self.pool_wait_max = max(self.pool_wait_max, wait)
+    
+    def to_dict(self) -> dict:
+        """Métricas del transporte HTTP."""
+        connections = self.new_connections + self.reused_connections
+        
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_ratio": round(self.reused_connections / connections, 4) if connections else 0.0,
+            "pool_wait_avg": round(self.pool_wait_total / connections, 4) if connections else 0.0,
+            "pool_wait_max": round(self.pool_wait_max, 4)
+        }
+
+
+def build_http_client(
+    max_connections: int = 100,
+    max_keepalive_connections: int = 50,
+    keepalive_expiry: float = 30.0,
+    connect_timeout: float = 2.0,
+    read_timeout: float = 60.0,
+    http2: bool = False,
+    metrics: Optional[HTTPClientMetrics] = None
+) -> "httpx.AsyncClient":
+    """
+    Crear cliente httpx con límites de pool y timeouts explícitos.
+    
+    Args:
+        max_connections: Conexiones simultáneas máximas (todas las URLs)
+        max_keepalive_connections: Conexiones inactivas conservadas
+        keepalive_expiry: Segundos antes de cerrar una conexión inactiva
+        connect_timeout: Timeout (s) para establecer conexión
+        read_timeout: Timeout (s) de lectura/escritura y de espera en el pool
+        http2: Usar HTTP/2 si el paquete h2 está instalado
+        metrics: Contadores donde registrar reutilización y espera
+    
+    Returns:
+        httpx.AsyncClient listo para pasar a AsyncOpenAI(http_client=...)
+    """
+    import httpx
+    
+    if http2 and find_spec("h2") is None:
+        logger.warning("⚠️ HTTP/2 requested but 'h2' is not installed, using HTTP/1.1")
+        http2 = False
+    
+    event_hooks = {"request": [metrics.on_request]} if metrics else {}
+    
+    logger.info(
+        f"🔗 LLM HTTP client: max_connections={max_connections}, "
+        f"keepalive={max_keepalive_connections} ({keepalive_expiry}s), "
+        f"connect_timeout={connect_timeout}s, read_timeout={read_timeout}s, http2={http2}"
+    )
+    
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        http2=http2,
+        event_hooks=event_hooks
+    )
@@ -0,0 +1,702 @@
+"""
+LLMPoolClient - Pool de backends LLM compatibles con OpenAI.
+
+Reparte las peticiones entre varias instancias de LM Studio usando
+least-outstanding-requests y, opcionalmente, afinidad de sesión para
+reutilizar el KV cache de cada backend.
+
+Protección de latencia de cola (p99):
+- Hedged requests: si la respuesta (o el primer token en streaming) no ha
+  llegado en el p95 reciente, se duplica la petición en otro backend y se
+  cancela la perdedora
+- Circuit breaker por backend con half-open probing
+
+Todos los backends comparten un httpx.AsyncClient con keep-alive (ver
+http_transport.py) para no pagar un handshake TCP por petición.
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from functools import partial
+from math import ceil
+from time import monotonic
+from typing import Callable, Mapping, Optional, Sequence, TYPE_CHECKING
+from uuid import UUID
+
+from loguru import logger
+
+from .circuit_breaker import CircuitBreaker
+from .http_transport import HTTPClientMetrics, build_http_client
+from .lm_studio_client import LMStudioClient, LLMUnavailableError
+
+if TYPE_CHECKING:
+    import httpx
+
+
+def _percentile(samples: deque[float], fraction: float) -> float:
+    """Percentil simple (nearest-rank) de una ventana de muestras."""
+    ordered = sorted(samples)
+    rank = max(0, ceil(fraction * len(ordered)) - 1)
+    return ordered[rank]
+
+
+class LLMBackend:
+    """
+    Estado de routing de un backend del pool.
+    
+    Registra peticiones en vuelo, latencias recientes y su circuit breaker.
+    """
+    
+    # Número de latencias recientes usadas para estadísticas
+    LATENCY_WINDOW = 50
+    
+    def __init__(self, index: int, client: LMStudioClient, breaker: CircuitBreaker):
+        """
+        Inicializar estado del backend.
+        
+        Args:
+            index: Posición del backend en el pool
+            client: Cliente LM Studio del backend
+            breaker: Circuit breaker del backend
+        """
+        self.index = index
+        self.client = client
+        self.breaker = breaker
+        self.in_flight = 0
+        self.total_requests = 0
+        self.total_failures = 0
+        self._latencies: deque[float] = deque(maxlen=self.LATENCY_WINDOW)
+    
+    @property
+    def base_url(self) -> str:
+        """URL del backend."""
+        return self.client.base_url
+    
+    @property
+    def is_healthy(self) -> bool:
+        """True si el circuit breaker admite tráfico."""
+        return self.breaker.can_attempt()
+    
+    @property
+    def recent_latency(self) -> float:
+        """Latencia media reciente en segundos (0.0 sin muestras)."""
+        if not self._latencies:
+            return 0.0
+        return sum(self._latencies) / len(self._latencies)
+    
+    def record_success(self, latency: Optional[float]) -> None:
+        """Registrar petición exitosa (latency None = no es una generación: solo breaker)."""
+        if latency is not None:
+            self._latencies.append(latency)
+        self.breaker.record_success()
+    
+    def record_failure(self) -> None:
+        """Registrar fallo o timeout."""
+        self.total_failures += 1
+        self.breaker.record_failure()
+    
+    def mark_healthy(self, healthy: bool) -> None:
+        """Actualizar el breaker a partir de un health check."""
+        if healthy:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+    
+    def to_dict(self) -> dict:
+        """Estadísticas del backend para métricas."""
+        return {
+            "index": self.index,
+            "base_url": self.base_url,
+            "healthy": self.is_healthy,
+            "circuit": self.breaker.to_dict(),
+            "in_flight": self.in_flight,
+            "total_requests": self.total_requests,
+            "total_failures": self.total_failures,
+            "recent_latency": round(self.recent_latency, 4)
+        }
+
+
+class LLMPoolClient:
+    """
+    Cliente LLM que balancea entre varios endpoints OpenAI-compatibles.
+    
+    Expone la misma interfaz que LMStudioClient, por lo que
+    VoiceAssistantService puede usar cualquiera de los dos.
+    
+    Routing:
+    - Least outstanding requests entre backends con circuito cerrado
+      (desempate por latencia)
+    - Afinidad de sesión opcional para reutilizar el KV cache del backend
+    - Hedging al p95 y failover al siguiente backend si uno falla
+    """
+    
+    # Máximo de sesiones recordadas en la tabla de afinidad (LRU)
+    MAX_AFFINITY_ENTRIES = 10_000
+    # Peticiones en vuelo extra toleradas antes de romper la afinidad
+    MAX_STICKY_IMBALANCE = 2
+    # Ventana y muestras mínimas para estimar el p95 del pool
+    HEDGE_WINDOW = 200
+    MIN_HEDGE_SAMPLES = 20
+    HEDGE_PERCENTILE = 0.95
+    
+    def __init__(
+        self,
+        backends: list[LMStudioClient],
+        sticky_sessions: bool = True,
+        hedging: bool = True,
+        hedge_min_delay: float = 0.5,
+        request_timeout: Optional[float] = None,
+        failure_threshold: int = 3,
+        reset_timeout: float = 10.0,
+        http_client: Optional["httpx.AsyncClient"] = None,
+        http_metrics: Optional[HTTPClientMetrics] = None
+    ):
+        """
+        Inicializar pool de backends.
+        
+        Args:
+            backends: Clientes LM Studio, uno por endpoint
+            sticky_sessions: Mantener cada sesión en el mismo backend
+            hedging: Duplicar peticiones lentas en un segundo backend
+            hedge_min_delay: Espera mínima (s) antes de duplicar una petición
+            request_timeout: Timeout (s) por petición; cuenta como fallo
+                             para el circuit breaker (None = sin timeout)
+            failure_threshold: Fallos consecutivos que abren el circuito
+            reset_timeout: Segundos en OPEN antes del probe half-open
+            http_client: Cliente httpx compartido por los backends; el pool
+                         es su dueño y lo cierra en cleanup()
+            http_metrics: Métricas de conexiones del cliente compartido
+        """
+        if not backends:
+            raise ValueError("LLM pool requires at least one backend")
+        
+        self.backends = [
+            LLMBackend(
+                i,
+                client,
+                CircuitBreaker(
+                    client.base_url,
+                    failure_threshold=failure_threshold,
+                    reset_timeout=reset_timeout
+                )
+            )
+            for i, client in enumerate(backends)
+        ]
+        self.sticky_sessions = sticky_sessions
+        self.hedging = hedging
+        self.hedge_min_delay = hedge_min_delay
+        self.request_timeout = request_timeout
+        self._http_client = http_client
+        self.http_metrics = http_metrics
+        self._affinity: OrderedDict[UUID, int] = OrderedDict()
+        
+        # Ventanas del pool: respuesta completa y primer token (streaming)
+        self._latencies: deque[float] = deque(maxlen=self.HEDGE_WINDOW)
+        self._ttft: deque[float] = deque(maxlen=self.HEDGE_WINDOW)
+        self.total_hedges = 0
+        self.hedge_wins = 0
+        
+        logger.info(
+            f"🧠 LLM pool initialized: {len(self.backends)} backends, "
+            f"sticky_sessions={sticky_sessions}, hedging={hedging}"
+        )
+    
+    @classmethod
+    def from_urls(
+        cls,
+        base_urls: list[str],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        http_options: Optional[dict] = None,
+        **pool_options
+    ) -> "LLMPoolClient":
+        """
+        Crear pool a partir de una lista de URLs.
+        
+        Args:
+            base_urls: Endpoints OpenAI-compatibles
+            model: Nombre del modelo
+            max_tokens: Límite de tokens para respuestas
+            temperature: Temperatura del modelo
+            http_options: Límites y timeouts del cliente httpx compartido
+                          (ver build_http_client; None = defaults del SDK)
+            **pool_options: Opciones de routing (ver __init__)
+        """
+        http_client = None
+        http_metrics = None
+        if http_options is not None:
+            http_metrics = HTTPClientMetrics()
+            http_client = build_http_client(**http_options, metrics=http_metrics)
+        
+        clients = [
+            LMStudioClient(
+                base_url=url,
+                model=model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                http_client=http_client
+            )
+            for url in base_urls
+        ]
+        return cls(
+            clients,
+            http_client=http_client,
+            http_metrics=http_metrics,
+            **pool_options
+        )
+    
+    @property
+    def base_url(self) -> str:
+        """URLs del pool (para logs y mensajes de error)."""
+        return ", ".join(backend.base_url for backend in self.backends)
+    
+    def _retry_after(self) -> float:
+        """Segundos hasta que algún backend vuelva a admitir tráfico."""
+        return min(backend.breaker.retry_after for backend in self.backends)
+    
+    def _pick_backend(
+        self,
+        session_id: Optional[UUID] = None,
+        exclude: frozenset[int] = frozenset()
+    ) -> Optional[LLMBackend]:
+        """
+        Elegir backend para una petición.
+        
+        Args:
+            session_id: Sesión para afinidad (opcional)
+            exclude: Índices de backends ya intentados
+        
+        Returns:
+            Backend elegido o None si ninguno admite tráfico
+        """
+        candidates = [
+            b for b in self.backends
+            if b.index not in exclude and b.is_healthy
+        ]
+        
+        if not candidates:
+            return None
+        
+        best = min(candidates, key=lambda b: (b.in_flight, b.recent_latency))
+        
+        if self.sticky_sessions and session_id is not None:
+            sticky_index = self._affinity.get(session_id)
+            sticky = next((b for b in candidates if b.index == sticky_index), None)
+            
+            if (
+                sticky is not None
+                and sticky.in_flight <= best.in_flight + self.MAX_STICKY_IMBALANCE
+            ):
+                best = sticky
+            
+            self._remember_affinity(session_id, best.index)
+        
+        return best
+    
+    def _select_backend(self, session_id: Optional[UUID] = None) -> LLMBackend:
+        """
+        Elegir backend o fallar rápido si todos los circuitos están abiertos.
+        
+        Raises:
+            LLMUnavailableError: Si ningún backend admite tráfico
+        """
+        backend = self._pick_backend(session_id)
+        
+        if backend is None:
+            raise LLMUnavailableError(
+                f"All LLM backends are unavailable (circuit open): {self.base_url}",
+                retry_after=self._retry_after()
+            )
+        
+        return backend
+    
+    def _remember_affinity(self, session_id: UUID, index: int) -> None:
+        """Guardar afinidad sesión → backend (tabla LRU acotada)."""
+        self._affinity[session_id] = index
+        self._affinity.move_to_end(session_id)
+        
+        if len(self._affinity) > self.MAX_AFFINITY_ENTRIES:
+            self._affinity.popitem(last=False)
+    
+    def _hedge_delay(self, window: deque[float]) -> Optional[float]:
+        """
+        Calcular cuándo duplicar una petición (p95 reciente del pool).
+        
+        Returns:
+            Segundos de espera o None si no se debe hacer hedging
+        """
+        if not self.hedging or len(self.backends) < 2:
+            return None
+        if len(window) < self.MIN_HEDGE_SAMPLES:
+            return None
+        return max(self.hedge_min_delay, _percentile(window, self.HEDGE_PERCENTILE))
+    
+    async def generate_response(
+        self,
+        messages: Sequence[Mapping[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        session_id: Optional[UUID] = None,
+        metrics: Optional[dict[str, float]] = None
+    ) -> str:
+        """
+        Generar respuesta en el backend menos cargado.
+        
+        Args:
+            messages: Mensajes en formato OpenAI (secuencia de solo lectura)
+            max_tokens: Override de límite de tokens
+            temperature: Override de temperatura
+            session_id: Sesión del turno (para afinidad)
+            metrics: Dict donde registrar la decisión de routing
+                     (llm_backend, llm_backend_in_flight, llm_hedged)
+        
+        Returns:
+            Texto de la respuesta generada
+        
+        Raises:
+            ValueError: Si messages está vacío
+            LLMUnavailableError: Si todos los backends fallan o tienen el
+                                 circuito abierto
+        """
+        if not messages:
+            raise ValueError("Messages list cannot be empty")
+        
+        tried: set[int] = set()
+        last_error: Optional[Exception] = None
+        
+        def make_call(backend: LLMBackend):
+            return backend.client.generate_response(messages, max_tokens, temperature)
+        
+        while len(tried) < len(self.backends):
+            backend = self._pick_backend(session_id, frozenset(tried))
+            
+            if backend is None:
+                break
+            
+            tried.add(backend.index)
+            
+            if metrics is not None:
+                metrics["llm_backend"] = float(backend.index)
+                metrics["llm_backend_in_flight"] = float(backend.in_flight)
+            
+            try:
+                return await self._hedged_call(backend, make_call, tried, metrics)
+            except RuntimeError as e:
+                last_error = e
+                logger.warning(f"⚠️ LLM backend {backend.base_url} failed, trying next: {e}")
+        
+        if last_error is None:
+            raise LLMUnavailableError(
+                f"All LLM backends are unavailable (circuit open): {self.base_url}",
+                retry_after=self._retry_after()
+            )
+        
+        raise LLMUnavailableError(
+            f"All LLM backends failed ({self.base_url})",
+            retry_after=self._retry_after()
+        ) from last_error
+    
+    async def _hedged_call(
+        self,
+        primary: LLMBackend,
+        make_call: Callable,
+        tried: set[int],
+        metrics: Optional[dict[str, float]]
+    ) -> str:
+        """
+        Ejecutar una llamada con hedging al p95.
+        
+        Si el primario no responde a tiempo se lanza la misma petición en
+        otro backend; gana la primera respuesta válida y la otra se cancela
+        (lo que cierra su conexión HTTP).
+        """
+        tasks = {
+            self._dispatch(primary, make_call(primary)): primary
+        }
+        
+        try:
+            delay = self._hedge_delay(self._latencies)
+            
+            if delay is not None:
+                done, _ = await asyncio.wait(set(tasks), timeout=delay)
+                
+                if not done:
+                    secondary = self._pick_backend(exclude=frozenset(tried))
+                    
+                    if secondary is not None:
+                        tried.add(secondary.index)
+                        self.total_hedges += 1
+                        logger.debug(
+                            f"🪃 Hedging LLM request to {secondary.base_url} "
+                            f"after {delay:.2f}s"
+                        )
+                        if metrics is not None:
+                            metrics["llm_hedged"] = 1.0
+                        tasks[self._dispatch(secondary, make_call(secondary))] = secondary
+            
+            pending = set(tasks)
+            last_error: Optional[BaseException] = None
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                
+                for task in done:
+                    if task.exception() is None:
+                        winner = tasks[task]
+                        if winner is not primary:
+                            self.hedge_wins += 1
+                            if metrics is not None:
+                                metrics["llm_backend"] = float(winner.index)
+                        return task.result()
+                    last_error = task.exception()
+            
+            raise last_error
+        
+        finally:
+            # Cancelar la petición perdedora (o todas si nos cancelan a nosotros)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    def _dispatch(self, backend: LLMBackend, call, generation: bool = True) -> asyncio.Task:
+        """
+        Lanzar una llamada a un backend como task.
+        
+        La carga se contabiliza de forma síncrona (antes de ceder el event
+        loop) para que la siguiente decisión de routing ya la vea, y se
+        libera en un done callback, que se ejecuta incluso si la task se
+        cancela antes de empezar.
+        
+        Solo las generaciones (generation=True) entran en las ventanas de
+        latencia: un prefill con max_tokens=1 tarda una fracción de una
+        respuesta y bajaría el p95 del hedging y la latencia del backend.
+        """
+        backend.breaker.on_dispatch()
+        backend.in_flight += 1
+        backend.total_requests += 1
+        
+        task = asyncio.create_task(self._await_backend(backend, call, generation))
+        task.add_done_callback(partial(self._on_backend_done, backend))
+        return task
+    
+    @staticmethod
+    def _on_backend_done(backend: LLMBackend, task: asyncio.Task) -> None:
+        """Liberar la carga del backend al terminar (o cancelarse) la llamada."""
+        backend.in_flight -= 1
+        if task.cancelled():
+            backend.breaker.on_cancel()
+    
+    async def _await_backend(self, backend: LLMBackend, call, generation: bool = True):
+        """Esperar la llamada registrando latencia, fallos y timeouts."""
+        start = monotonic()
+        
+        try:
+            if self.request_timeout:
+                result = await asyncio.wait_for(call, timeout=self.request_timeout)
+            else:
+                result = await call
+        except asyncio.TimeoutError as e:
+            backend.record_failure()
+            raise LLMUnavailableError(
+                f"LLM backend {backend.base_url} timed out after {self.request_timeout}s"
+            ) from e
+        except Exception:
+            backend.record_failure()
+            raise
+        
+        if not generation:
+            backend.record_success(None)
+            return result
+        
+        latency = monotonic() - start
+        backend.record_success(latency)
+        self._latencies.append(latency)
+        return result
+    
+    async def _tracked_stream(
+        self,
+        backend: LLMBackend,
+        messages: Sequence[Mapping[str, str]],
+        max_tokens: Optional[int],
+        temperature: Optional[float]
+    ):
+        """Stream de un backend contabilizando carga, primer token y breaker."""
+        backend.breaker.on_dispatch()
+        backend.in_flight += 1
+        backend.total_requests += 1
+        start = monotonic()
+        first_chunk = True
+        
+        try:
+            async for chunk in backend.client.generate_response_stream(
+                messages, max_tokens, temperature
+            ):
+                if first_chunk:
+                    self._ttft.append(monotonic() - start)
+                    first_chunk = False
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            backend.breaker.on_cancel()
+            raise
+        except Exception:
+            backend.record_failure()
+            raise
+        finally:
+            backend.in_flight -= 1
+        
+        backend.record_success(monotonic() - start)
+    
+    async def generate_response_stream(
+        self,
+        messages: Sequence[Mapping[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        session_id: Optional[UUID] = None
+    ):
+        """
+        Generar respuesta en streaming con hedging al primer token.
+        
+        Si el primer token no llega en el p95 reciente de time-to-first-token
+        se abre un segundo stream en otro backend; se queda el que entregue
+        antes su primer chunk y el otro se cancela.
+        
+        Yields:
+            Chunks de texto conforme se generan
+        """
+        primary = self._select_backend(session_id)
+        streams = {}
+        
+        def open_stream(backend: LLMBackend):
+            stream = self._tracked_stream(backend, messages, max_tokens, temperature)
+            streams[asyncio.ensure_future(stream.__anext__())] = stream
+        
+        open_stream(primary)
+        winner = None
+        first_chunk = None
+        
+        try:
+            delay = self._hedge_delay(self._ttft)
+            
+            if delay is not None:
+                done, _ = await asyncio.wait(set(streams), timeout=delay)
+                
+                if not done:
+                    secondary = self._pick_backend(exclude=frozenset({primary.index}))
+                    if secondary is not None:
+                        self.total_hedges += 1
+                        open_stream(secondary)
+            
+            pending = set(streams)
+            last_error: Optional[BaseException] = None
+            
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                
+                for task in done:
+                    error = task.exception()
+                    if error is None or isinstance(error, StopAsyncIteration):
+                        winner = streams[task]
+                        first_chunk = None if error else task.result()
+                        break
+                    last_error = error
+            
+            if winner is None:
+                raise last_error
+        
+        finally:
+            for task, stream in streams.items():
+                if stream is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif task.exception() is None:
+                    await stream.aclose()
+        
+        if first_chunk is None:
+            return
+        
+        if len(streams) > 1 and winner is not next(iter(streams.values())):
+            self.hedge_wins += 1
+        
+        try:
+            yield first_chunk
+            async for chunk in winner:
+                yield chunk
+        finally:
+            await winner.aclose()
+    
+    async def prefill_prompt(
+        self,
+        messages: Sequence[Mapping[str, str]],
+        session_id: Optional[UUID] = None
+    ) -> float:
+        """
+        Pre-calentar el KV cache en el backend que atenderá la sesión.
+        
+        Con sticky_sessions la afinidad queda registrada, así la petición
+        real del turno llega al mismo backend que recibió el prefill.
+        """
+        backend = self._select_backend(session_id)
+        return await self._dispatch(backend, backend.client.prefill_prompt(messages), generation=False)
+    
+    async def probe(self) -> bool:
+        """
+        Sondeo barato de todos los backends en paralelo (GET /models).
+        
+        No modifica los circuit breakers: que /models responda no garantiza
+        que la generación funcione.
+        
+        Returns:
+            True si al menos un backend responde
+        """
+        results = await asyncio.gather(
+            *(backend.client.probe() for backend in self.backends)
+        )
+        return any(results)
+    
+    async def health_check(self) -> bool:
+        """
+        Verificación profunda de todos los backends en paralelo.
+        
+        Returns:
+            True si al menos un backend está sano
+        """
+        results = await asyncio.gather(
+            *(backend.client.health_check() for backend in self.backends)
+        )
+        
+        for backend, healthy in zip(self.backends, results):
+            backend.mark_healthy(healthy)
+        
+        return any(results)
+    
+    def get_metrics(self) -> dict:
+        """Estadísticas de routing, hedging, circuit breakers y conexiones."""
+        p95 = _percentile(self._latencies, self.HEDGE_PERCENTILE) if self._latencies else 0.0
+        
+        metrics = {
+            "backends": [backend.to_dict() for backend in self.backends],
+            "sticky_sessions": self.sticky_sessions,
+            "affinity_entries": len(self._affinity),
+            "hedging": {
+                "enabled": self.hedging,
+                "p95_latency": round(p95, 4),
+                "hedged_requests": self.total_hedges,
+                "hedge_wins": self.hedge_wins
+            }
+        }
+        
+        if self.http_metrics is not None:
+            metrics["http"] = self.http_metrics.to_dict()
+        
+        return metrics
+    
+    async def cleanup(self) -> None:
+        """Cerrar los backends y el cliente HTTP compartido."""
+        logger.info("🧹 Cleaning up LLM pool")
+        for backend in self.backends:
+            await backend.client.cleanup()
+        
+        if self._http_client is not None:
+            await self._http_client.aclose()
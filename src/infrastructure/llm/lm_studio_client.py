@@ -5,10 +5,27 @@ Usa OpenAI SDK para compatibilidad con LM Studio.
 """
 
 import asyncio
-from typing import Optional
-from openai import AsyncOpenAI, OpenAIError
+from time import time
+from typing import Mapping, Optional, Sequence, TYPE_CHECKING
+from uuid import UUID
 from loguru import logger
 
+if TYPE_CHECKING:
+    # El SDK de OpenAI tarda ~600 ms en importarse: se importa al crear el
+    # cliente, no al importar este módulo
+    import httpx
+
+
+class LLMUnavailableError(RuntimeError):
+    """
+    El LLM no está disponible temporalmente (conexión rechazada, timeout o
+    circuit breaker abierto). La API lo traduce a 503 en lugar de 500.
+    """
+    
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
 
 class LMStudioClient:
     """
@@ -23,7 +40,8 @@ class LMStudioClient:
         base_url: str,
         model: str,
         max_tokens: int,
-        temperature: float
+        temperature: float,
+        http_client: Optional["httpx.AsyncClient"] = None
     ):
         """
         Inicializar cliente LM Studio.
@@ -33,6 +51,9 @@ class LMStudioClient:
             model: Nombre del modelo en LM Studio
             max_tokens: Límite de tokens para respuestas
             temperature: Creatividad del modelo (0.0-2.0)
+            http_client: Cliente httpx compartido (pool de conexiones y
+                         timeouts propios). Si se pasa, lo cierra su dueño,
+                         no este cliente
         
         Note: Valores vienen de config.py (única fuente de verdad)
         """
@@ -40,11 +61,15 @@ class LMStudioClient:
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
+        self._owns_http_client = http_client is None
+        
+        from openai import AsyncOpenAI
         
         # Cliente OpenAI configurado para LM Studio
         self.client = AsyncOpenAI(
             base_url=base_url,
-            api_key="not-needed"  # LM Studio no requiere API key
+            api_key="not-needed",  # LM Studio no requiere API key
+            http_client=http_client
         )
         
         logger.info(
@@ -54,26 +79,34 @@ class LMStudioClient:
     
     async def generate_response(
         self,
-        messages: list[dict[str, str]],
+        messages: Sequence[Mapping[str, str]],
         max_tokens: Optional[int] = None,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        session_id: Optional[UUID] = None,
+        metrics: Optional[dict[str, float]] = None
     ) -> str:
         """
         Generar respuesta usando el LLM local.
         
         Args:
-            messages: Lista de mensajes en formato OpenAI
+            messages: Mensajes en formato OpenAI (secuencia de solo lectura)
                      [{"role": "user"|"assistant"|"system", "content": "..."}]
             max_tokens: Override de límite de tokens
             temperature: Override de temperatura
-            
+            session_id: Sesión del turno (sin efecto con un único backend,
+                        ver LLMPoolClient)
+            metrics: Dict donde registrar métricas de routing (sin efecto
+                     con un único backend)
+        
         Returns:
             Texto de la respuesta generada
-            
+        
         Raises:
             ValueError: Si messages está vacío
             RuntimeError: Si LM Studio no responde
         """
+        from openai import OpenAIError, APIConnectionError, APITimeoutError
+        
         if not messages:
             raise ValueError("Messages list cannot be empty")
         
@@ -123,7 +156,12 @@ class LMStudioClient:
             
             logger.info(f"✅ Response generated: '{response_text[:50]}...'")
             return response_text
-            
+        
+        except (APIConnectionError, APITimeoutError) as e:
+            logger.error(f"❌ LM Studio unreachable: {e}")
+            raise LLMUnavailableError(
+                f"LM Studio is unreachable at {self.base_url}"
+            ) from e
         except OpenAIError as e:
             logger.error(f"❌ LM Studio API error: {e}")
             raise RuntimeError(
@@ -136,23 +174,26 @@ class LMStudioClient:
     
     async def generate_response_stream(
         self,
-        messages: list[dict[str, str]],
+        messages: Sequence[Mapping[str, str]],
         max_tokens: Optional[int] = None,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        session_id: Optional[UUID] = None
     ):
         """
         Generar respuesta en modo streaming (para optimización futura).
         
         Args:
-            messages: Lista de mensajes
+            messages: Mensajes en formato OpenAI
             max_tokens: Límite de tokens
             temperature: Temperatura
-            
+            session_id: Sesión del turno (sin efecto con un único backend)
+        
         Yields:
             Chunks de texto conforme se generan
         """
         tokens = max_tokens or self.max_tokens
         temp = temperature or self.temperature
+        stream = None
         
         try:
             stream = await self.client.chat.completions.create(
@@ -166,14 +207,81 @@ class LMStudioClient:
             async for chunk in stream:
                 if chunk.choices[0].delta.content:
                     yield chunk.choices[0].delta.content
-                    
+        
         except Exception as e:
             logger.error(f"❌ Streaming error: {e}")
             raise RuntimeError(f"LLM streaming error: {e}") from e
+        
+        finally:
+            # Cancelación o aclose() del consumidor: cerrar la respuesta HTTP
+            # para que LM Studio deje de generar tokens que nadie va a leer
+            if stream is not None:
+                await stream.close()
+    
+    async def prefill_prompt(
+        self,
+        messages: Sequence[Mapping[str, str]],
+        session_id: Optional[UUID] = None
+    ) -> float:
+        """
+        Pre-calentar el KV cache de LM Studio con un prefijo de conversación.
+        
+        Envía una petición con max_tokens=1 para que el servidor procese el
+        prompt (system + historial) y lo deje en su prompt cache. La petición
+        real que llegue después con el mismo prefijo solo procesa el delta.
+        
+        Args:
+            messages: Prefijo de la conversación en formato OpenAI
+            session_id: Sesión del turno (sin efecto con un único backend)
+        
+        Returns:
+            Segundos que tardó el prefill
+        
+        Raises:
+            RuntimeError: Si LM Studio no responde
+        """
+        from openai import OpenAIError
+        
+        if not messages:
+            raise ValueError("Messages list cannot be empty")
+        
+        start = time()
+        
+        try:
+            await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=1,
+                temperature=self.temperature,
+                stream=False
+            )
+        except OpenAIError as e:
+            logger.debug(f"Prefill request failed: {e}")
+            raise RuntimeError(f"LM Studio prefill failed: {e}") from e
+        
+        elapsed = time() - start
+        logger.debug(f"🔥 KV cache prefilled: {len(messages)} messages in {elapsed:.2f}s")
+        return elapsed
+    
+    async def probe(self) -> bool:
+        """
+        Sondeo barato de disponibilidad: GET /models, sin generar tokens.
+        
+        Returns:
+            True si el servidor responde, False si no
+        """
+        from openai import OpenAIError
+        
+        try:
+            await self.client.models.list()
+            return True
+        except OpenAIError as e:
+            logger.debug(f"LM Studio probe failed: {e}")
+            return False
     
     async def health_check(self) -> bool:
         """
-        Verificar que LM Studio está accesible.
+        Verificación profunda: genera una respuesta real (cara, bajo demanda).
         
         Returns:
             True si LM Studio responde, False si no
@@ -191,7 +299,7 @@ class LMStudioClient:
             
             logger.info("✅ LM Studio health check passed")
             return True
-            
+        
         except asyncio.TimeoutError:
             logger.warning("⏱️ LM Studio health check timeout")
             return False
@@ -199,8 +307,9 @@ class LMStudioClient:
             logger.warning(f"⚠️ LM Studio health check failed: {e}")
             return False
     
-    def cleanup(self) -> None:
-        """Limpiar recursos."""
+    async def cleanup(self) -> None:
+        """Cerrar el cliente HTTP (solo si no es compartido)."""
         logger.info("🧹 Cleaning up LMStudio client")
-        # AsyncOpenAI maneja su propio cleanup
+        if self._owns_http_client:
+            await self.client.close()
 
@@ -0,0 +1 @@
+"""Persistence - Stores externos de conversaciones."""
@@ -0,0 +1,327 @@
+"""
+HibernatedConversationStore - Conversaciones frías comprimidas fuera del heap.
+
+Tier de paso para InMemoryConversationStore (spill_store): las sesiones
+que el janitor saca de memoria por inactividad (o por LRU/bytes) se
+serializan a un blob compacto (msgpack, o JSON si msgpack no está
+instalado, comprimido con zlib) que vive en un dict en memoria o en un
+fichero por sesión en disco local.
+
+En el siguiente acceso la conversación se rehidrata, vuelve al hot set y
+el blob se libera: una sesión está en un tier u otro, nunca en los dos.
+
+Los blobs no se guardan para siempre: los que superan max_age se borran
+(janitor o siguiente acceso) y, por encima de max_bytes comprimidos, se
+borran los más antiguos. En disco el índice se reconstruye al arrancar
+a partir de los ficheros (tamaño y mtime).
+"""
+
+import json
+import os
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter, time
+from typing import Any, Optional
+from uuid import UUID
+
+from loguru import logger
+
+from ...application.conversation_store import ConversationStore
+from ...application.session_cache import estimate_size
+from ...domain.conversation import Conversation
+from ...domain.message import Message, ROLE_SYSTEM
+
+
+# Versión del formato del blob (primer campo). La 2 añade versión y época
+# del historial; los blobs de la 1 se siguen leyendo
+FORMAT_VERSION = 2
+
+
+def _load_codec() -> tuple[str, Any, Any]:
+    """msgpack si está instalado (más compacto y rápido); si no, JSON."""
+    try:
+        import msgpack
+    except ImportError:
+        return "json", lambda obj: json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode(), json.loads
+    return "msgpack", msgpack.packb, msgpack.unpackb
+
+
+@dataclass(slots=True)
+class _Blob:
+    resident: int
+    compressed: int
+    # Época Unix (comparable con el mtime de los ficheros tras un reinicio)
+    hibernated_at: float
+
+
+class HibernatedConversationStore(ConversationStore):
+    """
+    Store de conversaciones hibernadas (serializadas y comprimidas).
+    
+    Responsibilities:
+    - Serializar conversaciones a un blob compacto (rol entero, ns, zlib)
+    - Guardarlas en memoria o en disco local (un fichero por sesión)
+    - Rehidratarlas en el siguiente acceso y liberar el blob
+    - Borrar los blobs caducados (max_age) o por encima del presupuesto (max_bytes)
+    - Medir sesiones hibernadas, bytes ahorrados y latencia de rehidratación
+    """
+    
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        compression_level: int = 6,
+        max_age: Optional[float] = None,
+        max_bytes: Optional[int] = None
+    ):
+        """
+        Inicializar store.
+        
+        Args:
+            directory: Directorio para los blobs (None = en memoria del proceso)
+            compression_level: Nivel zlib (1 = rápido, 9 = máximo)
+            max_age: Segundos que se conserva un blob antes de borrarlo (None = siempre)
+            max_bytes: Bytes comprimidos máximos; por encima se borran los más antiguos
+        """
+        self.directory = Path(directory) if directory is not None else None
+        self.compression_level = compression_level
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.codec, self._pack, self._unpack = _load_codec()
+        
+        # session_id -> blob (solo en memoria)
+        self._blobs: dict[UUID, bytes] = {}
+        # Índice de sesiones hibernadas en orden de hibernación (la más antigua primero)
+        self._index: OrderedDict[UUID, _Blob] = OrderedDict()
+        self._compressed = 0
+        
+        self._metrics = {
+            "hibernations": 0,
+            "rehydrations": 0,
+            "rehydrate_total": 0.0,
+            "rehydrate_max": 0.0,
+            "expired": 0,
+            "evicted": 0
+        }
+        
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._load_index()
+            self.evict_expired()
+            self._enforce_budget()
+        
+        logger.info(
+            f"🧊 HibernatedConversationStore initialized: "
+            f"{self.directory or 'memory'}, codec={self.codec}"
+        )
+    
+    @property
+    def blocking(self) -> bool:
+        """En disco, guardar y rehidratar leen y escriben ficheros."""
+        return self.directory is not None
+    
+    def _path(self, session_id: UUID) -> Path:
+        return self.directory / f"{session_id}.bin"
+    
+    def _load_index(self) -> None:
+        """Reconstruir el índice desde los ficheros del directorio (tras un reinicio)."""
+        entries = []
+        for path in self.directory.glob("*.bin"):
+            try:
+                session_id = UUID(path.stem)
+                stat = path.stat()
+            except (ValueError, FileNotFoundError):
+                continue
+            # Sin el tamaño residente original: se cuenta como el comprimido
+            entries.append((stat.st_mtime, session_id, stat.st_size))
+        
+        for mtime, session_id, size in sorted(entries):
+            self._index[session_id] = _Blob(resident=size, compressed=size, hibernated_at=mtime)
+            self._compressed += size
+        
+        # Escrituras interrumpidas por un reinicio
+        for tmp in self.directory.glob("*.tmp"):
+            tmp.unlink(missing_ok=True)
+        
+        if entries:
+            logger.info(f"🧊 Hibernation index rebuilt: {len(entries)} sessions, {self._compressed} bytes")
+    
+    def encode(self, conversation: Conversation) -> bytes:
+        """Serializar y comprimir una conversación."""
+        prompt = conversation.system_prompt
+        turns = [
+            [m.role_code, m.content, m.timestamp_ns]
+            for m in conversation.messages if m.role_code != ROLE_SYSTEM
+        ]
+        payload = [
+            FORMAT_VERSION,
+            conversation.is_active,
+            conversation.max_messages,
+            prompt.text if prompt is not None else None,
+            turns,
+            conversation.version,
+            conversation.epoch
+        ]
+        return zlib.compress(self._pack(payload), self.compression_level)
+    
+    def decode(self, session_id: UUID, blob: bytes) -> Conversation:
+        """Descomprimir y reconstruir una conversación."""
+        version, is_active, max_messages, prompt, turns, *history = self._unpack(zlib.decompress(blob))
+        
+        if version not in (1, FORMAT_VERSION):
+            raise ValueError(f"Unsupported hibernation format: {version}")
+        history_version, epoch = history if history else (None, None)
+        
+        messages = [Message.restore(*turn) for turn in turns]
+        if prompt is not None:
+            messages.insert(0, Message.create_system_message(prompt))
+        
+        return Conversation.restore(
+            session_id=session_id,
+            messages=messages,
+            max_messages=max_messages,
+            is_active=is_active,
+            version=history_version,
+            epoch=epoch
+        )
+    
+    def _read(self, session_id: UUID) -> Optional[bytes]:
+        if self.directory is None:
+            return self._blobs.get(session_id)
+        try:
+            return self._path(session_id).read_bytes()
+        except FileNotFoundError:
+            return None
+    
+    def _drop(self, session_id: UUID) -> bool:
+        """Liberar el blob de una sesión. True si existía."""
+        entry = self._index.pop(session_id, None)
+        if entry is not None:
+            self._compressed -= entry.compressed
+        if self.directory is None:
+            return self._blobs.pop(session_id, None) is not None
+        try:
+            self._path(session_id).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def get(self, session_id: UUID) -> Optional[Conversation]:
+        """Rehidratar una conversación hibernada (y liberar su blob)."""
+        entry = self._index.get(session_id)
+        if entry is not None and self._is_expired(entry, time()):
+            self._drop(session_id)
+            self._metrics["expired"] += 1
+            return None
+        
+        blob = self._read(session_id)
+        if blob is None:
+            return None
+        
+        start = perf_counter()
+        conversation = self.decode(session_id, blob)
+        elapsed = perf_counter() - start
+        
+        self._drop(session_id)
+        
+        m = self._metrics
+        m["rehydrations"] += 1
+        m["rehydrate_total"] += elapsed
+        m["rehydrate_max"] = max(m["rehydrate_max"], elapsed)
+        
+        logger.debug(f"♨️ Rehydrated conversation {session_id} in {elapsed * 1000:.2f}ms")
+        return conversation
+    
+    def save(self, conversation: Conversation) -> None:
+        """Hibernar (o re-hibernar) una conversación."""
+        session_id = conversation.session_id
+        blob = self.encode(conversation)
+        
+        if self.directory is None:
+            self._blobs[session_id] = blob
+        else:
+            # Escritura atómica: nunca queda un blob a medias
+            tmp = self._path(session_id).with_suffix(".tmp")
+            tmp.write_bytes(blob)
+            os.replace(tmp, self._path(session_id))
+        
+        previous = self._index.pop(session_id, None)
+        if previous is not None:
+            self._compressed -= previous.compressed
+        self._index[session_id] = _Blob(estimate_size(conversation), len(blob), time())
+        self._compressed += len(blob)
+        self._metrics["hibernations"] += 1
+        
+        self._enforce_budget()
+    
+    def _is_expired(self, entry: _Blob, now: float) -> bool:
+        return self.max_age is not None and now - entry.hibernated_at > self.max_age
+    
+    def _enforce_budget(self) -> None:
+        """Borrar los blobs más antiguos mientras se supere max_bytes."""
+        if self.max_bytes is None:
+            return
+        
+        evicted = 0
+        while self._compressed > self.max_bytes and self._index:
+            self._drop(next(iter(self._index)))
+            evicted += 1
+        
+        if evicted:
+            self._metrics["evicted"] += evicted
+            logger.info(f"🧊 Dropped {evicted} hibernated sessions over the {self.max_bytes} byte budget")
+    
+    def evict_expired(self) -> int:
+        """
+        Borrar los blobs más antiguos que max_age (llamado por el janitor).
+        
+        Returns:
+            Número de sesiones hibernadas borradas
+        """
+        if self.max_age is None:
+            return 0
+        
+        now = time()
+        expired = 0
+        while self._index:
+            session_id, entry = next(iter(self._index.items()))
+            if not self._is_expired(entry, now):
+                break
+            self._drop(session_id)
+            expired += 1
+        
+        if expired:
+            self._metrics["expired"] += expired
+            logger.info(f"🧊 Deleted {expired} hibernated sessions older than {self.max_age}s")
+        return expired
+    
+    def append(self, conversation: Conversation, message: Message) -> None:
+        """Las conversaciones hibernadas no reciben mensajes: re-hibernar entera."""
+        self.save(conversation)
+    
+    def delete(self, session_id: UUID) -> bool:
+        """Eliminar conversación hibernada. True si existía."""
+        return self._drop(session_id)
+    
+    def session_ids(self) -> list[UUID]:
+        """IDs de las conversaciones hibernadas."""
+        return list(self._index)
+    
+    def get_metrics(self) -> dict:
+        """Sesiones hibernadas, bytes ahorrados, borrados y latencia de rehidratación."""
+        m = self._metrics
+        resident = sum(entry.resident for entry in self._index.values())
+        
+        return {
+            "hibernated_sessions": len(self._index),
+            "codec": self.codec,
+            "compressed_bytes": self._compressed,
+            "bytes_saved": resident - self._compressed,
+            "expired": m["expired"],
+            "evicted": m["evicted"],
+            "hibernations": m["hibernations"],
+            "rehydrations": m["rehydrations"],
+            "rehydrate_avg": round(m["rehydrate_total"] / m["rehydrations"], 5) if m["rehydrations"] else 0.0,
+            "rehydrate_max": round(m["rehydrate_max"], 5)
+        }
@@ -0,0 +1,268 @@
+"""
+RedisConversationStore - Conversaciones compartidas entre workers y nodos.
+
+Habla el protocolo Redis (Redis, Valkey, KeyDB, Dragonfly...) con la API
+de redis-py. Por sesión:
+- {prefix}:{session_id}:msgs  → lista append-only de mensajes (JSON)
+- {prefix}:{session_id}:meta  → hash con version, epoch, is_active, max_messages
+- {prefix}:sessions           → set con todos los session_id
+
+La versión del hash es la de la conversación (la de los ETags): save() la
+escribe y append() la incrementa en la misma transacción, así todos los
+workers ven la misma numeración. Las lecturas pasan por una caché local:
+si la versión en Redis coincide con la cacheada basta un HGET; si no,
+historial y metadatos se leen en un solo pipeline.
+
+Cliente síncrono (redis-py): ConversationService hace las llamadas en su
+thread de store, fuera del event loop. Con idle_ttl, cada escritura
+renueva un EXPIRE en las claves de la sesión y Redis borra las abandonadas.
+"""
+
+import json
+from math import ceil
+from typing import Any, Optional
+from uuid import UUID
+
+from loguru import logger
+
+from ...application.conversation_store import ConversationStore
+from ...application.session_cache import SessionCache
+from ...domain.conversation import Conversation
+from ...domain.message import Message
+
+
+def _text(value: Any) -> str:
+    """redis-py devuelve bytes salvo con decode_responses=True."""
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisConversationStore(ConversationStore):
+    """
+    Store de conversaciones sobre un servidor con protocolo Redis.
+    
+    Responsibilities:
+    - Persistir mensajes con RPUSH (append-only) y versión por sesión
+    - Leer en un único round trip (pipeline) cuando la caché no vale
+    - Mantener una caché local read-through validada por versión
+    - Expirar las sesiones sin escrituras (idle_ttl)
+    """
+    
+    # Cada operación es un round trip de red
+    blocking = True
+    
+    def __init__(
+        self,
+        client: Any,
+        key_prefix: str = "arca:conv",
+        max_cached_sessions: Optional[int] = 10000,
+        idle_ttl: Optional[float] = None
+    ):
+        """
+        Inicializar store.
+        
+        Args:
+            client: Cliente redis-py (redis.Redis) o compatible
+            key_prefix: Prefijo de todas las claves
+            max_cached_sessions: Sesiones en la caché local (LRU, None = sin límite)
+            idle_ttl: Segundos sin escrituras antes de que Redis borre la sesión (None = nunca)
+        """
+        self.client = client
+        self.key_prefix = key_prefix
+        self.idle_ttl = max(1, ceil(idle_ttl)) if idle_ttl else None
+        
+        # Caché local acotada (LRU) + versión de cada conversación cacheada
+        self._cache = SessionCache(max_sessions=max_cached_sessions, on_evict=self._forget_version)
+        self._versions: dict[UUID, int] = {}
+        
+        logger.info(f"🗄️ RedisConversationStore initialized: prefix={key_prefix}")
+    
+    @classmethod
+    def from_url(
+        cls,
+        url: str,
+        key_prefix: str = "arca:conv",
+        max_cached_sessions: Optional[int] = 10000,
+        idle_ttl: Optional[float] = None
+    ) -> "RedisConversationStore":
+        """
+        Crear store conectando a una URL redis:// (requiere `pip install redis`).
+        
+        Args:
+            url: URL del servidor (p.ej. redis://localhost:6379/0)
+            key_prefix: Prefijo de todas las claves
+            max_cached_sessions: Sesiones en la caché local (LRU, None = sin límite)
+            idle_ttl: Segundos sin escrituras antes de que Redis borre la sesión (None = nunca)
+        """
+        import redis
+        
+        return cls(
+            redis.Redis.from_url(url),
+            key_prefix=key_prefix,
+            max_cached_sessions=max_cached_sessions,
+            idle_ttl=idle_ttl
+        )
+    
+    def _meta_key(self, session_id: UUID) -> str:
+        return f"{self.key_prefix}:{session_id}:meta"
+    
+    def _messages_key(self, session_id: UUID) -> str:
+        return f"{self.key_prefix}:{session_id}:msgs"
+    
+    @property
+    def _sessions_key(self) -> str:
+        return f"{self.key_prefix}:sessions"
+    
+    @staticmethod
+    def _encode(message: Message) -> str:
+        return json.dumps(message.to_display_dict(), ensure_ascii=False)
+    
+    @staticmethod
+    def _meta_mapping(conversation: Conversation) -> dict[str, str]:
+        return {
+            "is_active": "1" if conversation.is_active else "0",
+            "max_messages": str(conversation.max_messages or ""),
+            "version": str(conversation.version),
+            "epoch": str(conversation.epoch)
+        }
+    
+    def _expire(self, pipe: Any, session_id: UUID) -> None:
+        """Renovar el TTL de las claves de la sesión (dentro de la transacción)."""
+        if self.idle_ttl is not None:
+            pipe.expire(self._meta_key(session_id), self.idle_ttl)
+            pipe.expire(self._messages_key(session_id), self.idle_ttl)
+    
+    def _forget_version(self, conversation: Conversation, reason: str) -> None:
+        """Callback de expulsión de la caché local."""
+        self._versions.pop(conversation.session_id, None)
+    
+    def _cache_put(self, conversation: Conversation, version: int) -> None:
+        self._versions[conversation.session_id] = version
+        self._cache.put(conversation)
+    
+    def _cache_drop(self, session_id: UUID) -> None:
+        self._cache.pop(session_id)
+        self._versions.pop(session_id, None)
+    
+    def get(self, session_id: UUID) -> Optional[Conversation]:
+        """
+        Obtener conversación (caché local si la versión no cambió).
+        
+        Args:
+            session_id: ID de la sesión
+        
+        Returns:
+            Conversation si existe, None si no
+        """
+        cached = self._cache.get(session_id)
+        
+        if cached is not None:
+            version = self.client.hget(self._meta_key(session_id), "version")
+            if version is None:
+                self._cache_drop(session_id)
+                return None
+            if int(version) == self._versions.get(session_id):
+                return cached
+        
+        # Historial y metadatos en un solo round trip y consistentes entre sí
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hgetall(self._meta_key(session_id))
+        pipe.lrange(self._messages_key(session_id), 0, -1)
+        meta, raw_messages = pipe.execute()
+        
+        if not meta:
+            self._cache_drop(session_id)
+            return None
+        
+        meta = {_text(key): _text(value) for key, value in meta.items()}
+        max_messages = meta.get("max_messages")
+        version = int(meta.get("version", 0))
+        epoch = meta.get("epoch")
+        
+        conversation = Conversation.restore(
+            session_id=session_id,
+            messages=[Message.from_dict(json.loads(_text(raw))) for raw in raw_messages],
+            max_messages=int(max_messages) if max_messages else None,
+            is_active=meta.get("is_active", "1") == "1",
+            version=version,
+            epoch=int(epoch) if epoch is not None else None
+        )
+        
+        self._cache_put(conversation, version)
+        return conversation
+    
+    def save(self, conversation: Conversation) -> None:
+        """Reescribir la conversación completa (creación, limpieza, recortes)."""
+        session_id = conversation.session_id
+        messages = conversation.messages
+        
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(self._messages_key(session_id))
+        if messages:
+            pipe.rpush(self._messages_key(session_id), *(self._encode(m) for m in messages))
+        pipe.hset(self._meta_key(session_id), mapping=self._meta_mapping(conversation))
+        pipe.sadd(self._sessions_key, str(session_id))
+        self._expire(pipe, session_id)
+        pipe.execute()
+        
+        self._cache_put(conversation, conversation.version)
+    
+    def append(self, conversation: Conversation, message: Message) -> None:
+        """Añadir un mensaje al final (RPUSH) e incrementar la versión."""
+        session_id = conversation.session_id
+        
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(self._messages_key(session_id), self._encode(message))
+        pipe.hincrby(self._meta_key(session_id), "version", 1)
+        self._expire(pipe, session_id)
+        _, version, *_ = pipe.execute()
+        
+        # Solo si nadie más escribió: la versión en Redis sigue a la del dominio
+        if (
+            session_id in self._cache
+            and self._versions.get(session_id) == int(version) - 1
+            and conversation.version == int(version)
+        ):
+            self._versions[session_id] = int(version)
+            self._cache.grow(conversation, message)
+        else:
+            # Otro worker escribió entre medias: releer en el próximo get()
+            self._cache_drop(session_id)
+    
+    def delete(self, session_id: UUID) -> bool:
+        """Eliminar conversación. True si existía."""
+        self._cache_drop(session_id)
+        
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(self._meta_key(session_id), self._messages_key(session_id))
+        pipe.srem(self._sessions_key, str(session_id))
+        deleted, _ = pipe.execute()
+        
+        return deleted > 0
+    
+    def session_ids(self) -> list[UUID]:
+        """IDs de todas las conversaciones almacenadas (sin las que Redis ya expiró)."""
+        members = [_text(member) for member in self.client.smembers(self._sessions_key)]
+        if self.idle_ttl is None or not members:
+            return [UUID(member) for member in members]
+        
+        # El set no expira con las sesiones: quitar los IDs cuyo hash ya no existe
+        pipe = self.client.pipeline(transaction=False)
+        for member in members:
+            pipe.exists(self._meta_key(UUID(member)))
+        alive = pipe.execute()
+        
+        expired = [member for member, exists in zip(members, alive) if not exists]
+        if expired:
+            self.client.srem(self._sessions_key, *expired)
+        
+        return [UUID(member) for member, exists in zip(members, alive) if exists]
+    
+    def count(self) -> int:
+        """Número de conversaciones almacenadas."""
+        if self.idle_ttl is not None:
+            return len(self.session_ids())
+        return self.client.scard(self._sessions_key)
+    
+    def get_metrics(self) -> dict:
+        """Ocupación y aciertos de la caché local."""
+        return {"cache": self._cache.stats()}
@@ -0,0 +1,426 @@
+"""
+SqliteConversationStore - Conversaciones duraderas en SQLite (WAL).
+
+Store write-behind: las conversaciones vivas están en memoria y cada cambio
+se encola para un thread escritor que agrupa todo lo pendiente en una sola
+transacción (group commit). La petición nunca espera al fsync.
+
+Tras un reinicio, la primera get_conversation() de una sesión la rehidrata
+desde disco (lazy): arrancar no cuesta nada aunque haya miles de sesiones.
+Rehidratar puede esperar a que se confirmen los cambios en cola de esa
+sesión, así que el store es `blocking` y ConversationService lo llama
+fuera del event loop.
+"""
+
+import queue
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from time import monotonic, sleep
+from typing import Optional
+from uuid import UUID
+
+from loguru import logger
+
+from ...application.conversation_store import ConversationStore
+from ...application.session_cache import SessionCache
+from ...domain.conversation import Conversation
+from ...domain.message import Message
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    session_id TEXT PRIMARY KEY,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    max_messages INTEGER,
+    version INTEGER,
+    epoch INTEGER
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id);
+"""
+
+# Columnas añadidas después de la primera versión del esquema
+MIGRATIONS = {
+    "version": "ALTER TABLE conversations ADD COLUMN version INTEGER",
+    "epoch": "ALTER TABLE conversations ADD COLUMN epoch INTEGER"
+}
+
+# Marca de parada para el thread escritor
+_STOP = object()
+
+
+class SqliteConversationStore(ConversationStore):
+    """
+    Store de conversaciones con persistencia SQLite en modo WAL.
+    
+    Responsibilities:
+    - Servir las conversaciones vivas desde memoria
+    - Persistir cada cambio en background con group commit
+    - Rehidratar sesiones desde disco en el primer acceso
+    - Medir tamaño de lote, latencia de commit y de rehidratación
+    """
+    
+    # get() lee de disco y puede esperar al escritor
+    blocking = True
+    
+    def __init__(
+        self,
+        path: Path,
+        commit_delay: float = 0.01,
+        max_batch: int = 512,
+        max_sessions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        flush_timeout: float = 5.0
+    ):
+        """
+        Abrir (o crear) la base de datos y arrancar el escritor.
+        
+        Args:
+            path: Fichero SQLite
+            commit_delay: Segundos que el escritor espera a más cambios antes
+                          de cada commit (agrupa ráfagas en una transacción)
+            max_batch: Máximo de cambios por transacción
+            max_sessions: Máximo de sesiones vivas en memoria (None = sin límite)
+            max_bytes: Máximo de bytes aproximados en memoria (None = sin límite)
+            idle_ttl: Segundos sin acceso antes de sacar una sesión de memoria
+            flush_timeout: Segundos máximos esperando al escritor antes de rehidratar
+        """
+        self.path = Path(path)
+        self.commit_delay = commit_delay
+        self.max_batch = max_batch
+        self.flush_timeout = flush_timeout
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Conversaciones vivas en este proceso (fuente de verdad mientras existan).
+        # Expulsar una es seguro: ya está en disco o en la cola del escritor
+        self._live = SessionCache(max_sessions=max_sessions, max_bytes=max_bytes, idle_ttl=idle_ttl)
+        
+        # Cambios encolados aún no confirmados, por sesión
+        self._pending: Counter[UUID] = Counter()
+        self._deleted: set[UUID] = set()
+        self._pending_lock = threading.Lock()
+        # El escritor avisa al confirmar cada lote (esperas por sesión en get())
+        self._committed = threading.Condition(self._pending_lock)
+        
+        self._queue: queue.Queue = queue.Queue()
+        
+        self._metrics = {
+            "writes_queued": 0,
+            "writes_committed": 0,
+            "batches": 0,
+            "batch_max": 0,
+            "commit_total": 0.0,
+            "commit_max": 0.0,
+            "write_errors": 0,
+            "rehydrations": 0,
+            "rehydrate_total": 0.0,
+            "rehydrate_max": 0.0
+        }
+        
+        # Conexión de lectura (rehidratación); WAL permite leer mientras se escribe
+        self._reader = self._connect()
+        self._reader.executescript(SCHEMA)
+        self._migrate()
+        self._reader_lock = threading.Lock()
+        
+        self._writer = threading.Thread(target=self._writer_loop, name="sqlite-conversation-writer", daemon=True)
+        self._writer.start()
+        
+        logger.info(f"🗄️ SqliteConversationStore initialized: {self.path} (WAL, group commit)")
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Abrir conexión en modo WAL."""
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # En WAL, NORMAL solo hace fsync en los checkpoints
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+    
+    def _migrate(self) -> None:
+        """Añadir a una base de datos existente las columnas que le falten."""
+        columns = {row[1] for row in self._reader.execute("PRAGMA table_info(conversations)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                self._reader.execute(statement)
+    
+    # === Escritura (write-behind) ===
+    
+    def _enqueue(self, session_id: UUID, operation: tuple) -> None:
+        """Encolar un cambio para el escritor."""
+        with self._committed:
+            self._pending[session_id] += 1
+        self._metrics["writes_queued"] += 1
+        self._queue.put(operation)
+    
+    def _writer_loop(self) -> None:
+        """Thread escritor: agrupa los cambios pendientes en transacciones."""
+        connection = self._connect()
+        stopping = False
+        
+        while not stopping:
+            operation = self._queue.get()
+            if operation is _STOP:
+                break
+            
+            batch = [operation]
+            
+            # Dar tiempo a que lleguen más cambios y agruparlos en un commit
+            if self.commit_delay > 0:
+                sleep(self.commit_delay)
+            
+            while len(batch) < self.max_batch:
+                try:
+                    operation = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if operation is _STOP:
+                    stopping = True
+                    break
+                batch.append(operation)
+            
+            self._write_batch(connection, batch)
+        
+        connection.close()
+    
+    def _write_batch(self, connection: sqlite3.Connection, batch: list[tuple]) -> None:
+        """Aplicar un lote de cambios en una sola transacción."""
+        start = monotonic()
+        
+        try:
+            connection.execute("BEGIN")
+            for operation in batch:
+                self._apply(connection, operation)
+            connection.execute("COMMIT")
+            self._metrics["writes_committed"] += len(batch)
+        except sqlite3.Error as e:
+            connection.execute("ROLLBACK")
+            self._metrics["write_errors"] += len(batch)
+            logger.error(f"❌ Conversation batch write failed ({len(batch)} changes): {e}")
+        
+        elapsed = monotonic() - start
+        self._metrics["batches"] += 1
+        self._metrics["batch_max"] = max(self._metrics["batch_max"], len(batch))
+        self._metrics["commit_total"] += elapsed
+        self._metrics["commit_max"] = max(self._metrics["commit_max"], elapsed)
+        
+        with self._committed:
+            for operation in batch:
+                session_id = operation[1]
+                self._pending[session_id] -= 1
+                if self._pending[session_id] <= 0:
+                    del self._pending[session_id]
+                    self._deleted.discard(session_id)
+            self._committed.notify_all()
+    
+    @staticmethod
+    def _apply(connection: sqlite3.Connection, operation: tuple) -> None:
+        """Ejecutar un cambio (dentro de la transacción del lote)."""
+        kind, session_id = operation[0], str(operation[1])
+        
+        if kind == "append":
+            row, version = operation[2:]
+            connection.execute(
+                "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                (session_id, *row)
+            )
+            connection.execute("UPDATE conversations SET version = ? WHERE session_id = ?", (version, session_id))
+        elif kind == "save":
+            is_active, max_messages, version, epoch, messages = operation[2:]
+            connection.execute(
+                "INSERT INTO conversations (session_id, is_active, max_messages, version, epoch) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET "
+                "is_active = excluded.is_active, max_messages = excluded.max_messages, "
+                "version = excluded.version, epoch = excluded.epoch",
+                (session_id, is_active, max_messages, version, epoch)
+            )
+            connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            connection.executemany(
+                "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                [(session_id, *row) for row in messages]
+            )
+        elif kind == "delete":
+            connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            connection.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+    
+    @staticmethod
+    def _row(message: Message) -> tuple[str, str, str]:
+        return (message.role, message.content, message.timestamp.isoformat())
+    
+    def save(self, conversation: Conversation) -> None:
+        """Guardar la conversación completa (sin esperar a disco)."""
+        session_id = conversation.session_id
+        self._live.put(conversation)
+        
+        self._enqueue(session_id, (
+            "save",
+            session_id,
+            int(conversation.is_active),
+            conversation.max_messages,
+            conversation.version,
+            conversation.epoch,
+            [self._row(m) for m in conversation.messages]
+        ))
+    
+    def append(self, conversation: Conversation, message: Message) -> None:
+        """Encolar un mensaje nuevo (INSERT, sin reescribir el historial)."""
+        self._live.grow(conversation, message)
+        self._enqueue(
+            conversation.session_id,
+            ("append", conversation.session_id, self._row(message), conversation.version)
+        )
+    
+    def delete(self, session_id: UUID) -> bool:
+        """Eliminar conversación de memoria y (en background) de disco."""
+        existed = self._live.pop(session_id) is not None or self._exists_on_disk(session_id)
+        
+        if existed:
+            with self._pending_lock:
+                self._deleted.add(session_id)
+            self._enqueue(session_id, ("delete", session_id))
+        
+        return existed
+    
+    # === Lectura ===
+    
+    def get(self, session_id: UUID) -> Optional[Conversation]:
+        """
+        Obtener conversación (memoria, o rehidratada desde disco).
+        
+        Args:
+            session_id: ID de la sesión
+        
+        Returns:
+            Conversation si existe, None si no
+        
+        Raises:
+            TimeoutError: Si los cambios en cola de la sesión no se confirman a tiempo
+        """
+        conversation = self._live.get(session_id)
+        if conversation is not None:
+            return conversation
+        
+        # Cambios de esta sesión aún en cola: esperar a que lleguen a disco
+        # (solo los suyos, no los de todas las sesiones)
+        with self._committed:
+            if session_id in self._deleted:
+                return None
+            if not self._committed.wait_for(lambda: session_id not in self._pending, self.flush_timeout):
+                raise TimeoutError(f"Pending writes for conversation {session_id} not committed")
+        
+        conversation = self._rehydrate(session_id)
+        if conversation is not None:
+            self._live.put(conversation)
+        return conversation
+    
+    def _rehydrate(self, session_id: UUID) -> Optional[Conversation]:
+        """Cargar una conversación desde disco."""
+        start = monotonic()
+        
+        with self._reader_lock:
+            row = self._reader.execute(
+                "SELECT is_active, max_messages, version, epoch FROM conversations WHERE session_id = ?",
+                (str(session_id),)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            messages = self._reader.execute(
+                "SELECT role, content, timestamp FROM messages WHERE session_id = ? ORDER BY id",
+                (str(session_id),)
+            ).fetchall()
+        
+        conversation = Conversation.restore(
+            session_id=session_id,
+            messages=[
+                Message.from_dict({"role": role, "content": content, "timestamp": timestamp})
+                for role, content, timestamp in messages
+            ],
+            max_messages=row[1],
+            is_active=bool(row[0]),
+            version=row[2],
+            epoch=row[3]
+        )
+        
+        elapsed = monotonic() - start
+        self._metrics["rehydrations"] += 1
+        self._metrics["rehydrate_total"] += elapsed
+        self._metrics["rehydrate_max"] = max(self._metrics["rehydrate_max"], elapsed)
+        
+        logger.debug(f"💧 Rehydrated conversation {session_id}: {len(messages)} messages in {elapsed * 1000:.1f}ms")
+        return conversation
+    
+    def _exists_on_disk(self, session_id: UUID) -> bool:
+        with self._reader_lock:
+            return self._reader.execute(
+                "SELECT 1 FROM conversations WHERE session_id = ?", (str(session_id),)
+            ).fetchone() is not None
+    
+    def session_ids(self) -> list[UUID]:
+        """IDs de todas las conversaciones (en memoria y en disco)."""
+        self.flush()
+        
+        with self._reader_lock:
+            rows = self._reader.execute("SELECT session_id FROM conversations").fetchall()
+        
+        return list({UUID(row[0]) for row in rows} | set(self._live))
+    
+    def evict_expired(self) -> int:
+        """Sacar de memoria las sesiones inactivas (siguen en disco)."""
+        return self._live.evict_expired()
+    
+    # === Ciclo de vida y métricas ===
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Esperar a que el escritor confirme todos los cambios encolados.
+        
+        Args:
+            timeout: Segundos máximos de espera (None = flush_timeout)
+        
+        Returns:
+            True si no queda nada pendiente
+        """
+        with self._committed:
+            return self._committed.wait_for(
+                lambda: not self._pending,
+                self.flush_timeout if timeout is None else timeout
+            )
+    
+    def close(self) -> None:
+        """Confirmar lo pendiente y cerrar la base de datos."""
+        self._queue.put(_STOP)
+        self._writer.join(timeout=10.0)
+        self._reader.close()
+        logger.info(f"🗄️ SqliteConversationStore closed: {self._metrics['writes_committed']} writes committed")
+    
+    def get_metrics(self) -> dict:
+        """Métricas de group commit y rehidratación."""
+        m = self._metrics
+        
+        return {
+            "live_sessions": len(self._live),
+            "cache": self._live.stats(),
+            "queue_depth": self._queue.qsize(),
+            "writes_queued": m["writes_queued"],
+            "writes_committed": m["writes_committed"],
+            "write_errors": m["write_errors"],
+            "batches": m["batches"],
+            "batch_avg": round((m["writes_committed"] + m["write_errors"]) / m["batches"], 2) if m["batches"] else 0.0,
+            "batch_max": m["batch_max"],
+            "commit_avg": round(m["commit_total"] / m["batches"], 5) if m["batches"] else 0.0,
+            "commit_max": round(m["commit_max"], 5),
+            "rehydrations": m["rehydrations"],
+            "rehydrate_avg": round(m["rehydrate_total"] / m["rehydrations"], 5) if m["rehydrations"] else 0.0,
+            "rehydrate_max": round(m["rehydrate_max"], 5)
+        }
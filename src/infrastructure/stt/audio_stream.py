@@ -0,0 +1,195 @@
+"""
+AudioStreamDecoder - Decodificar el audio mientras se sube.
+
+El cuerpo de la petición llega en chunks desde el event loop; un thread
+los lee como si fueran un fichero (sin seek) y PyAV los decodifica y
+remuestrea a PCM mono de 16 kHz (lo que consume Whisper) a medida que
+llegan. Al terminar la subida solo queda decodificar el último chunk:
+sin multipart, sin fichero temporal y sin copia completa del clip.
+
+Los límites de tamaño y duración se comprueban durante la subida: una
+subida que los supera se corta sin leer el resto.
+
+Formatos: los que se pueden leer secuencialmente (WAV, WebM/Matroska,
+OGG, MP3...). MP4/M4A con el índice al final requieren seek y fallan.
+"""
+
+import asyncio
+import io
+import queue
+from concurrent.futures import Executor
+from itertools import chain
+from time import perf_counter
+from typing import TYPE_CHECKING, Optional
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Frecuencia de muestreo que espera Whisper
+WHISPER_SAMPLE_RATE = 16000
+
+# Marcas en la cola de chunks
+_EOF = None
+_ABORT = object()
+
+
+class AudioLimitError(ValueError):
+    """El audio supera el tamaño o la duración máximos."""
+
+
+class _ChunkPipe(io.RawIOBase):
+    """Fichero de solo lectura alimentado con chunks desde otro thread."""
+    
+    def __init__(self):
+        self._chunks: queue.SimpleQueue = queue.SimpleQueue()
+        self._pending = memoryview(b"")
+        self._eof = False
+    
+    def readable(self) -> bool:
+        return True
+    
+    def feed(self, chunk) -> None:
+        self._chunks.put(chunk)
+    
+    def readinto(self, buffer) -> int:
+        if not self._pending:
+            if self._eof:
+                return 0
+            chunk = self._chunks.get()
+            if chunk is _ABORT:
+                raise OSError("Audio upload aborted")
+            if chunk is _EOF:
+                self._eof = True
+                return 0
+            self._pending = memoryview(chunk)
+        
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class AudioStreamDecoder:
+    """
+    Decodificador incremental de una subida de audio.
+    
+    Uso (desde el event loop):
+        decoder = AudioStreamDecoder(max_bytes, max_seconds)
+        decoder.start(executor)
+        for chunk in ...: decoder.feed(chunk)
+        samples = await decoder.finish()
+    """
+    
+    def __init__(
+        self,
+        max_bytes: int,
+        max_seconds: float,
+        sample_rate: int = WHISPER_SAMPLE_RATE
+    ):
+        """
+        Inicializar decodificador.
+        
+        Args:
+            max_bytes: Tamaño máximo de la subida
+            max_seconds: Duración máxima del audio decodificado
+            sample_rate: Frecuencia de salida (Hz)
+        """
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.sample_rate = sample_rate
+        self.received = 0
+        
+        self._pipe = _ChunkPipe()
+        self._future: Optional[asyncio.Future] = None
+        self._closed_at = 0.0
+    
+    def start(self, executor: Executor) -> None:
+        """Arrancar la decodificación en un thread del executor."""
+        self._future = asyncio.get_running_loop().run_in_executor(executor, self._decode)
+    
+    def feed(self, chunk: bytes) -> None:
+        """
+        Entregar un chunk de la subida.
+        
+        Raises:
+            AudioLimitError: Si se supera el tamaño o la duración máxima
+            ValueError: Si el audio ya resultó inválido
+        """
+        if self._future is not None and self._future.done():
+            # El decodificador ya falló (duración, formato): no leer más
+            self._future.result()
+        
+        self.received += len(chunk)
+        if self.received > self.max_bytes:
+            self.abort()
+            raise AudioLimitError(f"Audio exceeds {self.max_bytes} bytes")
+        
+        if chunk:
+            self._pipe.feed(chunk)
+    
+    async def finish(self) -> "np.ndarray":
+        """
+        Cerrar la subida y esperar las últimas muestras.
+        
+        Returns:
+            Audio mono float32 a sample_rate
+        
+        Raises:
+            AudioLimitError: Si el audio supera la duración máxima
+            ValueError: Si el audio está vacío o no se puede decodificar
+        """
+        if self.received == 0:
+            self.abort()
+            raise ValueError("Audio stream is empty")
+        
+        self._closed_at = perf_counter()
+        self._pipe.feed(_EOF)
+        samples = await self._future
+        
+        logger.debug(
+            f"🎧 Streamed audio decoded: {self.received} bytes, "
+            f"{len(samples) / self.sample_rate:.2f}s, "
+            f"{(perf_counter() - self._closed_at) * 1000:.1f}ms after upload end"
+        )
+        return samples
+    
+    def abort(self) -> None:
+        """Cancelar la decodificación (subida cortada o rechazada)."""
+        self._pipe.feed(_ABORT)
+        if self._future is not None:
+            # El resultado ya no interesa: evitar "exception never retrieved"
+            self._future.add_done_callback(lambda future: future.exception())
+    
+    def _decode(self) -> "np.ndarray":
+        import av
+        import numpy as np
+        
+        max_samples = int(self.max_seconds * self.sample_rate)
+        chunks = []
+        total = 0
+        
+        try:
+            with av.open(self._pipe, mode="r") as container:
+                resampler = av.AudioResampler(format="s16", layout="mono", rate=self.sample_rate)
+                
+                # None al final: vaciar el resampler
+                for frame in chain(container.decode(audio=0), (None,)):
+                    for resampled in resampler.resample(frame):
+                        array = resampled.to_ndarray().reshape(-1)
+                        total += array.size
+                        if total > max_samples:
+                            raise AudioLimitError(f"Audio exceeds {self.max_seconds:g} seconds")
+                        chunks.append(array)
+        except AudioLimitError:
+            raise
+        except (av.error.FFmpegError, OSError, IndexError) as e:
+            raise ValueError(f"Invalid audio stream: {e}") from e
+        
+        if not chunks:
+            raise ValueError("Audio stream has no samples")
+        
+        # Mismo formato que faster_whisper.decode_audio: float32 en [-1, 1)
+        return np.concatenate(chunks).astype(np.float32) / 32768.0
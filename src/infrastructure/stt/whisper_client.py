@@ -7,25 +7,75 @@ Implementación optimizada para baja latencia con modelo Whisper local.
 import asyncio
 import os
 import tempfile
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Optional, TYPE_CHECKING, Union
 from concurrent.futures import ThreadPoolExecutor
 
-# IMPORTANTE: Configurar cache ANTES de importar faster-whisper
-# Esto evita problemas de permisos en Windows
-cache_dir = Path("./models/hf_cache").resolve()
-cache_dir.mkdir(parents=True, exist_ok=True)
+from loguru import logger
 
-# Configurar TODAS las variables de HuggingFace para evitar D:\AI\hf_cache
-os.environ["HF_HOME"] = str(cache_dir)
-os.environ["TRANSFORMERS_CACHE"] = str(cache_dir)
-os.environ["HF_HUB_CACHE"] = str(cache_dir)
-os.environ["HUGGINGFACE_HUB_CACHE"] = str(cache_dir)
-os.environ["XDG_CACHE_HOME"] = str(cache_dir.parent)  # Unix-style cache
+from .audio_stream import AudioStreamDecoder
 
-# ruff: noqa: E402 - Imports after cache config (required)
-from faster_whisper import WhisperModel
-from loguru import logger
+if TYPE_CHECKING:
+    # faster-whisper (ctranslate2, av, numpy) tarda ~250 ms en importarse:
+    # se importa al cargar el modelo, no al importar este módulo
+    import numpy as np
+    from faster_whisper import WhisperModel
+
+
+# Cache local de modelos HuggingFace
+MODEL_CACHE_DIR = Path("./models/hf_cache")
+
+
+def configure_model_cache(cache_dir: Path = MODEL_CACHE_DIR) -> Path:
+    """
+    Configurar el cache de HuggingFace (llamar al arrancar, antes de cargar modelos).
+    
+    IMPORTANTE: debe ejecutarse ANTES de importar faster-whisper, que lee
+    estas variables al importarse. Evita problemas de permisos en Windows
+    y caches globales tipo D:\\AI\\hf_cache.
+    
+    Args:
+        cache_dir: Directorio del cache de modelos
+    
+    Returns:
+        Ruta absoluta del cache
+    """
+    cache_dir = cache_dir.resolve()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Configurar TODAS las variables de HuggingFace
+    os.environ["HF_HOME"] = str(cache_dir)
+    os.environ["TRANSFORMERS_CACHE"] = str(cache_dir)
+    os.environ["HF_HUB_CACHE"] = str(cache_dir)
+    os.environ["HUGGINGFACE_HUB_CACHE"] = str(cache_dir)
+    os.environ["XDG_CACHE_HOME"] = str(cache_dir.parent)  # Unix-style cache
+    
+    logger.debug(f"📁 Model cache configured: {cache_dir}")
+    return cache_dir
+
+
+def prefetch_model(model_size: str, cache_dir: Path = MODEL_CACHE_DIR) -> str:
+    """
+    Descargar (si falta) el modelo al cache local sin instanciarlo.
+    
+    Pensado para el proceso padre del modo prefork: los workers solo leen
+    de disco en vez de competir por la misma descarga. No se crea el
+    WhisperModel porque CTranslate2 arranca threads al instanciarlo y
+    esos threads no sobreviven a fork().
+    
+    Args:
+        model_size: Tamaño del modelo (tiny, base, small, medium, large)
+        cache_dir: Directorio del cache de modelos
+    
+    Returns:
+        Ruta local del modelo
+    """
+    from faster_whisper import download_model
+    
+    model_path = download_model(model_size, cache_dir=str(cache_dir.resolve()))
+    logger.info(f"📥 Whisper model '{model_size}' available at {model_path}")
+    return model_path
 
 
 class WhisperSTTClient:
@@ -41,6 +91,7 @@ class WhisperSTTClient:
     # Constantes de configuración de transcripción
     DEFAULT_BEAM_SIZE = 5  # Tamaño del beam para búsqueda (balance entre velocidad y precisión)
     VAD_MIN_SILENCE_MS = 500  # Silencio mínimo en ms para Voice Activity Detection
+    MAX_STREAM_DECODERS = 8  # Subidas en streaming decodificándose a la vez
     
     def __init__(
         self,
@@ -63,60 +114,121 @@ class WhisperSTTClient:
         self.compute_type = compute_type
         
         # El modelo se carga lazy para no bloquear startup
-        self._model: Optional[WhisperModel] = None
+        self._model: Optional["WhisperModel"] = None
+        self._load_lock = threading.Lock()  # Warm-up y primera petición pueden coincidir
         self._executor = ThreadPoolExecutor(max_workers=2)
+        # Pool aparte: una subida lenta bloquea su thread esperando chunks
+        # y no debe dejar sin threads a las transcripciones
+        self._stream_executor = ThreadPoolExecutor(
+            max_workers=self.MAX_STREAM_DECODERS,
+            thread_name_prefix="whisper-stream"
+        )
         
         logger.info(
             f"🔊 WhisperSTT initialized: model={model_size}, "
             f"device={device}, compute={compute_type}"
         )
     
-    def _ensure_model_loaded(self) -> WhisperModel:
+    def _ensure_model_loaded(self) -> "WhisperModel":
         """
         Lazy loading del modelo Whisper.
         
         Carga el modelo solo cuando se necesita por primera vez.
         """
         if self._model is None:
-            logger.info(f"📥 Loading Whisper model '{self.model_size}'...")
-            
-            # Usar cache local explícitamente
-            cache_dir = Path("./models/hf_cache").resolve()
-            
-            self._model = WhisperModel(
-                self.model_size,
-                device=self.device,
-                compute_type=self.compute_type,
-                download_root=str(cache_dir)  # Forzar download en directorio local
-            )
-            
-            logger.info(f"✅ Whisper model '{self.model_size}' loaded successfully")
+            with self._load_lock:
+                if self._model is None:
+                    logger.info(f"📥 Loading Whisper model '{self.model_size}'...")
+                    
+                    from faster_whisper import WhisperModel
+                    
+                    # Usar cache local explícitamente
+                    cache_dir = MODEL_CACHE_DIR.resolve()
+                    
+                    self._model = WhisperModel(
+                        self.model_size,
+                        device=self.device,
+                        compute_type=self.compute_type,
+                        download_root=str(cache_dir)  # Forzar download en directorio local
+                    )
+                    
+                    logger.info(f"✅ Whisper model '{self.model_size}' loaded successfully")
         
         return self._model
     
+    async def warm_up(self) -> None:
+        """
+        Cargar el modelo en background (thread pool) antes de la primera petición.
+        
+        Raises:
+            RuntimeError: Si el modelo no se puede cargar
+        """
+        loop = asyncio.get_event_loop()
+        
+        try:
+            await loop.run_in_executor(self._executor, self._ensure_model_loaded)
+        except Exception as e:
+            raise RuntimeError(f"Whisper model load error: {e}") from e
+    
+    async def decode_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        max_bytes: int,
+        max_seconds: float
+    ) -> "np.ndarray":
+        """
+        Decodificar una subida de audio a medida que llega.
+        
+        Args:
+            chunks: Cuerpo de la petición (p.ej. Request.stream())
+            max_bytes: Tamaño máximo de la subida
+            max_seconds: Duración máxima del audio
+        
+        Returns:
+            Audio mono float32 a 16 kHz, listo para transcribe_audio()
+        
+        Raises:
+            AudioLimitError: Si se supera el tamaño o la duración (se deja de leer)
+            ValueError: Si el audio está vacío o no se puede decodificar
+        """
+        decoder = AudioStreamDecoder(max_bytes, max_seconds)
+        decoder.start(self._stream_executor)
+        
+        try:
+            async for chunk in chunks:
+                decoder.feed(chunk)
+        except BaseException:
+            # Límite superado, audio inválido o cliente desconectado
+            decoder.abort()
+            raise
+        
+        return await decoder.finish()
+    
     async def transcribe_audio(
         self,
-        audio_bytes: bytes,
+        audio_bytes: Union[bytes, "np.ndarray"],
         language: str = "es"
     ) -> str:
         """
         Transcribir audio a texto de forma asíncrona.
         
         Args:
-            audio_bytes: Audio en bytes (WAV, MP3, etc.)
+            audio_bytes: Audio en bytes (WAV, MP3, etc.) o muestras ya
+                         decodificadas por decode_stream()
             language: Código de idioma ISO (es, en, etc.)
-            
+        
         Returns:
             Texto transcrito
-            
+        
         Raises:
             ValueError: Si audio está vacío o corrupto
             RuntimeError: Si transcripción falla
         """
-        if not audio_bytes:
+        if len(audio_bytes) == 0:
             raise ValueError("Audio bytes cannot be empty")
         
-        logger.info(f"🎤 Transcribing audio: {len(audio_bytes)} bytes, language={language}")
+        unit = "bytes" if isinstance(audio_bytes, bytes) else "samples"
+        logger.info(f"🎤 Transcribing audio: {len(audio_bytes)} {unit}, language={language}")
         
         try:
             # Ejecutar transcripción en thread pool (Whisper es CPU-bound)
@@ -130,18 +242,20 @@ class WhisperSTTClient:
             
             logger.info(f"✅ Transcription successful: '{transcribed_text[:50]}...'")
             return transcribed_text
-            
+        
         except Exception as e:
             logger.error(f"❌ Transcription failed: {e}")
             raise RuntimeError(f"Whisper transcription error: {e}") from e
     
-    def _transcribe_sync(self, audio_bytes: bytes, language: str) -> str:
+    def _transcribe_sync(self, audio_bytes: Union[bytes, "np.ndarray"], language: str) -> str:
         """
         Transcripción síncrona (ejecutada en thread pool).
         
-        Guarda audio temporalmente porque faster-whisper requiere archivo.
+        Los bytes se guardan temporalmente porque faster-whisper requiere
+        archivo; las muestras ya decodificadas se pasan directamente.
         """
-        model = self._ensure_model_loaded()
+        if not isinstance(audio_bytes, bytes):
+            return self._transcribe_source(audio_bytes, language)
         
         # Crear archivo temporal para el audio
         with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
@@ -149,29 +263,34 @@ class WhisperSTTClient:
             temp_path = Path(temp_file.name)
         
         try:
-            # Transcribir audio
-            segments, info = model.transcribe(
-                str(temp_path),
-                language=language,
-                beam_size=self.DEFAULT_BEAM_SIZE,
-                vad_filter=True,  # Voice Activity Detection para mejor precisión
-                vad_parameters=dict(min_silence_duration_ms=self.VAD_MIN_SILENCE_MS)
-            )
-            
-            # Combinar todos los segmentos
-            transcribed_text = " ".join(segment.text.strip() for segment in segments)
-            
-            logger.debug(
-                f"Detected language: {info.language} "
-                f"(probability: {info.language_probability:.2f})"
-            )
-            
-            return transcribed_text.strip()
-            
+            return self._transcribe_source(str(temp_path), language)
+        
         finally:
             # Limpiar archivo temporal
             temp_path.unlink(missing_ok=True)
     
+    def _transcribe_source(self, source: Union[str, "np.ndarray"], language: str) -> str:
+        model = self._ensure_model_loaded()
+        
+        # Transcribir audio
+        segments, info = model.transcribe(
+            source,
+            language=language,
+            beam_size=self.DEFAULT_BEAM_SIZE,
+            vad_filter=True,  # Voice Activity Detection para mejor precisión
+            vad_parameters=dict(min_silence_duration_ms=self.VAD_MIN_SILENCE_MS)
+        )
+        
+        # Combinar todos los segmentos
+        transcribed_text = " ".join(segment.text.strip() for segment in segments)
+        
+        logger.debug(
+            f"Detected language: {info.language} "
+            f"(probability: {info.language_probability:.2f})"
+        )
+        
+        return transcribed_text.strip()
+    
     async def transcribe_file(self, file_path: Path, language: str = "es") -> str:
         """
         Transcribir archivo de audio existente.
@@ -179,7 +298,7 @@ class WhisperSTTClient:
         Args:
             file_path: Ruta al archivo de audio
             language: Código de idioma
-            
+        
         Returns:
             Texto transcrito
         """
@@ -190,9 +309,22 @@ class WhisperSTTClient:
         audio_bytes = file_path.read_bytes()
         return await self.transcribe_audio(audio_bytes, language)
     
+    async def probe(self) -> bool:
+        """
+        Sondeo barato de disponibilidad.
+        
+        El modelo se carga bajo demanda en el primer uso y corre en
+        proceso, así que no hay servicio externo que comprobar.
+        
+        Returns:
+            True (STT local siempre disponible)
+        """
+        return True
+    
     def cleanup(self) -> None:
         """Limpiar recursos."""
         logger.info("🧹 Cleaning up WhisperSTT resources")
         self._executor.shutdown(wait=True)
+        self._stream_executor.shutdown(wait=False, cancel_futures=True)
         self._model = None
 
@@ -0,0 +1,163 @@
+"""
+AudioEncoder - Codificación del audio sintetizado para el envío.
+
+espeak genera WAV PCM de 16 bits a 22 kHz (~44 KB por segundo de voz).
+Tras la síntesis, el audio se puede recodificar con PyAV (FFmpeg, ya
+instalado como dependencia de faster-whisper) a:
+- ogg / webm: Opus mono a 24 kbps (~3-4 KB/s con el contenedor)
+- mp3: MP3 mono a 32 kbps (~4 KB/s)
+- wav16k / wav8k: PCM remuestreado a 16 u 8 kHz
+
+Si PyAV no está disponible solo se ofrece wav (sin recodificar).
+"""
+
+import io
+import threading
+import wave
+from dataclasses import dataclass
+from importlib.util import find_spec
+from itertools import chain
+from time import perf_counter
+from typing import Optional
+
+from loguru import logger
+
+
+@dataclass(frozen=True, slots=True)
+class AudioFormat:
+    """Value Object: formato de salida del TTS."""
+    
+    name: str
+    media_type: str
+    container: Optional[str] = None
+    codec: Optional[str] = None
+    sample_rate: Optional[int] = None
+    bit_rate: Optional[int] = None
+
+
+# Formato que genera el TTS (se envía tal cual)
+WAV = AudioFormat("wav", "audio/wav")
+
+AUDIO_FORMATS = {
+    audio_format.name: audio_format for audio_format in (
+        WAV,
+        AudioFormat("ogg", "audio/ogg; codecs=opus", "ogg", "libopus", 24000, 24000),
+        AudioFormat("webm", "audio/webm; codecs=opus", "webm", "libopus", 24000, 24000),
+        AudioFormat("mp3", "audio/mpeg", "mp3", "libmp3lame", 22050, 32000),
+        AudioFormat("wav16k", "audio/wav", "wav", "pcm_s16le", 16000),
+        AudioFormat("wav8k", "audio/wav", "wav", "pcm_s16le", 8000),
+    )
+}
+
+
+def wav_duration(wav_bytes: bytes) -> float:
+    """Segundos de audio de un WAV (0.0 si la cabecera no es válida)."""
+    try:
+        with wave.open(io.BytesIO(wav_bytes)) as reader:
+            return reader.getnframes() / reader.getframerate()
+    except (wave.Error, EOFError, ZeroDivisionError):
+        return 0.0
+
+
+class AudioEncoder:
+    """
+    Recodificador WAV → formato negociado con el cliente.
+    
+    Responsibilities:
+    - Ofrecer los formatos disponibles (según esté instalado PyAV)
+    - Recodificar y remuestrear a mono (síncrono: se ejecuta en el
+      thread pool del cliente TTS)
+    - Medir bytes por segundo de voz y coste de codificación por formato
+    """
+    
+    def __init__(self):
+        """Inicializar encoder (PyAV se importa al codificar por primera vez)."""
+        self.available = find_spec("av") is not None
+        
+        self._lock = threading.Lock()
+        self._metrics: dict[str, dict[str, float]] = {}
+        
+        logger.info(f"🎚️ AudioEncoder initialized: formats={', '.join(self.formats())}")
+    
+    def formats(self) -> list[str]:
+        """Nombres de los formatos disponibles."""
+        return list(AUDIO_FORMATS) if self.available else [WAV.name]
+    
+    def get_format(self, name: str) -> AudioFormat:
+        """
+        Obtener un formato disponible por nombre.
+        
+        Raises:
+            ValueError: Si el formato no existe o requiere PyAV y no está instalado
+        """
+        if name not in self.formats():
+            raise ValueError(f"Unsupported audio format: {name}")
+        return AUDIO_FORMATS[name]
+    
+    def encode(self, wav_bytes: bytes, name: str) -> bytes:
+        """
+        Recodificar el WAV del TTS al formato pedido.
+        
+        Args:
+            wav_bytes: Audio WAV sintetizado
+            name: Nombre del formato (ver AUDIO_FORMATS)
+        
+        Returns:
+            Audio codificado (el mismo WAV si el formato es wav)
+        
+        Raises:
+            ValueError: Si el formato no está disponible
+        """
+        audio_format = self.get_format(name)
+        
+        start = perf_counter()
+        encoded = wav_bytes if audio_format is WAV else self._transcode(wav_bytes, audio_format)
+        elapsed = perf_counter() - start
+        
+        self._record(name, wav_duration(wav_bytes), len(encoded), elapsed)
+        return encoded
+    
+    @staticmethod
+    def _transcode(wav_bytes: bytes, audio_format: AudioFormat) -> bytes:
+        import av
+        
+        output = io.BytesIO()
+        
+        with av.open(io.BytesIO(wav_bytes)) as source, av.open(output, "w", format=audio_format.container) as target:
+            stream = target.add_stream(audio_format.codec, rate=audio_format.sample_rate, layout="mono")
+            if audio_format.bit_rate:
+                stream.bit_rate = audio_format.bit_rate
+            
+            resampler = av.AudioResampler(
+                format=stream.codec_context.format,
+                layout="mono",
+                rate=audio_format.sample_rate
+            )
+            
+            # None al final: vaciar resampler y encoder
+            for frame in chain(source.decode(audio=0), (None,)):
+                for resampled in resampler.resample(frame):
+                    target.mux(stream.encode(resampled))
+            target.mux(stream.encode(None))
+        
+        return output.getvalue()
+    
+    def _record(self, name: str, seconds: float, size: int, elapsed: float) -> None:
+        with self._lock:
+            m = self._metrics.setdefault(name, {"encoded": 0, "seconds": 0.0, "bytes": 0, "encode_total": 0.0})
+            m["encoded"] += 1
+            m["seconds"] += seconds
+            m["bytes"] += size
+            m["encode_total"] += elapsed
+    
+    def get_metrics(self) -> dict:
+        """Por formato: audios codificados, bytes por segundo de voz y coste medio."""
+        with self._lock:
+            return {
+                name: {
+                    "encoded": m["encoded"],
+                    "bytes_per_second": round(m["bytes"] / m["seconds"], 1) if m["seconds"] else 0.0,
+                    "encode_avg": round(m["encode_total"] / m["encoded"], 5)
+                }
+                for name, m in self._metrics.items()
+            }
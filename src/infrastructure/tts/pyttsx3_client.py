@@ -1,18 +1,26 @@
 """
 Pyttsx3TTSClient - Cliente para Text-to-Speech usando pyttsx3.
 
-Implementación async wrapper para pyttsx3 (que es síncrono).
+Implementación async wrapper para pyttsx3 (que es síncrono). El WAV
+sintetizado se recodifica (AudioEncoder) en el mismo thread pool al
+formato pedido por el cliente.
 """
 
 import asyncio
 import tempfile
 from pathlib import Path
-from typing import Optional, Any
+from typing import Optional, Any, TYPE_CHECKING
 from concurrent.futures import ThreadPoolExecutor
 
-import pyttsx3
 from loguru import logger
 
+from .audio_encoder import AudioEncoder
+
+if TYPE_CHECKING:
+    # pyttsx3 se importa al crear el engine (fallback no-Linux), no al
+    # importar este módulo
+    import pyttsx3
+
 
 class Pyttsx3TTSClient:
     """
@@ -31,7 +39,8 @@ class Pyttsx3TTSClient:
         self,
         rate: int,
         volume: float,
-        voice_index: int
+        voice_index: int,
+        encoder: Optional[AudioEncoder] = None
     ):
         """
         Inicializar cliente TTS.
@@ -40,18 +49,20 @@ class Pyttsx3TTSClient:
             rate: Velocidad de habla (palabras por minuto)
             volume: Volumen de la voz (0.0 a 1.0)
             voice_index: Índice de voz del sistema (0=primera disponible)
+            encoder: Recodificador del audio (None = uno por defecto)
         
         Note: Valores vienen de config.py (única fuente de verdad)
         """
         self.rate = rate
         self.volume = volume
         self.voice_index = voice_index
+        self.encoder = encoder if encoder is not None else AudioEncoder()
         
         # ThreadPool para operaciones síncronas
         self._executor = ThreadPoolExecutor(max_workers=2)
         
         # El engine se inicializa lazy
-        self._engine: Optional[pyttsx3.Engine] = None
+        self._engine: Optional["pyttsx3.Engine"] = None
         self._voices: list[Any] = []  # pyttsx3.Voice no exporta tipos
         
         logger.info(
@@ -59,7 +70,7 @@ class Pyttsx3TTSClient:
             f"volume={volume}, voice_index={voice_index}"
         )
     
-    def _ensure_engine_initialized(self) -> pyttsx3.Engine:
+    def _ensure_engine_initialized(self) -> "pyttsx3.Engine":
         """
         Lazy initialization del engine pyttsx3.
         
@@ -67,6 +78,7 @@ class Pyttsx3TTSClient:
         donde se usa, por eso creamos un nuevo engine cada vez.
         """
         import platform
+        import pyttsx3
         
         # En Linux/Docker, usar espeak explícitamente
         try:
@@ -117,22 +129,26 @@ class Pyttsx3TTSClient:
         
         Args:
             text: Texto para convertir a voz
-            output_format: Formato de audio (wav o mp3)
-            
+            output_format: Formato de audio (ver AudioEncoder.formats())
+        
         Returns:
             Audio sintetizado en bytes
-            
+        
         Raises:
-            ValueError: Si texto está vacío
+            ValueError: Si texto está vacío o el formato no está disponible
             RuntimeError: Si síntesis falla
         """
         if not text.strip():
             raise ValueError("Text cannot be empty")
         
+        self.encoder.get_format(output_format)
+        
         logger.info(f"🎙️ Synthesizing speech: '{text[:50]}...'")
         
         try:
-            # Ejecutar síntesis en thread pool
+            # Ejecutar síntesis en thread pool. Si el turno se cancela
+            # mientras el trabajo sigue en cola, el future del executor se
+            # cancela también y la síntesis no llega a ejecutarse
             loop = asyncio.get_event_loop()
             audio_bytes = await loop.run_in_executor(
                 self._executor,
@@ -143,14 +159,27 @@ class Pyttsx3TTSClient:
             
             logger.info(f"✅ Speech synthesized: {len(audio_bytes)} bytes")
             return audio_bytes
-            
+        
+        except asyncio.CancelledError:
+            logger.info("🛑 Speech synthesis cancelled")
+            raise
         except Exception as e:
             logger.error(f"❌ Speech synthesis failed: {e}")
             raise RuntimeError(f"TTS synthesis error: {e}") from e
     
     def _synthesize_sync(self, text: str, output_format: str) -> bytes:
         """
-        Síntesis síncrona (ejecutada en thread pool).
+        Síntesis + codificación síncronas (ejecutadas en thread pool).
+        
+        Args:
+            text: Texto para convertir a voz
+            output_format: Formato de salida del AudioEncoder
+        """
+        return self.encoder.encode(self._synthesize_wav(text), output_format)
+    
+    def _synthesize_wav(self, text: str) -> bytes:
+        """
+        Síntesis síncrona a WAV.
         
         pyttsx3 guarda en archivo, luego leemos los bytes.
         """
@@ -176,11 +205,11 @@ class Pyttsx3TTSClient:
                     # Leer bytes del archivo
                     audio_bytes = temp_path.read_bytes()
                     return audio_bytes
-                    
+                
                 finally:
                     # Limpiar archivo temporal
                     temp_path.unlink(missing_ok=True)
-                    
+            
             except Exception as e:
                 logger.warning(f"espeak direct call failed: {e}, falling back to pyttsx3")
                 # Fallback a pyttsx3
@@ -189,8 +218,7 @@ class Pyttsx3TTSClient:
         engine = self._ensure_engine_initialized()
         
         # Crear archivo temporal para guardar audio
-        suffix = f".{output_format}"
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
             temp_path = Path(temp_file.name)
         
         try:
@@ -202,7 +230,7 @@ class Pyttsx3TTSClient:
             audio_bytes = temp_path.read_bytes()
             
             return audio_bytes
-            
+        
         finally:
             # Limpiar archivo temporal
             temp_path.unlink(missing_ok=True)
@@ -238,6 +266,8 @@ class Pyttsx3TTSClient:
         Returns:
             Lista de voces con id, name, languages
         """
+        import pyttsx3
+        
         engine = pyttsx3.init()
         voices = engine.getProperty('voices')
         
@@ -253,9 +283,43 @@ class Pyttsx3TTSClient:
         engine.stop()
         return voice_list
     
+    async def warm_up(self) -> None:
+        """
+        Sintetizar una frase corta para arrancar el thread pool y que espeak
+        cargue sus datos de voz antes de la primera petición real.
+        """
+        await self.synthesize_speech("Hola")
+    
+    async def probe(self) -> bool:
+        """
+        Sondeo barato: comprobar que espeak responde (sin sintetizar).
+        
+        En Windows/Mac pyttsx3 usa el motor del sistema, que no tiene
+        una comprobación barata: se asume disponible.
+        
+        Returns:
+            True si el motor TTS está disponible
+        """
+        import platform
+        
+        if platform.system() != 'Linux':
+            return True
+        
+        try:
+            process = await asyncio.create_subprocess_exec(
+                'espeak', '--version',
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+        except FileNotFoundError:
+            logger.debug("espeak not found")
+            return False
+        
+        return await process.wait() == 0
+    
     async def health_check(self) -> bool:
         """
-        Verificar que TTS está funcional.
+        Verificación profunda: sintetiza audio real (cara, bajo demanda).
         
         Returns:
             True si puede sintetizar audio
@@ -269,7 +333,7 @@ class Pyttsx3TTSClient:
             
             logger.info("✅ TTS health check passed")
             return True
-            
+        
         except asyncio.TimeoutError:
             logger.warning("⏱️ TTS health check timeout")
             return False
@@ -277,6 +341,13 @@ class Pyttsx3TTSClient:
             logger.warning(f"⚠️ TTS health check failed: {e}")
             return False
     
+    def get_metrics(self) -> dict:
+        """Formatos de salida disponibles y métricas de codificación por formato."""
+        return {
+            "formats": self.encoder.formats(),
+            "encoding": self.encoder.get_metrics()
+        }
+    
     def cleanup(self) -> None:
         """Limpiar recursos."""
         logger.info("🧹 Cleaning up Pyttsx3TTS resources")
@@ -170,6 +170,16 @@ def mock_voice_service_for_api(mock_stt_client, mock_llm_client, mock_tts_client
         "tts": True
     })
     
+    # Mock get_health_snapshot (instantánea cacheada del monitor)
+    service.get_health_snapshot = Mock(return_value={
+        "overall": True,
+        "stt": True,
+        "llm": True,
+        "tts": True,
+        "checked_at": 1700000000.0,
+        "age": 1.0
+    })
+    
     # Mock process_voice_input
     service.process_voice_input = AsyncMock(return_value={
         "session_id": "test-session-id",
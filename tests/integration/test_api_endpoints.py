@@ -5,13 +5,23 @@ Requires FastAPI app to be running.
 Uses httpx for async HTTP testing.
 """
 
+import asyncio
+import json
 import pytest
 from httpx import AsyncClient, ASGITransport
+from unittest.mock import AsyncMock, Mock
 from uuid import uuid4
 import io
 
 from src.api.main import app
 import src.api.main as main_module
+from src.api import voice_envelope
+from src.api.routes import voice_routes
+from src.application.voice_assistant_service import TurnCancelledError
+from src.application.conversation_service import SessionBusyError
+from src.application.idempotency import IdempotencyKeyReusedError
+from src.application.rate_limiter import RateLimiter
+from src.infrastructure.llm.lm_studio_client import LLMUnavailableError
 
 
 @pytest.fixture
@@ -62,6 +72,44 @@ class TestHealthEndpoint:
         assert "tts" in components
 
 
+class TestProbeEndpoints:
+    """Tests for liveness and readiness endpoints."""
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_liveness(self, client):
+        """Test that liveness does not depend on components."""
+        response = await client.get("/health/live")
+        
+        assert response.status_code == 200
+        assert response.json()["status"] == "alive"
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_readiness_before_warm_up(self, client):
+        """Test that readiness is 503 while components are warming up."""
+        response = await client.get("/health/ready")
+        
+        assert response.status_code == 503
+        data = response.json()
+        assert data["ready"] is False
+        assert data["components"]["stt"]["status"] == "pending"
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_readiness_after_warm_up(self, client, mock_voice_service_for_api):
+        """Test that readiness is 200 with per-component timings once warm."""
+        mock_voice_service_for_api.stt.warm_up = AsyncMock()
+        mock_voice_service_for_api.llm.prefill_prompt = AsyncMock(return_value=0.01)
+        mock_voice_service_for_api.tts.warm_up = AsyncMock()
+        await mock_voice_service_for_api.warm_up()
+        
+        response = await client.get("/health/ready")
+        
+        assert response.status_code == 200
+        assert response.json()["components"]["llm"]["duration"] is not None
+
+
 class TestRootEndpoint:
     """Tests for root endpoint."""
     
@@ -88,6 +136,26 @@ class TestVoiceHealthEndpoint:
         
         assert "status" in data
         assert "components" in data
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_voice_health_uses_cached_snapshot(self, client, mock_voice_service_for_api):
+        """Test that the default health check does not run the deep check."""
+        response = await client.get("/api/voice/health")
+        
+        assert response.status_code == 200
+        assert response.json()["age"] == 1.0
+        mock_voice_service_for_api.health_check.assert_not_called()
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_voice_health_deep_check(self, client, mock_voice_service_for_api):
+        """Test that ?deep=true runs the full health check."""
+        response = await client.get("/api/voice/health", params={"deep": "true"})
+        
+        assert response.status_code == 200
+        assert response.json()["deep"] is True
+        mock_voice_service_for_api.health_check.assert_awaited_once()
 
 
 class TestTextProcessEndpoint:
@@ -171,6 +239,119 @@ class TestConversationEndpoints:
         assert response.status_code in [200, 404]
 
 
+class TestConversationHistorySync:
+    """Tests for delta polling, ETags and NDJSON on the history endpoint."""
+    
+    @pytest.fixture
+    def conversation(self, mock_voice_service_for_api):
+        conversation = mock_voice_service_for_api.conversations.create_conversation()
+        conversation.add_user_message("Hola")
+        conversation.add_assistant_message("¿Qué tal?")
+        return conversation
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_unchanged_history_returns_304(self, client, conversation):
+        """Test that polling with the last ETag skips the body."""
+        url = f"/api/conversation/{conversation.session_id}"
+        
+        response = await client.get(url)
+        assert response.status_code == 200
+        assert response.json()["message_count"] == 3
+        etag = response.headers["etag"]
+        
+        response = await client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        
+        conversation.add_user_message("Sigo aquí")
+        response = await client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_etag_does_not_match_another_page(self, client, conversation):
+        """Test that a different since or limit gets a body, not a 304."""
+        url = f"/api/conversation/{conversation.session_id}"
+        etag = (await client.get(url, params={"limit": 1})).headers["etag"]
+        
+        same = await client.get(url, params={"limit": 1}, headers={"If-None-Match": etag})
+        wider = await client.get(url, params={"limit": 3}, headers={"If-None-Match": etag})
+        later = await client.get(url, params={"limit": 1, "since": 1}, headers={"If-None-Match": etag})
+        
+        assert same.status_code == 304
+        assert wider.status_code == 200
+        assert wider.json()["message_count"] == 3
+        assert later.status_code == 200
+        assert later.json()["messages"][0]["content"] == "Hola"
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_delta_since_cursor(self, client, conversation):
+        """Test that since returns only messages after the cursor."""
+        url = f"/api/conversation/{conversation.session_id}"
+        first = (await client.get(url)).json()
+        
+        conversation.add_user_message("Nuevo")
+        response = await client.get(url, params={"since": first["next_cursor"]})
+        data = response.json()
+        
+        assert [m["content"] for m in data["messages"]] == ["Nuevo"]
+        assert data["next_cursor"] == data["total"] == 4
+        assert data["reset"] is False
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_delta_after_clear_resets(self, client, conversation):
+        """Test that a delta after a clear resends the history from the start."""
+        url = f"/api/conversation/{conversation.session_id}"
+        first = await client.get(url)
+        
+        conversation.clear_history()
+        conversation.add_user_message("Otra vez")
+        conversation.add_assistant_message("Claro")
+        conversation.add_user_message("Gracias")
+        
+        response = await client.get(
+            url,
+            params={"since": first.json()["next_cursor"]},
+            headers={"If-None-Match": first.headers["etag"]}
+        )
+        data = response.json()
+        
+        assert data["reset"] is True
+        assert data["message_count"] == 4
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_pagination(self, client, conversation):
+        """Test that limit pages through the history."""
+        url = f"/api/conversation/{conversation.session_id}"
+        
+        data = (await client.get(url, params={"limit": 2})).json()
+        assert data["message_count"] == 2
+        assert data["has_more"] is True
+        
+        data = (await client.get(url, params={"limit": 2, "since": data["next_cursor"]})).json()
+        assert [m["content"] for m in data["messages"]] == ["¿Qué tal?"]
+        assert data["has_more"] is False
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_ndjson_stream(self, client, conversation):
+        """Test that the history streams as NDJSON with its own ETag."""
+        url = f"/api/conversation/{conversation.session_id}"
+        
+        response = await client.get(url, headers={"Accept": "application/x-ndjson"})
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert lines[0]["message_count"] == 3
+        assert [m["role"] for m in lines[1:]] == ["system", "user", "assistant"]
+        assert response.headers["etag"] != (await client.get(url)).headers["etag"]
+
+
 class TestVoiceProcessEndpoint:
     """Tests for /api/voice/process endpoint (with mocked audio)."""
     
@@ -232,6 +413,271 @@ class TestVoiceProcessEndpoint:
         assert response.status_code in [400, 422, 500]
 
 
+class TestVoiceResponseFormats:
+    """Tests for Accept-negotiated /api/voice/process responses."""
+    
+    @pytest.fixture
+    def voice_turn(self, mock_voice_service_for_api):
+        mock_voice_service_for_api.process_voice_input = AsyncMock(return_value=(
+            "¿Qué hora es?",
+            "Son las diez y cuarto.",
+            b"RIFF fake wav",
+            {"total": 1.0, "stt": 0.2, "llm": 0.5, "tts": 0.3}
+        ))
+    
+    async def _post(self, client, accept=None):
+        headers = {"Accept": accept} if accept else {}
+        return await client.post(
+            "/api/voice/process",
+            files={"audio": ("test.wav", io.BytesIO(b"audio"), "audio/wav")},
+            headers=headers
+        )
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_default_keeps_header_format(self, client, voice_turn):
+        """Test that clients without Accept still get audio + base64 headers."""
+        response = await self._post(client)
+        
+        assert response.headers["content-type"] == "audio/wav"
+        assert response.content == b"RIFF fake wav"
+        assert "X-Response-Text" in response.headers
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_frame_format(self, client, voice_turn):
+        """Test that the binary frame carries text and audio in the body."""
+        response = await self._post(client, accept=voice_envelope.FRAME_MEDIA_TYPE)
+        meta, audio = voice_envelope.decode_frame(response.content)
+        
+        assert response.headers["content-type"] == voice_envelope.FRAME_MEDIA_TYPE
+        assert "X-Response-Text" not in response.headers
+        assert meta["response_text"] == "Son las diez y cuarto."
+        assert meta["session_id"] == response.headers["X-Session-ID"]
+        assert audio == b"RIFF fake wav"
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_audio_format_from_accept(self, client, voice_turn, mock_voice_service_for_api):
+        """Test that audio/* in Accept selects the TTS codec and media type."""
+        mock_voice_service_for_api.get_audio_formats = Mock(return_value={
+            "wav": "audio/wav",
+            "ogg": "audio/ogg; codecs=opus"
+        })
+        
+        response = await self._post(client, accept="audio/ogg, audio/wav;q=0.5")
+        
+        assert response.headers["content-type"] == "audio/ogg; codecs=opus"
+        call = mock_voice_service_for_api.process_voice_input.call_args
+        assert call.kwargs["audio_format"] == "ogg"
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_unknown_audio_format_returns_400(self, client, voice_turn, mock_voice_service_for_api):
+        """Test that an unavailable audio_format is rejected before the pipeline."""
+        response = await client.post(
+            "/api/voice/process",
+            files={"audio": ("test.wav", io.BytesIO(b"audio"), "audio/wav")},
+            data={"audio_format": "flac"}
+        )
+        
+        assert response.status_code == 400
+        mock_voice_service_for_api.process_voice_input.assert_not_called()
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_multipart_format(self, client, voice_turn):
+        """Test that multipart/mixed is served when preferred."""
+        response = await self._post(client, accept="multipart/mixed")
+        
+        assert response.headers["content-type"].startswith("multipart/mixed; boundary=")
+        assert "Son las diez y cuarto.".encode() in response.content
+        assert "Accept" in response.headers["vary"]
+
+
+class TestVoiceStreamEndpoint:
+    """Tests for raw-body uploads to /api/voice/stream."""
+    
+    @pytest.fixture
+    def voice_turn(self, mock_voice_service_for_api):
+        mock_voice_service_for_api.decode_voice_stream = AsyncMock(return_value=b"pcm samples")
+        mock_voice_service_for_api.process_voice_input = AsyncMock(return_value=(
+            "¿Qué hora es?",
+            "Son las diez y cuarto.",
+            b"RIFF fake wav",
+            {"total": 1.0, "stt": 0.2, "llm": 0.5, "tts": 0.3}
+        ))
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_raw_body_runs_voice_turn(self, client, voice_turn, mock_voice_service_for_api):
+        """Test that decoded samples go through the voice pipeline."""
+        session_id = str(uuid4())
+        response = await client.post(
+            f"/api/voice/stream?session_id={session_id}",
+            content=b"webm bytes",
+            headers={"Content-Type": "audio/webm;codecs=opus", "Accept": voice_envelope.FRAME_MEDIA_TYPE}
+        )
+        meta, audio = voice_envelope.decode_frame(response.content)
+        
+        assert response.status_code == 200
+        assert meta["session_id"] == session_id
+        assert audio == b"RIFF fake wav"
+        call = mock_voice_service_for_api.process_voice_input.call_args
+        assert call.kwargs["audio_bytes"] == b"pcm samples"
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_unsupported_content_type_returns_415(self, client, voice_turn, mock_voice_service_for_api):
+        """Test that non-audio bodies are rejected before reading them."""
+        response = await client.post(
+            "/api/voice/stream",
+            content=b"{}",
+            headers={"Content-Type": "application/json"}
+        )
+        
+        assert response.status_code == 415
+        mock_voice_service_for_api.decode_voice_stream.assert_not_called()
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_declared_size_over_limit_returns_413(self, client, voice_turn, mock_voice_service_for_api):
+        """Test that a Content-Length above the limit is rejected up front."""
+        mock_voice_service_for_api.stream_max_bytes = 8
+        
+        response = await client.post(
+            "/api/voice/stream",
+            content=b"0123456789",
+            headers={"Content-Type": "application/octet-stream"}
+        )
+        
+        assert response.status_code == 413
+        mock_voice_service_for_api.decode_voice_stream.assert_not_called()
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_streamed_size_over_limit_returns_413(self, client, mock_voice_service_for_api):
+        """Test that chunked uploads are cut off once they exceed the limit."""
+        pytest.importorskip("av")
+        mock_voice_service_for_api.stream_max_bytes = 1024
+        
+        async def body():
+            for _ in range(8):
+                yield b"\0" * 512
+        
+        response = await client.post(
+            "/api/voice/stream",
+            content=body(),
+            headers={"Content-Type": "audio/wav"}
+        )
+        
+        assert response.status_code == 413
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_invalid_audio_returns_400(self, client, mock_voice_service_for_api):
+        """Test that an undecodable body is a client error."""
+        pytest.importorskip("av")
+        
+        response = await client.post(
+            "/api/voice/stream",
+            content=b"not audio at all" * 64,
+            headers={"Content-Type": "application/octet-stream"}
+        )
+        
+        assert response.status_code == 400
+
+
+class TestIdempotencyKey:
+    """Tests for the Idempotency-Key header on turn endpoints."""
+    
+    @pytest.fixture
+    def voice_turn(self, mock_voice_service_for_api):
+        mock_voice_service_for_api.process_voice_input = AsyncMock(return_value=(
+            "¿Qué hora es?",
+            "Son las diez y cuarto.",
+            b"RIFF fake wav",
+            {"total": 1.0, "stt": 0.2, "llm": 0.5, "tts": 0.3}
+        ))
+    
+    async def _post(self, client, key):
+        return await client.post(
+            "/api/voice/process",
+            files={"audio": ("test.wav", io.BytesIO(b"audio"), "audio/wav")},
+            headers={"Idempotency-Key": key}
+        )
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_retry_without_session_id_reuses_session(self, client, voice_turn, mock_voice_service_for_api):
+        """Test that the key is forwarded and retries land in the same session."""
+        first = await self._post(client, "retry-abc")
+        retry = await self._post(client, "retry-abc")
+        
+        assert first.headers["X-Session-ID"] == retry.headers["X-Session-ID"]
+        call = mock_voice_service_for_api.process_voice_input.call_args
+        assert call.kwargs["idempotency_key"] == "retry-abc"
+    
+    def test_derived_session_is_scoped_by_client(self):
+        """Test that two clients sending the same key do not share a conversation."""
+        first = voice_routes._parse_session_id(None, "1", "10.0.0.1")
+        
+        assert voice_routes._parse_session_id(None, "1", "10.0.0.1") == first
+        assert voice_routes._parse_session_id(None, "1", "10.0.0.2") != first
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_oversized_key_returns_400(self, client, voice_turn, mock_voice_service_for_api):
+        """Test that keys longer than the limit are rejected."""
+        response = await self._post(client, "k" * (voice_routes.IDEMPOTENCY_KEY_MAX_LENGTH + 1))
+        
+        assert response.status_code == 400
+        mock_voice_service_for_api.process_voice_input.assert_not_called()
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_reused_key_returns_422(self, client, mock_voice_service_for_api):
+        """Test that a key reused with a different request maps to 422."""
+        mock_voice_service_for_api.process_text_input = AsyncMock(
+            side_effect=IdempotencyKeyReusedError("Idempotency-Key 'k' was already used")
+        )
+        
+        response = await client.post(
+            "/api/text/process",
+            json={"text": "Hola"},
+            headers={"Idempotency-Key": "k"}
+        )
+        
+        assert response.status_code == 422
+
+
+class TestRateLimiting:
+    """Tests for per-session and per-client turn quotas."""
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_exhausted_quota_returns_429(self, client, mock_voice_service_for_api):
+        """Test that turns beyond the quota get 429 with Retry-After."""
+        mock_voice_service_for_api.rate_limiter = RateLimiter(session_rate=0.1, session_burst=1, client_rate=0)
+        session_id = str(uuid4())
+        
+        first = await client.post("/api/text/process", json={"text": "Hola", "session_id": session_id})
+        second = await client.post("/api/text/process", json={"text": "Hola", "session_id": session_id})
+        
+        assert first.status_code != 429
+        assert second.status_code == 429
+        assert int(second.headers["Retry-After"]) >= 1
+        assert mock_voice_service_for_api.get_metrics()["rate_limit"]["rejected"]["session"] == 1
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_stage_queues_in_metrics(self, client):
+        """Test that per-stage queue metrics are exposed."""
+        response = await client.get("/api/voice/metrics")
+        
+        assert set(response.json()["stages"]) == {"stt", "llm", "tts"}
+
+
 class TestCORS:
     """Tests for CORS configuration."""
     
@@ -260,6 +706,9 @@ class TestCORS:
         # Should allow custom headers to be read
         # (Actual testing would require browser environment)
         assert response.status_code == 200
+        exposed = response.headers["access-control-expose-headers"]
+        assert "X-Latency-Lock-Wait" in exposed
+        assert "X-Latency-Queue-Wait" in exposed
 
 
 class TestErrorHandling:
@@ -290,4 +739,72 @@ class TestErrorHandling:
         response = await client.post("/health")
         
         assert response.status_code == 405
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_llm_unavailable_returns_503(self, client, mock_voice_service_for_api):
+        """Test that an unavailable LLM maps to 503 with Retry-After."""
+        cause = LLMUnavailableError("circuit open", retry_after=4.2)
+        error = RuntimeError("Text processing error: circuit open")
+        error.__cause__ = cause
+        mock_voice_service_for_api.process_text_input = AsyncMock(side_effect=error)
+        
+        response = await client.post("/api/text/process", json={"text": "Hola"})
+        
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "5"
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_barged_in_turn_returns_409(self, client, mock_voice_service_for_api):
+        """Test that a turn cancelled by barge-in maps to 409."""
+        mock_voice_service_for_api.process_text_input = AsyncMock(
+            side_effect=TurnCancelledError("Turn cancelled by barge-in")
+        )
+        
+        response = await client.post("/api/text/process", json={"text": "Hola"})
+        
+        assert response.status_code == 409
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_busy_session_returns_409(self, client, mock_voice_service_for_api):
+        """Test that a rejected concurrent turn maps to 409."""
+        mock_voice_service_for_api.process_text_input = AsyncMock(
+            side_effect=SessionBusyError("Session already has a turn in progress")
+        )
+        
+        response = await client.post("/api/text/process", json={"text": "Hola"})
+        
+        assert response.status_code == 409
+
+
+class TestCancellation:
+    """Tests for barge-in and client disconnect handling."""
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_barge_in_endpoint(self, client):
+        """Test barge-in endpoint when no turn is in flight."""
+        session_id = uuid4()
+        
+        response = await client.post(f"/api/voice/barge-in/{session_id}")
+        
+        assert response.status_code == 200
+        assert response.json() == {"session_id": str(session_id), "cancelled": False}
+    
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_disconnect_cancels_work(self, monkeypatch):
+        """Test that the pipeline is cancelled once the client disconnects."""
+        monkeypatch.setattr(voice_routes, "DISCONNECT_POLL_INTERVAL", 0.01)
+        request = Mock()
+        request.is_disconnected = AsyncMock(return_value=True)
+        work = asyncio.create_task(asyncio.Event().wait())
+        
+        with pytest.raises(voice_routes.ClientDisconnectedError):
+            await voice_routes._cancel_on_disconnect(request, work)
+        
+        assert work.cancelled()
+
 
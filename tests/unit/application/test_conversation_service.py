@@ -5,11 +5,17 @@ Tests:
 - Service orchestration
 - Multiple conversation management
 - Repository-like behavior
+- Per-session turn locks
+- Blocking stores called off the event loop
 """
 
+import asyncio
+import threading
+
 import pytest
 from uuid import uuid4
-from src.application.conversation_service import ConversationService
+from src.application.conversation_service import ConversationService, SessionBusyError
+from src.application.conversation_store import InMemoryConversationStore
 from src.domain.conversation import Conversation
 
 
@@ -315,3 +321,120 @@ class TestActiveConversationsCount:
         service.delete_conversation(conv2.session_id)
         assert service.get_active_conversations_count() == 0
 
+
+
+class TestTurnLocks:
+    """Tests for per-session turn serialization."""
+    
+    async def test_same_session_turns_are_serialized(self):
+        """Test that a second turn waits and reports its lock wait."""
+        service = ConversationService()
+        session_id = uuid4()
+        order = []
+        
+        async def turn(name, hold):
+            async with service.turn_lock(session_id) as wait:
+                order.append(name)
+                await asyncio.sleep(hold)
+                return wait
+        
+        first = asyncio.create_task(turn("first", 0.05))
+        await asyncio.sleep(0)
+        second_wait = await turn("second", 0)
+        
+        assert await first == pytest.approx(0, abs=0.01)
+        assert order == ["first", "second"]
+        assert second_wait >= 0.04
+        assert service.get_turn_metrics()["waited"] == 1
+    
+    async def test_different_sessions_run_concurrently(self):
+        """Test that locks of different sessions never block each other."""
+        service = ConversationService()
+        both_inside = asyncio.Barrier(2)
+        
+        async def turn(session_id):
+            async with service.turn_lock(session_id):
+                await asyncio.wait_for(both_inside.wait(), timeout=1.0)
+        
+        await asyncio.gather(turn(uuid4()), turn(uuid4()))
+    
+    async def test_reject_policy_raises_when_busy(self):
+        """Test that the reject policy fails fast instead of queueing."""
+        service = ConversationService(turn_policy="reject")
+        session_id = uuid4()
+        
+        async with service.turn_lock(session_id):
+            with pytest.raises(SessionBusyError):
+                async with service.turn_lock(session_id):
+                    pass
+        
+        assert service.get_turn_metrics()["rejected"] == 1
+    
+    async def test_lock_table_does_not_grow(self):
+        """Test that idle sessions leave no entry in the weak lock table."""
+        service = ConversationService()
+        
+        for _ in range(100):
+            async with service.turn_lock(uuid4()):
+                pass
+        
+        assert service.get_turn_metrics()["locked_sessions"] == 0
+    
+    def test_invalid_policy_raises(self):
+        """Test that unknown policies are rejected."""
+        with pytest.raises(ValueError):
+            ConversationService(turn_policy="drop")
+
+
+class ThreadRecordingStore(InMemoryConversationStore):
+    """In-memory store that declares blocking I/O and records the calling threads."""
+    
+    blocking = True
+    
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+    
+    def get(self, session_id):
+        self.threads.add(threading.current_thread().name)
+        return super().get(session_id)
+    
+    def append(self, conversation, message):
+        self.threads.add(threading.current_thread().name)
+        super().append(conversation, message)
+
+
+class TestAsyncAccess:
+    """Tests for the event-loop facade over the store."""
+    
+    async def test_blocking_store_runs_off_the_loop(self):
+        """Test that a blocking store is never called on the event loop thread."""
+        store = ThreadRecordingStore()
+        service = ConversationService(store=store)
+        session_id = uuid4()
+        
+        await service.aget_or_create_conversation(session_id)
+        conversation = await service.aadd_user_message(session_id, "Hola")
+        await service.aadd_assistant_message(session_id, "¿Qué tal?")
+        service.close()
+        
+        assert conversation.message_count == 3
+        assert store.threads and threading.current_thread().name not in store.threads
+    
+    async def test_memory_store_stays_on_the_loop(self):
+        """Test that the default store is called inline (no thread hop)."""
+        service = ConversationService()
+        session_id = uuid4()
+        
+        await service.aget_or_create_conversation(session_id)
+        await service.aadd_user_message(session_id, "Hola")
+        assert await service.adiscard_unanswered_user_message(session_id) is True
+        await service.aclear_conversation(session_id, keep_system=False)
+        
+        assert (await service.aget_conversation(session_id)).message_count == 0
+        assert service._io_executor is None
+    
+    async def test_missing_conversation_raises(self):
+        """Test that adding to an unknown session fails like the sync API."""
+        with pytest.raises(ValueError):
+            await ConversationService().aadd_user_message(uuid4(), "Hola")
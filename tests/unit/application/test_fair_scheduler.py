@@ -0,0 +1,123 @@
+"""
+Tests for FairScheduler (Application Layer).
+
+Tests:
+- Slot limits per stage
+- Round-robin dispatch among sessions, grouped by client
+- Cancellation while queued
+- Per-session queue metrics (hashed session keys)
+"""
+
+import asyncio
+
+import pytest
+
+from src.application.fair_scheduler import FairScheduler, _metric_key
+
+
+async def _hold(scheduler: FairScheduler, key: str, order: list, release: asyncio.Event):
+    """Take a slot, record the order and keep it until release is set."""
+    async with scheduler.slot(key):
+        order.append(key)
+        await release.wait()
+
+
+class TestFairScheduler:
+    """Tests for slot allocation."""
+    
+    async def test_free_slot_has_no_wait(self):
+        """Test that requests run immediately while slots are free."""
+        scheduler = FairScheduler("stt", slots=2)
+        
+        async with scheduler.slot("a") as wait:
+            assert wait == 0.0
+            assert scheduler.get_metrics()["active"] == 1
+        
+        assert scheduler.get_metrics()["active"] == 0
+    
+    async def test_round_robin_across_sessions(self):
+        """Test that a chatty session does not starve the others."""
+        scheduler = FairScheduler("llm", slots=1)
+        order = []
+        
+        async def run(key):
+            async with scheduler.slot(key):
+                order.append(key)
+                await asyncio.sleep(0)
+        
+        await asyncio.gather(*(run(key) for key in ("a", "a", "a", "b", "c")))
+        
+        assert order == ["a", "a", "b", "c", "a"]
+    
+    async def test_sessions_of_one_client_share_its_turn(self):
+        """Test that a client with many sessions gets one turn per round."""
+        scheduler = FairScheduler("llm", slots=1)
+        order = []
+        
+        async def run(key, client):
+            async with scheduler.slot(key, client):
+                order.append(key)
+                await asyncio.sleep(0)
+        
+        await asyncio.gather(
+            *(run(key, "10.0.0.1") for key in ("a1", "a1", "a2", "a3")),
+            run("b1", "10.0.0.2"),
+            run("b1", "10.0.0.2")
+        )
+        
+        assert order == ["a1", "a1", "b1", "a2", "b1", "a3"]
+    
+    async def test_sessions_behind_one_address_are_round_robin(self):
+        """Test that users sharing an IP (proxy, NAT) alternate instead of FIFO."""
+        scheduler = FairScheduler("llm", slots=1)
+        order = []
+        
+        async def run(key):
+            async with scheduler.slot(key, "10.0.0.1"):
+                order.append(key)
+                await asyncio.sleep(0)
+        
+        await asyncio.gather(*(run(key) for key in ("a", "a", "a", "b", "c")))
+        
+        assert order == ["a", "a", "b", "c", "a"]
+    
+    async def test_queue_metrics_per_session(self):
+        """Test that pending requests and waits are reported per hashed session."""
+        scheduler = FairScheduler("tts", slots=1)
+        release = asyncio.Event()
+        order = []
+        
+        tasks = [asyncio.create_task(_hold(scheduler, key, order, release)) for key in ("a", "b", "b")]
+        await asyncio.sleep(0)
+        
+        metrics = scheduler.get_metrics()
+        assert metrics["active"] == 1
+        assert metrics["queued"] == 2
+        assert list(metrics["sessions"]) == [_metric_key("b")]
+        assert metrics["sessions"][_metric_key("b")]["queued"] == 2
+        assert metrics["sessions"][_metric_key("b")]["wait"] >= 0.0
+        
+        release.set()
+        await asyncio.gather(*tasks)
+        assert scheduler.get_metrics()["queued_total"] == 2
+    
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Test that a cancelled request does not keep a slot or a queue entry."""
+        scheduler = FairScheduler("stt", slots=1)
+        release = asyncio.Event()
+        order = []
+        
+        holder = asyncio.create_task(_hold(scheduler, "a", order, release))
+        waiter = asyncio.create_task(_hold(scheduler, "b", order, release))
+        await asyncio.sleep(0)
+        
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        release.set()
+        await holder
+        
+        metrics = scheduler.get_metrics()
+        assert order == ["a"]
+        assert metrics["active"] == 0
+        assert metrics["queued"] == 0
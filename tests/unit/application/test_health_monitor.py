@@ -0,0 +1,125 @@
+"""
+Tests for HealthMonitor (Application Layer).
+
+Tests:
+- Parallel probing with timeouts
+- Cached snapshots
+- Background refresh lifecycle
+"""
+
+import asyncio
+from time import monotonic
+
+from src.application.health_monitor import HealthMonitor
+
+
+def _probe(result: bool = True, delay: float = 0.0):
+    """Build a probe coroutine function."""
+    async def probe():
+        await asyncio.sleep(delay)
+        return result
+    return probe
+
+
+class TestSnapshot:
+    """Tests for cached snapshots."""
+    
+    def test_snapshot_before_first_probe(self):
+        """Test that nothing is reported healthy before probing."""
+        monitor = HealthMonitor({"stt": _probe(), "llm": _probe()})
+        
+        snapshot = monitor.snapshot()
+        
+        assert snapshot["overall"] is False
+        assert snapshot["checked_at"] is None
+        assert snapshot["details"]["llm"]["error"] == "not checked yet"
+    
+    async def test_overall_ignores_non_critical(self):
+        """Test that a failing TTS does not make the service unhealthy."""
+        monitor = HealthMonitor({"stt": _probe(), "llm": _probe(), "tts": _probe(False)})
+        
+        snapshot = await monitor.refresh()
+        
+        assert snapshot["overall"] is True
+        assert snapshot["tts"] is False
+        assert snapshot["details"]["tts"]["error"] == "probe failed"
+    
+    async def test_snapshot_does_not_probe(self):
+        """Test that reading the snapshot never runs the probes."""
+        calls = []
+        
+        async def probe():
+            calls.append(1)
+            return True
+        
+        monitor = HealthMonitor({"llm": probe}, critical=("llm",))
+        await monitor.refresh()
+        
+        for _ in range(5):
+            assert monitor.snapshot()["llm"] is True
+        
+        assert len(calls) == 1
+
+
+class TestProbing:
+    """Tests for probe execution."""
+    
+    async def test_probes_run_in_parallel(self):
+        """Test that probes run concurrently, not one after another."""
+        monitor = HealthMonitor({name: _probe(delay=0.1) for name in ("stt", "llm", "tts")})
+        
+        start = monotonic()
+        await monitor.refresh()
+        
+        assert monotonic() - start < 0.25
+    
+    async def test_slow_probe_times_out(self):
+        """Test that a hanging probe is reported down after the timeout."""
+        monitor = HealthMonitor(
+            {"stt": _probe(), "llm": _probe(delay=1.0)},
+            probe_timeout=0.05
+        )
+        
+        snapshot = await monitor.refresh()
+        
+        assert snapshot["llm"] is False
+        assert "timeout" in snapshot["details"]["llm"]["error"]
+    
+    async def test_probe_exception_is_captured(self):
+        """Test that a raising probe is reported down with its error."""
+        async def broken():
+            raise ConnectionError("refused")
+        
+        monitor = HealthMonitor({"llm": broken}, critical=("llm",))
+        
+        snapshot = await monitor.refresh()
+        
+        assert snapshot["overall"] is False
+        assert snapshot["details"]["llm"]["error"] == "refused"
+
+
+class TestLifecycle:
+    """Tests for the background refresh loop."""
+    
+    async def test_background_refresh(self):
+        """Test that the monitor keeps refreshing on its interval."""
+        state = {"up": False}
+        
+        async def probe():
+            return state["up"]
+        
+        monitor = HealthMonitor({"llm": probe}, critical=("llm",), interval=0.05)
+        await monitor.start()
+        await asyncio.sleep(0.01)
+        assert monitor.snapshot()["llm"] is False
+        assert monitor.snapshot()["checked_at"] is not None
+        
+        state["up"] = True
+        await asyncio.sleep(0.15)
+        
+        assert monitor.snapshot()["llm"] is True
+        await monitor.stop()
+    
+    async def test_stop_without_start(self):
+        """Test that stopping an idle monitor is a no-op."""
+        await HealthMonitor({"llm": _probe()}).stop()
@@ -0,0 +1,164 @@
+"""
+Tests for IdempotencyCache (Application Layer).
+
+Tests:
+- Retries joining the in-flight turn
+- Replaying completed results within the TTL
+- Failures and cancellations are not cached
+- Key reuse with a different request
+- Bounded size (keys and bytes)
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from src.application.idempotency import IdempotencyCache, IdempotencyKeyReusedError
+
+
+def _turn(calls: list, result="ok", delay: float = 0.0, error: Exception = None):
+    """Build a turn factory that records each execution."""
+    async def turn():
+        calls.append(result)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+    return lambda: turn()
+
+
+class TestDeduplication:
+    """Tests for running each keyed turn once."""
+    
+    async def test_retry_joins_in_flight_turn(self):
+        """Test that concurrent retries share the first execution."""
+        cache = IdempotencyCache()
+        calls = []
+        
+        results = await asyncio.gather(
+            cache.run("k1", ("fp",), _turn(calls, delay=0.05)),
+            cache.run("k1", ("fp",), _turn(calls, delay=0.05))
+        )
+        
+        assert results == ["ok", "ok"]
+        assert len(calls) == 1
+        assert cache.get_metrics()["joined"] == 1
+    
+    async def test_completed_result_is_replayed(self):
+        """Test that a retry after completion gets the cached result."""
+        cache = IdempotencyCache()
+        calls = []
+        
+        await cache.run("k1", ("fp",), _turn(calls))
+        result = await cache.run("k1", ("fp",), _turn(calls, result="second"))
+        
+        assert result == "ok"
+        assert len(calls) == 1
+        assert cache.get_metrics()["replayed"] == 1
+    
+    async def test_expired_result_runs_again(self):
+        """Test that results are forgotten after the TTL."""
+        cache = IdempotencyCache(ttl=10.0)
+        calls = []
+        
+        await cache.run("k1", ("fp",), _turn(calls))
+        with patch("src.application.idempotency.monotonic", return_value=float("1e12")):
+            await cache.run("k1", ("fp",), _turn(calls))
+        
+        assert len(calls) == 2
+    
+    async def test_expired_results_behind_in_flight_turn_are_evicted(self):
+        """Test that a long in-flight turn at the head does not pin expired results."""
+        cache = IdempotencyCache(ttl=10.0)
+        calls = []
+        
+        slow = asyncio.create_task(cache.run("k1", ("fp",), _turn(calls, delay=0.05)))
+        await asyncio.sleep(0)
+        await cache.run("k2", ("fp",), _turn(calls))
+        
+        with patch("src.application.idempotency.monotonic", return_value=float("1e12")):
+            assert "k2" not in cache
+            assert "k1" in cache
+        await slow
+    
+    async def test_different_request_with_same_key_raises(self):
+        """Test that a key reused with another payload is rejected."""
+        cache = IdempotencyCache()
+        
+        await cache.run("k1", ("fp",), _turn([]))
+        
+        with pytest.raises(IdempotencyKeyReusedError):
+            await cache.run("k1", ("other",), _turn([]))
+        assert cache.get_metrics()["conflicts"] == 1
+
+
+class TestFailures:
+    """Tests for failed and cancelled turns."""
+    
+    async def test_failure_is_not_cached(self):
+        """Test that a retry after an error executes the turn again."""
+        cache = IdempotencyCache()
+        calls = []
+        
+        with pytest.raises(RuntimeError):
+            await cache.run("k1", ("fp",), _turn(calls, error=RuntimeError("LLM down")))
+        await asyncio.sleep(0)
+        result = await cache.run("k1", ("fp",), _turn(calls))
+        
+        assert result == "ok"
+        assert len(calls) == 2
+    
+    async def test_waiter_cancellation_keeps_turn_running(self):
+        """Test that a disconnected first request does not cancel the turn."""
+        cache = IdempotencyCache()
+        calls = []
+        
+        first = asyncio.create_task(cache.run("k1", ("fp",), _turn(calls, delay=0.05)))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        
+        result = await cache.run("k1", ("fp",), _turn(calls))
+        
+        assert result == "ok"
+        assert len(calls) == 1
+
+
+class TestBounds:
+    """Tests for the bounded key map."""
+    
+    async def test_oldest_keys_are_evicted(self):
+        """Test that the map never exceeds max_keys."""
+        cache = IdempotencyCache(max_keys=2)
+        calls = []
+        
+        for key in ("k1", "k2", "k3"):
+            await cache.run(key, ("fp",), _turn(calls))
+        await cache.run("k1", ("fp",), _turn(calls))
+        
+        assert cache.get_metrics()["keys"] == 2
+        assert len(calls) == 4
+    
+    async def test_byte_budget_evicts_oldest_results(self):
+        """Test that stored results stay under max_bytes."""
+        cache = IdempotencyCache(max_bytes=10, sizeof=len)
+        calls = []
+        
+        await cache.run("k1", ("fp",), _turn(calls, result="x" * 6))
+        await cache.run("k2", ("fp",), _turn(calls, result="y" * 6))
+        
+        assert "k1" not in cache
+        assert "k2" in cache
+        assert cache.get_metrics()["bytes"] == 6
+    
+    async def test_oversized_result_is_not_kept(self):
+        """Test that a result larger than the budget is returned but not cached."""
+        cache = IdempotencyCache(max_bytes=4, sizeof=len)
+        calls = []
+        
+        result = await cache.run("k1", ("fp",), _turn(calls, result="big audio"))
+        await cache.run("k1", ("fp",), _turn(calls, result="big audio"))
+        
+        assert result == "big audio"
+        assert len(calls) == 2
+        assert cache.get_metrics()["oversized"] == 2
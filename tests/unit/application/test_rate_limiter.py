@@ -0,0 +1,101 @@
+"""
+Tests for RateLimiter (Application Layer).
+
+Tests:
+- Burst and refill of per-session and per-client token buckets
+- Retry-After hints on rejection
+- Rejections do not consume the other bucket
+- Bounded bucket map
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from src.application.rate_limiter import RateLimitedError, RateLimiter, TokenBucketLimiter
+
+
+CLOCK = "src.application.rate_limiter.monotonic"
+
+
+class TestTokenBuckets:
+    """Tests for burst and refill."""
+    
+    def test_burst_then_reject_with_retry_after(self):
+        """Test that a session gets its burst and then a retry hint."""
+        limiter = RateLimiter(session_rate=0.5, session_burst=2, client_rate=0)
+        
+        with patch(CLOCK, return_value=100.0):
+            limiter.acquire("s1")
+            limiter.acquire("s1")
+            with pytest.raises(RateLimitedError) as error:
+                limiter.acquire("s1")
+        
+        assert error.value.retry_after == pytest.approx(2.0)
+        assert limiter.get_metrics()["rejected"]["session"] == 1
+    
+    def test_tokens_refill_over_time(self):
+        """Test that the bucket refills at the configured rate."""
+        limiter = RateLimiter(session_rate=1.0, session_burst=1, client_rate=0)
+        
+        with patch(CLOCK, return_value=100.0):
+            limiter.acquire("s1")
+        with patch(CLOCK, return_value=101.0):
+            limiter.acquire("s1")
+        
+        assert limiter.get_metrics()["allowed"] == 2
+    
+    def test_sessions_are_independent(self):
+        """Test that one session's quota does not affect another."""
+        limiter = RateLimiter(session_rate=1.0, session_burst=1, client_rate=0)
+        
+        with patch(CLOCK, return_value=100.0):
+            limiter.acquire("s1")
+            limiter.acquire("s2")
+    
+    def test_zero_rate_disables_limit(self):
+        """Test that rate 0 means unlimited."""
+        limiter = RateLimiter(session_rate=0, client_rate=0)
+        
+        for _ in range(100):
+            limiter.acquire("s1", "10.0.0.1")
+
+
+class TestClientLimit:
+    """Tests for the per-IP bucket."""
+    
+    def test_client_limit_spans_sessions(self):
+        """Test that many sessions from one IP share the client quota."""
+        limiter = RateLimiter(session_rate=1.0, session_burst=5, client_rate=1.0, client_burst=2)
+        
+        with patch(CLOCK, return_value=100.0):
+            limiter.acquire("s1", "10.0.0.1")
+            limiter.acquire("s2", "10.0.0.1")
+            with pytest.raises(RateLimitedError):
+                limiter.acquire("s3", "10.0.0.1")
+            limiter.acquire("s3", "10.0.0.2")
+        
+        assert limiter.get_metrics()["rejected"]["client"] == 1
+    
+    def test_rejection_does_not_consume_session_tokens(self):
+        """Test that a turn rejected by IP keeps the session's tokens."""
+        limiter = RateLimiter(session_rate=1.0, session_burst=1, client_rate=1.0, client_burst=1)
+        
+        with patch(CLOCK, return_value=100.0):
+            limiter.acquire("s1", "10.0.0.1")
+            with pytest.raises(RateLimitedError):
+                limiter.acquire("s2", "10.0.0.1")
+            limiter.acquire("s2", "10.0.0.2")
+
+
+class TestBounds:
+    """Tests for the bounded bucket map."""
+    
+    def test_least_recently_used_buckets_are_evicted(self):
+        """Test that the number of buckets stays under max_keys."""
+        limiter = TokenBucketLimiter(rate=1.0, burst=1, max_keys=2)
+        
+        for key in ("a", "b", "c"):
+            limiter.wait_time(key, 100.0)
+        
+        assert len(limiter) == 2
@@ -0,0 +1,209 @@
+"""
+Tests for SessionCache and the bounded in-memory store (Application Layer).
+
+Tests:
+- LRU eviction by session count and by bytes
+- Idle TTL eviction
+- Sessions with a turn in flight are never evicted
+- Spill to a persistence backend instead of dropping
+- Background janitor
+"""
+
+import asyncio
+
+import pytest
+
+from src.application.conversation_service import ConversationService
+from src.application.conversation_store import InMemoryConversationStore
+from src.application.session_cache import SessionCache, estimate_size
+from src.domain.conversation import Conversation
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestSessionCacheLimits:
+    """Tests for count, bytes and TTL limits."""
+    
+    def test_lru_eviction_by_session_count(self):
+        """Test that the least recently used session is evicted first."""
+        evicted = []
+        cache = SessionCache(max_sessions=2, on_evict=lambda conv, reason: evicted.append((conv, reason)))
+        first, second, third = Conversation(), Conversation(), Conversation()
+        
+        cache.put(first)
+        cache.put(second)
+        cache.get(first.session_id)  # first is now most recent
+        cache.put(third)
+        
+        assert second.session_id not in cache
+        assert first.session_id in cache and third.session_id in cache
+        assert evicted == [(second, "lru")]
+        assert cache.stats()["evictions"]["lru"] == 1
+    
+    def test_eviction_by_bytes(self):
+        """Test that sessions are evicted until the byte budget fits."""
+        conversation = Conversation()
+        conversation.add_user_message("x" * 1000)
+        budget = estimate_size(conversation) + 10
+        
+        cache = SessionCache(max_bytes=budget)
+        cache.put(conversation)
+        
+        newer = Conversation()
+        newer.add_user_message("y" * 1000)
+        cache.put(newer)
+        
+        assert conversation.session_id not in cache
+        assert cache.total_bytes <= budget
+        assert cache.stats()["evictions"]["bytes"] == 1
+    
+    def test_grow_tracks_appended_messages(self):
+        """Test that appends are accounted without re-measuring the history."""
+        cache = SessionCache()
+        conversation = Conversation()
+        cache.put(conversation)
+        
+        conversation.add_user_message("Hola")
+        cache.grow(conversation, conversation.get_last_user_message())
+        
+        assert cache.total_bytes == estimate_size(conversation)
+    
+    def test_idle_ttl_eviction(self):
+        """Test that only sessions idle beyond the TTL are evicted."""
+        clock = FakeClock()
+        cache = SessionCache(idle_ttl=60.0, clock=clock)
+        idle, busy = Conversation(), Conversation()
+        cache.put(idle)
+        cache.put(busy)
+        
+        clock.now += 45
+        cache.get(busy.session_id)
+        clock.now += 30
+        
+        assert cache.evict_expired() == 1
+        assert idle.session_id not in cache
+        assert busy.session_id in cache
+        assert cache.stats()["evictions"]["ttl"] == 1
+    
+    def test_pinned_sessions_are_skipped(self):
+        """Test that LRU, byte and TTL eviction pass over pinned sessions."""
+        clock = FakeClock()
+        cache = SessionCache(max_sessions=1, idle_ttl=60.0, clock=clock)
+        pinned, other = Conversation(), Conversation()
+        
+        cache.put(pinned)
+        cache.pin(pinned.session_id)
+        cache.put(other)
+        clock.now += 120
+        cache.evict_expired()
+        
+        assert pinned.session_id in cache
+        assert other.session_id not in cache
+        
+        cache.unpin(pinned.session_id)
+        cache.put(Conversation())
+        assert pinned.session_id not in cache
+    
+    def test_pop_is_not_an_eviction(self):
+        """Test that explicit removal does not count or notify."""
+        evicted = []
+        cache = SessionCache(on_evict=lambda conv, reason: evicted.append(conv))
+        conversation = Conversation()
+        cache.put(conversation)
+        
+        assert cache.pop(conversation.session_id) is conversation
+        assert cache.total_bytes == 0
+        assert evicted == []
+
+
+class TestBoundedInMemoryStore:
+    """Tests for the bounded in-memory conversation store."""
+    
+    def test_evicted_sessions_are_dropped_without_spill(self):
+        """Test that memory stays bounded when sessions keep arriving."""
+        service = ConversationService(store=InMemoryConversationStore(max_sessions=3))
+        
+        for _ in range(10):
+            service.create_conversation()
+        
+        assert service.get_active_conversations_count() == 3
+        assert service.store.get_metrics()["evictions"]["lru"] == 7
+    
+    def test_evicted_sessions_spill_and_come_back(self):
+        """Test that spilled sessions are restored on next access."""
+        spill = InMemoryConversationStore()
+        service = ConversationService(store=InMemoryConversationStore(max_sessions=1, spill_store=spill))
+        
+        first = service.create_conversation()
+        service.add_user_message(first.session_id, "Recuérdame")
+        service.create_conversation()
+        
+        assert spill.get(first.session_id) is first
+        
+        restored = service.get_conversation(first.session_id)
+        
+        assert restored is first
+        assert restored.get_last_user_message().content == "Recuérdame"
+        assert service.store.get_metrics()["spilled"] == 2
+    
+    async def test_session_in_turn_survives_eviction(self):
+        """Test that new sessions cannot evict one between its question and answer."""
+        service = ConversationService(store=InMemoryConversationStore(max_sessions=1))
+        first = service.create_conversation()
+        
+        async with service.turn_lock(first.session_id):
+            await service.aadd_user_message(first.session_id, "Hola")
+            second = service.create_conversation()
+            await service.aadd_assistant_message(first.session_id, "Hola!")
+        
+        assert first.message_count == 3
+        assert second.session_id not in service.store.session_ids()
+        
+        service.create_conversation()
+        assert service.get_conversation(first.session_id) is None
+    
+    def test_delete_reaches_spill_store(self):
+        """Test that deleting a spilled session removes it everywhere."""
+        spill = InMemoryConversationStore()
+        service = ConversationService(store=InMemoryConversationStore(max_sessions=1, spill_store=spill))
+        
+        first = service.create_conversation()
+        service.create_conversation()
+        
+        assert service.delete_conversation(first.session_id) is True
+        assert service.get_conversation(first.session_id) is None
+
+
+class TestJanitor:
+    """Tests for the background idle-session janitor."""
+    
+    @pytest.mark.asyncio
+    async def test_janitor_evicts_idle_sessions(self):
+        """Test that the janitor task evicts sessions past the idle TTL."""
+        service = ConversationService(store=InMemoryConversationStore(idle_ttl=0.01))
+        conversation = service.create_conversation()
+        
+        await service.start_janitor(interval=0.02)
+        try:
+            await asyncio.sleep(0.1)
+        finally:
+            await service.stop_janitor()
+        
+        assert service.get_conversation(conversation.session_id) is None
+        assert service.store.get_metrics()["evictions"]["ttl"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_stop_janitor_is_idempotent(self):
+        """Test that stopping a janitor that never started is a no-op."""
+        service = ConversationService()
+        
+        await service.stop_janitor()
+        assert service.evict_idle_conversations() == 0
@@ -0,0 +1,411 @@
+"""
+Tests for VoiceAssistantService (Application Layer).
+
+Tests:
+- KV cache prefill concurrent with STT
+- Barge-in and cancellation of in-flight turns
+- Turn serialization per session (queue, coalesce, reject)
+- Idempotency-Key deduplication of retried turns
+- Fair queuing of stages by session, grouped by client
+- Background warm-up and readiness
+"""
+
+import asyncio
+import json
+from time import monotonic
+from uuid import uuid4
+
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from src.application.conversation_service import ConversationService, SessionBusyError
+from src.application.fair_scheduler import FairScheduler
+from src.application.idempotency import IdempotencyKeyReusedError
+from src.application.rate_limiter import RateLimitedError, RateLimiter
+from src.application.voice_assistant_service import VoiceAssistantService, TurnCancelledError
+
+
+@pytest.fixture
+def prefill_service(mock_stt_client, mock_llm_client, mock_tts_client, conversation_service):
+    """Fixture: VoiceAssistantService with prefill enabled."""
+    mock_llm_client.prefill_prompt = AsyncMock(return_value=0.05)
+    
+    return VoiceAssistantService(
+        stt_client=mock_stt_client,
+        llm_client=mock_llm_client,
+        tts_client=mock_tts_client,
+        conversation_service=conversation_service,
+        enable_prefill=True,
+        prefill_max_wait=1.0
+    )
+
+
+class TestPrefill:
+    """Tests for KV cache prefill while STT runs."""
+    
+    async def test_prefill_disabled_by_default(self, voice_assistant_service, session_id):
+        """Test that prefill is not sent unless enabled."""
+        voice_assistant_service.llm.prefill_prompt = AsyncMock()
+        
+        await voice_assistant_service.process_voice_input(b"audio", session_id)
+        
+        voice_assistant_service.llm.prefill_prompt.assert_not_called()
+    
+    async def test_prefill_runs_concurrently_with_stt(self, prefill_service, session_id):
+        """Test that prefill is in flight while STT is transcribing."""
+        prefill_started = asyncio.Event()
+        
+        async def slow_prefill(messages, session_id=None):
+            prefill_started.set()
+            return 0.01
+        
+        async def transcribe(audio_bytes, language):
+            # STT only finishes once the prefill request has been dispatched
+            await asyncio.wait_for(prefill_started.wait(), timeout=1.0)
+            return "Hola"
+        
+        prefill_service.llm.prefill_prompt = AsyncMock(side_effect=slow_prefill)
+        prefill_service.stt.transcribe_audio = AsyncMock(side_effect=transcribe)
+        
+        transcribed, _, _, latency = await prefill_service.process_voice_input(b"audio", session_id)
+        
+        assert transcribed == "Hola"
+        assert latency["prefill"] == 0.01
+    
+    async def test_prefill_prefix_is_byte_identical(self, prefill_service, session_id):
+        """Test that the prefilled history is an exact prefix of the real prompt."""
+        await prefill_service.process_voice_input(b"audio", session_id)
+        await prefill_service.process_voice_input(b"audio", session_id)
+        
+        prefilled = prefill_service.llm.prefill_prompt.call_args.args[0]
+        sent = prefill_service.llm.generate_response.call_args.args[0]
+        
+        assert len(sent) == len(prefilled) + 1
+        assert json.dumps(sent[:len(prefilled)]) == json.dumps(prefilled)
+        assert sent[-1] == {"role": "user", "content": "Test transcription"}
+    
+    async def test_prefill_failure_does_not_break_turn(self, prefill_service, session_id):
+        """Test that a failing prefill is ignored."""
+        prefill_service.llm.prefill_prompt = AsyncMock(side_effect=RuntimeError("down"))
+        
+        _, response_text, _, latency = await prefill_service.process_voice_input(b"audio", session_id)
+        
+        assert response_text == "Test response"
+        assert latency["prefill"] == 0.0
+
+
+def _block_llm(service: VoiceAssistantService) -> asyncio.Event:
+    """Make the LLM hang until cancelled; returns an event set once it is called."""
+    started = asyncio.Event()
+    
+    async def hang(messages, **kwargs):
+        started.set()
+        await asyncio.Event().wait()
+    
+    service.llm.generate_response = AsyncMock(side_effect=hang)
+    return started
+
+
+class TestBargeIn:
+    """Tests for cancelling the in-flight turn of a session."""
+    
+    async def test_barge_in_cancels_turn(self, voice_assistant_service, session_id):
+        """Test that barge-in cancels the turn and drops the unanswered question."""
+        service = voice_assistant_service
+        llm_started = _block_llm(service)
+        
+        turn = asyncio.create_task(service.process_text_input("Hola", session_id))
+        await llm_started.wait()
+        
+        assert await service.barge_in(session_id) is True
+        with pytest.raises(TurnCancelledError):
+            await turn
+        
+        history = await service.get_conversation_history(session_id)
+        assert [m["role"] for m in history] == ["system"]
+        service.tts.synthesize_speech.assert_not_called()
+    
+    async def test_barge_in_without_turn(self, voice_assistant_service, session_id):
+        """Test that barge-in is a no-op when nothing is running."""
+        assert await voice_assistant_service.barge_in(session_id) is False
+    
+    async def test_next_turn_after_barge_in(self, voice_assistant_service, session_id):
+        """Test that the session keeps working after a barge-in."""
+        service = voice_assistant_service
+        llm_started = _block_llm(service)
+        turn = asyncio.create_task(service.process_voice_input(b"audio", session_id))
+        await llm_started.wait()
+        await service.barge_in(session_id)
+        with pytest.raises(TurnCancelledError):
+            await turn
+        
+        service.llm.generate_response = AsyncMock(return_value="Test response")
+        await service.process_voice_input(b"audio", session_id)
+        
+        history = await service.get_conversation_history(session_id)
+        assert [m["role"] for m in history] == ["system", "user", "assistant"]
+    
+    async def test_caller_cancellation_propagates(self, voice_assistant_service, session_id):
+        """Test that cancelling the caller (client disconnect) cancels the turn."""
+        service = voice_assistant_service
+        llm_started = _block_llm(service)
+        
+        turn = asyncio.create_task(service.process_text_input("Hola", session_id))
+        await llm_started.wait()
+        turn.cancel()
+        
+        with pytest.raises(asyncio.CancelledError):
+            await turn
+        
+        history = await service.get_conversation_history(session_id)
+        assert [m["role"] for m in history] == ["system"]
+        assert await service.barge_in(session_id) is False
+
+
+def _service_with_policy(stt, llm, tts, policy: str) -> VoiceAssistantService:
+    """Build a VoiceAssistantService whose conversations use the given turn policy."""
+    return VoiceAssistantService(
+        stt_client=stt,
+        llm_client=llm,
+        tts_client=tts,
+        conversation_service=ConversationService(turn_policy=policy)
+    )
+
+
+class TestTurnSerialization:
+    """Tests for concurrent turns on the same session."""
+    
+    async def test_queued_turns_keep_history_ordered(self, voice_assistant_service, session_id):
+        """Test that overlapping turns run one after another."""
+        service = voice_assistant_service
+        replies = iter(["Respuesta 1", "Respuesta 2"])
+        
+        async def reply(messages, **kwargs):
+            await asyncio.sleep(0.02)
+            return next(replies)
+        
+        service.llm.generate_response = AsyncMock(side_effect=reply)
+        
+        first, second = await asyncio.gather(
+            service.process_text_input("Pregunta 1", session_id),
+            service.process_text_input("Pregunta 2", session_id)
+        )
+        
+        history = await service.get_conversation_history(session_id)
+        assert [m["content"] for m in history[1:]] == [
+            "Pregunta 1", "Respuesta 1", "Pregunta 2", "Respuesta 2"
+        ]
+        assert second[-1]["lock_wait"] >= 0.01
+        assert service.get_metrics()["turns"]["waited"] == 1
+    
+    async def test_reject_policy_raises_session_busy(
+        self, mock_stt_client, mock_llm_client, mock_tts_client, session_id
+    ):
+        """Test that a concurrent turn is rejected without touching the history."""
+        service = _service_with_policy(mock_stt_client, mock_llm_client, mock_tts_client, "reject")
+        llm_started = _block_llm(service)
+        
+        turn = asyncio.create_task(service.process_text_input("Hola", session_id))
+        await llm_started.wait()
+        
+        with pytest.raises(SessionBusyError):
+            await service.process_text_input("Otra", session_id)
+        
+        await service.barge_in(session_id)
+        with pytest.raises(TurnCancelledError):
+            await turn
+        assert service.get_metrics()["turns"]["rejected"] == 1
+    
+    async def test_coalesce_joins_identical_turn(
+        self, mock_stt_client, mock_llm_client, mock_tts_client, session_id
+    ):
+        """Test that a duplicated request shares the in-flight turn."""
+        service = _service_with_policy(mock_stt_client, mock_llm_client, mock_tts_client, "coalesce")
+        llm_started = _block_llm(service)
+        
+        first = asyncio.create_task(service.process_voice_input(b"audio", session_id))
+        await llm_started.wait()
+        duplicate = asyncio.create_task(service.process_voice_input(b"audio", session_id))
+        await asyncio.sleep(0)
+        
+        assert service.get_metrics()["turns"]["coalesced"] == 1
+        
+        await service.barge_in(session_id)
+        for turn in (first, duplicate):
+            with pytest.raises(TurnCancelledError):
+                await turn
+        
+        mock_stt_client.transcribe_audio.assert_called_once()
+    
+    async def test_coalesce_queues_different_turn(
+        self, mock_stt_client, mock_llm_client, mock_tts_client, session_id
+    ):
+        """Test that coalesce only joins identical inputs."""
+        service = _service_with_policy(mock_stt_client, mock_llm_client, mock_tts_client, "coalesce")
+        
+        await asyncio.gather(
+            service.process_text_input("Hola", session_id),
+            service.process_text_input("Adiós", session_id)
+        )
+        
+        history = await service.get_conversation_history(session_id)
+        assert [m["role"] for m in history] == ["system", "user", "assistant", "user", "assistant"]
+        assert service.get_metrics()["turns"]["coalesced"] == 0
+
+
+class TestIdempotency:
+    """Tests for Idempotency-Key deduplication of retried turns."""
+    
+    async def test_retry_replays_completed_turn(self, voice_assistant_service, session_id):
+        """Test that a retried text turn does not run the pipeline again."""
+        service = voice_assistant_service
+        
+        first = await service.process_text_input("Hola", session_id, idempotency_key="retry-1")
+        retry = await service.process_text_input("Hola", session_id, idempotency_key="retry-1")
+        
+        history = await service.get_conversation_history(session_id)
+        assert retry is first
+        assert [m["role"] for m in history] == ["system", "user", "assistant"]
+        service.llm.generate_response.assert_called_once()
+        assert service.get_metrics()["idempotency"]["replayed"] == 1
+    
+    async def test_retry_joins_in_flight_voice_turn(self, voice_assistant_service, session_id):
+        """Test that a retry during the turn waits for the same result."""
+        service = voice_assistant_service
+        
+        results = await asyncio.gather(
+            service.process_voice_input(b"audio", session_id, idempotency_key="retry-2"),
+            service.process_voice_input(b"audio", session_id, idempotency_key="retry-2")
+        )
+        
+        assert results[0] is results[1]
+        service.stt.transcribe_audio.assert_called_once()
+    
+    async def test_key_is_scoped_to_request(self, voice_assistant_service, session_id):
+        """Test that the same key with different audio is rejected."""
+        service = voice_assistant_service
+        await service.process_voice_input(b"audio", session_id, idempotency_key="retry-3")
+        
+        with pytest.raises(IdempotencyKeyReusedError):
+            await service.process_voice_input(b"other audio", session_id, idempotency_key="retry-3")
+    
+    async def test_key_is_scoped_to_client(self, voice_assistant_service, session_id):
+        """Test that another client reusing a key runs its own turn."""
+        service = voice_assistant_service
+        other_session = uuid4()
+        
+        await service.process_text_input("Hola", session_id, idempotency_key="1", client="10.0.0.1")
+        await service.process_text_input("Adiós", other_session, idempotency_key="1", client="10.0.0.2")
+        
+        assert service.llm.generate_response.call_count == 2
+        assert service.get_metrics()["idempotency"]["conflicts"] == 0
+    
+    async def test_known_key_is_admitted_without_quota(self, voice_assistant_service, session_id):
+        """Test that a retry of a cached turn is not rate limited."""
+        service = voice_assistant_service
+        service.rate_limiter = RateLimiter(session_rate=0.1, session_burst=1, client_rate=0)
+        
+        service.admit(session_id, idempotency_key="retry-4")
+        await service.process_text_input("Hola", session_id, idempotency_key="retry-4")
+        service.admit(session_id, idempotency_key="retry-4")
+        
+        with pytest.raises(RateLimitedError):
+            service.admit(session_id, idempotency_key="retry-5")
+        assert service.rate_limiter.get_metrics()["allowed"] == 1
+
+
+class TestFairQueuing:
+    """Tests for the per-session fair queue in front of each stage."""
+    
+    async def test_client_with_many_sessions_is_not_served_first(self, voice_assistant_service):
+        """Test that opening more sessions does not buy a client more LLM turns."""
+        service = voice_assistant_service
+        service.stages["llm"] = FairScheduler("llm", slots=1)
+        order = []
+        
+        async def reply(messages, **kwargs):
+            order.append(messages[-1]["content"])
+            await asyncio.sleep(0.01)
+            return "ok"
+        
+        service.llm.generate_response = AsyncMock(side_effect=reply)
+        
+        await asyncio.gather(
+            *(service.process_text_input(f"a{n}", uuid4(), client="10.0.0.1") for n in range(3)),
+            service.process_text_input("b0", uuid4(), client="10.0.0.2")
+        )
+        
+        assert order == ["a0", "a1", "b0", "a2"]
+
+
+def _slow(delay: float = 0.0, error: Exception = None):
+    """Build an AsyncMock that sleeps and optionally raises."""
+    async def run(*args, **kwargs):
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+    return AsyncMock(side_effect=run)
+
+
+@pytest.fixture
+def warm_service(voice_assistant_service):
+    """Fixture: service whose components warm up quickly without real models."""
+    service = voice_assistant_service
+    service.stt.warm_up = _slow(0.1)
+    service.llm.prefill_prompt = _slow(0.1)
+    service.tts.warm_up = _slow(0.1)
+    return service
+
+
+class TestWarmUp:
+    """Tests for background warm-up and readiness."""
+    
+    async def test_components_warm_up_in_parallel(self, warm_service):
+        """Test that STT, LLM and TTS warm up concurrently."""
+        start = monotonic()
+        await warm_service.warm_up()
+        
+        assert monotonic() - start < 0.25
+        components = warm_service.get_readiness()["components"]
+        assert all(c["status"] == "ready" for c in components.values())
+        assert all(c["duration"] >= 0.1 for c in components.values())
+    
+    async def test_llm_is_primed_with_system_prompt(self, warm_service):
+        """Test that LLM priming prefills the shared system prompt."""
+        await warm_service.warm_up()
+        
+        primer = warm_service.llm.prefill_prompt.call_args.args[0]
+        assert primer[0]["role"] == "system"
+    
+    async def test_failed_warm_up_is_recorded(self, warm_service):
+        """Test that a failing component does not abort the others."""
+        warm_service.llm.prefill_prompt = _slow(error=RuntimeError("LM Studio down"))
+        
+        await warm_service.warm_up()
+        
+        components = warm_service.get_readiness()["components"]
+        assert components["llm"]["status"] == "failed"
+        assert components["llm"]["error"] == "LM Studio down"
+        assert components["stt"]["status"] == "ready"
+    
+    async def test_ready_requires_stt_and_llm(self, warm_service):
+        """Test that readiness waits for the STT model and a reachable LLM."""
+        warm_service.get_health_snapshot = Mock(return_value={"llm": False, "stt": True, "tts": True})
+        assert warm_service.get_readiness()["ready"] is False
+        
+        await warm_service.warm_up()
+        assert warm_service.get_readiness()["ready"] is False
+        
+        warm_service.get_health_snapshot.return_value["llm"] = True
+        assert warm_service.get_readiness()["ready"] is True
+    
+    async def test_start_does_not_block(self, warm_service):
+        """Test that start() returns before the warm-up finishes."""
+        warm_service.health_monitor.probes = {"llm": AsyncMock(return_value=True)}
+        
+        start = monotonic()
+        await warm_service.start()
+        
+        assert monotonic() - start < 0.05
+        assert warm_service.get_readiness()["components"]["stt"]["status"] != "ready"
+        await warm_service.cleanup()
@@ -191,6 +191,165 @@ class TestConversationMemory:
             assert "timestamp" in msg  # Included for display
 
 
+class TestCachedPayloads:
+    """Tests for the incrementally maintained LLM/display payloads."""
+    
+    def test_repeated_reads_share_snapshot(self):
+        """Test that an unchanged history returns the same immutable tuple."""
+        conv = Conversation()
+        conv.add_user_message("Hola")
+        
+        first = conv.get_messages_for_llm()
+        
+        assert isinstance(first, tuple)
+        assert conv.get_messages_for_llm() is first
+        assert conv.get_messages_for_display() is conv.get_messages_for_display()
+    
+    def test_snapshot_is_not_affected_by_later_changes(self):
+        """Test copy-on-write: a reader's snapshot survives new messages."""
+        conv = Conversation()
+        conv.add_user_message("Hola")
+        snapshot = conv.get_messages_for_llm()
+        
+        conv.add_assistant_message("Hola!")
+        
+        assert len(snapshot) == 2
+        assert len(conv.get_messages_for_llm()) == 3
+        assert conv.get_messages_for_llm()[:2] == snapshot
+    
+    def test_payload_dicts_are_built_once(self):
+        """Test that existing messages are not converted again on each turn."""
+        conv = Conversation()
+        conv.add_user_message("Hola")
+        before = conv.get_messages_for_llm()
+        
+        conv.add_assistant_message("Hola!")
+        after = conv.get_messages_for_llm()
+        
+        assert all(a is b for a, b in zip(before, after))
+    
+    def test_payloads_follow_trim_discard_and_clear(self):
+        """Test that payloads stay aligned with the messages on every mutation."""
+        conv = Conversation(max_messages=3)
+        conv.get_messages_for_display()
+        
+        for i in range(5):
+            conv.add_user_message(f"Message {i}")
+        conv.discard_unanswered_user_message()
+        
+        expected = [m.to_dict() for m in conv.messages]
+        assert list(conv.get_messages_for_llm()) == expected
+        assert list(conv.get_messages_for_display()) == [m.to_display_dict() for m in conv.messages]
+        
+        conv.clear_history()
+        assert [m["role"] for m in conv.get_messages_for_llm()] == ["system"]
+        assert len(conv.get_messages_for_display()) == 1
+    
+    
+    def test_shared_payloads_are_read_only(self):
+        """Test that a caller's mutation cannot leak into another session."""
+        conv = Conversation(system_prompt="SYS")
+        conv.add_user_message("Hola")
+        
+        for payload in conv.get_messages_for_llm() + conv.get_messages_for_display():
+            with pytest.raises(TypeError):
+                payload["content"] = "HACKED"
+            with pytest.raises(TypeError):
+                payload.update(content="HACKED")
+        
+        other = Conversation(system_prompt="SYS")
+        assert other.get_messages_for_llm()[0] == {"role": "system", "content": "SYS"}
+        assert other.get_messages_for_display()[0]["content"] == "SYS"
+    
+    def test_payload_copy_is_mutable(self):
+        """Test that dict() gives callers a private, editable copy."""
+        conv = Conversation(system_prompt="SYS")
+        
+        payload = dict(conv.get_messages_for_llm()[0])
+        payload["content"] = "Otro"
+        
+        assert conv.get_messages_for_llm()[0]["content"] == "SYS"
+
+class TestDisplayPages:
+    """Tests for versioned, paginated display reads."""
+    
+    def test_version_changes_on_every_mutation(self):
+        """Test that appends, discards and clears bump the version."""
+        conv = Conversation()
+        versions = [conv.version]
+        
+        conv.add_user_message("Hola")
+        versions.append(conv.version)
+        conv.get_messages_for_display()
+        assert conv.version == versions[-1]
+        
+        conv.discard_unanswered_user_message()
+        versions.append(conv.version)
+        conv.clear_history()
+        versions.append(conv.version)
+        
+        assert len(set(versions)) == 4
+    
+    def test_append_only_since(self):
+        """Test detecting destructive changes after a known version."""
+        conv = Conversation()
+        conv.add_user_message("Hola")
+        known = conv.version
+        
+        conv.add_assistant_message("¿Qué tal?")
+        assert conv.is_append_only_since(known) is True
+        
+        conv.clear_history()
+        assert conv.is_append_only_since(known) is False
+        assert conv.is_append_only_since(conv.version + 1) is False
+    
+    def test_delta_returns_only_new_messages(self):
+        """Test that a page since the last cursor holds only new messages."""
+        conv = Conversation()
+        conv.add_user_message("Hola")
+        cursor, total, page = conv.get_display_page()
+        
+        assert (cursor, total, len(page)) == (2, 2, 2)
+        
+        conv.add_assistant_message("¿Qué tal?")
+        cursor, total, page = conv.get_display_page(cursor)
+        
+        assert [m["content"] for m in page] == ["¿Qué tal?"]
+        assert (cursor, total) == (3, 3)
+        assert conv.get_display_page(cursor)[2] == ()
+    
+    def test_pages_match_full_history(self):
+        """Test that walking pages reproduces the display snapshot."""
+        conv = Conversation()
+        for i in range(7):
+            conv.add_user_message(f"Mensaje {i}")
+        
+        pages, cursor = [], 0
+        while cursor < conv.message_count:
+            cursor, _, page = conv.get_display_page(cursor, limit=3)
+            pages.extend(page)
+        
+        assert tuple(pages) == conv.get_messages_for_display()
+    
+    def test_indices_survive_trimming(self):
+        """Test that absolute indices do not shift when old turns are trimmed."""
+        conv = Conversation(max_messages=3)
+        conv.add_user_message("uno")
+        conv.add_assistant_message("dos")
+        cursor, _, _ = conv.get_display_page()
+        
+        conv.add_user_message("tres")
+        conv.add_assistant_message("cuatro")
+        cursor, total, page = conv.get_display_page(cursor)
+        
+        assert [m["content"] for m in page] == ["tres", "cuatro"]
+        assert (cursor, total) == (5, 5)
+        
+        # Un cliente atrasado salta lo recortado
+        _, _, page = conv.get_display_page(1, limit=2)
+        assert [m["content"] for m in page] == ["tres", "cuatro"]
+
+
 class TestMaxMessagesLimit:
     """Tests for max_messages limit feature."""
     
@@ -232,6 +391,26 @@ class TestMaxMessagesLimit:
         # Should have recent messages
         last_message = messages[-1]
         assert "Message 9" in last_message["content"]
+    
+    def test_trimming_keeps_exact_window(self):
+        """Test that the bound keeps the system prompt plus the newest turns."""
+        conv = Conversation(max_messages=4, system_prompt="You are helpful")
+        
+        for i in range(1000):
+            conv.add_user_message(f"Message {i}")
+        
+        contents = [m["content"] for m in conv.get_messages_for_llm()]
+        assert contents == ["You are helpful", "Message 997", "Message 998", "Message 999"]
+    
+    def test_bound_applies_to_turns_after_clearing_system(self):
+        """Test that dropping the system prompt frees its slot for turns."""
+        conv = Conversation(max_messages=3, system_prompt="You are helpful")
+        conv.clear_history(keep_system=False)
+        
+        for i in range(5):
+            conv.add_user_message(f"Message {i}")
+        
+        assert [m["role"] for m in conv.get_messages_for_llm()] == ["user"] * 3
 
 
 class TestConversationOperations:
@@ -297,6 +476,26 @@ class TestConversationOperations:
         assert last_msg is not None
         assert last_msg.content == "Second response"
     
+    def test_discard_unanswered_user_message(self):
+        """Test that a cancelled turn's question is removed."""
+        conv = Conversation()
+        conv.add_user_message("First")
+        conv.add_assistant_message("Response")
+        conv.add_user_message("Interrupted")
+        
+        assert conv.discard_unanswered_user_message() is True
+        assert conv.get_last_user_message().content == "First"
+        assert conv.message_count == 3
+    
+    def test_discard_keeps_answered_turn(self):
+        """Test that an answered turn is left untouched."""
+        conv = Conversation()
+        conv.add_user_message("Question")
+        conv.add_assistant_message("Answer")
+        
+        assert conv.discard_unanswered_user_message() is False
+        assert conv.message_count == 3
+    
     def test_deactivate_and_reactivate(self):
         """Test deactivating and reactivating conversation."""
         conv = Conversation()
@@ -348,3 +547,40 @@ class TestConversationEquality:
         assert "messages=" in repr_str
         assert "active=" in repr_str
 
+
+
+class TestConversationRestore:
+    """Tests for rebuilding persisted conversations."""
+    
+    def test_restore_keeps_messages_and_state(self):
+        """Test that restore does not add a second system prompt."""
+        original = Conversation(max_messages=10)
+        original.add_user_message("Hola")
+        original.deactivate()
+        
+        restored = Conversation.restore(
+            session_id=original.session_id,
+            messages=list(original.messages),
+            max_messages=original.max_messages,
+            is_active=original.is_active
+        )
+        
+        assert restored == original
+        assert restored.get_messages_for_display() == original.get_messages_for_display()
+        assert restored.max_messages == 10
+        assert restored.is_active is False
+    
+    def test_restore_pins_system_prompt_and_applies_bound(self):
+        """Test that restored history is trimmed without losing the system prompt."""
+        original = Conversation(system_prompt="You are helpful")
+        for i in range(6):
+            original.add_user_message(f"Message {i}")
+        
+        restored = Conversation.restore(
+            session_id=original.session_id,
+            messages=list(original.messages),
+            max_messages=3
+        )
+        
+        contents = [m["content"] for m in restored.get_messages_for_llm()]
+        assert contents == ["You are helpful", "Message 4", "Message 5"]
@@ -0,0 +1,224 @@
+"""
+Tests for ConversationTemplate and forking (Domain Layer).
+
+Tests:
+- Template prefix shared by identity across sessions
+- Flat LLM payload (system + prefix + turns) and byte-identical prefix
+- Prefix never trimmed by the message limit
+- Fork sharing messages and payload dicts with the source
+- Service-level templates and forks
+"""
+
+import json
+from uuid import uuid4
+
+import pytest
+
+from src.application.conversation_service import ConversationService
+from src.domain.conversation import Conversation
+from src.domain.conversation_template import ConversationTemplate, SharedPrefix
+from src.domain.message import Message
+from src.domain.system_prompt import SystemPromptRegistry
+
+
+EXAMPLES = [
+    ("user", "¿Qué hora es?"),
+    ("assistant", "Son las diez."),
+    ("user", "¿Y mañana?"),
+    ("assistant", "Mañana te lo digo."),
+]
+
+
+@pytest.fixture
+def template():
+    """Fixture: template with a few-shot preamble."""
+    return ConversationTemplate.create(
+        name="reloj",
+        system_prompt="Eres un asistente breve",
+        examples=EXAMPLES,
+        prompts=SystemPromptRegistry()
+    )
+
+
+class TestTemplates:
+    """Tests for conversations created from a template."""
+    
+    def test_sessions_share_prefix_objects(self, template):
+        """Test that sessions reference the template prefix without copying it."""
+        first = Conversation.from_template(template)
+        second = Conversation.from_template(template)
+        
+        assert first.shared_prefix is second.shared_prefix is template.prefix
+        assert first.messages[1] is second.messages[1]
+        assert first.get_messages_for_llm()[1] is second.get_messages_for_llm()[1]
+    
+    def test_llm_payload_is_flat(self, template):
+        """Test that the LLM payload is system + prefix + own turns."""
+        conv = Conversation.from_template(template)
+        conv.add_user_message("Hola")
+        
+        payload = conv.get_messages_for_llm()
+        
+        assert [m["role"] for m in payload] == ["system", "user", "assistant", "user", "assistant", "user"]
+        assert payload[-1]["content"] == "Hola"
+        assert conv.message_count == 6
+        assert conv.get_last_assistant_message().content == "Mañana te lo digo."
+    
+    def test_prefix_is_byte_identical_across_sessions(self, template):
+        """Test that different sessions send the same serialized prefix."""
+        first = Conversation.from_template(template)
+        second = Conversation.from_template(template)
+        first.add_user_message("Hola")
+        second.add_user_message("Adiós")
+        
+        prefix = json.dumps(list(first.get_messages_for_llm()[:5]))
+        assert json.dumps(list(second.get_messages_for_llm()[:5])) == prefix
+    
+    def test_limit_never_trims_prefix(self, template):
+        """Test that only own turns are trimmed by max_messages."""
+        conv = Conversation.from_template(template, max_messages=8)
+        for i in range(10):
+            conv.add_user_message(f"Pregunta {i}")
+        
+        assert conv.message_count == 8
+        assert conv.messages[1:5] == template.prefix.messages
+        assert conv.messages[-1].content == "Pregunta 9"
+    
+    def test_clear_keeps_preamble(self, template):
+        """Test that clearing history restores the template preamble."""
+        conv = Conversation.from_template(template)
+        conv.add_user_message("Hola")
+        
+        conv.clear_history()
+        assert conv.shared_prefix is template.prefix
+        assert conv.message_count == 5
+        
+        conv.clear_history(keep_system=False)
+        assert conv.message_count == 0
+    
+    def test_template_larger_than_limit_is_rejected(self, template):
+        """Test that a prefix leaving no room for own turns raises instead of dropping them."""
+        with pytest.raises(ValueError, match="max_messages"):
+            Conversation.from_template(template, max_messages=6)
+        
+        conv = Conversation.from_template(template, max_messages=7)
+        conv.add_user_message("Hola")
+        conv.add_assistant_message("¿Qué tal?")
+        assert conv.get_messages_for_llm()[-2]["content"] == "Hola"
+    
+    def test_prefix_rejects_system_messages(self):
+        """Test that a shared prefix only holds user/assistant turns."""
+        with pytest.raises(ValueError):
+            SharedPrefix((Message.create_system_message("Eres un asistente"),))
+
+
+class TestFork:
+    """Tests for copy-on-write forks."""
+    
+    def test_fork_shares_history(self, template):
+        """Test that a fork reuses the source messages and payload dicts."""
+        source = Conversation.from_template(template)
+        source.add_user_message("Hola")
+        source.add_assistant_message("¿Qué tal?")
+        
+        child = source.fork()
+        
+        assert child.session_id != source.session_id
+        assert child.messages == source.messages
+        assert all(a is b for a, b in zip(child.messages, source.messages))
+        assert all(a is b for a, b in zip(child.get_messages_for_llm(), source.get_messages_for_llm()))
+    
+    def test_fork_diverges(self, template):
+        """Test that appending to a fork does not touch the source."""
+        source = Conversation.from_template(template)
+        source.add_user_message("Hola")
+        child = source.fork()
+        
+        child.add_assistant_message("Respuesta del fork")
+        source.add_assistant_message("Respuesta original")
+        
+        assert child.messages[-1].content == "Respuesta del fork"
+        assert source.messages[-1].content == "Respuesta original"
+        assert child.message_count == source.message_count
+        
+        child.clear_history()
+        assert child.shared_prefix is template.prefix
+    
+    def test_fork_of_full_conversation_keeps_new_turns(self, template):
+        """Test that a fork whose prefix fills max_messages still records new turns."""
+        source = Conversation.from_template(template, max_messages=7)
+        source.add_user_message("Hola")
+        source.add_assistant_message("¿Qué tal?")
+        
+        child = source.fork()
+        child.add_user_message("Sigo aquí")
+        child.add_assistant_message("Aquí estoy")
+        
+        assert [m["content"] for m in child.get_messages_for_llm()[-2:]] == ["Sigo aquí", "Aquí estoy"]
+        assert child.message_count == 7
+        assert child.messages[1:5] == template.prefix.messages
+    
+    def test_fork_never_exceeds_max_messages(self, template):
+        """Test that the inherited history is trimmed, oldest own turns first."""
+        source = Conversation.from_template(template, max_messages=9)
+        for i in range(3):
+            source.add_user_message(f"Pregunta {i}")
+            source.add_assistant_message(f"Respuesta {i}")
+        
+        child = source.fork()
+        
+        assert child.message_count == 7
+        assert [m.content for m in child.messages[5:]] == ["Pregunta 2", "Respuesta 2"]
+        child.add_user_message("Nueva")
+        child.add_assistant_message("Vale")
+        assert child.message_count == 9
+
+
+class TestServiceTemplates:
+    """Tests for templates and forks through ConversationService."""
+    
+    def test_create_from_registered_template(self):
+        """Test that the service creates sessions from a registered template."""
+        service = ConversationService(prompts=SystemPromptRegistry())
+        template = service.register_template("reloj", EXAMPLES)
+        
+        first = service.create_conversation(template="reloj")
+        second = service.create_conversation(template="reloj")
+        
+        assert first.shared_prefix is second.shared_prefix is template.prefix
+        assert service.get_conversation(first.session_id) is first
+    
+    def test_unknown_template_raises_error(self):
+        """Test that an unknown template name is rejected."""
+        with pytest.raises(ValueError):
+            ConversationService().create_conversation(template="missing")
+    
+    def test_default_template(self, template):
+        """Test that the default template only applies without a custom prompt."""
+        service = ConversationService(default_template=template)
+        
+        assert service.create_conversation().shared_prefix is template.prefix
+        assert len(service.create_conversation(system_prompt="Otro").shared_prefix) == 0
+    
+    def test_oversized_templates_rejected_at_registration(self, template):
+        """Test that the service rejects templates that do not fit its limit up front."""
+        with pytest.raises(ValueError):
+            ConversationService(max_messages_per_conversation=5, default_template=template)
+        
+        service = ConversationService(max_messages_per_conversation=3, prompts=SystemPromptRegistry())
+        with pytest.raises(ValueError):
+            service.register_template("reloj", EXAMPLES)
+    
+    def test_fork_conversation(self):
+        """Test that the service stores the fork under a new session."""
+        service = ConversationService()
+        source = service.create_conversation()
+        service.add_user_message(source.session_id, "Hola")
+        
+        child = service.fork_conversation(source.session_id)
+        
+        assert service.get_conversation(child.session_id) is child
+        assert child.get_messages_for_llm() == source.get_messages_for_llm()
+        
+        with pytest.raises(ValueError):
+            service.fork_conversation(uuid4())
@@ -8,8 +8,12 @@ Tests DDD principles:
 - Validation
 """
 
+import copy
+import pickle
+
 import pytest
 from datetime import datetime, timezone
+from src.domain.conversation import Conversation
 from src.domain.message import Message
 
 
@@ -133,4 +137,50 @@ class TestMessage:
         # Should be hashable
         message_set = {msg1, msg2}
         assert len(message_set) >= 1  # Can be used in sets
-
+    
+    
+    def test_message_from_dict_round_trip(self):
+        """Test that a display dict can be turned back into an equal Message."""
+        msg = Message.create_assistant_message("¿En qué te ayudo?")
+        
+        assert Message.from_dict(msg.to_display_dict()) == msg
+    
+    def test_message_is_slotted(self):
+        """Test that Message has no per-instance __dict__."""
+        msg = Message.create_user_message("Hola")
+        
+        assert not hasattr(msg, "__dict__")
+        with pytest.raises(AttributeError):
+            msg.extra = "x"
+    
+    def test_timestamps_are_monotonic(self):
+        """Test that consecutive messages never go back in time."""
+        messages = [Message.create_user_message(f"Msg {i}") for i in range(100)]
+        stamps = [m.timestamp_ns for m in messages]
+        
+        assert stamps == sorted(stamps)
+        assert messages[0].timestamp.tzinfo == timezone.utc
+    
+    def test_naive_datetime_is_utc(self):
+        """Test that a naive timestamp is interpreted as UTC."""
+        naive = Message(role="user", content="Hola", timestamp=datetime(2025, 1, 1, 12, 0, 0))
+        
+        assert naive.to_display_dict()["timestamp"] == "2025-01-01T12:00:00+00:00"
+    
+    def test_message_deepcopy_and_pickle_round_trip(self):
+        """Test that messages survive copy.deepcopy and pickle."""
+        msg = Message.create_assistant_message("Hola, ¿qué tal?")
+        
+        for clone in (copy.copy(msg), copy.deepcopy(msg), pickle.loads(pickle.dumps(msg))):
+            assert clone == msg
+            assert clone.role == "assistant"
+            with pytest.raises(AttributeError):
+                clone.content = "x"
+    
+    def test_conversation_deepcopy(self):
+        """Test that a conversation holding messages can be deep-copied."""
+        conversation = Conversation()
+        conversation.add_user_message("Hola")
+        clone = copy.deepcopy(conversation)
+        
+        assert clone.get_messages_for_llm() == conversation.get_messages_for_llm()
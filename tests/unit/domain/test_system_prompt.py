@@ -0,0 +1,101 @@
+"""
+Tests for SystemPromptRegistry (Domain Layer).
+
+Tests:
+- Interning (one shared prompt per distinct text)
+- Stable ids and precomputed token counts
+- Sharing across conversations, including restored ones
+"""
+
+import pytest
+
+from src.application.conversation_service import ConversationService
+from src.domain.conversation import Conversation
+from src.domain.system_prompt import SystemPromptRegistry, estimate_tokens
+
+
+class TestSystemPromptRegistry:
+    """Tests for interning system prompts."""
+    
+    def test_same_text_returns_same_prompt(self):
+        """Test that interning a prompt twice returns the same object."""
+        registry = SystemPromptRegistry()
+        
+        first = registry.intern("Eres un asistente")
+        second = registry.intern("".join(["Eres un ", "asistente"]))
+        
+        assert first is second
+        assert len(registry) == 1
+        assert registry.stats()["hits"] == 1
+    
+    def test_prompt_id_is_stable_and_resolvable(self):
+        """Test that the id only depends on the text and resolves back."""
+        registry = SystemPromptRegistry()
+        prompt = registry.intern("Eres un asistente")
+        
+        assert prompt.prompt_id == SystemPromptRegistry().intern("Eres un asistente").prompt_id
+        assert registry.get(prompt.prompt_id) is prompt
+        assert registry.get("unknown") is None
+    
+    def test_token_count_is_precomputed(self):
+        """Test that the configured tokenizer runs once per distinct prompt."""
+        calls = []
+        
+        def tokenizer(text):
+            calls.append(text)
+            return 42
+        
+        registry = SystemPromptRegistry(tokenizer=tokenizer)
+        registry.intern("Eres un asistente")
+        prompt = registry.intern("Eres un asistente")
+        
+        assert prompt.token_count == 42
+        assert calls == ["Eres un asistente"]
+        assert estimate_tokens("abcdefgh") == 2
+    
+    def test_empty_prompt_raises_error(self):
+        """Test that an empty prompt is rejected like any message."""
+        with pytest.raises(ValueError):
+            SystemPromptRegistry().intern("   ")
+
+
+class TestSharedPrompts:
+    """Tests for conversations referencing the shared prompt."""
+    
+    def test_conversations_share_one_system_message(self):
+        """Test that sessions created by the service reference one prompt."""
+        registry = SystemPromptRegistry()
+        service = ConversationService(prompts=registry)
+        
+        conversations = [service.create_conversation() for _ in range(3)]
+        
+        system_messages = {id(c.messages[0]) for c in conversations}
+        payloads = {id(c.get_messages_for_llm()[0]) for c in conversations}
+        assert len(system_messages) == 1
+        assert len(payloads) == 1
+        assert len(registry) == 1
+        assert conversations[0].system_prompt_id == conversations[1].system_prompt_id
+    
+    def test_restore_reuses_interned_prompt(self):
+        """Test that a restored conversation points at the registry prompt."""
+        registry = SystemPromptRegistry()
+        original = Conversation(system_prompt="Eres un asistente", prompts=registry)
+        original.add_user_message("Hola")
+        
+        restored = Conversation.restore(
+            session_id=original.session_id,
+            messages=list(original.messages),
+            prompts=registry
+        )
+        
+        assert restored.system_prompt is original.system_prompt
+        assert restored.get_messages_for_llm() == original.get_messages_for_llm()
+    
+    def test_clear_without_system_drops_reference(self):
+        """Test that clearing the system prompt removes the reference."""
+        conv = Conversation(system_prompt="Eres un asistente", prompts=SystemPromptRegistry())
+        
+        conv.clear_history(keep_system=False)
+        
+        assert conv.system_prompt_id is None
+        assert conv.message_count == 0
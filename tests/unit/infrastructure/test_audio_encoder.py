@@ -0,0 +1,128 @@
+"""
+Tests for AudioEncoder (Infrastructure Layer).
+
+Tests:
+- WAV passthrough and format validation
+- Opus/MP3/downsampled PCM transcoding (requires PyAV)
+- Bytes-per-second-of-speech metrics
+- TTS client encoding in its worker pool
+"""
+
+import io
+import math
+import struct
+import wave
+from unittest.mock import patch
+
+import pytest
+
+from src.infrastructure.tts.audio_encoder import AUDIO_FORMATS, AudioEncoder, wav_duration
+from src.infrastructure.tts.pyttsx3_client import Pyttsx3TTSClient
+
+
+def _wav(seconds: float = 1.0, rate: int = 22050) -> bytes:
+    """Mono 16-bit tone like the one espeak writes."""
+    samples = b"".join(
+        struct.pack("<h", int(8000 * math.sin(2 * math.pi * 220 * i / rate)))
+        for i in range(int(seconds * rate))
+    )
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(samples)
+    return buffer.getvalue()
+
+
+class TestFormats:
+    """Tests for format selection without transcoding."""
+    
+    def test_wav_is_passed_through(self):
+        """Test that the TTS output is returned as-is for wav."""
+        wav = _wav()
+        
+        assert AudioEncoder().encode(wav, "wav") is wav
+        assert wav_duration(wav) == pytest.approx(1.0)
+    
+    def test_unknown_format_raises_error(self):
+        """Test that unsupported formats are rejected."""
+        with pytest.raises(ValueError):
+            AudioEncoder().get_format("flac")
+    
+    def test_only_wav_without_pyav(self):
+        """Test that compressed formats are hidden when PyAV is missing."""
+        with patch("src.infrastructure.tts.audio_encoder.find_spec", return_value=None):
+            encoder = AudioEncoder()
+        
+        assert encoder.formats() == ["wav"]
+        with pytest.raises(ValueError):
+            encoder.encode(_wav(), "ogg")
+    
+    async def test_tts_client_rejects_unknown_format(self):
+        """Test that an unknown format fails before synthesizing."""
+        client = Pyttsx3TTSClient(rate=175, volume=0.9, voice_index=0)
+        
+        with patch.object(client, "_synthesize_wav") as synthesize:
+            with pytest.raises(ValueError):
+                await client.synthesize_speech("Hola", "flac")
+        
+        synthesize.assert_not_called()
+        client.cleanup()
+
+
+class TestTranscoding:
+    """Tests for compressed output formats."""
+    
+    @pytest.fixture(autouse=True)
+    def _requires_pyav(self):
+        pytest.importorskip("av")
+    
+    @pytest.mark.parametrize("name,magic", [
+        ("ogg", b"OggS"),
+        ("webm", b"\x1a\x45\xdf\xa3"),
+        ("mp3", None),
+    ])
+    def test_compressed_formats_shrink_audio(self, name, magic):
+        """Test that Opus and MP3 are several times smaller than the WAV."""
+        wav = _wav(seconds=2.0)
+        
+        encoded = AudioEncoder().encode(wav, name)
+        
+        assert len(encoded) * 5 < len(wav)
+        if magic is not None:
+            assert encoded.startswith(magic)
+    
+    def test_downsampled_pcm(self):
+        """Test that wav16k keeps the duration at a lower sample rate."""
+        encoded = AudioEncoder().encode(_wav(seconds=1.0), "wav16k")
+        
+        with wave.open(io.BytesIO(encoded)) as reader:
+            assert reader.getframerate() == 16000
+            assert reader.getnchannels() == 1
+        assert wav_duration(encoded) == pytest.approx(1.0, abs=0.05)
+    
+    def test_bytes_per_second_metrics(self):
+        """Test that encoding reports bytes per second of speech."""
+        encoder = AudioEncoder()
+        wav = _wav(seconds=2.0)
+        encoder.encode(wav, "wav")
+        encoder.encode(wav, "ogg")
+        
+        metrics = encoder.get_metrics()
+        
+        assert metrics["wav"]["bytes_per_second"] == pytest.approx(len(wav) / 2.0)
+        assert metrics["ogg"]["bytes_per_second"] * 5 < metrics["wav"]["bytes_per_second"]
+        assert metrics["ogg"]["encoded"] == 1
+    
+    async def test_tts_client_encodes_in_worker_pool(self):
+        """Test that synthesize_speech returns the requested format."""
+        client = Pyttsx3TTSClient(rate=175, volume=0.9, voice_index=0)
+        
+        with patch.object(client, "_synthesize_wav", return_value=_wav()):
+            audio = await client.synthesize_speech("Hola", "ogg")
+        
+        assert audio.startswith(b"OggS")
+        assert client.get_metrics()["encoding"]["ogg"]["encoded"] == 1
+        assert AUDIO_FORMATS["ogg"].media_type.startswith("audio/ogg")
+        client.cleanup()
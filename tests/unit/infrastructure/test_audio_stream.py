@@ -0,0 +1,116 @@
+"""
+Tests for AudioStreamDecoder (Infrastructure Layer).
+
+Tests:
+- Incremental decoding to 16 kHz mono float32 while chunks arrive
+- Size and duration limits enforced during the upload
+- Invalid and empty uploads
+- Whisper client decode_stream over an async iterator
+"""
+
+import io
+import math
+import struct
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.infrastructure.stt.audio_stream import AudioLimitError, AudioStreamDecoder
+from src.infrastructure.stt.whisper_client import WhisperSTTClient
+
+pytest.importorskip("av")
+
+
+def _wav(seconds: float = 1.0, rate: int = 48000) -> bytes:
+    """Mono 16-bit tone as a browser recorder could upload it."""
+    samples = b"".join(
+        struct.pack("<h", int(8000 * math.sin(2 * math.pi * 220 * i / rate)))
+        for i in range(int(seconds * rate))
+    )
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(samples)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def executor():
+    """Fixture: thread pool for the blocking decoder."""
+    pool = ThreadPoolExecutor(max_workers=2)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+async def _decode(executor, data: bytes, max_bytes: int = 10**7, max_seconds: float = 60.0, chunk: int = 4096):
+    decoder = AudioStreamDecoder(max_bytes, max_seconds)
+    decoder.start(executor)
+    for start in range(0, len(data), chunk):
+        decoder.feed(data[start:start + chunk])
+    return await decoder.finish()
+
+
+class TestAudioStreamDecoder:
+    """Tests for decoding chunked uploads."""
+    
+    async def test_decodes_to_whisper_format(self, executor):
+        """Test that a chunked WAV is resampled to 16 kHz mono float32."""
+        samples = await _decode(executor, _wav(seconds=1.0))
+        
+        assert samples.dtype.name == "float32"
+        assert samples.ndim == 1
+        assert len(samples) == pytest.approx(16000, abs=32)
+        assert 0.1 < abs(samples).max() < 1.0
+    
+    async def test_size_limit_stops_upload(self, executor):
+        """Test that exceeding max_bytes fails on the offending chunk."""
+        decoder = AudioStreamDecoder(max_bytes=10_000, max_seconds=60.0)
+        decoder.start(executor)
+        data = _wav(seconds=1.0)
+        
+        with pytest.raises(AudioLimitError):
+            for start in range(0, len(data), 4096):
+                decoder.feed(data[start:start + 4096])
+        
+        assert decoder.received <= 10_000 + 4096
+    
+    async def test_duration_limit(self, executor):
+        """Test that audio longer than max_seconds is rejected."""
+        with pytest.raises(AudioLimitError):
+            await _decode(executor, _wav(seconds=2.0), max_seconds=1.0)
+    
+    async def test_invalid_audio_raises_value_error(self, executor):
+        """Test that undecodable bodies raise ValueError."""
+        with pytest.raises(ValueError, match="Invalid audio stream"):
+            await _decode(executor, b"not audio at all" * 64)
+    
+    async def test_empty_upload_raises_value_error(self, executor):
+        """Test that an upload without bytes is rejected."""
+        decoder = AudioStreamDecoder(max_bytes=10_000, max_seconds=60.0)
+        decoder.start(executor)
+        
+        with pytest.raises(ValueError, match="empty"):
+            await decoder.finish()
+
+
+class TestWhisperDecodeStream:
+    """Tests for WhisperSTTClient.decode_stream."""
+    
+    async def test_decode_stream_from_async_iterator(self):
+        """Test that the client consumes an async body stream."""
+        client = WhisperSTTClient(model_size="base", device="cpu", compute_type="int8")
+        data = _wav(seconds=0.5)
+        
+        async def body():
+            for start in range(0, len(data), 1024):
+                yield data[start:start + 1024]
+        
+        try:
+            samples = await client.decode_stream(body(), max_bytes=10**6, max_seconds=5.0)
+        finally:
+            client.cleanup()
+        
+        assert len(samples) == pytest.approx(8000, abs=32)
@@ -0,0 +1,92 @@
+"""
+Tests for CircuitBreaker (Infrastructure Layer).
+
+Tests:
+- Closed → open after consecutive failures
+- Half-open probing
+"""
+
+from unittest.mock import patch
+
+from src.infrastructure.llm.circuit_breaker import CircuitBreaker, CircuitState
+
+
+class TestCircuitBreaker:
+    """Tests for circuit breaker state transitions."""
+    
+    def test_starts_closed(self):
+        """Test that a new breaker lets traffic through."""
+        breaker = CircuitBreaker("backend")
+        
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.can_attempt()
+    
+    def test_opens_after_threshold(self):
+        """Test that consecutive failures open the circuit."""
+        breaker = CircuitBreaker("backend", failure_threshold=2)
+        
+        breaker.record_failure()
+        assert breaker.state == CircuitState.CLOSED
+        
+        breaker.record_failure()
+        assert breaker.state == CircuitState.OPEN
+        assert not breaker.can_attempt()
+        assert breaker.retry_after > 0
+    
+    def test_success_resets_failure_count(self):
+        """Test that failures must be consecutive."""
+        breaker = CircuitBreaker("backend", failure_threshold=2)
+        
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        
+        assert breaker.state == CircuitState.CLOSED
+    
+    def test_half_open_allows_single_probe(self):
+        """Test that only one probe is allowed after the reset timeout."""
+        breaker = CircuitBreaker("backend", failure_threshold=1, reset_timeout=10.0)
+        
+        with patch("src.infrastructure.llm.circuit_breaker.monotonic", return_value=100.0):
+            breaker.record_failure()
+        
+        with patch("src.infrastructure.llm.circuit_breaker.monotonic", return_value=111.0):
+            assert breaker.state == CircuitState.HALF_OPEN
+            assert breaker.can_attempt()
+            
+            breaker.on_dispatch()
+            assert not breaker.can_attempt()
+    
+    def test_probe_success_closes_circuit(self):
+        """Test that a successful probe closes the circuit."""
+        breaker = CircuitBreaker("backend", failure_threshold=1, reset_timeout=0.0)
+        breaker.record_failure()
+        breaker.on_dispatch()
+        
+        breaker.record_success()
+        
+        assert breaker.state == CircuitState.CLOSED
+    
+    def test_probe_failure_reopens_circuit(self):
+        """Test that a failed probe opens the circuit again."""
+        breaker = CircuitBreaker("backend", failure_threshold=1, reset_timeout=10.0)
+        
+        with patch("src.infrastructure.llm.circuit_breaker.monotonic", return_value=100.0):
+            breaker.record_failure()
+        
+        with patch("src.infrastructure.llm.circuit_breaker.monotonic", return_value=111.0):
+            breaker.on_dispatch()
+            breaker.record_failure()
+            
+            assert breaker.state == CircuitState.OPEN
+            assert breaker.times_opened == 2
+    
+    def test_cancelled_probe_is_released(self):
+        """Test that a cancelled probe does not block the next one."""
+        breaker = CircuitBreaker("backend", failure_threshold=1, reset_timeout=0.0)
+        breaker.record_failure()
+        breaker.on_dispatch()
+        
+        breaker.on_cancel()
+        
+        assert breaker.can_attempt()
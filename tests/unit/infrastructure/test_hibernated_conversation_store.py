@@ -0,0 +1,223 @@
+"""
+Tests for HibernatedConversationStore (Infrastructure Layer).
+
+Tests:
+- Compact round trip (memory and local disk)
+- Blob released on rehydration
+- Idle sessions hibernated by the in-memory store and brought back
+- Hot-set, bytes saved and rehydration metrics
+- Max age, byte budget and index rebuilt from disk
+"""
+
+import zlib
+from uuid import uuid4
+
+from unittest.mock import patch
+
+import pytest
+
+from src.application.conversation_service import ConversationService
+from src.application.conversation_store import InMemoryConversationStore
+from src.infrastructure.persistence.hibernated_conversation_store import HibernatedConversationStore
+
+
+@pytest.fixture(params=["memory", "disk"])
+def hibernation(request, tmp_path):
+    """Fixture: hibernation tier in memory or on local disk."""
+    if request.param == "disk":
+        return HibernatedConversationStore(directory=tmp_path / "hibernated")
+    return HibernatedConversationStore()
+
+
+def _long_conversation(service: ConversationService, turns: int = 20):
+    conversation = service.create_conversation()
+    for i in range(turns):
+        service.add_user_message(conversation.session_id, f"Pregunta número {i} sobre el tiempo")
+        service.add_assistant_message(conversation.session_id, f"Respuesta número {i}: hace sol")
+    return conversation
+
+
+class TestRoundTrip:
+    """Tests for hibernating and rehydrating a conversation."""
+    
+    def test_round_trip_preserves_history(self, hibernation):
+        """Test that a rehydrated conversation equals the original."""
+        service = ConversationService(max_messages_per_conversation=100)
+        original = _long_conversation(service)
+        original.deactivate()
+        
+        hibernation.save(original)
+        restored = hibernation.get(original.session_id)
+        
+        assert restored.messages == original.messages
+        assert restored.system_prompt is original.system_prompt
+        assert restored.max_messages == 100
+        assert restored.is_active is False
+    
+    def test_round_trip_preserves_version(self, hibernation):
+        """Test that a thawed conversation keeps its version (ETags stay valid)."""
+        service = ConversationService()
+        original = _long_conversation(service, turns=2)
+        known = original.version
+        service.add_user_message(original.session_id, "Una más")
+        
+        hibernation.save(original)
+        restored = hibernation.get(original.session_id)
+        
+        assert restored.version == original.version
+        assert restored.epoch == original.epoch
+        assert restored.is_append_only_since(known)
+    
+    def test_format_1_blobs_still_decode(self, hibernation):
+        """Test that blobs written before versions were stored are readable."""
+        blob = zlib.compress(hibernation._pack([1, True, None, "Eres un asistente", [[1, "Hola", 10**18]]]))
+        restored = hibernation.decode(uuid4(), blob)
+        
+        assert [m.content for m in restored.messages] == ["Eres un asistente", "Hola"]
+    
+    def test_rehydration_releases_blob(self, hibernation):
+        """Test that a session lives in one tier at a time."""
+        conversation = _long_conversation(ConversationService())
+        hibernation.save(conversation)
+        
+        assert hibernation.session_ids() == [conversation.session_id]
+        assert hibernation.get(conversation.session_id) is not None
+        assert hibernation.session_ids() == []
+        assert hibernation.get(conversation.session_id) is None
+    
+    def test_delete_and_missing(self, hibernation):
+        """Test delete semantics and unknown sessions."""
+        conversation = _long_conversation(ConversationService(), turns=1)
+        hibernation.save(conversation)
+        
+        assert hibernation.delete(conversation.session_id) is True
+        assert hibernation.delete(conversation.session_id) is False
+        assert hibernation.get(uuid4()) is None
+    
+    def test_blob_is_smaller_than_resident_estimate(self, hibernation):
+        """Test that hibernation reports bytes saved and rehydration latency."""
+        conversation = _long_conversation(ConversationService())
+        hibernation.save(conversation)
+        
+        metrics = hibernation.get_metrics()
+        assert metrics["hibernated_sessions"] == 1
+        assert metrics["bytes_saved"] > 5 * metrics["compressed_bytes"]
+        
+        hibernation.get(conversation.session_id)
+        metrics = hibernation.get_metrics()
+        assert metrics["rehydrations"] == 1
+        assert metrics["rehydrate_max"] > 0
+
+
+CLOCK = "src.infrastructure.persistence.hibernated_conversation_store.time"
+
+
+class TestRetention:
+    """Tests for bounded retention of hibernated blobs."""
+    
+    def test_blobs_older_than_max_age_are_deleted(self, hibernation):
+        """Test that the janitor deletes blobs past max_age."""
+        hibernation.max_age = 60
+        old = _long_conversation(ConversationService(), turns=1)
+        fresh = _long_conversation(ConversationService(), turns=1)
+        
+        with patch(CLOCK, return_value=1000.0):
+            hibernation.save(old)
+        with patch(CLOCK, return_value=1050.0):
+            hibernation.save(fresh)
+        with patch(CLOCK, return_value=1070.0):
+            assert hibernation.evict_expired() == 1
+        
+        assert hibernation.session_ids() == [fresh.session_id]
+        assert hibernation.get_metrics()["expired"] == 1
+    
+    def test_expired_blob_is_not_rehydrated(self, hibernation):
+        """Test that an expired session reads as missing even before the janitor runs."""
+        hibernation.max_age = 60
+        conversation = _long_conversation(ConversationService(), turns=1)
+        
+        with patch(CLOCK, return_value=1000.0):
+            hibernation.save(conversation)
+        with patch(CLOCK, return_value=2000.0):
+            assert hibernation.get(conversation.session_id) is None
+        
+        assert hibernation.session_ids() == []
+    
+    def test_byte_budget_drops_oldest(self, hibernation):
+        """Test that going over max_bytes deletes the oldest blobs first."""
+        conversations = [_long_conversation(ConversationService(), turns=5) for _ in range(3)]
+        hibernation.save(conversations[0])
+        hibernation.max_bytes = hibernation.get_metrics()["compressed_bytes"] * 5 // 2
+        
+        for conversation in conversations[1:]:
+            hibernation.save(conversation)
+        
+        assert hibernation.session_ids() == [c.session_id for c in conversations[1:]]
+        assert hibernation.get_metrics()["evicted"] == 1
+        assert hibernation.get_metrics()["compressed_bytes"] <= hibernation.max_bytes
+    
+    def test_disk_index_survives_restart(self, tmp_path):
+        """Test that sizes and ages are rebuilt from the directory on startup."""
+        directory = tmp_path / "hibernated"
+        first = HibernatedConversationStore(directory=directory)
+        conversation = _long_conversation(ConversationService(), turns=2)
+        first.save(conversation)
+        compressed = first.get_metrics()["compressed_bytes"]
+        
+        restarted = HibernatedConversationStore(directory=directory, max_bytes=compressed * 10)
+        
+        assert restarted.session_ids() == [conversation.session_id]
+        assert restarted.get_metrics()["compressed_bytes"] == compressed
+        assert restarted.get(conversation.session_id).messages == conversation.messages
+        assert restarted.get_metrics()["compressed_bytes"] == 0
+    
+    def test_disk_restart_applies_max_age(self, tmp_path):
+        """Test that stale files left by a previous run are deleted at startup."""
+        directory = tmp_path / "hibernated"
+        conversation = _long_conversation(ConversationService(), turns=1)
+        HibernatedConversationStore(directory=directory).save(conversation)
+        
+        with patch(CLOCK, return_value=4e9):
+            restarted = HibernatedConversationStore(directory=directory, max_age=60)
+        
+        assert restarted.session_ids() == []
+        assert not list(directory.glob("*.bin"))
+
+
+class TestTiering:
+    """Tests for hibernation as the cold tier of the in-memory store."""
+    
+    def test_idle_sessions_hibernate_and_come_back(self):
+        """Test that the janitor pass hibernates idle sessions transparently."""
+        hibernation = HibernatedConversationStore()
+        store = InMemoryConversationStore(idle_ttl=1e-9, spill_store=hibernation)
+        service = ConversationService(store=store)
+        conversation = _long_conversation(service)
+        expected = conversation.get_messages_for_llm()
+        
+        assert service.evict_idle_conversations() == 1
+        assert store.get_metrics()["sessions"] == 0
+        assert store.get_metrics()["spill"]["hibernated_sessions"] == 1
+        assert service.get_active_conversations_count() == 1
+        
+        restored = service.get_conversation(conversation.session_id)
+        
+        assert restored.get_messages_for_llm() == expected
+        assert store.get_metrics()["spill"]["hibernated_sessions"] == 0
+        
+        service.add_user_message(conversation.session_id, "Sigo aquí")
+        assert service.get_conversation(conversation.session_id).message_count == len(expected) + 1
+    
+    def test_janitor_expires_cold_tier(self):
+        """Test that the in-memory store's janitor pass also ages out hibernated blobs."""
+        hibernation = HibernatedConversationStore(max_age=60)
+        store = InMemoryConversationStore(idle_ttl=1e-9, spill_store=hibernation)
+        service = ConversationService(store=store)
+        _long_conversation(service, turns=1)
+        
+        with patch(CLOCK, return_value=1000.0):
+            service.evict_idle_conversations()
+        with patch(CLOCK, return_value=2000.0):
+            service.evict_idle_conversations()
+        
+        assert service.get_active_conversations_count() == 0
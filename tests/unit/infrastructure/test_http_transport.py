@@ -0,0 +1,96 @@
+"""
+Tests for the shared LLM HTTP transport (Infrastructure Layer).
+
+Tests:
+- httpx client limits and timeouts
+- Connection reuse and pool-wait metrics
+"""
+
+import httpx
+import pytest
+
+from src.infrastructure.llm.http_transport import HTTPClientMetrics, build_http_client
+from src.infrastructure.llm.llm_pool_client import LLMPoolClient
+
+
+async def _run_trace(metrics: HTTPClientMetrics, events: list[str]) -> None:
+    """Simulate the httpcore trace events of one request."""
+    request = httpx.Request("POST", "http://localhost:1234/v1/chat/completions")
+    await metrics.on_request(request)
+    trace = request.extensions["trace"]
+    for event in events:
+        await trace(event, {})
+
+
+class TestBuildHttpClient:
+    """Tests for build_http_client."""
+    
+    async def test_timeouts_are_explicit(self):
+        """Test that the SDK default timeout is replaced."""
+        client = build_http_client(connect_timeout=1.5, read_timeout=20.0)
+        
+        assert client.timeout.connect == 1.5
+        assert client.timeout.read == 20.0
+        await client.aclose()
+    
+    async def test_http2_falls_back_without_h2(self, monkeypatch):
+        """Test that HTTP/2 is silently disabled when h2 is missing."""
+        monkeypatch.setattr(
+            "src.infrastructure.llm.http_transport.find_spec", lambda name: None
+        )
+        
+        client = build_http_client(http2=True)
+        
+        assert client is not None
+        await client.aclose()
+
+
+class TestHTTPClientMetrics:
+    """Tests for connection reuse metrics."""
+    
+    async def test_new_and_reused_connections(self):
+        """Test that requests without connect_tcp count as reused."""
+        metrics = HTTPClientMetrics()
+        
+        await _run_trace(metrics, [
+            "connection.connect_tcp.started",
+            "connection.connect_tcp.complete",
+            "http11.send_request_headers.started"
+        ])
+        await _run_trace(metrics, ["http11.send_request_headers.started"])
+        await _run_trace(metrics, ["http11.send_request_headers.started"])
+        
+        stats = metrics.to_dict()
+        assert stats["requests"] == 3
+        assert stats["new_connections"] == 1
+        assert stats["reused_connections"] == 2
+        assert stats["reuse_ratio"] == pytest.approx(0.6667)
+        assert stats["pool_wait_max"] >= 0.0
+    
+    def test_empty_metrics(self):
+        """Test that metrics are zero before any request."""
+        stats = HTTPClientMetrics().to_dict()
+        
+        assert stats["reuse_ratio"] == 0.0
+        assert stats["pool_wait_avg"] == 0.0
+
+
+class TestSharedClient:
+    """Tests for the pool sharing one httpx client."""
+    
+    async def test_backends_share_http_client(self):
+        """Test that every backend uses the same httpx client."""
+        pool = LLMPoolClient.from_urls(
+            base_urls=["http://a:1234/v1", "http://b:1234/v1"],
+            model="test-model",
+            max_tokens=150,
+            temperature=0.7,
+            http_options={"max_connections": 10}
+        )
+        
+        first, second = (backend.client.client._client for backend in pool.backends)
+        
+        assert first is second
+        assert "http" in pool.get_metrics()
+        await pool.cleanup()
+        assert first.is_closed
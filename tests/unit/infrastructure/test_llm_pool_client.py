@@ -0,0 +1,307 @@
+"""
+Tests for LLMPoolClient (Infrastructure Layer).
+
+Uses local stand-in backends instead of real LM Studio servers.
+
+Tests:
+- Least-outstanding-requests routing
+- Session affinity
+- Failover, circuit breaker and health
+- Hedged requests
+- Routing metrics
+"""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from src.infrastructure.llm.lm_studio_client import LLMUnavailableError
+from src.infrastructure.llm.llm_pool_client import LLMPoolClient
+
+
+class StandInBackend:
+    """Stand-in for an OpenAI-compatible backend (LMStudioClient interface)."""
+    
+    def __init__(self, name: str, fail: bool = False, delay: float = 0.0):
+        self.base_url = f"http://{name}:1234/v1"
+        self.name = name
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+        self.release.set()
+    
+    async def generate_response(self, messages, max_tokens=None, temperature=None):
+        self.calls += 1
+        try:
+            await self.release.wait()
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        return f"reply from {self.name}"
+    
+    async def generate_response_stream(self, messages, max_tokens=None, temperature=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+            for word in ("reply", "from", self.name):
+                yield word
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+    
+    async def prefill_prompt(self, messages):
+        self.calls += 1
+        return 0.01
+    
+    async def health_check(self):
+        return not self.fail
+    
+    async def cleanup(self):
+        pass
+
+
+@pytest.fixture
+def backends():
+    """Fixture: three stand-in backends."""
+    return [StandInBackend("a"), StandInBackend("b"), StandInBackend("c")]
+
+
+MESSAGES = [{"role": "user", "content": "Hola"}]
+
+
+class TestRouting:
+    """Tests for least-outstanding-requests routing."""
+    
+    async def test_routes_to_least_loaded_backend(self, backends):
+        """Test that a busy backend is skipped while others are idle."""
+        pool = LLMPoolClient(backends, sticky_sessions=False)
+        backends[0].release.clear()
+        
+        # Occupy backend "a" with an in-flight request
+        pending = asyncio.create_task(pool.generate_response(MESSAGES))
+        await asyncio.sleep(0)
+        
+        result = await pool.generate_response(MESSAGES)
+        
+        assert result == "reply from b"
+        backends[0].release.set()
+        assert await pending == "reply from a"
+    
+    async def test_in_flight_is_released_after_request(self, backends):
+        """Test that in-flight counters return to zero."""
+        pool = LLMPoolClient(backends)
+        
+        await asyncio.gather(*(pool.generate_response(MESSAGES) for _ in range(6)))
+        
+        assert all(b.in_flight == 0 for b in pool.backends)
+        assert sum(b.total_requests for b in pool.backends) == 6
+    
+    async def test_routing_decision_in_metrics(self, backends):
+        """Test that the chosen backend is reported in latency metrics."""
+        pool = LLMPoolClient(backends)
+        metrics: dict[str, float] = {}
+        
+        await pool.generate_response(MESSAGES, metrics=metrics)
+        
+        assert metrics["llm_backend"] == 0.0
+        assert metrics["llm_backend_in_flight"] == 0.0
+    
+    def test_empty_pool_raises_error(self):
+        """Test that a pool needs at least one backend."""
+        with pytest.raises(ValueError, match="at least one backend"):
+            LLMPoolClient([])
+
+
+class TestSessionAffinity:
+    """Tests for sticky sessions."""
+    
+    async def test_session_sticks_to_backend(self, backends):
+        """Test that a session keeps using the same backend."""
+        pool = LLMPoolClient(backends, sticky_sessions=True)
+        session_id = uuid4()
+        
+        # Load the pool so that least-loaded would pick a different backend
+        backends[0].release.clear()
+        other = asyncio.create_task(pool.generate_response(MESSAGES))
+        await asyncio.sleep(0)
+        
+        first: dict[str, float] = {}
+        await pool.generate_response(MESSAGES, session_id=session_id, metrics=first)
+        backends[0].release.set()
+        await other
+        
+        second: dict[str, float] = {}
+        await pool.generate_response(MESSAGES, session_id=session_id, metrics=second)
+        
+        assert first["llm_backend"] == 1.0
+        assert second["llm_backend"] == 1.0
+    
+    async def test_prefill_and_turn_hit_same_backend(self, backends):
+        """Test that the prefill and the real request share a backend."""
+        pool = LLMPoolClient(backends, sticky_sessions=True)
+        session_id = uuid4()
+        
+        await pool.prefill_prompt(MESSAGES, session_id=session_id)
+        prefill_backend = next(b for b in backends if b.calls == 1)
+        
+        metrics: dict[str, float] = {}
+        await pool.generate_response(MESSAGES, session_id=session_id, metrics=metrics)
+        
+        assert backends[int(metrics["llm_backend"])] is prefill_backend
+
+
+class TestFailover:
+    """Tests for failover and health tracking."""
+    
+    async def test_failover_to_next_backend(self, backends):
+        """Test that a failing backend is skipped transparently."""
+        backends[0].fail = True
+        pool = LLMPoolClient(backends, failure_threshold=1)
+        
+        result = await pool.generate_response(MESSAGES)
+        
+        assert result == "reply from b"
+        assert not pool.backends[0].is_healthy
+    
+    async def test_open_circuit_backend_is_not_routed(self, backends):
+        """Test that a backend with an open circuit receives no traffic."""
+        backends[0].fail = True
+        pool = LLMPoolClient(backends, failure_threshold=1)
+        await pool.generate_response(MESSAGES)
+        
+        await pool.generate_response(MESSAGES)
+        
+        assert backends[0].calls == 1
+    
+    async def test_circuit_opens_after_threshold(self, backends):
+        """Test that the circuit only opens after consecutive failures."""
+        backends[0].fail = True
+        pool = LLMPoolClient(backends[:1], failure_threshold=2)
+        
+        with pytest.raises(LLMUnavailableError):
+            await pool.generate_response(MESSAGES)
+        assert pool.backends[0].breaker.state == "closed"
+        
+        with pytest.raises(LLMUnavailableError):
+            await pool.generate_response(MESSAGES)
+        assert pool.backends[0].breaker.state == "open"
+    
+    async def test_all_circuits_open_fails_fast(self, backends):
+        """Test that no request is sent when every circuit is open."""
+        pool = LLMPoolClient(backends, failure_threshold=1, reset_timeout=30.0)
+        for backend in pool.backends:
+            backend.record_failure()
+        
+        with pytest.raises(LLMUnavailableError, match="circuit open") as exc_info:
+            await pool.generate_response(MESSAGES)
+        
+        assert sum(b.calls for b in backends) == 0
+        assert exc_info.value.retry_after > 0
+    
+    async def test_timeout_counts_as_failure(self, backends):
+        """Test that a timed-out request trips the breaker and fails over."""
+        backends[0].delay = 1.0
+        pool = LLMPoolClient(backends, request_timeout=0.05, failure_threshold=1, hedging=False)
+        
+        result = await pool.generate_response(MESSAGES)
+        
+        assert result == "reply from b"
+        assert pool.backends[0].breaker.state == "open"
+        assert backends[0].cancelled == 1
+    
+    async def test_all_backends_failing_raises_error(self, backends):
+        """Test that an error is raised when every backend fails."""
+        for backend in backends:
+            backend.fail = True
+        pool = LLMPoolClient(backends)
+        
+        with pytest.raises(RuntimeError, match="All LLM backends failed"):
+            await pool.generate_response(MESSAGES)
+    
+    async def test_health_check_any_backend(self, backends):
+        """Test that the pool is healthy while one backend is up."""
+        backends[0].fail = True
+        backends[1].fail = True
+        pool = LLMPoolClient(backends, failure_threshold=1)
+        
+        assert await pool.health_check() is True
+        assert [b["healthy"] for b in pool.get_metrics()["backends"]] == [False, False, True]
+
+
+def _warm_up_latencies(pool: LLMPoolClient, latency: float) -> None:
+    """Fill the pool latency windows so that the p95 is known."""
+    for _ in range(LLMPoolClient.MIN_HEDGE_SAMPLES):
+        pool._latencies.append(latency)
+        pool._ttft.append(latency)
+
+
+class TestHedging:
+    """Tests for hedged requests."""
+    
+    async def test_no_hedge_without_latency_samples(self, backends):
+        """Test that hedging waits until the p95 is known."""
+        backends[0].delay = 0.05
+        pool = LLMPoolClient(backends, hedge_min_delay=0.0)
+        
+        result = await pool.generate_response(MESSAGES)
+        
+        assert result == "reply from a"
+        assert backends[1].calls == 0
+    
+    async def test_slow_request_is_hedged_and_loser_cancelled(self, backends):
+        """Test that a request slower than the p95 is duplicated."""
+        backends[0].delay = 1.0
+        pool = LLMPoolClient(backends, hedge_min_delay=0.0)
+        _warm_up_latencies(pool, 0.02)
+        metrics: dict[str, float] = {}
+        
+        result = await pool.generate_response(MESSAGES, metrics=metrics)
+        await asyncio.sleep(0.01)  # Let the cancelled loser unwind
+        
+        assert result == "reply from b"
+        assert metrics["llm_hedged"] == 1.0
+        assert metrics["llm_backend"] == 1.0
+        assert backends[0].cancelled == 1
+        assert pool.get_metrics()["hedging"]["hedge_wins"] == 1
+        assert all(b.in_flight == 0 for b in pool.backends)
+    
+    async def test_prefill_does_not_lower_hedge_threshold(self, backends):
+        """Test that max_tokens=1 prefills stay out of the latency windows."""
+        pool = LLMPoolClient(backends, hedge_min_delay=0.0)
+        _warm_up_latencies(pool, 0.5)
+        
+        for _ in range(20):
+            await pool.prefill_prompt(MESSAGES)
+        
+        assert pool.get_metrics()["hedging"]["p95_latency"] == 0.5
+        assert all(b.recent_latency == 0.0 for b in pool.backends)
+    
+    async def test_fast_request_is_not_hedged(self, backends):
+        """Test that requests under the p95 are not duplicated."""
+        pool = LLMPoolClient(backends, hedge_min_delay=0.0)
+        _warm_up_latencies(pool, 0.5)
+        metrics: dict[str, float] = {}
+        
+        await pool.generate_response(MESSAGES, metrics=metrics)
+        
+        assert "llm_hedged" not in metrics
+        assert sum(b.calls for b in backends) == 1
+    
+    async def test_stream_hedges_on_first_token(self, backends):
+        """Test that a stream without a first token by the p95 is hedged."""
+        backends[0].delay = 1.0
+        pool = LLMPoolClient(backends, hedge_min_delay=0.0)
+        _warm_up_latencies(pool, 0.02)
+        
+        chunks = [chunk async for chunk in pool.generate_response_stream(MESSAGES)]
+        await asyncio.sleep(0.01)  # Let the cancelled loser unwind
+        
+        assert chunks == ["reply", "from", "b"]
+        assert backends[0].cancelled == 1
+        assert all(b.in_flight == 0 for b in pool.backends)
@@ -0,0 +1,44 @@
+"""
+Tests for LMStudioClient (Infrastructure Layer, mocked).
+
+Tests:
+- KV cache prefill request
+"""
+
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from src.infrastructure.llm.lm_studio_client import LMStudioClient
+
+
+@pytest.fixture
+def llm_client():
+    """Fixture: LMStudioClient pointing at a non-existent server."""
+    return LMStudioClient(
+        base_url="http://localhost:1234/v1",
+        model="test-model",
+        max_tokens=150,
+        temperature=0.7
+    )
+
+
+class TestPrefillPrompt:
+    """Tests for prefill_prompt."""
+    
+    async def test_prefill_requests_single_token(self, llm_client):
+        """Test that prefill only asks the server for one token."""
+        llm_client.client.chat.completions.create = AsyncMock(return_value=Mock())
+        messages = [{"role": "system", "content": "Eres A.R.C.A"}]
+        
+        elapsed = await llm_client.prefill_prompt(messages)
+        
+        kwargs = llm_client.client.chat.completions.create.call_args.kwargs
+        assert kwargs["max_tokens"] == 1
+        assert kwargs["messages"] == messages
+        assert kwargs["stream"] is False
+        assert elapsed >= 0.0
+    
+    async def test_prefill_empty_messages_raises_error(self, llm_client):
+        """Test that an empty prefix is rejected."""
+        with pytest.raises(ValueError, match="Messages list cannot be empty"):
+            await llm_client.prefill_prompt([])
@@ -0,0 +1,307 @@
+"""
+Tests for RedisConversationStore (Infrastructure Layer).
+
+Uses a local in-process stand-in that speaks the redis-py API subset used
+by the store (and fakeredis too, when installed).
+
+Tests:
+- Round trip through ConversationService
+- Append-only writes and version checks
+- Read-through cache and pipelined reads
+- Sharing between workers (two stores on the same server)
+"""
+
+from uuid import uuid4
+
+import pytest
+
+from src.application.conversation_service import ConversationService
+from src.infrastructure.persistence.redis_conversation_store import RedisConversationStore
+
+
+class StandInPipeline:
+    """Queues commands and runs them in order on execute()."""
+    
+    def __init__(self, server: "StandInRedis"):
+        self.server = server
+        self.commands = []
+    
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+    
+    def execute(self):
+        self.server.round_trips += 1
+        return [getattr(self.server, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class StandInRedis:
+    """In-process stand-in for a Redis server (bytes in, bytes out)."""
+    
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.round_trips = 0
+        self.commands = []
+    
+    @staticmethod
+    def _b(value) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+    
+    def pipeline(self, transaction=True):
+        return StandInPipeline(self)
+    
+    def _call(self, name):
+        self.commands.append(name)
+    
+    def hget(self, key, field):
+        self.round_trips += 1
+        self._call("hget")
+        return self.data.get(key, {}).get(self._b(field))
+    
+    def hgetall(self, key):
+        self._call("hgetall")
+        return dict(self.data.get(key, {}))
+    
+    def hset(self, key, mapping):
+        self._call("hset")
+        self.data.setdefault(key, {}).update({self._b(k): self._b(v) for k, v in mapping.items()})
+        return len(mapping)
+    
+    def hincrby(self, key, field, amount):
+        self._call("hincrby")
+        fields = self.data.setdefault(key, {})
+        value = int(fields.get(self._b(field), b"0")) + amount
+        fields[self._b(field)] = self._b(value)
+        return value
+    
+    def rpush(self, key, *values):
+        self._call("rpush")
+        items = self.data.setdefault(key, [])
+        items.extend(self._b(v) for v in values)
+        return len(items)
+    
+    def lrange(self, key, start, end):
+        self._call("lrange")
+        items = self.data.get(key, [])
+        return list(items[start:] if end == -1 else items[start:end + 1])
+    
+    def expire(self, key, seconds):
+        self._call("expire")
+        self.ttls[key] = seconds
+        return key in self.data
+    
+    def exists(self, key):
+        self._call("exists")
+        return int(key in self.data)
+    
+    def delete(self, *keys):
+        self._call("delete")
+        return sum(self.data.pop(key, None) is not None for key in keys)
+    
+    def sadd(self, key, member):
+        self._call("sadd")
+        self.data.setdefault(key, set()).add(self._b(member))
+    
+    def srem(self, key, *members):
+        self.round_trips += 1
+        self._call("srem")
+        for member in members:
+            self.data.get(key, set()).discard(self._b(member))
+    
+    def smembers(self, key):
+        self.round_trips += 1
+        return set(self.data.get(key, set()))
+    
+    def scard(self, key):
+        self.round_trips += 1
+        return len(self.data.get(key, set()))
+
+
+@pytest.fixture(params=["stand-in", "fakeredis"])
+def redis_server(request):
+    """Fixture: Redis-protocol server (stand-in, or fakeredis if installed)."""
+    if request.param == "fakeredis":
+        fakeredis = pytest.importorskip("fakeredis")
+        return fakeredis.FakeRedis()
+    return StandInRedis()
+
+
+@pytest.fixture
+def store(redis_server):
+    """Fixture: RedisConversationStore on the test server."""
+    return RedisConversationStore(redis_server, key_prefix="test:conv")
+
+
+class TestRoundTrip:
+    """Tests for persisting conversations through the service."""
+    
+    def test_conversation_survives_new_service(self, redis_server):
+        """Test that a restarted worker sees the same history."""
+        service = ConversationService(store=RedisConversationStore(redis_server))
+        conv = service.create_conversation(system_prompt="Eres un asistente")
+        service.add_user_message(conv.session_id, "Hola, me llamo Adrian")
+        service.add_assistant_message(conv.session_id, "Hola Adrian!")
+        
+        restarted = ConversationService(store=RedisConversationStore(redis_server))
+        restored = restarted.get_conversation(conv.session_id)
+        
+        assert restored is not None
+        assert restored.get_messages_for_llm() == conv.get_messages_for_llm()
+        assert restored.get_messages_for_display() == conv.get_messages_for_display()
+    
+    def test_version_is_shared_between_workers(self, redis_server):
+        """Test that a reload on another worker reports the same version."""
+        service = ConversationService(store=RedisConversationStore(redis_server))
+        conv = service.create_conversation()
+        service.add_user_message(conv.session_id, "Hola")
+        known = conv.version
+        service.add_assistant_message(conv.session_id, "¿Qué tal?")
+        
+        restored = RedisConversationStore(redis_server).get(conv.session_id)
+        
+        assert restored.version == conv.version
+        assert restored.is_append_only_since(known)
+    
+    def test_missing_conversation_returns_none(self, store):
+        """Test that unknown sessions are not found."""
+        assert store.get(uuid4()) is None
+    
+    def test_delete_and_count(self, store):
+        """Test delete, count and session listing."""
+        service = ConversationService(store=store)
+        conv1 = service.create_conversation()
+        conv2 = service.create_conversation()
+        
+        assert service.get_active_conversations_count() == 2
+        assert set(store.session_ids()) == {conv1.session_id, conv2.session_id}
+        
+        assert service.delete_conversation(conv1.session_id) is True
+        assert service.delete_conversation(conv1.session_id) is False
+        assert service.get_active_conversations_count() == 1
+        assert service.get_conversation(conv1.session_id) is None
+    
+    def test_clear_and_discard_are_persisted(self, redis_server):
+        """Test that full rewrites reach the server."""
+        service = ConversationService(store=RedisConversationStore(redis_server))
+        conv = service.create_conversation()
+        service.add_user_message(conv.session_id, "Pregunta sin respuesta")
+        
+        assert service.discard_unanswered_user_message(conv.session_id) is True
+        
+        other = RedisConversationStore(redis_server).get(conv.session_id)
+        assert other.message_count == 1
+    
+    def test_max_messages_trim_rewrites_history(self, redis_server):
+        """Test that a trimmed conversation is rewritten instead of appended."""
+        service = ConversationService(
+            max_messages_per_conversation=3,
+            store=RedisConversationStore(redis_server)
+        )
+        conv = service.create_conversation()
+        for i in range(5):
+            service.add_user_message(conv.session_id, f"Message {i}")
+        
+        restored = RedisConversationStore(redis_server).get(conv.session_id)
+        
+        assert restored.max_messages == 3
+        assert restored.get_messages_for_llm() == conv.get_messages_for_llm()
+
+
+class TestAppendAndCache:
+    """Tests for append-only writes and the local read-through cache."""
+    
+    def test_append_uses_rpush(self):
+        """Test that adding a message is an RPUSH, not a rewrite."""
+        server = StandInRedis()
+        service = ConversationService(store=RedisConversationStore(server))
+        conv = service.create_conversation()
+        server.commands.clear()
+        
+        service.add_user_message(conv.session_id, "Hola")
+        
+        assert "rpush" in server.commands
+        assert "delete" not in server.commands
+    
+    def test_cached_read_is_single_version_check(self):
+        """Test that an unchanged conversation is served from the local cache."""
+        server = StandInRedis()
+        store = RedisConversationStore(server)
+        service = ConversationService(store=store)
+        conv = service.create_conversation()
+        server.round_trips = 0
+        
+        assert store.get(conv.session_id) is conv
+        assert server.round_trips == 1
+        assert "lrange" not in server.commands
+    
+    def test_cache_miss_is_one_pipelined_round_trip(self):
+        """Test that a cold read fetches meta and history together."""
+        server = StandInRedis()
+        conv = ConversationService(store=RedisConversationStore(server)).create_conversation()
+        cold = RedisConversationStore(server)
+        server.round_trips = 0
+        
+        assert cold.get(conv.session_id) is not None
+        assert server.round_trips == 1
+    
+    def test_other_worker_write_invalidates_cache(self):
+        """Test that a write from another worker is seen via the version check."""
+        server = StandInRedis()
+        worker_a = ConversationService(store=RedisConversationStore(server))
+        worker_b = ConversationService(store=RedisConversationStore(server))
+        conv = worker_a.create_conversation()
+        
+        # Both workers hold the conversation in their local cache
+        assert worker_b.get_conversation(conv.session_id) is not None
+        
+        worker_b.add_user_message(conv.session_id, "Desde el worker B")
+        worker_a.add_assistant_message(conv.session_id, "Respuesta del worker A")
+        
+        history = worker_b.get_conversation(conv.session_id).get_messages_for_llm()
+        
+        assert [m["content"] for m in history[1:]] == ["Desde el worker B", "Respuesta del worker A"]
+
+
+class TestExpiry:
+    """Tests for idle expiry of abandoned sessions."""
+    
+    def test_every_write_renews_ttl(self):
+        """Test that save and append set EXPIRE on the session keys."""
+        server = StandInRedis()
+        service = ConversationService(store=RedisConversationStore(server, key_prefix="t", idle_ttl=600))
+        conv = service.create_conversation()
+        server.ttls.clear()
+        
+        service.add_user_message(conv.session_id, "Hola")
+        
+        assert server.ttls == {f"t:{conv.session_id}:meta": 600, f"t:{conv.session_id}:msgs": 600}
+    
+    def test_no_ttl_by_default(self):
+        """Test that without idle_ttl keys never expire."""
+        server = StandInRedis()
+        ConversationService(store=RedisConversationStore(server)).create_conversation()
+        
+        assert server.ttls == {}
+    
+    def test_expired_sessions_leave_the_index(self):
+        """Test that IDs whose keys Redis expired are pruned from the session set."""
+        server = StandInRedis()
+        store = RedisConversationStore(server, key_prefix="t", idle_ttl=600)
+        service = ConversationService(store=store)
+        kept = service.create_conversation()
+        gone = service.create_conversation()
+        
+        # Redis expires the abandoned session's keys
+        server.delete(f"t:{gone.session_id}:meta", f"t:{gone.session_id}:msgs")
+        
+        assert store.session_ids() == [kept.session_id]
+        assert store.count() == 1
+        assert store.get(gone.session_id) is None
+        assert server.data["t:sessions"] == {str(kept.session_id).encode()}
+    
+    def test_store_is_called_off_the_event_loop(self):
+        """Test that the service treats Redis as blocking I/O."""
+        assert RedisConversationStore(StandInRedis()).blocking is True
@@ -0,0 +1,239 @@
+"""
+Tests for SqliteConversationStore (Infrastructure Layer).
+
+Tests:
+- Durability across restarts with lazy rehydration
+- Group commit (batched writes off the request path)
+- Deletes, trims and rollbacks
+- Write and rehydration metrics
+"""
+
+import sqlite3
+from time import monotonic
+from uuid import uuid4
+
+import pytest
+
+from src.application.conversation_service import ConversationService
+from src.infrastructure.persistence.sqlite_conversation_store import SqliteConversationStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Fixture: SQLite file path."""
+    return tmp_path / "conversations.db"
+
+
+@pytest.fixture
+def store(db_path):
+    """Fixture: SqliteConversationStore, closed after the test."""
+    store = SqliteConversationStore(db_path, commit_delay=0.0)
+    yield store
+    store.close()
+
+
+class TestDurability:
+    """Tests for surviving restarts."""
+    
+    def test_conversation_survives_restart(self, db_path):
+        """Test that history is rehydrated lazily after a restart."""
+        store = SqliteConversationStore(db_path)
+        service = ConversationService(store=store)
+        conv = service.create_conversation(system_prompt="Eres un asistente")
+        service.add_user_message(conv.session_id, "Hola, me llamo Adrian")
+        service.add_assistant_message(conv.session_id, "Hola Adrian!")
+        store.close()
+        
+        restarted_store = SqliteConversationStore(db_path)
+        restarted = ConversationService(store=restarted_store)
+        
+        try:
+            assert restarted_store.get_metrics()["live_sessions"] == 0
+            
+            restored = restarted.get_conversation(conv.session_id)
+            
+            assert restored.get_messages_for_display() == conv.get_messages_for_display()
+            assert restarted_store.get_metrics()["rehydrations"] == 1
+            
+            # Second access is served from memory
+            assert restarted.get_conversation(conv.session_id) is restored
+            assert restarted_store.get_metrics()["rehydrations"] == 1
+        finally:
+            restarted_store.close()
+    
+    def test_version_survives_restart(self, db_path):
+        """Test that a rehydrated conversation keeps its version and stays append-only."""
+        store = SqliteConversationStore(db_path, commit_delay=0.0)
+        service = ConversationService(store=store)
+        conv = service.create_conversation()
+        service.add_user_message(conv.session_id, "Hola")
+        known = conv.version
+        service.add_assistant_message(conv.session_id, "¿Qué tal?")
+        store.close()
+        
+        reopened = SqliteConversationStore(db_path)
+        try:
+            restored = reopened.get(conv.session_id)
+            
+            assert restored.version == conv.version
+            assert restored.is_append_only_since(known)
+        finally:
+            reopened.close()
+    
+    def test_old_schema_is_migrated(self, db_path):
+        """Test that a database without version columns is upgraded in place."""
+        connection = sqlite3.connect(db_path)
+        connection.execute(
+            "CREATE TABLE conversations (session_id TEXT PRIMARY KEY, "
+            "is_active INTEGER NOT NULL DEFAULT 1, max_messages INTEGER)"
+        )
+        connection.execute("INSERT INTO conversations (session_id) VALUES (?)", (str(uuid4()),))
+        connection.commit()
+        connection.close()
+        
+        store = SqliteConversationStore(db_path, commit_delay=0.0)
+        try:
+            [session_id] = store.session_ids()
+            assert store.get(session_id).message_count == 0
+            
+            conv = ConversationService(store=store).create_conversation()
+            assert store.flush()
+        finally:
+            store.close()
+        
+        reopened = SqliteConversationStore(db_path)
+        try:
+            assert reopened.get(conv.session_id).version == conv.version
+        finally:
+            reopened.close()
+    
+    def test_unknown_session_returns_none(self, store):
+        """Test that a session never stored is not found."""
+        assert store.get(uuid4()) is None
+    
+    def test_trim_and_rollback_are_persisted(self, db_path):
+        """Test that full rewrites replace the stored history."""
+        store = SqliteConversationStore(db_path, commit_delay=0.0)
+        service = ConversationService(max_messages_per_conversation=3, store=store)
+        conv = service.create_conversation()
+        for i in range(4):
+            service.add_user_message(conv.session_id, f"Message {i}")
+        service.add_assistant_message(conv.session_id, "Respuesta")
+        service.add_user_message(conv.session_id, "Sin respuesta")
+        service.discard_unanswered_user_message(conv.session_id)
+        store.close()
+        
+        reopened = SqliteConversationStore(db_path)
+        try:
+            assert reopened.get(conv.session_id).get_messages_for_llm() == conv.get_messages_for_llm()
+        finally:
+            reopened.close()
+    
+    def test_delete_removes_from_disk(self, db_path):
+        """Test that deleted sessions do not come back after a restart."""
+        store = SqliteConversationStore(db_path, commit_delay=0.0)
+        service = ConversationService(store=store)
+        kept = service.create_conversation()
+        removed = service.create_conversation()
+        
+        assert service.delete_conversation(removed.session_id) is True
+        assert service.get_conversation(removed.session_id) is None
+        store.close()
+        
+        reopened = SqliteConversationStore(db_path)
+        try:
+            assert reopened.session_ids() == [kept.session_id]
+        finally:
+            reopened.close()
+
+
+class TestGroupCommit:
+    """Tests for write batching."""
+    
+    def test_burst_is_committed_in_few_batches(self, db_path):
+        """Test that a burst of appends is grouped into few transactions."""
+        store = SqliteConversationStore(db_path, commit_delay=0.05)
+        service = ConversationService(store=store)
+        
+        try:
+            conv = service.create_conversation()
+            for i in range(50):
+                service.add_user_message(conv.session_id, f"Message {i}")
+            
+            assert store.flush()
+            metrics = store.get_metrics()
+            
+            assert metrics["writes_committed"] == 51
+            assert metrics["batches"] < 10
+            assert metrics["batch_max"] > 1
+            assert metrics["queue_depth"] == 0
+        finally:
+            store.close()
+    
+    def test_writes_do_not_block_request_path(self, store):
+        """Test that save/append return before the writer commits."""
+        service = ConversationService(store=store)
+        conv = service.create_conversation()
+        service.add_user_message(conv.session_id, "Hola")
+        
+        assert store.get_metrics()["writes_queued"] == 2
+        assert store.flush()
+        assert store.get_metrics()["writes_committed"] == 2
+    
+    def test_evicted_session_is_rehydrated_with_queued_writes(self, db_path):
+        """Test that a session evicted before its writes commit is not lost."""
+        store = SqliteConversationStore(db_path, commit_delay=0.05, max_sessions=1)
+        service = ConversationService(store=store)
+        
+        try:
+            first = service.create_conversation()
+            service.add_user_message(first.session_id, "Todavía en cola")
+            service.create_conversation()  # evicts the first one from memory
+            
+            restored = service.get_conversation(first.session_id)
+            
+            assert restored is not first
+            assert restored.get_messages_for_llm() == first.get_messages_for_llm()
+            assert store.get_metrics()["cache"]["evictions"]["lru"] >= 1
+        finally:
+            store.close()
+    
+    def test_rehydrate_waits_only_for_its_own_session(self, db_path):
+        """Test that a cold read is not held up by other sessions' queued writes."""
+        store = SqliteConversationStore(db_path, commit_delay=0.5, max_sessions=1)
+        service = ConversationService(store=store)
+        
+        try:
+            first = service.create_conversation()
+            assert store.flush()
+            service.create_conversation()  # queued, and evicts the first one
+            
+            start = monotonic()
+            restored = store.get(first.session_id)
+            
+            assert restored is not None
+            assert monotonic() - start < 0.25
+        finally:
+            store.close()
+    
+    def test_rehydrate_timeout_raises_instead_of_stale_read(self, db_path):
+        """Test that a session whose writes are still queued is never read stale."""
+        store = SqliteConversationStore(db_path, commit_delay=0.5, max_sessions=1, flush_timeout=0.05)
+        service = ConversationService(store=store)
+        
+        try:
+            first = service.create_conversation()
+            service.add_user_message(first.session_id, "Todavía en cola")
+            service.create_conversation()  # evicts the first one from memory
+            
+            with pytest.raises(TimeoutError):
+                store.get(first.session_id)
+            
+            assert store.flush(timeout=5.0)
+            assert store.get(first.session_id).message_count == 2
+        finally:
+            store.close()
+    
+    def test_store_is_called_off_the_event_loop(self, store):
+        """Test that the service treats SQLite as blocking I/O."""
+        assert store.blocking is True
@@ -0,0 +1,65 @@
+"""
+Tests for application import time (lazy backend imports).
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+HEAVY_MODULES = ("faster_whisper", "ctranslate2", "pyttsx3", "openai")
+
+
+def _run(code: str) -> subprocess.CompletedProcess:
+    """Run code in a fresh interpreter from the project root."""
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+
+
+@pytest.mark.unit
+class TestImportTime:
+    """Test that importing the app stays cheap."""
+    
+    def test_heavy_backends_not_imported(self):
+        """Test that importing src.api.main does not import heavy backends."""
+        result = _run(
+            "import sys, src.api.main; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        )
+        
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == ""
+    
+    def test_no_import_time_side_effects(self):
+        """Test that importing the STT client does not touch env vars or disk."""
+        result = _run(
+            "import os; before = dict(os.environ); "
+            "import src.infrastructure.stt.whisper_client; "
+            "print(sorted(k for k in os.environ if os.environ.get(k) != before.get(k)))"
+        )
+        
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "[]"
+    
+    def test_configure_model_cache(self, tmp_path, monkeypatch):
+        """Test that configure_model_cache creates the dir and sets HF env vars."""
+        from src.infrastructure.stt.whisper_client import configure_model_cache
+        
+        for name in ("HF_HOME", "HF_HUB_CACHE", "TRANSFORMERS_CACHE", "HUGGINGFACE_HUB_CACHE", "XDG_CACHE_HOME"):
+            monkeypatch.delenv(name, raising=False)
+        
+        cache_dir = configure_model_cache(tmp_path / "hf_cache")
+        
+        assert cache_dir.is_dir()
+        assert cache_dir.is_absolute()
+        assert os.environ["HF_HOME"] == str(cache_dir)
+        assert os.environ["HF_HUB_CACHE"] == str(cache_dir)
@@ -0,0 +1,76 @@
+"""
+Tests for the pre-fork multi-worker launcher.
+"""
+
+import gc
+import socket
+from unittest.mock import patch
+
+import pytest
+
+from src.api import prefork
+
+
+@pytest.mark.unit
+class TestProtocolSelection:
+    """Test uvicorn loop/parser selection."""
+    
+    def test_uses_fast_implementations_when_installed(self):
+        """Test that uvloop and httptools are chosen when importable."""
+        with patch.object(prefork, "find_spec", return_value=object()):
+            assert prefork.select_event_loop() == "uvloop"
+            assert prefork.select_http_protocol() == "httptools"
+    
+    def test_falls_back_to_pure_python(self):
+        """Test that asyncio and h11 are used when the fast ones are missing."""
+        with patch.object(prefork, "find_spec", return_value=None):
+            assert prefork.select_event_loop() == "asyncio"
+            assert prefork.select_http_protocol() == "h11"
+
+
+@pytest.mark.unit
+class TestPreload:
+    """Test parent-process preloading."""
+    
+    def test_preload_prefetches_model_and_freezes_heap(self):
+        """Test that preload downloads the model and freezes the GC heap."""
+        with patch("src.infrastructure.stt.whisper_client.configure_model_cache") as configure, \
+                patch("src.infrastructure.stt.whisper_client.prefetch_model") as prefetch:
+            try:
+                prefork.preload()
+                assert gc.get_freeze_count() > 0
+            finally:
+                gc.unfreeze()
+        
+        configure.assert_called_once()
+        prefetch.assert_called_once_with(prefork.settings.whisper_model)
+    
+    def test_preload_survives_prefetch_failure(self):
+        """Test that a failed download is left for the workers to retry."""
+        with patch("src.infrastructure.stt.whisper_client.configure_model_cache"), \
+                patch("src.infrastructure.stt.whisper_client.prefetch_model", side_effect=OSError("offline")):
+            try:
+                prefork.preload()
+            finally:
+                gc.unfreeze()
+
+
+@pytest.mark.unit
+class TestSupervisor:
+    """Test supervisor setup."""
+    
+    def test_rejects_zero_workers(self):
+        """Test that at least one worker is required."""
+        with pytest.raises(ValueError, match="workers must be >= 1"):
+            prefork.PreforkSupervisor(workers=0, host="127.0.0.1", port=8000)
+    
+    def test_bind_socket_is_inheritable(self):
+        """Test that the listening socket can be shared with forked workers."""
+        sock = prefork.bind_socket("127.0.0.1", 0)
+        
+        try:
+            assert sock.get_inheritable()
+            assert sock.type == socket.SOCK_STREAM
+            assert sock.getsockname()[1] > 0
+        finally:
+            sock.close()
@@ -0,0 +1,135 @@
+"""
+Tests for the in-memory static asset cache.
+
+Tests:
+- Content-hashed URLs and index.html rewriting
+- Accept-Encoding negotiation with precompressed bodies
+- Conditional requests (If-None-Match → 304)
+- Cache-Control for hashed and plain URLs
+"""
+
+import gzip
+
+import pytest
+from starlette.requests import Request
+
+from src.api.static_assets import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    StaticAssetCache,
+)
+
+
+SCRIPT = "console.log('A.R.C.A');\n" * 100
+
+
+def _request(**headers) -> Request:
+    """Minimal GET request with the given headers."""
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    })
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Fixture: cache over a small frontend tree."""
+    static = tmp_path / "static"
+    (static / "js").mkdir(parents=True)
+    (static / "js" / "app.js").write_text(SCRIPT)
+    (static / "logo.png").write_bytes(b"\x89PNG" + bytes(1000))
+    
+    template = tmp_path / "index.html"
+    template.write_text('<html><script src="/static/js/app.js"></script></html>')
+    
+    return StaticAssetCache(static_dir=static, template_path=template)
+
+
+def _hashed_script_path(cache) -> str:
+    body = cache.index(_request()).body.decode()
+    return body.split('src="/static/')[1].split('"')[0]
+
+
+class TestHashedUrls:
+    """Tests for content-hashed URLs."""
+    
+    def test_index_references_hashed_url(self, cache):
+        """Test that index.html points to the fingerprinted asset."""
+        path = _hashed_script_path(cache)
+        
+        assert path.startswith("js/app.") and path.endswith(".js")
+        assert path != "js/app.js"
+    
+    def test_hashed_url_is_immutable(self, cache):
+        """Test that fingerprinted URLs are cacheable for a year."""
+        response = cache.static(_hashed_script_path(cache), _request())
+        
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.body == SCRIPT.encode()
+    
+    def test_plain_url_must_revalidate(self, cache):
+        """Test that the unhashed URL still works but is revalidated."""
+        response = cache.static("js/app.js", _request())
+        
+        assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    
+    def test_unknown_path_returns_none(self, cache):
+        """Test that only loaded files are served."""
+        assert cache.static("../index.html", _request()) is None
+
+
+class TestEncoding:
+    """Tests for Accept-Encoding negotiation."""
+    
+    def test_gzip_when_accepted(self, cache):
+        """Test that the precompressed gzip body is served."""
+        response = cache.static("js/app.js", _request(accept_encoding="gzip, deflate"))
+        
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert gzip.decompress(response.body) == SCRIPT.encode()
+    
+    def test_identity_without_accept_encoding(self, cache):
+        """Test that clients without compression get the raw body."""
+        response = cache.static("js/app.js", _request())
+        
+        assert "content-encoding" not in response.headers
+    
+    def test_gzip_refused_with_q_zero(self, cache):
+        """Test that q=0 disables an encoding."""
+        response = cache.static("js/app.js", _request(accept_encoding="gzip;q=0"))
+        
+        assert "content-encoding" not in response.headers
+    
+    def test_binary_files_are_not_compressed(self, cache):
+        """Test that images are served as-is."""
+        response = cache.static("logo.png", _request(accept_encoding="gzip"))
+        
+        assert "content-encoding" not in response.headers
+
+
+class TestConditionalRequests:
+    """Tests for ETag revalidation."""
+    
+    def test_matching_etag_returns_304(self, cache):
+        """Test that a revalidation with the current ETag has no body."""
+        first = cache.static("js/app.js", _request(accept_encoding="gzip"))
+        second = cache.static("js/app.js", _request(accept_encoding="gzip", if_none_match=first.headers["etag"]))
+        
+        assert second.status_code == 304
+        assert second.body == b""
+        assert second.headers["etag"] == first.headers["etag"]
+    
+    def test_etag_differs_per_encoding(self, cache):
+        """Test that each representation has its own strong ETag."""
+        plain = cache.static("js/app.js", _request())
+        gzipped = cache.static("js/app.js", _request(accept_encoding="gzip"))
+        
+        assert plain.headers["etag"] != gzipped.headers["etag"]
+    
+    def test_stale_etag_returns_body(self, cache):
+        """Test that an old ETag gets the full response."""
+        response = cache.static("js/app.js", _request(if_none_match='"0000"'))
+        
+        assert response.status_code == 200
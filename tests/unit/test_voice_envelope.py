@@ -0,0 +1,130 @@
+"""
+Tests for the negotiated /api/voice/process response formats.
+"""
+
+import base64
+import json
+
+import pytest
+
+from src.api import voice_envelope
+
+
+META = {
+    "session_id": "550e8400-e29b-41d4-a716-446655440000",
+    "transcribed_text": "¿Qué tiempo hará mañana?",
+    "response_text": "Mañana habrá sol y 24 °C.",
+    "latency": {"total": 1.5, "stt": 0.3, "llm": 0.9, "tts": 0.3}
+}
+AUDIO = b"RIFF" + bytes(range(256)) * 8
+
+
+@pytest.mark.unit
+class TestNegotiation:
+    """Test Accept header negotiation."""
+    
+    @pytest.mark.parametrize("accept,expected", [
+        ("", voice_envelope.FORMAT_HEADERS),
+        ("*/*", voice_envelope.FORMAT_HEADERS),
+        ("audio/wav", voice_envelope.FORMAT_HEADERS),
+        ("multipart/mixed", voice_envelope.FORMAT_MULTIPART),
+        (voice_envelope.FRAME_MEDIA_TYPE, voice_envelope.FORMAT_FRAME),
+        (f"multipart/mixed, {voice_envelope.FRAME_MEDIA_TYPE}", voice_envelope.FORMAT_MULTIPART),
+        (f"multipart/mixed;q=0.5, {voice_envelope.FRAME_MEDIA_TYPE}", voice_envelope.FORMAT_FRAME),
+        (f"{voice_envelope.FRAME_MEDIA_TYPE};q=0, audio/wav", voice_envelope.FORMAT_HEADERS),
+    ])
+    def test_negotiate(self, accept, expected):
+        """Test that quality and client order pick the format."""
+        assert voice_envelope.negotiate(accept) == expected
+
+
+@pytest.mark.unit
+class TestAudioNegotiation:
+    """Test negotiation of the response audio codec."""
+    
+    FORMATS = {
+        "wav": "audio/wav",
+        "ogg": "audio/ogg; codecs=opus",
+        "mp3": "audio/mpeg",
+        "wav16k": "audio/wav"
+    }
+    
+    @pytest.mark.parametrize("accept,expected", [
+        ("", None),
+        (voice_envelope.FRAME_MEDIA_TYPE, None),
+        ("audio/ogg, audio/wav;q=0.5", "ogg"),
+        (f"{voice_envelope.FRAME_MEDIA_TYPE}, audio/mpeg, audio/ogg", "mp3"),
+        ("audio/wav", "wav"),
+        ("audio/flac", None),
+    ])
+    def test_negotiate_audio(self, accept, expected):
+        """Test that audio/* entries pick the codec, independent of the envelope."""
+        assert voice_envelope.negotiate_audio(accept, self.FORMATS) == expected
+    
+    def test_audio_types_select_header_envelope(self):
+        """Test that asking only for compressed audio keeps the audio body."""
+        assert voice_envelope.negotiate("audio/ogg") == voice_envelope.FORMAT_HEADERS
+
+
+@pytest.mark.unit
+class TestEncoding:
+    """Test each response format round-trips text and audio."""
+    
+    def test_headers_format_is_backwards_compatible(self):
+        """Test that the default format keeps audio body and base64 headers."""
+        body, media_type, headers = voice_envelope.encode(voice_envelope.FORMAT_HEADERS, META, AUDIO)
+        
+        assert body is AUDIO
+        assert media_type == "audio/wav"
+        assert base64.b64decode(headers["X-Response-Text"]).decode("utf-8") == META["response_text"]
+    
+    def test_frame_round_trip(self):
+        """Test that a frame decodes back to the same metadata and audio."""
+        body, media_type, headers = voice_envelope.encode(voice_envelope.FORMAT_FRAME, META, AUDIO)
+        
+        assert media_type == voice_envelope.FRAME_MEDIA_TYPE
+        assert headers == {}
+        assert voice_envelope.decode_frame(body) == (META, AUDIO)
+    
+    def test_audio_type_is_forwarded(self):
+        """Test that a compressed codec sets the body and part media types."""
+        meta = {**META, "audio_type": "audio/ogg; codecs=opus"}
+        
+        _, media_type, _ = voice_envelope.encode(voice_envelope.FORMAT_HEADERS, meta, AUDIO)
+        body, _, _ = voice_envelope.encode(voice_envelope.FORMAT_MULTIPART, meta, AUDIO)
+        
+        assert media_type == "audio/ogg; codecs=opus"
+        assert b"Content-Type: audio/ogg; codecs=opus\r\n" in body
+    
+    def test_truncated_frame_raises_error(self):
+        """Test that a truncated or foreign frame is rejected."""
+        body, _, _ = voice_envelope.encode(voice_envelope.FORMAT_FRAME, META, AUDIO)
+        
+        with pytest.raises(ValueError):
+            voice_envelope.decode_frame(body[:-1])
+        with pytest.raises(ValueError):
+            voice_envelope.decode_frame(b"WAVE" + body[4:])
+    
+    def test_multipart_parts(self):
+        """Test that multipart/mixed carries a JSON part and an audio part."""
+        body, media_type, _ = voice_envelope.encode(voice_envelope.FORMAT_MULTIPART, META, AUDIO)
+        boundary = media_type.split("boundary=")[1].encode()
+        
+        parts = body.split(b"--" + boundary)
+        assert parts[0] == b"" and parts[-1] == b"--\r\n"
+        
+        json_part, audio_part = (part.split(b"\r\n\r\n", 1) for part in parts[1:3])
+        assert b"application/json" in json_part[0]
+        assert json.loads(json_part[1]) == META
+        assert b"audio/wav" in audio_part[0]
+        assert audio_part[1] == AUDIO + b"\r\n"
+    
+    def test_binary_formats_are_smaller_than_base64_headers(self):
+        """Test that the envelopes avoid the base64 overhead on long replies."""
+        meta = {**META, "response_text": "Una respuesta larga con acentos: áéíóú. " * 100}
+        body, _, headers = voice_envelope.encode(voice_envelope.FORMAT_HEADERS, meta, AUDIO)
+        legacy = len(body) + sum(len(v) for v in headers.values())
+        
+        frame, _, _ = voice_envelope.encode(voice_envelope.FORMAT_FRAME, meta, AUDIO)
+        
+        assert len(frame) < legacy